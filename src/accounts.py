@@ -0,0 +1,230 @@
+#
+import threading
+
+#
+from typing import Callable, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+#
+from algosdk.v2client.algod import AlgodClient
+
+#
+from confirmation import ConfirmationTracker
+from state import StateReader
+
+
+#
+@dataclass
+class AccountSnapshot:
+    address: str
+    round: int
+    amount: int
+    min_balance: int
+    assets: dict = field(default_factory=dict)
+    created_apps: dict = field(default_factory=dict)
+
+
+#
+class AccountReader:
+    """
+    AccountReader object for reading many accounts concurrently,
+    snapshots are cached with the round they were read at until a
+    tracked transaction touching the account confirms
+    """
+
+    #
+    def __init__(
+                self,
+                client: Optional[AlgodClient],
+                round_source: Callable[[], Optional[int]],
+                confirmation_tracker: Optional[ConfirmationTracker] = None,
+                state_reader: Optional[StateReader] = None,
+                max_workers: int = 8
+            ) -> None:
+        """
+        Constructor
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param round_source: function returning the current round,
+                             None disables caching
+        :param confirmation_tracker: tracker whose confirmations
+                                     invalidate cached snapshots of
+                                     the accounts they touched
+        :param state_reader: reader decoding global state of created apps
+        :param max_workers: most account_info requests in flight
+
+        :returns: None
+        """
+        self.__client = client
+        self.__round_source = round_source
+        self.__state_reader = state_reader or StateReader(client, round_source)
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__cache = {}
+        self.__generations = {}
+        self.__generation = 0
+        self.__reads = 0
+        self.__hits = 0
+        self.__misses = 0
+        if confirmation_tracker is not None:
+            confirmation_tracker.add_address_listener(self.invalidate)
+
+    #
+    @property
+    def hits(self) -> int:
+        """
+        Getter for hits private field
+
+        :returns: number of snapshots served from cache
+        """
+        return self.__hits
+
+    #
+    @property
+    def misses(self) -> int:
+        """
+        Getter for misses private field
+
+        :returns: number of account_info requests made
+        """
+        return self.__misses
+
+    #
+    def get(self, address: str) -> AccountSnapshot:
+        """
+        Get snapshot of one account
+
+        :param address: account address
+
+        :returns: account snapshot
+        """
+        return self.snapshot([address])[address]
+
+    #
+    def snapshot(self, addresses: list) -> dict:
+        """
+        Get snapshots of many accounts, snapshots read at the current
+        round or later are reused, the rest is fetched concurrently with
+        at most max_workers requests in flight
+
+        :param addresses: account addresses
+
+        :returns: account snapshot per address
+        """
+        round_num = self.__round_source()
+        snapshots = {}
+        missing = []
+        with self.__lock:
+            generation = self.__generation
+            for address in dict.fromkeys(addresses):
+                cached = self.__cache.get(address)
+                if round_num is not None and cached is not None and cached[0] >= round_num:
+                    self.__hits += 1
+                    snapshots[address] = cached[1]
+                else:
+                    missing.append((address, self.__generations.get(address, 0)))
+            if missing:
+                self.__reads += 1
+
+        if not missing:
+            return snapshots
+        fetched = []
+        try:
+            if len(missing) == 1:
+                fetched = [self.__fetch(missing[0][0])]
+            else:
+                fetched = list(self.__get_executor().map(self.__fetch, [address for address, _ in missing]))
+        finally:
+            with self.__lock:
+                self.__misses += len(fetched)
+                for snapshot, (_, address_generation) in zip(fetched, missing):
+                    snapshots[snapshot.address] = snapshot
+                    # snapshot read while a transaction touching the
+                    # account confirmed is not kept
+                    if (round_num is not None and snapshot.round is not None
+                            and self.__generation == generation
+                            and self.__generations.get(snapshot.address, 0) == address_generation):
+                        self.__cache[snapshot.address] = (snapshot.round, snapshot)
+                # generations are only compared by reads in flight
+                self.__reads -= 1
+                if not self.__reads:
+                    self.__generations.clear()
+
+        return snapshots
+
+    #
+    def invalidate(self, address: Optional[str] = None, round_num: Optional[int] = None) -> None:
+        """
+        Drop cached snapshot of account touched by a confirmed transaction
+
+        :param address: account address, None drops every snapshot
+        :param round_num: round transaction was confirmed in
+
+        :returns: None
+        """
+        with self.__lock:
+            if address is None:
+                self.__cache.clear()
+                self.__generations.clear()
+                self.__generation += 1
+            else:
+                self.__cache.pop(address, None)
+                if self.__reads:
+                    self.__generations[address] = self.__generations.get(address, 0) + 1
+
+    #
+    def close(self) -> None:
+        """
+        Shut down executor reading accounts concurrently, a later
+        snapshot starts a new one
+
+        :returns: None
+        """
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    #
+    def __get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get executor reading accounts concurrently, created on first use
+
+        :returns: executor
+        """
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(
+                                        max_workers=self.__max_workers,
+                                        thread_name_prefix="account-reader"
+                                    )
+            return self.__executor
+
+    #
+    def __fetch(self, address: str) -> AccountSnapshot:
+        """
+        Read account and decode assets and created apps
+
+        :param address: account address
+
+        :returns: account snapshot
+        """
+        info = self.__client.account_info(address)
+        return AccountSnapshot(
+                    address=address,
+                    round=info.get("round"),
+                    amount=info.get("amount", 0),
+                    min_balance=info.get("min-balance", 0),
+                    assets={
+                        asset["asset-id"]: asset["amount"]
+                        for asset in info.get("assets") or []
+                    },
+                    created_apps={
+                        app["id"]: self.__state_reader.decode(
+                            app["params"].get("global-state") or [])
+                        for app in info.get("created-apps") or []
+                    }
+                )
@@ -10,6 +10,20 @@ from algosdk import account, mnemonic, transaction, logic
 from algosdk.v2client.algod import AlgodClient
 from algosdk.transaction import PaymentTxn, SignedTransaction
 from algosdk.transaction import ApplicationCreateTxn, ApplicationCallTxn
+from algosdk.transaction import ApplicationDeleteTxn
+from algosdk.transaction import AssetConfigTxn
+from algosdk.transaction import SuggestedParams
+
+#
+from accounts import AccountReader
+from confirmation import ConfirmationTracker
+from metrics import REGISTRY, MetricsRegistry, instrumented
+from signer import TransactionSigner
+from state import StateReader
+from suggested_params import SuggestedParamsProvider
+from router import RoutedAlgodClient
+from scheduler import RequestScheduler
+from transport import HttpTransport, PooledAlgodClient
 
 
 #
@@ -28,112 +42,17 @@ class AlgoUser:
 
 
 #
-class Algorand:
+class TransactionBuilder:
     """
-    Algorand object for interacting with algosdk
+    TransactionBuilder object with transaction builders shared by
+    synchronous and asynchronous clients, subclasses provide params,
+    signer and metrics
     """
 
     # global and local schema parameters
     GLOBAL_SCHEMA = transaction.StateSchema(num_uints=4, num_byte_slices=4)
     LOCAL_SCHEMA = transaction.StateSchema(num_uints=4, num_byte_slices=4)
 
-    #
-    def __init__(self, algo_token: str, algo_address: str) -> None:
-        """
-        Constructor
-
-        :param algo_token: token for connecting algorand testnet
-        :param algo_address: algorand testnet address
-
-        :returns: None
-        """
-        self.__token = algo_token
-        self.__address = algo_address
-        self.__headers = {"X-API-Key": self.token}
-        self.__client = self.__get_client()
-        self.__params = self.client.suggested_params()
-
-    #
-    def __get_client(self) -> Optional[AlgodClient]:
-        """
-        create AlgodClient object from given token and address
-
-        :returns: AlgodClient object
-        """
-        return AlgodClient(self.token, self.address, self.headers)
-
-    #
-    @property
-    def headers(self) -> dict:
-        """
-        Getter for header private field
-
-        :returns: headers field value
-        """
-        return self.__headers
-
-    #
-    @property
-    def token(self) -> str:
-        """
-        Getter for token private field
-
-        :returns: token field value
-        """
-        return self.__token
-
-    #
-    @property
-    def address(self) -> str:
-        """
-        Getter for address private field
-
-        :returns: address field value
-        """
-        return self.__address
-
-    #
-    @property
-    def params(self) -> str:
-        """
-        Getter for params private field
-
-        :returns: params field value
-        """
-        return self.__params
-
-    #
-    @property
-    def client(self) -> Optional[AlgodClient]:
-        """
-        Getter for client private field
-
-        :returns: client field value
-        """
-        return self.__client
-
-    #
-    def get_balance(self, address: str) -> int:
-        """
-        Get balance of given account
-
-        :params address: address of account
-
-        :returns: amount balance
-        """
-        return self.client.account_info(address).get("amount")
-
-    #
-    def get_transaction_info(self, tx_id: str):
-        """
-        Get transaction information
-
-        :param tx_id: transaction id
-
-        :returns: transaction information
-        """
-        return self.client.pending_transaction_info(tx_id)
-
     #
     def generate_new_account(self) -> dict:
         """
@@ -146,19 +65,6 @@ class Algorand:
 
         return AlgoUser(private_key, address, mnem)
 
-    #
-    def get_application_id(self, tx_id: str) -> int:
-        """
-        Get application id from transaction id
-
-        :param tx_id: transaction id
-
-        :returns: application id
-        """
-        transaction_info = self.get_transaction_info(tx_id)
-        app_id = transaction_info.get("application-index")
-        return app_id
-
     #
     def get_application_address(self, app_id: int) -> str:
         """
@@ -172,6 +78,7 @@ class Algorand:
         return app_address
 
     #
+    @instrumented("build")
     def build_payment_transaction(
                 self,
                 sender: str,
@@ -199,11 +106,14 @@ class Algorand:
         return txn
 
     #
+    @instrumented("build")
     def create_application_transaction(
                 self,
                 sender: str,
                 approval_teal: bytes,
-                clear_teal: bytes
+                clear_teal: bytes,
+                app_args: list = None,
+                receiver: str = None
             ) -> Optional[ApplicationCreateTxn]:
         """
         Create transaction that interacts with the application system
@@ -211,6 +121,8 @@ class Algorand:
         :param sender: address
         :param approval_teal: transaction smart contract in bytes
         :param clear_teal: clear smart contract in bytes
+        :param app_args: arguments passed to the creation call
+        :param receiver: receiver address passed to the creation call
 
         :returns: application transaction
         """
@@ -221,11 +133,14 @@ class Algorand:
             approval_program=approval_teal,
             clear_program=clear_teal,
             global_schema=self.GLOBAL_SCHEMA,
-            local_schema=self.LOCAL_SCHEMA
+            local_schema=self.LOCAL_SCHEMA,
+            app_args=app_args,
+            accounts=[receiver] if receiver else None
         )
         return app_create_txn
 
     #
+    @instrumented("sign")
     def sign_transaction(
                 self,
                 sender: str,
@@ -239,40 +154,33 @@ class Algorand:
 
         :returns: signed transaction
         """
-        signed_txn = txn.sign(sender)
+        signed_txn = self.signer.sign(sender, txn)
         return signed_txn
 
     #
-    def send_transaction(self, signed_txn: Optional[SignedTransaction]) -> str:
+    @instrumented("sign")
+    def sign_transactions(self, sender, txns: list) -> list:
         """
-        Send already signed transaction
+        Sign transactions, large batches in parallel
 
-        :param signed_txn: signed transaction which should be sent
+        :param sender: private key signing every transaction
+                       or list of private keys, one per transaction
+        :param txns: transactions which should be signed
 
-        :returns: transaction id
+        :returns: signed transactions in order of txns
         """
-        tx_id = self.client.send_transaction(signed_txn)
-        return tx_id
-
-    #
-    def wait_for_confirmation(self, tx_id: str) -> None:
-        """
-        Block until a pending transaction is confirmed by the network
-
-        :param tx_id: transaction id
-
-        :returns None
-        """
-        return transaction.wait_for_confirmation(self.client, tx_id, 4)
+        return self.signer.sign_batch(sender, txns)
 
     #
+    @instrumented("build")
     def call_application_transaction(
                 self,
                 sender: str,
                 app_id: int,
                 app_args: list,
                 receiver: str=None,
-                asset: int=None
+                asset: int=None,
+                boxes: list=None
             ) -> Optional[ApplicationCallTxn]:
         """
         Create Application call transaction object
@@ -281,6 +189,8 @@ class Algorand:
         :param app_id: application id for which transaction is made
         :param app_args: arguments for application smart contract
         :param receiver: receiver address
+        :param asset: foreign asset id
+        :param boxes: names of application boxes the call accesses
 
         :returns: ApplicationCallTxn objects
         """
@@ -300,11 +210,13 @@ class Algorand:
             on_complete=transaction.OnComplete.NoOpOC.real,
             app_args=app_args,
             accounts=accounts,
-            foreign_assets=assets
+            foreign_assets=assets,
+            boxes=[(0, name) for name in boxes or []]
         )
         return app_call_txn
 
     #
+    @instrumented("build")
     def call_application_transaction_foreign_asset(
                 self,
                 sender: str,
@@ -333,6 +245,7 @@ class Algorand:
         )
         return app_call_txn
     #
+    @instrumented("build")
     def create_application_no_op_transaction(self, sender, app_id, app_args, receiver=None):
         accounts = []
         if receiver:
@@ -349,20 +262,438 @@ class Algorand:
         return txn
 
     #
-    def create_asset(self, creator):
+    @instrumented("build")
+    def delete_application_transaction(
+                self,
+                sender: str,
+                app_id: int
+            ) -> Optional[ApplicationDeleteTxn]:
+        """
+        Create transaction deleting application
+
+        :param sender: creator address
+        :param app_id: application id
+
+        :returns: application delete transaction
+        """
+        txn = transaction.ApplicationDeleteTxn(
+            sender=sender,
+            sp=self.params,
+            index=app_id
+        )
+        return txn
+
+    #
+    @instrumented("build")
+    def create_asset_transaction(self, creator: str) -> Optional[AssetConfigTxn]:
+        """
+        Create transaction creating the swap asset
+
+        :param creator: creator address, also manager, reserve, freeze
+                        and clawback address
+
+        :returns: asset config transaction
+        """
         txn = transaction.AssetConfigTxn(
-                sender=creator.address,
+                sender=creator,
                 sp=self.params,
                 total=1000000,
                 default_frozen=False,
                 unit_name="LSCOIN",
                 asset_name="LS Coin",
-                manager=creator.address,
-                reserve=creator.address,
-                freeze=creator.address,
-                clawback=creator.address,
+                manager=creator,
+                reserve=creator,
+                freeze=creator,
+                clawback=creator,
                 decimals=0
         )
+        return txn
+
+
+#
+class Algorand(TransactionBuilder):
+    """
+    Algorand object for interacting with algosdk
+    """
+
+    #
+    def __init__(
+                self,
+                algo_token: str,
+                algo_address: str,
+                params_provider: Optional[SuggestedParamsProvider] = None,
+                confirmation_tracker: Optional[ConfirmationTracker] = None,
+                client: Optional[AlgodClient] = None,
+                signer: Optional[TransactionSigner] = None,
+                transport: Optional[HttpTransport] = None,
+                scheduler: Optional[RequestScheduler] = None,
+                metrics: Optional[MetricsRegistry] = None
+            ) -> None:
+        """
+        Constructor
+
+        :param algo_token: token for connecting algorand testnet
+        :param algo_address: algorand testnet address or list of
+                             addresses of interchangeable nodes
+        :param params_provider: shared suggested params cache,
+                                created for the client when not given
+        :param confirmation_tracker: shared confirmation tracker,
+                                     created for the client when not given
+        :param client: object used in place of AlgodClient, e.g. FakeAlgod
+        :param signer: shared signer caching decoded keys,
+                       created for the client when not given
+        :param transport: pooled keep-alive connections to algo_address
+                          shared by every request, created for the
+                          client when not given, unused with client
+        :param scheduler: rate limiter ordering requests by priority,
+                          used by the transport created for the client
+        :param metrics: registry operations and algod requests are
+                        recorded in, the package REGISTRY by default
+
+        :returns: None
+        """
+        self.__token = algo_token
+        self.__address = algo_address
+        self.__headers = {"X-API-Key": self.token}
+        self.__transport = transport
+        self.__scheduler = scheduler
+        self.__metrics = metrics or REGISTRY
+        self.__client = client or self.__get_client()
+        self.__signer = signer or TransactionSigner()
+        self.__params_provider = params_provider or SuggestedParamsProvider(self.client)
+        if self.__params_provider.current_round() is None:
+            self.__params_provider.refresh()
+        self.__confirmation_tracker = confirmation_tracker or ConfirmationTracker(self.client)
+        self.__state_reader = StateReader(
+                                    self.client,
+                                    self.__params_provider.current_round,
+                                    self.__confirmation_tracker
+                                )
+        self.__account_reader = AccountReader(
+                                    self.client,
+                                    self.__params_provider.current_round,
+                                    self.__confirmation_tracker,
+                                    self.__state_reader
+                                )
+
+    #
+    def __get_client(self) -> Optional[AlgodClient]:
+        """
+        create AlgodClient object from given token and address,
+        requests reuse connections of the pooled transport, a list of
+        addresses is routed between the endpoints
+
+        :returns: AlgodClient object
+        """
+        if isinstance(self.address, list):
+            return RoutedAlgodClient.from_addresses(
+                        self.token, self.address, self.headers, self.__scheduler, self.__metrics)
+        self.__transport = self.__transport or HttpTransport(
+                                self.address, scheduler=self.__scheduler, metrics=self.__metrics)
+        return PooledAlgodClient(self.token, self.address, self.headers, self.__transport)
+
+    #
+    @property
+    def headers(self) -> dict:
+        """
+        Getter for header private field
+
+        :returns: headers field value
+        """
+        return self.__headers
+
+    #
+    @property
+    def token(self) -> str:
+        """
+        Getter for token private field
+
+        :returns: token field value
+        """
+        return self.__token
+
+    #
+    @property
+    def address(self) -> str:
+        """
+        Getter for address private field
+
+        :returns: address field value
+        """
+        return self.__address
+
+    #
+    @property
+    def params(self) -> Optional[SuggestedParams]:
+        """
+        Getter for suggested params of a new transaction
+
+        :returns: cached params valid from the current round
+        """
+        return self.params_provider.get()
+
+    #
+    @property
+    def params_provider(self) -> Optional[SuggestedParamsProvider]:
+        """
+        Getter for params_provider private field
+
+        :returns: params_provider field value
+        """
+        return self.__params_provider
+
+    #
+    @property
+    def confirmation_tracker(self) -> Optional[ConfirmationTracker]:
+        """
+        Getter for confirmation_tracker private field
+
+        :returns: confirmation_tracker field value
+        """
+        return self.__confirmation_tracker
+
+    #
+    @property
+    def transport(self) -> Optional[HttpTransport]:
+        """
+        Getter for transport private field
+
+        :returns: transport field value, None when a client was given
+        """
+        return self.__transport
+
+    #
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """
+        Getter for metrics private field
+
+        :returns: metrics field value
+        """
+        return self.__metrics
+
+    #
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        """
+        Getter for scheduler private field
+
+        :returns: scheduler field value
+        """
+        return self.__scheduler
+
+    #
+    @property
+    def signer(self) -> Optional[TransactionSigner]:
+        """
+        Getter for signer private field
+
+        :returns: signer field value
+        """
+        return self.__signer
+
+    #
+    @property
+    def state_reader(self) -> Optional[StateReader]:
+        """
+        Getter for state_reader private field
+
+        :returns: state_reader field value
+        """
+        return self.__state_reader
+
+    #
+    @property
+    def account_reader(self) -> Optional[AccountReader]:
+        """
+        Getter for account_reader private field
+
+        :returns: account_reader field value
+        """
+        return self.__account_reader
+
+    #
+    @property
+    def client(self) -> Optional[AlgodClient]:
+        """
+        Getter for client private field
+
+        :returns: client field value
+        """
+        return self.__client
+
+    #
+    def get_balance(self, address: str) -> int:
+        """
+        Get balance of given account
+
+        :params address: address of account
+
+        :returns: amount balance
+        """
+        return self.account_reader.get(address).amount
+
+    #
+    def get_balances(self, addresses: list) -> dict:
+        """
+        Get balances of many accounts read concurrently
+
+        :params addresses: addresses of accounts
+
+        :returns: amount balance per address
+        """
+        snapshots = self.account_reader.snapshot(addresses)
+        return {address: snapshot.amount for address, snapshot in snapshots.items()}
+
+    #
+    def get_transaction_info(self, tx_id: str):
+        """
+        Get transaction information
+
+        :param tx_id: transaction id
+
+        :returns: transaction information
+        """
+        return self.client.pending_transaction_info(tx_id)
+
+    #
+    def get_application_id(self, tx_id: str) -> int:
+        """
+        Get application id from transaction id
+
+        :param tx_id: transaction id
+
+        :returns: application id
+        """
+        transaction_info = self.get_transaction_info(tx_id)
+        app_id = transaction_info.get("application-index")
+        return app_id
+
+    #
+    @staticmethod
+    def get_called_app_ids(txns: list) -> tuple:
+        """
+        Get ids of existing applications called by transactions
+
+        :param txns: unsigned transactions
+
+        :returns: application ids
+        """
+        return tuple(
+            txn.index for txn in txns
+            if isinstance(txn, ApplicationCallTxn) and txn.index
+        )
+
+    #
+    def get_touched_addresses(self, txns: list) -> Optional[tuple]:
+        """
+        Get accounts whose balance or assets transactions may change
+
+        :param txns: unsigned transactions
+
+        :returns: addresses, None when an application call may pay
+                  accounts whose state is not cached
+        """
+        addresses = []
+        for txn in txns:
+            addresses.append(txn.sender)
+            for name in ("receiver", "close_remainder_to", "close_assets_to", "revocation_target"):
+                if getattr(txn, name, None):
+                    addresses.append(getattr(txn, name))
+            if isinstance(txn, ApplicationCallTxn) and txn.index:
+                # inner transactions pay accounts held in global state
+                held = self.state_reader.cached_addresses(txn.index)
+                if held is None:
+                    return None
+                addresses.append(logic.get_application_address(txn.index))
+                addresses.extend(txn.accounts or [])
+                addresses.extend(held)
+        return tuple(dict.fromkeys(addresses))
+
+    #
+    @instrumented("send")
+    def send_transaction(self, signed_txn: Optional[SignedTransaction]) -> str:
+        """
+        Send already signed transaction
+
+        :param signed_txn: signed transaction which should be sent
+
+        :returns: transaction id
+        """
+        mark = self.confirmation_tracker.mark()
+        tx_id = self.client.send_transaction(signed_txn)
+        self.confirmation_tracker.track(
+            tx_id,
+            signed_txn.transaction.last_valid_round,
+            self.get_called_app_ids([signed_txn.transaction]),
+            mark,
+            self.get_touched_addresses([signed_txn.transaction])
+        )
+        return tx_id
+
+    #
+    @instrumented("send")
+    def send_group(self, sender, txns: list) -> str:
+        """
+        Assign group id to transactions, sign them and submit the group
+        in one request, then wait once for the whole group to confirm
+
+        :param sender: private key signing every member of the group
+                       or list of private keys, one per transaction
+        :param txns: transactions which should be executed atomically
+
+        :returns: id of the first transaction in the group
+        """
+        transaction.assign_group_id(txns)
+        signed_txns = self.sign_transactions(sender, txns)
+        tx_id = self.send_transactions(signed_txns)
+        self.wait_for_confirmation(tx_id)
+        return tx_id
+
+    #
+    @instrumented("send")
+    def send_transactions(self, signed_txns: list) -> str:
+        """
+        Send already signed transactions in one request, a group has to
+        be assigned its group id before signing
+
+        :param signed_txns: signed transactions
+
+        :returns: id of the first transaction
+        """
+        mark = self.confirmation_tracker.mark()
+        tx_id = self.client.send_transactions(signed_txns)
+        self.confirmation_tracker.track(
+            tx_id,
+            min(signed_txn.transaction.last_valid_round for signed_txn in signed_txns),
+            self.get_called_app_ids([signed_txn.transaction for signed_txn in signed_txns]),
+            mark,
+            self.get_touched_addresses([signed_txn.transaction for signed_txn in signed_txns])
+        )
+        return tx_id
+
+    #
+    @instrumented("confirm")
+    def wait_for_confirmation(self, tx_id: str) -> dict:
+        """
+        Block until a pending transaction is confirmed by the network
+        or its last valid round has passed
+
+        :param tx_id: transaction id
+
+        :returns: {"confirmed-round": round}
+        """
+        # transactions sent elsewhere are tracked for the longest validity
+        last_valid = (
+            self.params_provider.current_round()
+            + SuggestedParamsProvider.MAX_TXN_LIFE
+        )
+        return self.confirmation_tracker.wait(tx_id, last_valid)
+
+    #
+    @instrumented("asset")
+    def create_asset(self, creator):
+        txn = self.create_asset_transaction(creator.address)
         signed_txn = self.sign_transaction(creator.pk, txn)
         tx_id = self.send_transaction(signed_txn)
         self.wait_for_confirmation(tx_id)
@@ -370,6 +701,7 @@ class Algorand:
         return response['asset-index']
 
     #
+    @instrumented("asset")
     def opt_in_to_asset(self, sender, asset_id):
         txn = transaction.AssetTransferTxn(
                 sender=sender.address,
@@ -387,7 +719,8 @@ class Algorand:
     #
     def get_application_global_state(self, app_id: int) -> dict:
         """
-        Get application global state info
+        Get application global state info, see state_reader for typed
+        and cached state
 
         :param app_id: application id
 
@@ -1,10 +1,22 @@
+#
+import base64
+import functools
+
 #
 from typing import Optional
 
+#
+from algosdk import constants, encoding, error, transaction
+
 #
 from algorand import Algorand, AlgoUser
 
 #
+from app_pool import AppPool
+from journal import SwapJournal
+from metrics import instrumented
+from profiling import profiled
+from scheduler import Priority, request_priority
 from teal import TealManager
 from utils import fill_smart_contract_balance
 
@@ -14,13 +26,47 @@ class AlgorandHTLC(Algorand):
     AlgoriandHTLC object for running preHtlc protocol steps
     """
 
+    # minimum balance of an application account holding no boxes
+    REGISTRY_MIN_BALANCE = 100000
+
+    # journal steps finishing a swap
+    COMPLETING_STEPS = ("redeem_dest", "claim")
+
+    #
+    def __init__(self, *args, journal: Optional[SwapJournal] = None, **kwargs) -> None:
+        """
+        Constructor, see Algorand
+
+        :param journal: swap journal protocol steps called with a
+                        swap_id are recorded in, steps it holds as
+                        confirmed are not sent again
+
+        :returns: None
+        """
+        super().__init__(*args, **kwargs)
+        self.__journal = journal
+
+    #
+    @property
+    def journal(self) -> Optional[SwapJournal]:
+        """
+        Getter for journal private field
+
+        :returns: journal field value
+        """
+        return self.__journal
+
     #
+    @profiled
+    @instrumented("htlc")
     def commit(
                 self,
                 teal_manager: Optional[TealManager],
                 sender: dict,
                 amount: int,
-                receiver: dict
+                receiver: dict,
+                pool: Optional[AppPool] = None,
+                swap_id=None
             ) -> int:
         """
         Commit funds for choosen LP
@@ -29,25 +75,79 @@ class AlgorandHTLC(Algorand):
         :param sender: commit account info
         :param amount: commited amount
         :param receiver: receiver account
+        :param pool: pool of pre-deployed applications, when given only
+                     the commit call is made on a pooled application
+        :param swap_id: journal key of the swap, see journal
 
         :returns: application id
         """
+        swap = self.__resume(swap_id, 'commit')
+        if swap is not None:
+            app_id = swap["app_id"] or self.get_application_id(swap["steps"]["commit"]["tx_id"])
+            return app_id, self.get_application_address(app_id)
+
+        if pool is not None:
+            app_id, app_address = pool.acquire('commit')
+            try:
+                self.commit_to_app(sender, app_id, amount, receiver, swap_id)
+            except Exception:
+                # an application the commit did not reach goes back to
+                # the pool, release keeps one holding committed funds
+                pool.release('commit', app_id)
+                raise
+            return app_id, app_address
 
         approval_teal, clear_teal = teal_manager.deploy_contract(self.client, 'commit')
 
+        # application is created and the commitment recorded in one call
+        app_args = [b"commit", (amount).to_bytes(8, 'big')]
+
         txn = self.create_application_transaction(
                     sender.address,
                     approval_teal,
-                    clear_teal
+                    clear_teal,
+                    app_args,
+                    receiver.address
                 )
 
         signed_txn = self.sign_transaction(sender.pk, txn)
-        tx_id = self.send_transaction(signed_txn)
-
-        self.wait_for_confirmation(tx_id)
+        tx_id, round_num = self.__send(swap_id, 'commit', [signed_txn])
 
         app_id = self.get_application_id(tx_id)
         app_address = self.get_application_address(app_id)
+        self.__record(
+            swap_id, 'commit', tx_id, round_num,
+            app_id=app_id, app_address=app_address, sender=sender.address,
+            receiver=receiver.address, amount=amount
+        )
+
+        return app_id, app_address
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def commit_to_app(
+                self,
+                sender: Optional[AlgoUser],
+                app_id: int,
+                amount: int,
+                receiver: Optional[AlgoUser],
+                swap_id=None
+            ) -> str:
+        """
+        Commit funds for choosen LP in existing application
+
+        :param sender: commit account info
+        :param app_id: application id
+        :param amount: commited amount
+        :param receiver: receiver account
+        :param swap_id: journal key of the swap, see journal
+
+        :returns: transaction id
+        """
+        swap = self.__resume(swap_id, 'commit')
+        if swap is not None:
+            return swap["steps"]["commit"]["tx_id"]
 
         app_args = [b"commit", (amount).to_bytes(8, 'big')]
 
@@ -59,20 +159,26 @@ class AlgorandHTLC(Algorand):
                 )
 
         signed_txn = self.sign_transaction(sender.pk, txn)
-        tx_id = self.send_transaction(signed_txn)
-
-        self.wait_for_confirmation(tx_id)
+        tx_id, round_num = self.__send(swap_id, 'commit', [signed_txn])
+        self.__record(
+            swap_id, 'commit', tx_id, round_num,
+            app_id=app_id, app_address=self.get_application_address(app_id),
+            sender=sender.address, receiver=receiver.address, amount=amount
+        )
 
-        return app_id, app_address
+        return tx_id
 
     #
+    @profiled
+    @instrumented("htlc")
     def lock_commitment(
                 self,
                 sender: Optional[AlgoUser],
                 app_id: int,
                 amount: int,
                 hashlock: str,
-                receiver: dict
+                receiver: dict,
+                swap_id=None
             ) -> dict:
         """
         lock commited fund and write hashlock in smart contract
@@ -81,38 +187,43 @@ class AlgorandHTLC(Algorand):
         :param app_id: application id
         :param hashlock: hashlock from LP for writing in smart contract
         :param receiver: receiver address
+        :param swap_id: journal key of the swap, see journal
 
         :returns: state of application
         """
+        if self.__resume(swap_id, 'lock') is not None:
+            return
 
         app_args = [b"lock", hashlock]
 
-        app_txn = self.call_application_transaction(
-                    sender.address,
-                    app_id,
-                    app_args,
-                    receiver
-                )
         pmt_txn = self.build_payment_transaction(
                     sender.address,
                     self.get_application_address(app_id),
                     amount,
                     "Lock Commitment"
                 )
+        app_txn = self.call_application_transaction(
+                    sender.address,
+                    app_id,
+                    app_args,
+                    receiver
+                )
 
-        signed_app_txn = self.sign_transaction(sender.pk, app_txn)
-        signed_pmt_txn = self.sign_transaction(sender.pk, pmt_txn)
-
-        app_txn_id = self.send_transaction(signed_app_txn)
-        pmt_txn_id = self.send_transaction(signed_pmt_txn)
-
-        self.wait_for_confirmation(app_txn_id)
-        self.wait_for_confirmation(pmt_txn_id)
+        txns = transaction.assign_group_id([pmt_txn, app_txn])
+        tx_id, round_num = self.__send(swap_id, 'lock', self.sign_transactions(sender.pk, txns), hashlock=hashlock)
+        self.__record(swap_id, 'lock', tx_id, round_num, hashlock=hashlock)
 
-        
     #
-    def redeem(self, sender, app_id, secret):
-        # 3d. Bob Claims the Funds
+    @profiled
+    @instrumented("htlc")
+    def redeem(self, sender, app_id, secret, swap_id=None, pool: Optional[AppPool] = None):
+        # 3d. Bob Claims the Funds, a pooled application is released
+        # once the claim confirms
+        swap = self.__resume(swap_id, 'redeem')
+        if swap is not None:
+            if pool is not None:
+                pool.release_later('commit', app_id)
+            return swap["steps"]["redeem"]["tx_id"]
         app_args = [b"claim", secret]
         txn = self.call_application_transaction(
                     sender.address,
@@ -120,43 +231,443 @@ class AlgorandHTLC(Algorand):
                     app_args
                 )
         signed_txn = self.sign_transaction(sender.pk, txn)
-        tx_id = self.send_transaction(signed_txn)
+        with request_priority(Priority.REDEEM):
+            tx_id, _ = self.__send(swap_id, 'redeem', [signed_txn], wait=False)
+        if pool is not None:
+            future = self.confirmation_tracker.track(tx_id, txn.last_valid_round)
+            future.add_done_callback(functools.partial(self.__release_confirmed, pool, 'commit', app_id))
         print(f"Claim Transaction ID: {tx_id}")
+        return tx_id
 
     #
-    def create_new_asset(self, teal_manager, sender):
+    @profiled
+    @instrumented("htlc")
+    def create_new_asset(self, teal_manager, sender, pool=None, swap_id=None):
+
+        swap = self.__resume(swap_id, 'create_asset')
+        if swap is not None:
+            asset_id = swap["asset_id"] or self.client.pending_transaction_info(
+                        swap["steps"]["create_asset"]["tx_id"])["asset-index"]
+        else:
+            # journaled as submitted before sending, a restart looks the
+            # asset up instead of creating a second one
+            txn = self.create_asset_transaction(sender.address)
+            signed_txn = self.sign_transaction(sender.pk, txn)
+            tx_id, round_num = self.__send(swap_id, 'create_asset', [signed_txn])
+            asset_id = self.client.pending_transaction_info(tx_id)['asset-index']
+            self.opt_in_to_asset(sender, asset_id)
+            self.__record(swap_id, 'create_asset', tx_id, round_num, asset_id=asset_id)
+
+        swap = self.__resume(swap_id, 'create_dest_app')
+        if swap is not None:
+            return swap["dest_app_id"] or self.get_application_id(
+                        swap["steps"]["create_dest_app"]["tx_id"]), asset_id
+
+        if pool is not None:
+            dest_app_id = pool.acquire('lock_redeem_dest')[0]
+            self.__record(swap_id, 'create_dest_app', dest_app_id=dest_app_id)
+            return dest_app_id, asset_id
 
-        asset_id = self.create_asset(sender)
-        self.opt_in_to_asset(sender, asset_id)
-        
         approval_teal, clear_teal = teal_manager.deploy_contract(self.client, 'lock_redeem_dest')
         txn = self.create_application_transaction(sender.address, approval_teal, clear_teal)
 
         signed_txn = self.sign_transaction(sender.pk, txn)
-        tx_id = self.send_transaction(signed_txn)
-        self.wait_for_confirmation(tx_id)
-        resp = self.client.pending_transaction_info(tx_id)
+        tx_id, round_num = self.__send(swap_id, 'create_dest_app', [signed_txn])
+        dest_app_id = self.get_application_id(tx_id)
+        self.__record(swap_id, 'create_dest_app', tx_id, round_num, dest_app_id=dest_app_id)
 
-        return resp['application-index'], asset_id
+        return dest_app_id, asset_id
 
     #
-    def lock_dest_chain(self, sender, app_id, asset_id, amount, hashlock, receiver):
-    
+    @profiled
+    @instrumented("htlc")
+    def lock_dest_chain(self, sender, app_id, asset_id, amount, hashlock, receiver, swap_id=None):
+
+        if self.__resume(swap_id, 'lock_dest') is not None:
+            return
         app_args=[b"lock", (amount).to_bytes(8, "big"), hashlock]
         txn = self.call_application_transaction(sender.address, app_id, app_args, receiver.address, asset_id)
     
         signed_txn = self.sign_transaction(sender.pk, txn)
-        tx_id = self.send_transaction(signed_txn)
-        self.wait_for_confirmation(tx_id)
+        tx_id, round_num = self.__send(swap_id, 'lock_dest', [signed_txn], hashlock=hashlock)
+        self.__record(swap_id, 'lock_dest', tx_id, round_num, hashlock=hashlock)
         print(f"Locked {amount} tokens for Bob in application {app_id}")
 
     #
-    def redeem_dest(self, receiver, app_id, secret):
-        
+    @profiled
+    @instrumented("htlc")
+    def redeem_dest(self, receiver, app_id, secret, swap_id=None, pool: Optional[AppPool] = None):
+
+        if self.__resume(swap_id, 'redeem_dest') is not None:
+            if pool is not None:
+                pool.release('lock_redeem_dest', app_id)
+            return
         app_args=[b"redeem", secret]
     
         txn = self.call_application_transaction(receiver.address, app_id, app_args)
         signed_txn = self.sign_transaction(receiver.pk, txn)
+        with request_priority(Priority.REDEEM):
+            tx_id, round_num = self.__send(swap_id, 'redeem_dest', [signed_txn])
+        self.__record(swap_id, 'redeem_dest', tx_id, round_num)
+        if pool is not None:
+            pool.release('lock_redeem_dest', app_id)
+        print(f"Redeemed tokens in application {app_id}")
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def create_swap_registry(
+                self,
+                teal_manager: Optional[TealManager],
+                sender: Optional[AlgoUser]
+            ) -> tuple:
+        """
+        Create long-lived application holding swaps in boxes, it is
+        created once and reused by commit_swap, lock_swap and claim_swap
+
+        :param teal_manager: object for interacting with teal contracts
+        :param sender: creator account information
+
+        :returns: application id and address
+        """
+        approval_teal, clear_teal = teal_manager.deploy_contract(self.client, 'swap_registry')
+
+        txn = self.create_application_transaction(
+                    sender.address,
+                    approval_teal,
+                    clear_teal
+                )
+        signed_txn = self.sign_transaction(sender.pk, txn)
         tx_id = self.send_transaction(signed_txn)
         self.wait_for_confirmation(tx_id)
-        print(f"Redeemed tokens in application {app_id}")
+
+        app_id = self.get_application_id(tx_id)
+        app_address = self.get_application_address(app_id)
+        fill_smart_contract_balance(self, sender, app_address, self.REGISTRY_MIN_BALANCE)
+
+        return app_id, app_address
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def commit_swap(
+                self,
+                sender: Optional[AlgoUser],
+                app_id: int,
+                swap_id: bytes,
+                amount: int,
+                receiver: Optional[AlgoUser]
+            ) -> str:
+        """
+        Commit funds for choosen LP in swap registry, the payment covers
+        the amount and the minimum balance of the swap box
+
+        :param sender: commit account info
+        :param app_id: swap registry application id
+        :param swap_id: 32 bytes swap identifier, name of the swap box
+        :param amount: commited amount
+        :param receiver: receiver account
+
+        :returns: transaction id
+        """
+        swap = self.__resume(swap_id, 'commit')
+        if swap is not None:
+            return swap["steps"]["commit"]["tx_id"]
+
+        pmt_txn = self.build_payment_transaction(
+                    sender.address,
+                    self.get_application_address(app_id),
+                    amount + TealManager.SWAP_BOX_COST,
+                    "Commit"
+                )
+        app_txn = self.call_application_transaction(
+                    sender.address,
+                    app_id,
+                    [b"commit", swap_id, (amount).to_bytes(8, 'big')],
+                    receiver.address,
+                    boxes=[swap_id]
+                )
+
+        txns = transaction.assign_group_id([pmt_txn, app_txn])
+        tx_id, round_num = self.__send(swap_id, 'commit', self.sign_transactions(sender.pk, txns))
+        self.__record(
+            swap_id, 'commit', tx_id, round_num,
+            app_id=app_id, app_address=self.get_application_address(app_id),
+            sender=sender.address, receiver=receiver.address, amount=amount
+        )
+
+        return tx_id
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def lock_swap(
+                self,
+                sender: Optional[AlgoUser],
+                app_id: int,
+                swap_id: bytes,
+                hashlock: bytes
+            ) -> str:
+        """
+        Lock commited swap with hashlock
+
+        :param sender: commit account info
+        :param app_id: swap registry application id
+        :param swap_id: swap identifier
+        :param hashlock: sha256 of the secret
+
+        :returns: transaction id
+        """
+        swap = self.__resume(swap_id, 'lock')
+        if swap is not None:
+            return swap["steps"]["lock"]["tx_id"]
+
+        txn = self.call_application_transaction(
+                    sender.address,
+                    app_id,
+                    [b"lock", swap_id, hashlock],
+                    boxes=[swap_id]
+                )
+        signed_txn = self.sign_transaction(sender.pk, txn)
+        tx_id, round_num = self.__send(swap_id, 'lock', [signed_txn], hashlock=hashlock)
+        self.__record(swap_id, 'lock', tx_id, round_num, hashlock=hashlock)
+
+        return tx_id
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def claim_swap(
+                self,
+                sender: Optional[AlgoUser],
+                app_id: int,
+                swap_id: bytes,
+                secret: bytes
+            ) -> str:
+        """
+        Claim locked swap by providing the preimage of its hashlock
+
+        :param sender: receiver account info
+        :param app_id: swap registry application id
+        :param swap_id: swap identifier
+        :param secret: preimage of hashlock
+
+        :returns: transaction id
+        """
+        swap = self.__resume(swap_id, 'claim')
+        if swap is not None:
+            return swap["steps"]["claim"]["tx_id"]
+
+        txn = self.call_application_transaction(
+                    sender.address,
+                    app_id,
+                    [b"claim", swap_id, secret],
+                    boxes=[swap_id]
+                )
+        # claim call pays the fees of the two inner payments
+        txn.fee = max(txn.fee, constants.MIN_TXN_FEE) * 3
+
+        signed_txn = self.sign_transaction(sender.pk, txn)
+        with request_priority(Priority.REDEEM):
+            tx_id, round_num = self.__send(swap_id, 'claim', [signed_txn])
+        self.__record(swap_id, 'claim', tx_id, round_num)
+
+        return tx_id
+
+    #
+    @profiled
+    @instrumented("htlc")
+    def get_swap(self, app_id: int, swap_id: bytes) -> dict:
+        """
+        Read swap stored in registry box
+
+        :param app_id: swap registry application id
+        :param swap_id: swap identifier
+
+        :returns: alice, bob, amount, timelock and hashlock of swap
+        """
+        box = self.client.application_box_by_name(app_id, swap_id)
+        value = base64.b64decode(box["value"])
+
+        return {
+            "alice": encoding.encode_address(value[0:32]),
+            "bob": encoding.encode_address(value[32:64]),
+            "amount": int.from_bytes(value[64:72], 'big'),
+            "timelock": int.from_bytes(value[72:80], 'big'),
+            "hashlock": value[80:112]
+        }
+
+    #
+    def __resume(self, swap_id, step: str) -> Optional[dict]:
+        """
+        Look up step of a swap left unfinished by a previous worker, a
+        step submitted before the restart is checked on chain and
+        recorded once confirmed
+
+        :param swap_id: journal key of the swap, None skips the journal
+        :param step: journal step name
+
+        :returns: journaled swap when the step is confirmed, None when
+                  the step has to be sent
+        """
+        if self.__journal is None or swap_id is None or not self.__journal.resumable(swap_id):
+            return None
+        swap = self.__journal.get(swap_id)
+        record = swap["steps"].get(step) if swap is not None else None
+        if record is None:
+            return None
+        if record["status"] == SwapJournal.SUBMITTED:
+            round_num = self.__confirmed_round(record)
+            if round_num is None:
+                return None
+            record.update(round=round_num, status=SwapJournal.CONFIRMED)
+            self.__record(swap_id, step, record["tx_id"], round_num)
+        return swap
+
+    #
+    def __confirmed_round(self, record: dict) -> Optional[int]:
+        """
+        Find transaction submitted before a restart. algod keeps confirmed
+        transactions in its pending cache for a short time only, so a
+        transaction it does not know is looked for in the blocks of its
+        validity window and waited for while the window is open
+
+        :param record: journaled submitted step
+
+        :returns: round transaction was confirmed in, None when it was
+                  rejected or its last valid round passed without it
+        """
+        tx_id = record["tx_id"]
+        try:
+            info = self.client.pending_transaction_info(tx_id)
+            if info.get("confirmed-round"):
+                return info["confirmed-round"]
+            if info.get("pool-error"):
+                return None
+        except error.AlgodHTTPError as e:
+            if e.code != 404:
+                raise
+
+        first_valid, last_valid = record.get("first_valid"), record.get("last_valid")
+        if first_valid is None or last_valid is None:
+            # journaled without its validity window, wait as before
+            try:
+                return self.wait_for_confirmation(tx_id)["confirmed-round"]
+            except error.ConfirmationTimeoutError:
+                return None
+
+        # blocks produced while waiting are scanned once the wait ends,
+        # a transaction confirmed in between is not missed
+        last_round = self.client.status()["last-round"]
+        round_num = self.__find_in_blocks(tx_id, first_valid, min(last_round, last_valid))
+        if round_num is not None or last_round >= last_valid:
+            return round_num
+        try:
+            return self.confirmation_tracker.wait(tx_id, last_valid)["confirmed-round"]
+        except error.ConfirmationTimeoutError:
+            return self.__find_in_blocks(tx_id, last_round + 1, last_valid)
+
+    #
+    def __find_in_blocks(self, tx_id: str, first_round: int, last_round: int) -> Optional[int]:
+        """
+        :param tx_id: top level transaction id
+        :param first_round: first block looked in
+        :param last_round: last block looked in
+        :returns: round of the block holding the transaction, None when
+                  no block in the range does
+        """
+        for round_num in range(first_round, last_round + 1):
+            if tx_id in (self.client.get_block_txids(round_num).get("blockTxids") or []):
+                return round_num
+        return None
+
+    #
+    def __send(self, swap_id, step: str, signed_txns: list, wait: bool = True, **fields) -> tuple:
+        """
+        Send transactions of a step, the journal records the step as
+        submitted before the transactions leave so a restart waits for
+        them instead of sending the step again
+
+        :param swap_id: journal key of the swap, None skips the journal
+        :param step: journal step name
+        :param signed_txns: signed transaction or group
+        :param wait: whether to wait for confirmation
+        :param fields: swap columns known before sending, e.g. hashlock
+
+        :returns: id of the first transaction and confirmed round, None
+                  without wait, the step is then recorded once the
+                  tracker sees it confirmed
+        """
+        tx_id = signed_txns[0].get_txid()
+        first_valid = max(signed_txn.transaction.first_valid_round for signed_txn in signed_txns)
+        last_valid = min(signed_txn.transaction.last_valid_round for signed_txn in signed_txns)
+        journaled = self.__journal is not None and swap_id is not None
+        if journaled:
+            self.__journal.record(
+                swap_id, step, tx_id, durable=True, first_valid=first_valid, last_valid=last_valid, **fields)
+        if len(signed_txns) == 1:
+            self.send_transaction(signed_txns[0])
+        else:
+            self.send_transactions(signed_txns)
+        if not wait:
+            if journaled:
+                future = self.confirmation_tracker.track(tx_id, last_valid)
+                future.add_done_callback(functools.partial(self.__record_confirmed, swap_id, step, tx_id))
+            return tx_id, None
+        return tx_id, self.wait_for_confirmation(tx_id).get("confirmed-round")
+
+    #
+    def __record_confirmed(self, swap_id, step: str, tx_id: str, future) -> None:
+        """
+        Record step sent without waiting once the tracker resolves it
+
+        :param swap_id: journal key of the swap
+        :param step: journal step name
+        :param tx_id: id of the first transaction of the step
+        :param future: tracker future of the transaction
+
+        :returns: None, a step which was not confirmed stays submitted
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.__record(swap_id, step, tx_id, future.result().get("confirmed-round"))
+
+    #
+    @staticmethod
+    def __release_confirmed(pool: Optional[AppPool], contract: str, app_id: int, future) -> None:
+        """
+        Queue pooled application for release once the tracker resolves
+        the call completing its swap, the tracker thread does not wait
+        on algod
+
+        :param pool: pool the application was acquired from
+        :param contract: name of TealManager contract method
+        :param app_id: application id
+        :param future: tracker future of the completing call
+
+        :returns: None, an application whose call was not confirmed is kept
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        pool.release_later(contract, app_id)
+
+    #
+    def __record(self, swap_id, step: str, tx_id: Optional[str] = None,
+                 round_num: Optional[int] = None, **fields) -> None:
+        """
+        Record confirmed step, batched with the records of other swaps
+
+        :param swap_id: journal key of the swap, None skips the journal
+        :param step: journal step name
+        :param tx_id: id of the first transaction of the step
+        :param round_num: round the step was confirmed in
+        :param fields: swap columns set by the step
+
+        :returns: None
+        """
+        if self.__journal is None or swap_id is None:
+            return
+        self.__journal.record(
+            swap_id, step, tx_id, round_num,
+            completed=step in self.COMPLETING_STEPS, **fields
+        )
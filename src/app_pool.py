@@ -0,0 +1,342 @@
+#
+import os
+import time
+import threading
+import collections
+
+#
+from typing import Optional, Tuple
+
+#
+from algorand import Algorand, AlgoUser
+from teal import TealManager
+
+
+#
+class AppPool:
+    """
+    AppPool object keeping pre-deployed applications ready for swaps,
+    so app creation happens in background instead of on the swap path
+    """
+
+    # applications created per group, protocol limit of group size
+    GROUP_SIZE = 16
+
+    # creator minimum balance locked by one application and its schema
+    APP_MIN_BALANCE = 100000
+    UINT_MIN_BALANCE = 28500
+    BYTES_MIN_BALANCE = 50000
+
+    #
+    def __init__(
+                self,
+                algorand: Optional[Algorand],
+                teal_manager: Optional[TealManager],
+                creator: Optional[AlgoUser],
+                targets: dict,
+                refill_interval: float = 1.0
+            ) -> None:
+        """
+        Constructor
+
+        :param algorand: client creating and deleting applications
+        :param teal_manager: object for interacting with teal contracts
+        :param creator: account creating and owning pooled applications
+        :param targets: number of ready applications kept per contract,
+                        e.g. {"commit": 10, "lock_redeem_dest": 10}
+        :param refill_interval: seconds between background refill checks
+
+        :returns: None
+        """
+        self.__algorand = algorand
+        self.__teal_manager = teal_manager
+        self.__creator = creator
+        self.__targets = dict(targets)
+        self.__refill_interval = refill_interval
+        self.__condition = threading.Condition()
+        self.__ready = {contract: collections.deque() for contract in targets}
+        self.__hits = collections.Counter()
+        self.__misses = collections.Counter()
+        self.__refills = collections.Counter()
+        self.__refill_time = collections.Counter()
+        self.__released = collections.deque()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    #
+    @property
+    def targets(self) -> dict:
+        """
+        Getter for targets private field
+
+        :returns: number of ready applications kept per contract
+        """
+        return dict(self.__targets)
+
+    #
+    def ready(self, contract: str) -> int:
+        """
+        Get number of ready applications of contract
+
+        :param contract: name of TealManager contract method
+
+        :returns: number of ready applications
+        """
+        with self.__condition:
+            return len(self.__ready[contract])
+
+    #
+    def acquire(self, contract: str) -> Tuple[int, str]:
+        """
+        Hand out ready application, an application is created in place
+        when the pool of contract is empty
+
+        :param contract: name of TealManager contract method
+
+        :returns: application id and address
+        """
+        with self.__condition:
+            if self.__ready[contract]:
+                self.__hits[contract] += 1
+                app_id = self.__ready[contract].popleft()
+                self.__condition.notify()
+                return app_id, self.__algorand.get_application_address(app_id)
+            self.__misses[contract] += 1
+            self.__condition.notify()
+
+        app_id = self.__create(contract, 1)[0]
+        return app_id, self.__algorand.get_application_address(app_id)
+
+    #
+    def release(self, contract: str, app_id: int) -> bool:
+        """
+        Return application whose swap completed, it is put back in the
+        pool while the pool is below target and deleted otherwise
+
+        :param contract: name of TealManager contract method
+        :param app_id: application id
+
+        :returns: True when application was reclaimed or deleted, False
+                  when it still holds committed funds and was left as is
+        """
+        state = self.__algorand.state_reader.get(app_id, contract)
+        if state["committed_amount"]:
+            return False
+
+        with self.__condition:
+            if len(self.__ready[contract]) < self.__targets[contract]:
+                self.__ready[contract].append(app_id)
+                return True
+
+        self.__delete([app_id])
+        return True
+
+    #
+    def release_later(self, contract: str, app_id: int) -> None:
+        """
+        Queue application whose swap completed for release by the
+        background loop, for callers which must not wait on algod, e.g.
+        confirmation callbacks
+
+        :param contract: name of TealManager contract method
+        :param app_id: application id
+
+        :returns: None
+        """
+        with self.__condition:
+            self.__released.append((contract, app_id))
+            self.__condition.notify()
+
+    #
+    def reclaim(self) -> int:
+        """
+        Release applications queued by release_later, an application
+        which could not be released stays queued
+
+        :returns: number of released applications
+        """
+        released = 0
+        with self.__condition:
+            queued, self.__released = self.__released, collections.deque()
+        for contract, app_id in queued:
+            try:
+                done = self.release(contract, app_id)
+            except Exception:
+                done = False
+            if done:
+                released += 1
+            else:
+                with self.__condition:
+                    self.__released.append((contract, app_id))
+        return released
+
+    #
+    def refill(self) -> int:
+        """
+        Create applications until every contract pool reaches its target
+
+        :returns: number of created applications
+        """
+        created = 0
+        for contract, target in self.__targets.items():
+            while True:
+                with self.__condition:
+                    missing = target - len(self.__ready[contract])
+                if missing <= 0:
+                    break
+                app_ids = self.__create(contract, min(missing, self.GROUP_SIZE))
+                with self.__condition:
+                    self.__ready[contract].extend(app_ids)
+                created += len(app_ids)
+        return created
+
+    #
+    def drain(self) -> int:
+        """
+        Delete every ready application, releasing creator min balance
+
+        :returns: number of deleted applications
+        """
+        with self.__condition:
+            app_ids = [app_id for ready in self.__ready.values() for app_id in ready]
+            for ready in self.__ready.values():
+                ready.clear()
+
+        for i in range(0, len(app_ids), self.GROUP_SIZE):
+            self.__delete(app_ids[i:i + self.GROUP_SIZE])
+        return len(app_ids)
+
+    #
+    def start(self) -> None:
+        """
+        Start refilling pools in background
+
+        :returns: None
+        """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="app-pool", daemon=True)
+        self.__thread.start()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop background refill, applications queued by release_later
+        are released once more
+
+        :returns: None
+        """
+        self.__stop.set()
+        with self.__condition:
+            self.__condition.notify()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+            self.reclaim()
+
+    #
+    def app_min_balance(self) -> int:
+        """
+        Get creator minimum balance locked by one pooled application
+
+        :returns: microalgos
+        """
+        schema = self.__algorand.GLOBAL_SCHEMA
+        return (
+            self.APP_MIN_BALANCE
+            + self.UINT_MIN_BALANCE * schema.num_uints
+            + self.BYTES_MIN_BALANCE * schema.num_byte_slices
+        )
+
+    #
+    def stats(self) -> dict:
+        """
+        Get pool metrics per contract
+
+        :returns: ready and target counts, hit rate, average seconds
+                  per refill batch and min balance locked by idle
+                  applications in microalgos
+        """
+        app_min_balance = self.app_min_balance()
+        stats = {}
+        with self.__condition:
+            for contract, target in self.__targets.items():
+                hits, misses = self.__hits[contract], self.__misses[contract]
+                refills = self.__refills[contract]
+                ready = len(self.__ready[contract])
+                stats[contract] = {
+                    "ready": ready,
+                    "target": target,
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                    "refill_latency": (
+                        self.__refill_time[contract] / refills if refills else 0.0
+                    ),
+                    "idle_min_balance": ready * app_min_balance
+                }
+        return stats
+
+    #
+    def __create(self, contract: str, count: int) -> list:
+        """
+        Create applications of contract in one transaction group
+
+        :param contract: name of TealManager contract method
+        :param count: number of applications, at most GROUP_SIZE
+
+        :returns: created application ids
+        """
+        started = time.monotonic()
+        approval_teal, clear_teal = self.__teal_manager.deploy_contract(
+                                        self.__algorand.client, contract)
+        txns = [
+            self.__algorand.create_application_transaction(
+                self.__creator.address, approval_teal, clear_teal)
+            for _ in range(count)
+        ]
+        # random note keeps identical create transactions apart
+        for txn in txns:
+            txn.note = os.urandom(8)
+        self.__algorand.send_group(self.__creator.pk, txns)
+        app_ids = [self.__algorand.get_application_id(txn.get_txid()) for txn in txns]
+
+        with self.__condition:
+            self.__refills[contract] += 1
+            self.__refill_time[contract] += time.monotonic() - started
+        return app_ids
+
+    #
+    def __delete(self, app_ids: list) -> None:
+        """
+        Delete applications in one transaction group, each application
+        closes its account to the creator on delete, returning the fill
+        leftover and its min balance
+
+        :param app_ids: application ids, at most GROUP_SIZE
+
+        :returns: None
+        """
+        txns = [
+            self.__algorand.delete_application_transaction(self.__creator.address, app_id)
+            for app_id in app_ids
+        ]
+        self.__algorand.send_group(self.__creator.pk, txns)
+
+    #
+    def __run(self) -> None:
+        """
+        Background refill loop, wakes up on every acquire and release_later
+
+        :returns: None
+        """
+        while not self.__stop.is_set():
+            try:
+                self.reclaim()
+                self.refill()
+            except Exception:
+                # algod failure, acquire creates applications in place meanwhile
+                pass
+            with self.__condition:
+                self.__condition.wait(self.__refill_interval)
@@ -0,0 +1,683 @@
+#
+import re
+import base64
+
+#
+from typing import List, Optional, Tuple
+
+#
+from algosdk import encoding
+
+
+# first TEAL version where algod reorders constant blocks by usage
+OPTIMIZE_CONSTANTS_VERSION = 4
+
+# name: (opcode, first version, immediate kinds)
+OPCODES = {
+    "err": (0x00, 1, ()),
+    "sha256": (0x01, 1, ()),
+    "keccak256": (0x02, 1, ()),
+    "sha512_256": (0x03, 1, ()),
+    "ed25519verify": (0x04, 1, ()),
+    "+": (0x08, 1, ()),
+    "-": (0x09, 1, ()),
+    "/": (0x0a, 1, ()),
+    "*": (0x0b, 1, ()),
+    "<": (0x0c, 1, ()),
+    ">": (0x0d, 1, ()),
+    "<=": (0x0e, 1, ()),
+    ">=": (0x0f, 1, ()),
+    "&&": (0x10, 1, ()),
+    "||": (0x11, 1, ()),
+    "==": (0x12, 1, ()),
+    "!=": (0x13, 1, ()),
+    "!": (0x14, 1, ()),
+    "len": (0x15, 1, ()),
+    "itob": (0x16, 1, ()),
+    "btoi": (0x17, 1, ()),
+    "%": (0x18, 1, ()),
+    "|": (0x19, 1, ()),
+    "&": (0x1a, 1, ()),
+    "^": (0x1b, 1, ()),
+    "~": (0x1c, 1, ()),
+    "mulw": (0x1d, 1, ()),
+    "addw": (0x1e, 2, ()),
+    "divmodw": (0x1f, 4, ()),
+    "intc": (0x21, 1, ("uint8",)),
+    "intc_0": (0x22, 1, ()),
+    "intc_1": (0x23, 1, ()),
+    "intc_2": (0x24, 1, ()),
+    "intc_3": (0x25, 1, ()),
+    "bytec": (0x27, 1, ("uint8",)),
+    "bytec_0": (0x28, 1, ()),
+    "bytec_1": (0x29, 1, ()),
+    "bytec_2": (0x2a, 1, ()),
+    "bytec_3": (0x2b, 1, ()),
+    "arg": (0x2c, 1, ("uint8",)),
+    "arg_0": (0x2d, 1, ()),
+    "arg_1": (0x2e, 1, ()),
+    "arg_2": (0x2f, 1, ()),
+    "arg_3": (0x30, 1, ()),
+    "txn": (0x31, 1, ("txn_field",)),
+    "global": (0x32, 1, ("global_field",)),
+    "gtxn": (0x33, 1, ("uint8", "txn_field")),
+    "load": (0x34, 1, ("uint8",)),
+    "store": (0x35, 1, ("uint8",)),
+    "txna": (0x36, 2, ("txn_field", "uint8")),
+    "gtxna": (0x37, 2, ("uint8", "txn_field", "uint8")),
+    "gtxns": (0x38, 3, ("txn_field",)),
+    "gtxnsa": (0x39, 3, ("txn_field", "uint8")),
+    "gload": (0x3a, 4, ("uint8", "uint8")),
+    "gloads": (0x3b, 4, ("uint8",)),
+    "gaid": (0x3c, 4, ("uint8",)),
+    "gaids": (0x3d, 4, ()),
+    "loads": (0x3e, 5, ()),
+    "stores": (0x3f, 5, ()),
+    "bnz": (0x40, 1, ("label",)),
+    "bz": (0x41, 2, ("label",)),
+    "b": (0x42, 2, ("label",)),
+    "return": (0x43, 2, ()),
+    "assert": (0x44, 3, ()),
+    "bury": (0x45, 8, ("uint8",)),
+    "popn": (0x46, 8, ("uint8",)),
+    "dupn": (0x47, 8, ("uint8",)),
+    "pop": (0x48, 1, ()),
+    "dup": (0x49, 1, ()),
+    "dup2": (0x4a, 2, ()),
+    "dig": (0x4b, 3, ("uint8",)),
+    "swap": (0x4c, 3, ()),
+    "select": (0x4d, 3, ()),
+    "cover": (0x4e, 5, ("uint8",)),
+    "uncover": (0x4f, 5, ("uint8",)),
+    "concat": (0x50, 2, ()),
+    "substring": (0x51, 2, ("uint8", "uint8")),
+    "substring3": (0x52, 2, ()),
+    "getbit": (0x53, 3, ()),
+    "setbit": (0x54, 3, ()),
+    "getbyte": (0x55, 3, ()),
+    "setbyte": (0x56, 3, ()),
+    "extract": (0x57, 5, ("uint8", "uint8")),
+    "extract3": (0x58, 5, ()),
+    "extract_uint16": (0x59, 5, ()),
+    "extract_uint32": (0x5a, 5, ()),
+    "extract_uint64": (0x5b, 5, ()),
+    "replace2": (0x5c, 7, ("uint8",)),
+    "replace3": (0x5d, 7, ()),
+    "balance": (0x60, 2, ()),
+    "app_opted_in": (0x61, 2, ()),
+    "app_local_get": (0x62, 2, ()),
+    "app_local_get_ex": (0x63, 2, ()),
+    "app_global_get": (0x64, 2, ()),
+    "app_global_get_ex": (0x65, 2, ()),
+    "app_local_put": (0x66, 2, ()),
+    "app_global_put": (0x67, 2, ()),
+    "app_local_del": (0x68, 2, ()),
+    "app_global_del": (0x69, 2, ()),
+    "asset_holding_get": (0x70, 2, ("asset_holding_field",)),
+    "asset_params_get": (0x71, 2, ("asset_params_field",)),
+    "app_params_get": (0x72, 5, ("app_params_field",)),
+    "acct_params_get": (0x73, 6, ("acct_params_field",)),
+    "min_balance": (0x78, 3, ()),
+    "pushbytes": (0x80, 3, ("bytes",)),
+    "pushint": (0x81, 3, ("varuint",)),
+    "pushbytess": (0x82, 8, ("bytes_list",)),
+    "pushints": (0x83, 8, ("varuint_list",)),
+    "callsub": (0x88, 4, ("label",)),
+    "retsub": (0x89, 4, ()),
+    "proto": (0x8a, 8, ("uint8", "uint8")),
+    "frame_dig": (0x8b, 8, ("int8",)),
+    "frame_bury": (0x8c, 8, ("int8",)),
+    "switch": (0x8d, 8, ("labels",)),
+    "match": (0x8e, 8, ("labels",)),
+    "shl": (0x90, 4, ()),
+    "shr": (0x91, 4, ()),
+    "sqrt": (0x92, 4, ()),
+    "bitlen": (0x93, 4, ()),
+    "exp": (0x94, 4, ()),
+    "expw": (0x95, 4, ()),
+    "bsqrt": (0x96, 6, ()),
+    "divw": (0x97, 6, ()),
+    "b+": (0xa0, 4, ()),
+    "b-": (0xa1, 4, ()),
+    "b/": (0xa2, 4, ()),
+    "b*": (0xa3, 4, ()),
+    "b<": (0xa4, 4, ()),
+    "b>": (0xa5, 4, ()),
+    "b<=": (0xa6, 4, ()),
+    "b>=": (0xa7, 4, ()),
+    "b==": (0xa8, 4, ()),
+    "b!=": (0xa9, 4, ()),
+    "b%": (0xaa, 4, ()),
+    "b|": (0xab, 4, ()),
+    "b&": (0xac, 4, ()),
+    "b^": (0xad, 4, ()),
+    "b~": (0xae, 4, ()),
+    "bzero": (0xaf, 4, ()),
+    "log": (0xb0, 5, ()),
+    "itxn_begin": (0xb1, 5, ()),
+    "itxn_field": (0xb2, 5, ("txn_field",)),
+    "itxn_submit": (0xb3, 5, ()),
+    "itxn": (0xb4, 5, ("txn_field",)),
+    "itxna": (0xb5, 5, ("txn_field", "uint8")),
+    "itxn_next": (0xb6, 6, ()),
+    "gitxn": (0xb7, 6, ("uint8", "txn_field")),
+    "gitxna": (0xb8, 6, ("uint8", "txn_field", "uint8")),
+    "box_create": (0xb9, 8, ()),
+    "box_extract": (0xba, 8, ()),
+    "box_replace": (0xbb, 8, ()),
+    "box_del": (0xbc, 8, ()),
+    "box_len": (0xbd, 8, ()),
+    "box_get": (0xbe, 8, ()),
+    "box_put": (0xbf, 8, ()),
+    "txnas": (0xc0, 5, ("txn_field",)),
+    "gtxnas": (0xc1, 5, ("uint8", "txn_field")),
+    "gtxnsas": (0xc2, 5, ("txn_field",)),
+    "args": (0xc3, 5, ()),
+    "gloadss": (0xc4, 6, ()),
+    "itxnas": (0xc5, 6, ("txn_field",)),
+    "gitxnas": (0xc6, 6, ("uint8", "txn_field")),
+}
+
+#
+OPCODE_NAMES = {opcode: name for name, (opcode, _, _) in OPCODES.items()}
+
+#
+INTCBLOCK = 0x20
+BYTECBLOCK = 0x26
+
+#
+TXN_FIELDS = [
+    "Sender", "Fee", "FirstValid", "FirstValidTime", "LastValid", "Note",
+    "Lease", "Receiver", "Amount", "CloseRemainderTo", "VotePK",
+    "SelectionPK", "VoteFirst", "VoteLast", "VoteKeyDilution", "Type",
+    "TypeEnum", "XferAsset", "AssetAmount", "AssetSender", "AssetReceiver",
+    "AssetCloseTo", "GroupIndex", "TxID", "ApplicationID", "OnCompletion",
+    "ApplicationArgs", "NumAppArgs", "Accounts", "NumAccounts",
+    "ApprovalProgram", "ClearStateProgram", "RekeyTo", "ConfigAsset",
+    "ConfigAssetTotal", "ConfigAssetDecimals", "ConfigAssetDefaultFrozen",
+    "ConfigAssetUnitName", "ConfigAssetName", "ConfigAssetURL",
+    "ConfigAssetMetadataHash", "ConfigAssetManager", "ConfigAssetReserve",
+    "ConfigAssetFreeze", "ConfigAssetClawback", "FreezeAsset",
+    "FreezeAssetAccount", "FreezeAssetFrozen", "Assets", "NumAssets",
+    "Applications", "NumApplications", "GlobalNumUint", "GlobalNumByteSlice",
+    "LocalNumUint", "LocalNumByteSlice", "ExtraProgramPages",
+    "Nonparticipation", "Logs", "NumLogs", "CreatedAssetID",
+    "CreatedApplicationID", "LastLog", "StateProofPK",
+    "ApprovalProgramPages", "NumApprovalProgramPages",
+    "ClearStateProgramPages", "NumClearStateProgramPages",
+]
+
+#
+GLOBAL_FIELDS = [
+    "MinTxnFee", "MinBalance", "MaxTxnLife", "ZeroAddress", "GroupSize",
+    "LogicSigVersion", "Round", "LatestTimestamp", "CurrentApplicationID",
+    "CreatorAddress", "CurrentApplicationAddress", "GroupID", "OpcodeBudget",
+    "CallerApplicationID", "CallerApplicationAddress",
+]
+
+#
+ASSET_HOLDING_FIELDS = ["AssetBalance", "AssetFrozen"]
+
+#
+ASSET_PARAMS_FIELDS = [
+    "AssetTotal", "AssetDecimals", "AssetDefaultFrozen", "AssetUnitName",
+    "AssetName", "AssetURL", "AssetMetadataHash", "AssetManager",
+    "AssetReserve", "AssetFreeze", "AssetClawback", "AssetCreator",
+]
+
+#
+APP_PARAMS_FIELDS = [
+    "AppApprovalProgram", "AppClearStateProgram", "AppGlobalNumUint",
+    "AppGlobalNumByteSlice", "AppLocalNumUint", "AppLocalNumByteSlice",
+    "AppExtraProgramPages", "AppCreator", "AppAddress",
+]
+
+#
+ACCT_PARAMS_FIELDS = ["AcctBalance", "AcctMinBalance", "AcctAuthAddr"]
+
+#
+FIELD_TABLES = {
+    "txn_field": TXN_FIELDS,
+    "global_field": GLOBAL_FIELDS,
+    "asset_holding_field": ASSET_HOLDING_FIELDS,
+    "asset_params_field": ASSET_PARAMS_FIELDS,
+    "app_params_field": APP_PARAMS_FIELDS,
+    "acct_params_field": ACCT_PARAMS_FIELDS,
+}
+
+# named integer constants accepted by the int pseudo-op
+NAMED_INTS = {
+    "unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4,
+    "afrz": 5, "appl": 6,
+    "NoOp": 0, "OptIn": 1, "CloseOut": 2, "ClearState": 3,
+    "UpdateApplication": 4, "DeleteApplication": 5,
+}
+
+#
+STRING_ESCAPES = {
+    "n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", "\"": b"\"",
+}
+
+
+#
+class TealAssemblyError(Exception):
+    """
+    Raised when TEAL source can not be assembled
+    """
+
+
+#
+def encode_varuint(value: int) -> bytes:
+    """
+    Encode unsigned integer as LEB128 varuint, the way algod does
+
+    :param value: integer value
+
+    :returns: encoded bytes
+    """
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+#
+def decode_varuint(program: bytes, pc: int) -> Tuple[int, int]:
+    """
+    Decode LEB128 varuint from program
+
+    :param program: program bytecode
+    :param pc: position of first varuint byte
+
+    :returns: decoded value and position after it
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = program[pc]
+        pc += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pc
+        shift += 7
+
+
+#
+class TealAssembler:
+    """
+    TealAssembler object for turning TEAL source into bytecode locally,
+    producing the same program as algod compile endpoint
+    """
+
+    #
+    def assemble(self, source: str) -> bytes:
+        """
+        Assemble TEAL source to bytecode
+
+        :param source: TEAL assembly program
+
+        :returns: program bytecode
+        """
+        version, lines = self.__parse(source)
+        instructions = [self.__parse_instruction(line, version) for line in lines]
+
+        int_refs = [i[1] for i in instructions if i[0] == "int"]
+        byte_refs = [i[1] for i in instructions if i[0] == "byte"]
+        int_block, int_singletons = self.__constant_block(int_refs, version)
+        byte_block, byte_singletons = self.__constant_block(byte_refs, version)
+
+        code = bytearray()
+        labels = {}
+        fixups = []
+        for instruction in instructions:
+            kind = instruction[0]
+            if kind == "label":
+                if instruction[1] in labels:
+                    raise TealAssemblyError(
+                        "duplicate label {}".format(instruction[1]))
+                labels[instruction[1]] = len(code)
+            elif kind == "int":
+                code += self.__constant_ref(
+                    instruction[1], int_block, int_singletons, "intc")
+            elif kind == "byte":
+                code += self.__constant_ref(
+                    instruction[1], byte_block, byte_singletons, "bytec")
+            else:
+                code += instruction[1]
+                positions = []
+                for label in instruction[2]:
+                    positions.append((len(code), label))
+                    code += b"\x00\x00"
+                # offsets are relative to the end of the instruction
+                fixups.extend((position, len(code), label) for position, label in positions)
+
+        for position, end, label in fixups:
+            if label not in labels:
+                raise TealAssemblyError("unknown label {}".format(label))
+            offset = labels[label] - end
+            if version < 4 and offset < 0:
+                raise TealAssemblyError(
+                    "backward branch to {} needs version 4".format(label))
+            code[position:position + 2] = offset.to_bytes(2, 'big', signed=True)
+
+        program = bytearray(encode_varuint(version))
+        if int_block:
+            program.append(INTCBLOCK)
+            program += encode_varuint(len(int_block))
+            for value in int_block:
+                program += encode_varuint(value)
+        if byte_block:
+            program.append(BYTECBLOCK)
+            program += encode_varuint(len(byte_block))
+            for value in byte_block:
+                program += encode_varuint(len(value)) + value
+        return bytes(program + code)
+
+    #
+    def assemble_file(self, filename: str) -> bytes:
+        """
+        Assemble TEAL source file to bytecode
+
+        :param filename: file with TEAL assembly program
+
+        :returns: program bytecode
+        """
+        with open(filename, "r") as f:
+            return self.assemble(f.read())
+
+    #
+    @staticmethod
+    def __parse(source: str) -> Tuple[int, List[List[str]]]:
+        """
+        Split TEAL source into tokenized lines and read its version
+
+        :param source: TEAL assembly program
+
+        :returns: version and list of tokenized lines
+        """
+        version = 1
+        lines = []
+        for line in source.splitlines():
+            tokens = TealAssembler.__tokenize(line)
+            if not tokens:
+                continue
+            if tokens[0] == "#pragma":
+                if len(tokens) != 3 or tokens[1] != "version":
+                    raise TealAssemblyError("unknown pragma {}".format(line))
+                if lines:
+                    raise TealAssemblyError("version pragma after code")
+                version = int(tokens[2])
+                continue
+            lines.append(tokens)
+        return version, lines
+
+    #
+    @staticmethod
+    def __tokenize(line: str) -> List[str]:
+        """
+        Split TEAL line into tokens, keeping quoted strings together
+
+        :param line: single line of TEAL source
+
+        :returns: tokens without comments
+        """
+        tokens = []
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if char.isspace():
+                i += 1
+            elif line.startswith("//", i):
+                break
+            elif char == "\"":
+                j = i + 1
+                while j < len(line) and line[j] != "\"":
+                    j += 2 if line[j] == "\\" else 1
+                if j >= len(line):
+                    raise TealAssemblyError("unterminated string {}".format(line))
+                tokens.append(line[i:j + 1])
+                i = j + 1
+            else:
+                j = i
+                while j < len(line) and not line[j].isspace():
+                    j += 1
+                tokens.append(line[i:j])
+                i = j
+        return tokens
+
+    #
+    def __parse_instruction(self, tokens: List[str], version: int) -> tuple:
+        """
+        Turn tokenized line into intermediate instruction
+
+        :param tokens: tokenized line
+        :param version: program TEAL version
+
+        :returns: ("label", name), ("int", value), ("byte", value)
+                  or ("op", encoded bytes, branch labels)
+        """
+        name, args = tokens[0], tokens[1:]
+
+        if name.endswith(":") and not args:
+            return ("label", name[:-1])
+        if name == "int":
+            self.__expect_args(name, args, 1)
+            return ("int", self.__parse_int(args[0]))
+        if name == "byte":
+            return ("byte", self.__parse_bytes(args))
+        if name == "addr":
+            self.__expect_args(name, args, 1)
+            return ("byte", encoding.decode_address(args[0]))
+        if name == "pushint":
+            self.__expect_args(name, args, 1)
+            return ("op", self.__opcode(name, version)
+                    + encode_varuint(self.__parse_int(args[0])), [])
+        if name == "pushbytes":
+            value = self.__parse_bytes(args)
+            return ("op", self.__opcode(name, version)
+                    + encode_varuint(len(value)) + value, [])
+        if name == "pushints":
+            encoded = self.__opcode(name, version) + encode_varuint(len(args))
+            for arg in args:
+                encoded += encode_varuint(self.__parse_int(arg))
+            return ("op", encoded, [])
+        if name == "pushbytess":
+            encoded = self.__opcode(name, version) + encode_varuint(len(args))
+            for arg in args:
+                value = self.__parse_bytes([arg])
+                encoded += encode_varuint(len(value)) + value
+            return ("op", encoded, [])
+        if name in ("switch", "match"):
+            if len(args) > 255:
+                raise TealAssemblyError("{} takes at most 255 labels".format(name))
+            return ("op", self.__opcode(name, version) + bytes([len(args)]), args)
+        if name in ("intcblock", "bytecblock"):
+            raise TealAssemblyError("explicit {} is not supported".format(name))
+
+        # txn/gtxn with array index are spelled as txna/gtxna
+        if name == "txn" and len(args) == 2:
+            name = "txna"
+        if name == "gtxn" and len(args) == 3:
+            name = "gtxna"
+
+        if name not in OPCODES:
+            raise TealAssemblyError("unknown opcode {}".format(name))
+        kinds = OPCODES[name][2]
+        self.__expect_args(name, args, len(kinds))
+
+        encoded = bytearray(self.__opcode(name, version))
+        branch_labels = []
+        for kind, arg in zip(kinds, args):
+            if kind == "label":
+                branch_labels.append(arg)
+            elif kind in FIELD_TABLES:
+                table = FIELD_TABLES[kind]
+                if arg not in table:
+                    raise TealAssemblyError("unknown field {} for {}".format(arg, name))
+                encoded.append(table.index(arg))
+            elif kind == "int8":
+                encoded += int(arg, 0).to_bytes(1, 'big', signed=True)
+            else:
+                value = int(arg, 0)
+                if not 0 <= value <= 255:
+                    raise TealAssemblyError("{} immediate out of range".format(name))
+                encoded.append(value)
+        return ("op", bytes(encoded), branch_labels)
+
+    #
+    @staticmethod
+    def __expect_args(name: str, args: List[str], count: int) -> None:
+        """
+        Check number of immediate arguments
+
+        :param name: opcode name
+        :param args: given arguments
+        :param count: expected number of arguments
+
+        :returns: None
+        """
+        if len(args) != count:
+            raise TealAssemblyError("{} expects {} arguments".format(name, count))
+
+    #
+    @staticmethod
+    def __opcode(name: str, version: int) -> bytes:
+        """
+        Get opcode byte checking it exists in program version
+
+        :param name: opcode name
+        :param version: program TEAL version
+
+        :returns: single opcode byte
+        """
+        opcode, first_version, _ = OPCODES[name]
+        if version < first_version:
+            raise TealAssemblyError("{} needs version {}".format(name, first_version))
+        return bytes([opcode])
+
+    #
+    @staticmethod
+    def __parse_int(arg: str) -> int:
+        """
+        Parse int pseudo-op argument
+
+        :param arg: decimal, hex, octal or named constant
+
+        :returns: integer value
+        """
+        if arg in NAMED_INTS:
+            return NAMED_INTS[arg]
+        try:
+            value = int(arg, 0)
+        except ValueError:
+            raise TealAssemblyError("invalid integer {}".format(arg))
+        if not 0 <= value < 2 ** 64:
+            raise TealAssemblyError("integer out of range {}".format(arg))
+        return value
+
+    #
+    @staticmethod
+    def __parse_bytes(args: List[str]) -> bytes:
+        """
+        Parse byte pseudo-op arguments
+
+        :param args: "string", 0xhex, base64 X, b64 X, base32 X or b32 X
+
+        :returns: byte value
+        """
+        if len(args) == 1:
+            arg = args[0]
+            if arg.startswith("\"") and arg.endswith("\""):
+                return TealAssembler.__parse_string(arg[1:-1])
+            if arg.startswith("0x"):
+                return bytes.fromhex(arg[2:])
+            match = re.fullmatch(r"(base64|b64|base32|b32)\((.*)\)", arg)
+            if match:
+                args = [match.group(1), match.group(2)]
+        if len(args) == 2:
+            encoding_name, value = args
+            if encoding_name in ("base64", "b64"):
+                return base64.b64decode(value)
+            if encoding_name in ("base32", "b32"):
+                return base64.b32decode(value + "=" * (-len(value) % 8))
+        raise TealAssemblyError("invalid byte constant {}".format(" ".join(args)))
+
+    #
+    @staticmethod
+    def __parse_string(value: str) -> bytes:
+        """
+        Parse body of quoted string constant
+
+        :param value: string without surrounding quotes
+
+        :returns: byte value
+        """
+        out = bytearray()
+        i = 0
+        while i < len(value):
+            char = value[i]
+            if char != "\\":
+                out += char.encode('utf-8')
+                i += 1
+            elif value[i + 1] == "x":
+                out.append(int(value[i + 2:i + 4], 16))
+                i += 4
+            elif value[i + 1] in STRING_ESCAPES:
+                out += STRING_ESCAPES[value[i + 1]]
+                i += 2
+            else:
+                raise TealAssemblyError("invalid escape in \"{}\"".format(value))
+        return bytes(out)
+
+    #
+    @staticmethod
+    def __constant_block(refs: list, version: int) -> Tuple[list, set]:
+        """
+        Build constant block the way algod does: in order of first use
+        before version 4, by descending use count with values used only
+        once moved to push opcodes from version 4
+
+        :param refs: constant values in order of use
+        :param version: program TEAL version
+
+        :returns: constant block and set of values emitted with push opcodes
+        """
+        counts = {}
+        for value in refs:
+            counts[value] = counts.get(value, 0) + 1
+        block = list(counts)
+        if version < OPTIMIZE_CONSTANTS_VERSION:
+            return block, set()
+        block.sort(key=lambda value: -counts[value])
+        singletons = {value for value in block if counts[value] == 1}
+        return [value for value in block if value not in singletons], singletons
+
+    #
+    @staticmethod
+    def __constant_ref(value, block: list, singletons: set, prefix: str) -> bytes:
+        """
+        Encode reference to constant
+
+        :param value: int or bytes constant
+        :param block: constant block
+        :param singletons: values emitted with push opcodes
+        :param prefix: intc or bytec
+
+        :returns: encoded instruction
+        """
+        if value in singletons:
+            if prefix == "intc":
+                return bytes([OPCODES["pushint"][0]]) + encode_varuint(value)
+            return (bytes([OPCODES["pushbytes"][0]])
+                    + encode_varuint(len(value)) + value)
+        index = block.index(value)
+        if index < 4:
+            return bytes([OPCODES["{}_{}".format(prefix, index)][0]])
+        if index > 255:
+            raise TealAssemblyError("too many constants")
+        return bytes([OPCODES[prefix][0], index])
@@ -0,0 +1,693 @@
+#
+import ssl
+import json
+import base64
+import asyncio
+import functools
+
+#
+from typing import Optional, Tuple
+from urllib import parse
+
+#
+from algosdk import encoding, error, transaction
+from algosdk.transaction import SignedTransaction, SuggestedParams
+
+#
+from algorand import AlgoUser, TransactionBuilder
+from metrics import REGISTRY, MetricsRegistry, instrumented
+from signer import TransactionSigner
+from suggested_params import SuggestedParamsProvider
+from teal import TealManager
+from transport import endpoint_path
+
+
+#
+class AsyncHttpTransport:
+    """
+    AsyncHttpTransport object sending HTTP/1.1 requests over a pool of
+    keep-alive asyncio connections to a single host
+    """
+
+    #
+    def __init__(self, address: str, pool_size: int = 100, timeout: float = 70) -> None:
+        """
+        Constructor
+
+        :param address: base url, for example http://127.0.0.1:8080
+        :param pool_size: maximum number of open connections
+        :param timeout: seconds a single request may take
+
+        :returns: None
+        """
+        url = parse.urlsplit(address)
+        self.__host = url.hostname
+        self.__port = url.port or (443 if url.scheme == "https" else 80)
+        self.__ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.__prefix = url.path.rstrip("/")
+        self.__timeout = timeout
+        self.__idle = []
+        self.__slots = asyncio.Semaphore(pool_size)
+
+    #
+    async def request(
+                self,
+                method: str,
+                path: str,
+                headers: dict,
+                body: bytes = b""
+            ) -> Tuple[int, bytes]:
+        """
+        Send request reusing an idle connection when possible
+
+        :param method: http method
+        :param path: request path with query
+        :param headers: request headers
+        :param body: request body
+
+        :returns: status code and response body
+        """
+        async with self.__slots:
+            reused = bool(self.__idle)
+            reader, writer = self.__idle.pop() if reused else await self.__connect()
+            try:
+                status, response, keep_alive = await asyncio.wait_for(
+                    self.__exchange(reader, writer, method, path, headers, body),
+                    self.__timeout
+                )
+            except asyncio.TimeoutError:
+                # caught first, TimeoutError is an OSError and a request
+                # which timed out may have reached the server
+                writer.close()
+                raise
+            except (OSError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # idle connection was closed by the server, retry on a new one
+                reader, writer = await self.__connect()
+                status, response, keep_alive = await asyncio.wait_for(
+                    self.__exchange(reader, writer, method, path, headers, body),
+                    self.__timeout
+                )
+            if keep_alive:
+                self.__idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, response
+
+    #
+    async def close(self) -> None:
+        """
+        Close idle connections
+
+        :returns: None
+        """
+        while self.__idle:
+            _, writer = self.__idle.pop()
+            writer.close()
+
+    #
+    async def __connect(self):
+        """
+        Open new connection
+
+        :returns: asyncio stream reader and writer
+        """
+        return await asyncio.open_connection(self.__host, self.__port, ssl=self.__ssl)
+
+    #
+    async def __exchange(self, reader, writer, method, path, headers, body):
+        """
+        Write request and read response on an open connection
+
+        :returns: status code, response body and keep-alive flag
+        """
+        lines = ["{} {}{} HTTP/1.1".format(method, self.__prefix, path),
+                 "Host: {}".format(self.__host),
+                 "Content-Length: {}".format(len(body))]
+        lines += ["{}: {}".format(key, value) for key, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode('latin-1').partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            response = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                response += chunk[:-2]
+        else:
+            response = await reader.readexactly(int(response_headers.get("content-length", 0)))
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        return status, response, keep_alive
+
+
+#
+class AsyncAlgorand(TransactionBuilder):
+    """
+    AsyncAlgorand object for interacting with algod from asyncio code
+    """
+
+    #
+    def __init__(
+                self,
+                algo_token: str,
+                algo_address: str,
+                pool_size: int = 100,
+                params_provider: Optional[SuggestedParamsProvider] = None,
+                signer: Optional[TransactionSigner] = None,
+                metrics: Optional[MetricsRegistry] = None
+            ) -> None:
+        """
+        Constructor
+
+        :param algo_token: token for connecting algorand testnet
+        :param algo_address: algorand testnet address
+        :param pool_size: maximum number of open connections
+        :param params_provider: shared suggested params cache
+        :param signer: shared signer caching decoded keys
+        :param metrics: registry operations and algod requests are
+                        recorded in, the package REGISTRY by default
+
+        :returns: None
+        """
+        self.__token = algo_token
+        self.__headers = {"X-API-Key": algo_token, "X-Algo-API-Token": algo_token}
+        self.__transport = AsyncHttpTransport(algo_address, pool_size)
+        self.__params_provider = params_provider or SuggestedParamsProvider(None)
+        self.__signer = signer or TransactionSigner()
+        self.__metrics = metrics or REGISTRY
+        self.__params_lock = asyncio.Lock()
+        self.__pending = {}
+        self.__follower = None
+        self.__last_round = None
+
+    #
+    @property
+    def params(self) -> Optional[SuggestedParams]:
+        """
+        Getter for suggested params of a new transaction,
+        refresh_params has to be awaited before building transactions
+
+        :returns: cached params valid from the current round
+        """
+        return self.__params_provider.get()
+
+    #
+    @property
+    def params_provider(self) -> Optional[SuggestedParamsProvider]:
+        """
+        Getter for params_provider private field
+
+        :returns: params_provider field value
+        """
+        return self.__params_provider
+
+    #
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """
+        Getter for metrics private field
+
+        :returns: metrics field value
+        """
+        return self.__metrics
+
+    #
+    @property
+    def signer(self) -> Optional[TransactionSigner]:
+        """
+        Getter for signer private field
+
+        :returns: signer field value
+        """
+        return self.__signer
+
+    #
+    async def close(self) -> None:
+        """
+        Stop confirmation follower and close connections
+
+        :returns: None
+        """
+        if self.__follower is not None:
+            self.__follower.cancel()
+        await self.__transport.close()
+
+    #
+    async def algod_request(
+                self,
+                method: str,
+                path: str,
+                body: bytes = b"",
+                headers: Optional[dict] = None
+            ) -> dict:
+        """
+        Send request to algod v2 api
+
+        :param method: http method
+        :param path: path below /v2
+        :param body: request body
+        :param headers: additional request headers
+
+        :returns: decoded json response
+        """
+        request_headers = dict(self.__headers)
+        request_headers.update(headers or {})
+        metrics = self.__metrics
+        if metrics.enabled:
+            endpoint = "{} {}".format(method, endpoint_path("/v2" + path))
+            metrics.inc("prehtlc_algod_requests_total", endpoint=endpoint)
+            metrics.inc("prehtlc_algod_request_bytes_sent_total", len(body), endpoint=endpoint)
+            with metrics.timer("prehtlc_algod_request_seconds",
+                               "prehtlc_algod_request_errors_total", endpoint=endpoint):
+                status, response = await self.__transport.request(
+                                        method, "/v2" + path, request_headers, body)
+            if status >= 400:
+                metrics.inc("prehtlc_algod_request_errors_total", endpoint=endpoint)
+        else:
+            status, response = await self.__transport.request(
+                                    method, "/v2" + path, request_headers, body)
+        decoded = json.loads(response) if response else {}
+        if status >= 400:
+            raise error.AlgodHTTPError(decoded.get("message", response), status)
+        return decoded
+
+    #
+    async def refresh_params(self) -> None:
+        """
+        Fetch suggested params when cached ones are stale
+
+        :returns: None
+        """
+        if not self.__params_provider.is_stale():
+            return
+        async with self.__params_lock:
+            # concurrent callers wait for the first fetch instead of repeating it
+            if not self.__params_provider.is_stale():
+                return
+            res = await self.algod_request("GET", "/transactions/params")
+            self.__params_provider.update(transaction.SuggestedParams(
+                res["fee"],
+                res["last-round"],
+                res["last-round"] + 1000,
+                res["genesis-hash"],
+                res["genesis-id"],
+                False,
+                res["consensus-version"],
+                res["min-fee"],
+            ))
+
+    #
+    async def status(self) -> dict:
+        """
+        Get node status
+
+        :returns: status with last round
+        """
+        return await self.algod_request("GET", "/status")
+
+    #
+    async def status_after_block(self, round_num: int) -> dict:
+        """
+        Wait until a round after given one is produced
+
+        :param round_num: round to wait after
+
+        :returns: status with last round
+        """
+        return await self.algod_request("GET", "/status/wait-for-block-after/{}".format(round_num))
+
+    #
+    async def get_block_txids(self, round_num: int) -> dict:
+        """
+        Get top level transaction ids of a block
+
+        :param round_num: block round
+
+        :returns: {"blockTxids": [...]}
+        """
+        return await self.algod_request("GET", "/blocks/{}/txids".format(round_num))
+
+    #
+    async def get_transaction_info(self, tx_id: str) -> dict:
+        """
+        Get transaction information
+
+        :param tx_id: transaction id
+
+        :returns: transaction information
+        """
+        return await self.algod_request("GET", "/transactions/pending/{}".format(tx_id))
+
+    #
+    async def get_balance(self, address: str) -> int:
+        """
+        Get balance of given account
+
+        :params address: address of account
+
+        :returns: amount balance
+        """
+        info = await self.algod_request("GET", "/accounts/{}".format(address))
+        return info.get("amount")
+
+    #
+    async def get_application_id(self, tx_id: str) -> int:
+        """
+        Get application id from transaction id
+
+        :param tx_id: transaction id
+
+        :returns: application id
+        """
+        info = await self.get_transaction_info(tx_id)
+        return info.get("application-index")
+
+    #
+    @instrumented("send")
+    async def send_transactions(self, signed_txns: list) -> str:
+        """
+        Send signed transactions in one request and start tracking them
+
+        :param signed_txns: signed transactions, a group or a single one
+
+        :returns: id of the first transaction
+        """
+        body = b"".join(base64.b64decode(encoding.msgpack_encode(txn)) for txn in signed_txns)
+        scanned = self.__last_round
+        response = await self.algod_request(
+                        "POST",
+                        "/transactions",
+                        body,
+                        {"Content-Type": "application/x-binary"}
+                    )
+        tx_id = response["txId"]
+        self.__track(tx_id, min(txn.transaction.last_valid_round for txn in signed_txns))
+        # follower may have scanned the confirming block before tracking
+        if self.__last_round != scanned:
+            info = await self.get_transaction_info(tx_id)
+            if info.get("confirmed-round") and tx_id in self.__pending:
+                self.__resolve(tx_id, info["confirmed-round"])
+        return tx_id
+
+    #
+    async def send_transaction(self, signed_txn: Optional[SignedTransaction]) -> str:
+        """
+        Send already signed transaction
+
+        :param signed_txn: signed transaction which should be sent
+
+        :returns: transaction id
+        """
+        return await self.send_transactions([signed_txn])
+
+    #
+    @instrumented("send")
+    async def send_group(self, sender, txns: list) -> str:
+        """
+        Assign group id, sign and submit transactions in one request,
+        then wait once for the whole group to confirm
+
+        :param sender: private key or list of private keys, one per transaction
+        :param txns: transactions which should be executed atomically
+
+        :returns: id of the first transaction in the group
+        """
+        transaction.assign_group_id(txns)
+        signed_txns = self.sign_transactions(sender, txns)
+        tx_id = await self.send_transactions(signed_txns)
+        await self.wait_for_confirmation(tx_id)
+        return tx_id
+
+    #
+    @instrumented("confirm")
+    async def wait_for_confirmation(self, tx_id: str) -> dict:
+        """
+        Wait until a transaction sent by this client is confirmed
+
+        :param tx_id: transaction id
+
+        :returns: {"confirmed-round": round}
+        """
+        if tx_id not in self.__pending:
+            info = await self.get_transaction_info(tx_id)
+            if info.get("confirmed-round"):
+                return {"confirmed-round": info["confirmed-round"]}
+            self.__track(tx_id, self.__params_provider.current_round()
+                         + SuggestedParamsProvider.MAX_TXN_LIFE)
+        return await asyncio.shield(self.__pending[tx_id][0])
+
+    #
+    async def sign_and_send(self, sender: AlgoUser, txn) -> str:
+        """
+        Sign transaction with sender key, send it and wait for confirmation
+
+        :param sender: account signing the transaction
+        :param txn: transaction to send
+
+        :returns: transaction id
+        """
+        tx_id = await self.send_transaction(self.sign_transaction(sender.pk, txn))
+        await self.wait_for_confirmation(tx_id)
+        return tx_id
+
+    #
+    def __track(self, tx_id: str, last_valid: int) -> None:
+        """
+        Register transaction with the confirmation follower
+
+        :param tx_id: transaction id
+        :param last_valid: last round transaction can be confirmed in
+
+        :returns: None
+        """
+        if tx_id not in self.__pending:
+            future = asyncio.get_running_loop().create_future()
+            self.__pending[tx_id] = (future, last_valid)
+        if self.__follower is None or self.__follower.done():
+            self.__follower = asyncio.get_running_loop().create_task(self.__follow())
+
+    #
+    async def __follow(self) -> None:
+        """
+        Follow rounds while transactions are pending, resolving all
+        transactions of a block with one txids request
+
+        :returns: None
+        """
+        while self.__pending:
+            try:
+                if self.__last_round is None:
+                    # blocks are followed from this round once every
+                    # pending transaction was looked up, confirmations
+                    # before it are only found this way
+                    last_round = (await self.status())["last-round"]
+                    # transactions tracked during the lookups are looked
+                    # up as well, their submit saw no round change
+                    checked = set()
+                    while True:
+                        tx_ids = [tx_id for tx_id in self.__pending if tx_id not in checked]
+                        if not tx_ids:
+                            break
+                        for tx_id in tx_ids:
+                            checked.add(tx_id)
+                            try:
+                                info = await self.get_transaction_info(tx_id)
+                            except error.AlgodHTTPError as e:
+                                if e.code != 404:
+                                    raise
+                                # unknown to this node, it may still confirm
+                                continue
+                            if info.get("confirmed-round"):
+                                self.__resolve(tx_id, info["confirmed-round"])
+                    self.__last_round = last_round
+                    continue
+
+                status = await self.status_after_block(self.__last_round)
+                for round_num in range(self.__last_round + 1, status["last-round"] + 1):
+                    block = await self.get_block_txids(round_num)
+                    for tx_id in block.get("blockTxids") or []:
+                        if tx_id in self.__pending:
+                            self.__resolve(tx_id, round_num)
+                    self.__last_round = round_num
+                    self.__expire(round_num)
+            except (OSError, error.AlgodHTTPError, asyncio.IncompleteReadError):
+                await asyncio.sleep(1)
+        self.__last_round = None
+
+    #
+    def __resolve(self, tx_id: str, round_num: int) -> None:
+        """
+        Mark transaction confirmed
+
+        :param tx_id: transaction id
+        :param round_num: round transaction was confirmed in
+
+        :returns: None
+        """
+        entry = self.__pending.pop(tx_id, None)
+        if entry is None:
+            # resolved by the follower and a submitter at once
+            return
+        future, _ = entry
+        if not future.done():
+            future.set_result({"confirmed-round": round_num})
+
+    #
+    def __expire(self, round_num: int) -> None:
+        """
+        Fail transactions whose last valid round has passed
+
+        :param round_num: last processed round
+
+        :returns: None
+        """
+        for tx_id, (future, last_valid) in list(self.__pending.items()):
+            if last_valid < round_num:
+                del self.__pending[tx_id]
+                if not future.done():
+                    future.set_exception(error.ConfirmationTimeoutError(
+                        "Transaction {} not confirmed by last valid round {}".format(
+                            tx_id, last_valid)))
+
+
+#
+class AsyncAlgorandHTLC(AsyncAlgorand):
+    """
+    AsyncAlgorandHTLC object for running preHtlc protocol steps as coroutines
+    """
+
+    #
+    @instrumented("htlc")
+    async def commit(
+                self,
+                teal_manager: Optional[TealManager],
+                sender: AlgoUser,
+                amount: int,
+                receiver: AlgoUser
+            ) -> Tuple[int, str]:
+        """
+        Commit funds for choosen LP, contract is assembled offline
+
+        :param teal_manager: object for interacting with teal contracts
+        :param sender: commit account info
+        :param amount: commited amount
+        :param receiver: receiver account
+
+        :returns: application id and address
+        """
+        # pyteal compilation on a cold cache must not block the loop
+        approval_teal, clear_teal = await asyncio.get_running_loop().run_in_executor(
+                                        None,
+                                        functools.partial(
+                                            teal_manager.deploy_contract,
+                                            None, 'commit', TealManager.LOCAL_BACKEND))
+        await self.refresh_params()
+
+        app_args = [b"commit", (amount).to_bytes(8, 'big')]
+        txn = self.create_application_transaction(
+                    sender.address, approval_teal, clear_teal, app_args, receiver.address)
+        tx_id = await self.sign_and_send(sender, txn)
+
+        app_id = await self.get_application_id(tx_id)
+        app_address = self.get_application_address(app_id)
+
+        return app_id, app_address
+
+    #
+    @instrumented("htlc")
+    async def lock_commitment(
+                self,
+                sender: AlgoUser,
+                app_id: int,
+                amount: int,
+                hashlock: bytes,
+                receiver: str
+            ) -> None:
+        """
+        Lock commited fund and write hashlock in smart contract
+
+        :param sender: locker account information
+        :param app_id: application id
+        :param amount: locked amount
+        :param hashlock: hashlock from LP for writing in smart contract
+        :param receiver: receiver address
+
+        :returns: None
+        """
+        await self.refresh_params()
+        pmt_txn = self.build_payment_transaction(
+                    sender.address,
+                    self.get_application_address(app_id),
+                    amount,
+                    "Lock Commitment"
+                )
+        app_txn = self.call_application_transaction(
+                    sender.address, app_id, [b"lock", hashlock], receiver)
+        await self.send_group(sender.pk, [pmt_txn, app_txn])
+
+    #
+    @instrumented("htlc")
+    async def redeem(self, sender: AlgoUser, app_id: int, secret: bytes) -> str:
+        """
+        Claim committed funds with the secret, without waiting for confirmation
+
+        :param sender: claiming account
+        :param app_id: application id
+        :param secret: hashlock preimage
+
+        :returns: claim transaction id
+        """
+        await self.refresh_params()
+        txn = self.call_application_transaction(sender.address, app_id, [b"claim", secret])
+        return await self.send_transaction(self.sign_transaction(sender.pk, txn))
+
+    #
+    @instrumented("htlc")
+    async def lock_dest_chain(
+                self,
+                sender: AlgoUser,
+                app_id: int,
+                asset_id: int,
+                amount: int,
+                hashlock: bytes,
+                receiver: AlgoUser
+            ) -> str:
+        """
+        Lock funds for receiver on destination chain application
+
+        :returns: lock transaction id
+        """
+        await self.refresh_params()
+        app_args = [b"lock", (amount).to_bytes(8, "big"), hashlock]
+        txn = self.call_application_transaction(
+                    sender.address, app_id, app_args, receiver.address, asset_id)
+        return await self.sign_and_send(sender, txn)
+
+    #
+    @instrumented("htlc")
+    async def redeem_dest(self, receiver: AlgoUser, app_id: int, secret: bytes) -> str:
+        """
+        Redeem funds on destination chain application with the secret
+
+        :returns: redeem transaction id
+        """
+        await self.refresh_params()
+        txn = self.call_application_transaction(receiver.address, app_id, [b"redeem", secret])
+        return await self.sign_and_send(receiver, txn)
@@ -0,0 +1,148 @@
+#
+import sys
+import json
+import time
+import asyncio
+import argparse
+import hashlib
+import tempfile
+import shutil
+import os
+
+#
+from typing import List
+from concurrent.futures import ThreadPoolExecutor
+
+#
+from algorand_htlc import AlgorandHTLC
+from async_algorand import AsyncAlgorandHTLC
+from fake_algod import FakeAlgod, FakeAlgodServer
+from suggested_params import SuggestedParamsProvider
+from teal import TealManager
+
+
+#
+SECRET = b"layerswap"
+HASHLOCK = hashlib.sha256(SECRET).digest()
+AMOUNT = 10**5
+FUNDING = 10**6
+
+
+#
+def sync_swap(htlc: AlgorandHTLC, teal_manager: TealManager, node: FakeAlgod) -> None:
+    """
+    Run commit, lock and claim with the synchronous client
+
+    :returns: None
+    """
+    alice = htlc.generate_new_account()
+    bob = htlc.generate_new_account()
+    node.fund(alice.address, FUNDING)
+    node.fund(bob.address, FUNDING)
+    app_id, app_address = htlc.commit(teal_manager, alice, AMOUNT, bob)
+    # stands in for filling the application balance
+    node.fund(app_address, FUNDING)
+    htlc.lock_commitment(alice, app_id, AMOUNT, HASHLOCK, app_address)
+    txn = htlc.call_application_transaction(bob.address, app_id, [b"claim", SECRET])
+    tx_id = htlc.send_transaction(htlc.sign_transaction(bob.pk, txn))
+    htlc.wait_for_confirmation(tx_id)
+
+
+#
+async def async_swap(htlc: AsyncAlgorandHTLC, teal_manager: TealManager, node: FakeAlgod) -> None:
+    """
+    Run commit, lock and claim with the asynchronous client
+
+    :returns: None
+    """
+    alice = htlc.generate_new_account()
+    bob = htlc.generate_new_account()
+    node.fund(alice.address, FUNDING)
+    node.fund(bob.address, FUNDING)
+    app_id, app_address = await htlc.commit(teal_manager, alice, AMOUNT, bob)
+    # stands in for filling the application balance
+    node.fund(app_address, FUNDING)
+    await htlc.lock_commitment(alice, app_id, AMOUNT, HASHLOCK, app_address)
+    tx_id = await htlc.redeem(bob, app_id, SECRET)
+    await htlc.wait_for_confirmation(tx_id)
+
+
+#
+def run_sync(
+            address: str, teal_manager: TealManager, node: FakeAlgod, swaps: int, threads: int
+        ) -> float:
+    """
+    Run swaps on a thread pool
+
+    :returns: elapsed seconds
+    """
+    htlc = AlgorandHTLC("", address)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(sync_swap, htlc, teal_manager, node) for _ in range(swaps)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    htlc.confirmation_tracker.stop()
+    return elapsed
+
+
+#
+async def run_async(address: str, teal_manager: TealManager, node: FakeAlgod, swaps: int) -> float:
+    """
+    Run swaps as concurrent coroutines
+
+    :returns: elapsed seconds
+    """
+    htlc = AsyncAlgorandHTLC("", address, params_provider=SuggestedParamsProvider(None))
+    start = time.perf_counter()
+    await asyncio.gather(*[async_swap(htlc, teal_manager, node) for _ in range(swaps)])
+    elapsed = time.perf_counter() - start
+    await htlc.close()
+    return elapsed
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sync vs async swap throughput")
+    parser.add_argument("--swaps", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32,
+                        help="worker threads driving the sync client")
+    parser.add_argument("--block-time", type=float, default=0.25,
+                        help="seconds per round of the local stand-in node")
+    args = parser.parse_args(argv)
+
+    contracts = tempfile.mkdtemp()
+    shutil.copy(os.path.join("smart_contracts", "clear.teal"), contracts)
+    teal_manager = TealManager(contracts)
+    teal_manager.deploy_contract(None, "commit", TealManager.LOCAL_BACKEND)
+
+    node = FakeAlgod(block_time=args.block_time)
+    server = FakeAlgodServer(node)
+    node.start()
+    server.start()
+    try:
+        sync_elapsed = run_sync(server.address, teal_manager, node, args.swaps, args.threads)
+        async_elapsed = asyncio.run(run_async(server.address, teal_manager, node, args.swaps))
+    finally:
+        server.stop()
+        node.stop()
+        shutil.rmtree(contracts)
+
+    print(json.dumps({
+        "swaps": args.swaps,
+        "block_time": args.block_time,
+        "sync": {
+            "threads": args.threads,
+            "seconds": round(sync_elapsed, 3),
+            "swaps_per_second": round(args.swaps / sync_elapsed, 2)
+        },
+        "async": {
+            "seconds": round(async_elapsed, 3),
+            "swaps_per_second": round(args.swaps / async_elapsed, 2)
+        }
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+#
+from typing import List
+
+
+# modules a worker imports on startup
+MODULES = ["teal", "algorand", "algorand_htlc"]
+
+# modules that must not be loaded by importing the package
+LAZY_MODULES = ["pyteal"]
+
+#
+PROBE = """
+import sys, json, time, importlib
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [name for name in {lazy!r} if name in sys.modules]
+}}))
+"""
+
+
+#
+def measure(module: str, runs: int) -> dict:
+    """
+    Import module in fresh interpreters and time the import
+
+    :param module: module name
+    :param runs: number of interpreters to start
+
+    :returns: median and max import time in milliseconds and
+              lazy modules that were loaded by the import
+    """
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+                    [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+                    check=True,
+                    capture_output=True,
+                    text=True
+                ).stdout
+        result = json.loads(output)
+        timings.append(result["seconds"] * 1000)
+        loaded.update(result["loaded"])
+
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "lazy_loaded": sorted(loaded)
+    }
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Package import time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail when median import time of a module is above")
+    args = parser.parse_args(argv)
+
+    results = [measure(module, args.runs) for module in MODULES]
+    print(json.dumps(results, indent=2))
+
+    failed = False
+    for result in results:
+        if result["lazy_loaded"]:
+            print("{} loads {}".format(result["module"], ", ".join(result["lazy_loaded"])),
+                  file=sys.stderr)
+            failed = True
+        if args.max_ms is not None and result["median_ms"] > args.max_ms:
+            print("{} import takes {} ms".format(result["module"], result["median_ms"]),
+                  file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
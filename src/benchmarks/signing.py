@@ -0,0 +1,98 @@
+#
+import sys
+import json
+import time
+import argparse
+
+#
+from typing import Callable, List
+
+#
+from algosdk import account
+from algosdk.transaction import PaymentTxn, SuggestedParams
+
+#
+from signer import TransactionSigner
+
+
+#
+def build(count: int, senders: int) -> tuple:
+    """
+    Build payments from a few senders, as a settlement burst does
+
+    :param count: number of transactions
+    :param senders: number of distinct signing accounts
+
+    :returns: private key per transaction and transactions
+    """
+    accounts = [account.generate_account() for _ in range(senders)]
+    params = SuggestedParams(1000, 1, 1000, "", "testnet-v1.0", flat_fee=True)
+    keys, txns = [], []
+    for i in range(count):
+        private_key, address = accounts[i % senders]
+        keys.append(private_key)
+        txns.append(PaymentTxn(address, params, accounts[0][1], i + 1, note=i.to_bytes(8, 'big')))
+    return keys, txns
+
+
+#
+def measure(sign: Callable[[], list], count: int, runs: int) -> dict:
+    """
+    Time a signing path, best of runs
+
+    :param sign: function signing the whole batch
+    :param count: transactions in the batch
+    :param runs: number of timed runs
+
+    :returns: best seconds and transactions per second
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        sign()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "seconds": round(best, 4),
+        "txns_per_second": round(count / best, 1)
+    }
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-call vs batch transaction signing")
+    parser.add_argument("--txns", type=int, default=5000)
+    parser.add_argument("--senders", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="signer worker processes, number of CPUs by default")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    keys, txns = build(args.txns, args.senders)
+    inline = TransactionSigner(max_workers=0)
+    with TransactionSigner(max_workers=args.workers) as pooled:
+        # start worker processes outside the timed runs
+        pooled.sign_batch(keys, txns)
+        results = {
+            "per_call": measure(lambda: [txn.sign(key) for key, txn in zip(keys, txns)],
+                                args.txns, args.runs),
+            "decoded_keys": measure(lambda: inline.sign_batch(keys, txns), args.txns, args.runs),
+            "process_pool": measure(lambda: pooled.sign_batch(keys, txns), args.txns, args.runs)
+        }
+        workers = pooled.max_workers
+
+    print(json.dumps({
+        "txns": args.txns,
+        "senders": args.senders,
+        "workers": workers,
+        "results": results,
+        "speedup": {
+            name: round(results["per_call"]["seconds"] / result["seconds"], 2)
+            for name, result in results.items() if name != "per_call"
+        }
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+#
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+import collections
+
+#
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+#
+from algosdk import account, constants, mnemonic
+
+#
+from algorand import AlgoUser
+from algorand_htlc import AlgorandHTLC
+from fake_algod import FakeAlgod, FakeAlgodServer
+from journal import SwapJournal
+from profiling import PROFILER
+from teal import TealManager
+from transport import HttpTransport, PooledAlgodClient, endpoint_path
+from utils import fill_smart_contract_balance
+
+
+#
+SECRET = b"layerswap"
+HASHLOCK = hashlib.sha256(SECRET).digest()
+AMOUNT = 10**5
+
+# covers fees, locked amounts and min balance of created apps and asset
+PAIR_FUNDING = 2 * 10**6
+
+# app account min balance plus fees of the lock and claim inner payments
+APP_FUNDING = AlgorandHTLC.REGISTRY_MIN_BALANCE + 2 * constants.MIN_TXN_FEE
+
+# steps of one swap, in the order they run
+STEPS = [
+    "fund", "commit", "fill", "lock", "redeem",
+    "create_asset", "lock_dest", "redeem_dest"
+]
+
+# metrics compared against a baseline, True when higher is better
+COMPARED = {
+    "swaps_per_second": True,
+    "requests_per_swap": False
+}
+
+# settings which must match for results to be comparable
+SETUP = ["endpoint", "block_time", "swaps", "concurrency"]
+
+#
+FUNDER_MNEMONIC_ENV = "SWAP_LOAD_FUNDER_MNEMONIC"
+
+
+#
+class CountingAlgodClient(PooledAlgodClient):
+    """
+    PooledAlgodClient counting requests per endpoint
+    """
+
+    #
+    def __init__(self, *args, **kwargs) -> None:
+        """
+        Constructor, takes PooledAlgodClient arguments
+
+        :returns: None
+        """
+        super().__init__(*args, **kwargs)
+        self.__lock = threading.Lock()
+        self.__requests = collections.Counter()
+
+    #
+    @property
+    def requests(self) -> dict:
+        """
+        Getter for requests private field
+
+        :returns: number of requests per "METHOD /path" endpoint
+        """
+        with self.__lock:
+            return dict(self.__requests)
+
+    #
+    def algod_request(self, method, requrl, *args, **kwargs):
+        """
+        Count request and send it, see PooledAlgodClient.algod_request
+        """
+        endpoint = "{} {}".format(method, endpoint_path(requrl))
+        with self.__lock:
+            self.__requests[endpoint] += 1
+        return super().algod_request(method, requrl, *args, **kwargs)
+
+
+#
+class Recorder:
+    """
+    Recorder object collecting step latencies and failures across threads
+    """
+
+    #
+    def __init__(self) -> None:
+        """
+        Constructor
+
+        :returns: None
+        """
+        self.__lock = threading.Lock()
+        self.__latencies = collections.defaultdict(list)
+        self.__errors = collections.Counter()
+
+    #
+    @contextlib.contextmanager
+    def step(self, name: str):
+        """
+        Time body of with statement as one run of step
+
+        :param name: step name
+        """
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        with self.__lock:
+            self.__latencies[name].append(elapsed)
+
+    #
+    def error(self, exc: Exception) -> None:
+        """
+        Count failed swap by exception type
+
+        :param exc: exception raised by the swap
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__errors[type(exc).__name__] += 1
+
+    #
+    def latencies(self) -> dict:
+        """
+        Summarize recorded latencies
+
+        :returns: count, mean and p50/p95/p99 in milliseconds per step
+        """
+        with self.__lock:
+            return {
+                name: summarize(self.__latencies[name])
+                for name in STEPS if self.__latencies[name]
+            }
+
+    #
+    def errors(self) -> dict:
+        """
+        Get failed swaps
+
+        :returns: number of failures per exception type
+        """
+        with self.__lock:
+            return dict(self.__errors)
+
+
+#
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile
+
+    :param values: sorted values
+    :param fraction: percentile between 0 and 1
+
+    :returns: value at percentile
+    """
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+#
+def summarize(seconds: list) -> dict:
+    """
+    Summarize latencies of one step
+
+    :param seconds: latencies in seconds
+
+    :returns: count, mean and p50/p95/p99 in milliseconds
+    """
+    values = sorted(value * 1000 for value in seconds)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3)
+    }
+
+
+#
+def git_revision() -> Optional[str]:
+    """
+    Get commit the benchmark runs on
+
+    :returns: commit hash, None outside a git checkout
+    """
+    try:
+        return subprocess.run(
+                    ["git", "rev-parse", "--short", "HEAD"],
+                    check=True,
+                    capture_output=True,
+                    text=True
+                ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+#
+def run_swap(
+            htlc: AlgorandHTLC,
+            teal_manager: TealManager,
+            funder: AlgoUser,
+            recorder: Recorder,
+            swap_id: int = 0
+        ) -> None:
+    """
+    Run one swap on a fresh account pair, source chain commit, lock and
+    redeem followed by destination chain lock and redeem
+
+    :param htlc: client running the protocol steps
+    :param teal_manager: object for interacting with teal contracts
+    :param funder: account funding the pair
+    :param recorder: recorder of step latencies
+    :param swap_id: number of the swap, names its profile directory
+                    and journal record
+
+    :returns: None
+    """
+    with PROFILER.swap("swap-{:05d}".format(swap_id)):
+        run_steps(htlc, teal_manager, funder, recorder, "swap-{:05d}".format(swap_id))
+
+
+#
+def run_steps(
+            htlc: AlgorandHTLC,
+            teal_manager: TealManager,
+            funder: AlgoUser,
+            recorder: Recorder,
+            swap_id: str
+        ) -> None:
+    """
+    Run the protocol steps of one swap, see run_swap
+
+    :returns: None
+    """
+    alice = htlc.generate_new_account()
+    bob = htlc.generate_new_account()
+
+    with recorder.step("fund"):
+        fill_smart_contract_balance(htlc, funder, alice.address, PAIR_FUNDING)
+        fill_smart_contract_balance(htlc, funder, bob.address, PAIR_FUNDING)
+
+    with recorder.step("commit"):
+        app_id, app_address = htlc.commit(teal_manager, alice, AMOUNT, bob, swap_id=swap_id)
+    with recorder.step("fill"):
+        fill_smart_contract_balance(htlc, alice, app_address, APP_FUNDING)
+    with recorder.step("lock"):
+        htlc.lock_commitment(alice, app_id, AMOUNT, HASHLOCK, app_address, swap_id=swap_id)
+    with recorder.step("redeem"):
+        htlc.wait_for_confirmation(htlc.redeem(bob, app_id, SECRET, swap_id=swap_id))
+
+    with recorder.step("create_asset"):
+        dest_app_id, asset_id = htlc.create_new_asset(teal_manager, bob, swap_id=swap_id)
+    with recorder.step("lock_dest"):
+        htlc.lock_dest_chain(bob, dest_app_id, asset_id, AMOUNT, HASHLOCK, alice, swap_id=swap_id)
+    with recorder.step("redeem_dest"):
+        htlc.redeem_dest(bob, dest_app_id, SECRET, swap_id=swap_id)
+
+
+#
+def run_load(
+            client: CountingAlgodClient,
+            teal_manager: TealManager,
+            funder: AlgoUser,
+            swaps: int,
+            concurrency: int,
+            journal: Optional[SwapJournal] = None
+        ) -> dict:
+    """
+    Run swaps on a thread pool and collect results
+
+    :param client: client of the node under test
+    :param teal_manager: object for interacting with teal contracts
+    :param funder: account funding every pair
+    :param swaps: number of swaps
+    :param concurrency: swaps in flight
+    :param journal: swap journal the steps are recorded in
+
+    :returns: throughput, step latencies, request counts and errors
+    """
+    htlc = AlgorandHTLC("", "", client=client, journal=journal)
+    recorder = Recorder()
+
+    #
+    def swap(swap_id):
+        try:
+            run_swap(htlc, teal_manager, funder, recorder, swap_id)
+        except Exception as exc:
+            recorder.error(exc)
+
+    requests_before = collections.Counter(client.requests)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(swap, swap_id) for swap_id in range(swaps)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    htlc.confirmation_tracker.stop()
+
+    requests = collections.Counter(client.requests)
+    requests.subtract(requests_before)
+    errors = recorder.errors()
+    completed = swaps - sum(errors.values())
+    total_requests = sum(requests.values())
+    return {
+        "completed": completed,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "swaps_per_second": round(completed / elapsed, 3),
+        "steps": recorder.latencies(),
+        "requests": {
+            "total": total_requests,
+            "by_endpoint": dict(sorted((k, v) for k, v in requests.items() if v))
+        },
+        "requests_per_swap": round(total_requests / swaps, 2) if swaps else 0.0
+    }
+
+
+#
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compare result against a baseline result
+
+    :param result: result of this run
+    :param baseline: result of an earlier run
+    :param tolerance: allowed relative change, e.g. 0.1 for 10%
+
+    :returns: regressions, empty when result is within tolerance
+    """
+    regressions = []
+    for metric, higher_is_better in COMPARED.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append("{}: {} -> {} ({:+.1%})".format(metric, old, new, change))
+
+    for step, summary in result["steps"].items():
+        old = baseline.get("steps", {}).get(step, {}).get("p95_ms")
+        if not old:
+            continue
+        change = (summary["p95_ms"] - old) / old
+        if change > tolerance:
+            regressions.append("{} p95_ms: {} -> {} ({:+.1%})".format(
+                step, old, summary["p95_ms"], change))
+
+    if result["errors"] and not baseline.get("errors"):
+        regressions.append("errors: {}".format(result["errors"]))
+    return regressions
+
+
+#
+def get_funder(args: argparse.Namespace, node: Optional[FakeAlgod]) -> AlgoUser:
+    """
+    Get account funding the pairs, a generated account funded by the
+    stand-in node or the account of FUNDER_MNEMONIC_ENV on a real endpoint
+
+    :returns: funder account
+    """
+    if node is not None:
+        private_key, address = account.generate_account()
+        node.fund(address, PAIR_FUNDING * 2 * args.swaps + 10**6)
+        return AlgoUser(private_key, address, mnemonic.from_private_key(private_key))
+
+    words = args.funder_mnemonic or os.environ.get(FUNDER_MNEMONIC_ENV)
+    if not words:
+        raise SystemExit("--funder-mnemonic or {} is required with --algod-address".format(
+            FUNDER_MNEMONIC_ENV))
+    private_key = mnemonic.to_private_key(words)
+    return AlgoUser(private_key, account.address_from_private_key(private_key), words)
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="PreHTLC swap load generator")
+    parser.add_argument("--swaps", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="swaps in flight")
+    parser.add_argument("--algod-address", default=None,
+                        help="node under test, a local stand-in node when not given")
+    parser.add_argument("--algod-token", default="")
+    parser.add_argument("--funder-mnemonic", default=None,
+                        help="account funding the pairs on a real endpoint, "
+                             "read from {} when not given".format(FUNDER_MNEMONIC_ENV))
+    parser.add_argument("--block-time", type=float, default=0.25,
+                        help="seconds per round of the local stand-in node")
+    parser.add_argument("--output", default=None,
+                        help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=None,
+                        help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed relative regression against the baseline")
+    parser.add_argument("--journal", default=None,
+                        help="record swap steps in this SQLite journal")
+    parser.add_argument("--profile", default=None,
+                        help="write cProfile and tracemalloc data of swap phases to this directory")
+    parser.add_argument("--profile-sample", type=float, default=0.1,
+                        help="fraction of swaps profiled")
+    args = parser.parse_args(argv)
+    if args.profile:
+        PROFILER.enable(args.profile, args.profile_sample)
+
+    contracts = tempfile.mkdtemp()
+    shutil.copy(os.path.join("smart_contracts", "clear.teal"), contracts)
+    teal_manager = TealManager(contracts)
+    # programs are compiled once up front and served from cache
+    for contract in ["commit", "lock_redeem_dest"]:
+        teal_manager.deploy_contract(None, contract, TealManager.LOCAL_BACKEND)
+
+    node = server = None
+    address = args.algod_address
+    if address is None:
+        node = FakeAlgod(block_time=args.block_time)
+        server = FakeAlgodServer(node)
+        node.start()
+        server.start()
+        address = server.address
+
+    try:
+        client = CountingAlgodClient(
+                    args.algod_token,
+                    address,
+                    {"X-API-Key": args.algod_token},
+                    HttpTransport(address, pool_size=max(10, args.concurrency))
+                )
+        funder = get_funder(args, node)
+        # protocol steps print progress, stdout is kept for the results
+        with contextlib.redirect_stdout(sys.stderr):
+            journal = SwapJournal(args.journal) if args.journal else None
+            load = run_load(client, teal_manager, funder, args.swaps, args.concurrency, journal)
+            if journal is not None:
+                journal.close()
+    finally:
+        if server is not None:
+            server.stop()
+            node.stop()
+        shutil.rmtree(contracts)
+
+    result = {
+        "revision": git_revision(),
+        "endpoint": args.algod_address or "local",
+        "block_time": None if args.algod_address else args.block_time,
+        "swaps": args.swaps,
+        "concurrency": args.concurrency,
+        **load
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in SETUP:
+            if baseline.get(key) != result[key]:
+                print("baseline {} is {}, this run {}".format(
+                    key, baseline.get(key), result[key]), file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print("regression {}".format(regression), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+#
+from typing import List, Optional
+
+#
+from teal import TealManager
+from teal_analyzer import TealAnalyzer
+
+
+#
+BASELINE = os.path.join(os.path.dirname(__file__), "teal_costs.json")
+
+
+#
+def analyze(contracts: List[str], version: Optional[int] = None) -> dict:
+    """
+    Analyze TealManager contracts
+
+    :param contracts: names of TealManager contract methods
+    :param version: teal version, contracts deployed with a newer
+                    version are built with the version they need
+
+    :returns: report per contract
+    """
+    path = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(os.path.dirname(__file__), "..", "smart_contracts", "clear.teal"),
+                    path)
+        teal_manager = TealManager(path)
+        analyzer = TealAnalyzer()
+        return {
+            contract: analyzer.analyze_contract(
+                teal_manager, contract, max(version or 0, teal_manager.get_version(contract))
+            ).to_dict()
+            for contract in contracts
+        }
+    finally:
+        shutil.rmtree(path)
+
+
+#
+def compare(reports: dict, baseline: dict) -> List[str]:
+    """
+    Compare reports against baseline reports
+
+    :param reports: report per contract
+    :param baseline: baseline report per contract
+
+    :returns: program sizes and branch costs above baseline, branches
+              above the opcode budget and contracts or branches added
+              or removed since the baseline, run with --update to accept
+    """
+    failures = []
+    for contract, report in reports.items():
+        for branch, branch_cost in report["branches"].items():
+            if branch_cost > report["budget"]:
+                failures.append("{} {} costs {}, budget is {}".format(
+                    contract, branch, branch_cost, report["budget"]))
+
+        old = baseline.get(contract)
+        if old is None:
+            failures.append("{} is not in the baseline".format(contract))
+            continue
+        for key in ["size", "extra_pages"]:
+            if report[key] > old[key]:
+                failures.append("{} {}: {} -> {}".format(contract, key, old[key], report[key]))
+        for branch in sorted(set(old["branches"]) - set(report["branches"])):
+            failures.append("{} {} branch removed since the baseline".format(contract, branch))
+        for branch, branch_cost in report["branches"].items():
+            old_cost = old["branches"].get(branch)
+            if old_cost is None:
+                failures.append("{} {} branch is not in the baseline".format(contract, branch))
+            elif branch_cost > old_cost:
+                failures.append("{} {} cost: {} -> {}".format(
+                    contract, branch, old_cost, branch_cost))
+    return failures
+
+
+#
+def diff(before: dict, after: dict) -> List[str]:
+    """
+    Describe size and branch cost changes between two runs
+
+    :param before: report per contract
+    :param after: report per contract
+
+    :returns: one line per contract and branch
+    """
+    lines = []
+    for contract, new in after.items():
+        old = before.get(contract)
+        if old is None:
+            continue
+        lines.append("{} v{} -> v{}: size {} -> {} ({:+d})".format(
+            contract, old["version"], new["version"],
+            old["size"], new["size"], new["size"] - old["size"]))
+        for branch in sorted(set(old["branches"]) | set(new["branches"])):
+            old_cost = old["branches"].get(branch)
+            new_cost = new["branches"].get(branch)
+            change = "" if old_cost is None or new_cost is None else " ({:+d})".format(new_cost - old_cost)
+            lines.append("  {}: {} -> {}{}".format(
+                branch, "-" if old_cost is None else old_cost,
+                "-" if new_cost is None else new_cost, change))
+    return lines
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Contract opcode cost and size check")
+    parser.add_argument("contracts", nargs="*", default=TealAnalyzer.CONTRACTS)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true",
+                        help="write this run as the new baseline")
+    parser.add_argument("--versions", nargs=2, type=int, metavar=("BEFORE", "AFTER"),
+                        help="report cost changes between two teal versions")
+    args = parser.parse_args(argv)
+
+    if args.versions:
+        before, after = (analyze(args.contracts, version) for version in args.versions)
+        for line in diff(before, after):
+            print(line)
+        return 0
+
+    reports = analyze(args.contracts)
+    print(json.dumps(reports, indent=2))
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps(reports, indent=2) + "\n")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = compare(reports, baseline)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        print("rerun with --update to accept this run as the baseline", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+#
+import time
+import logging
+import threading
+import contextlib
+import collections
+
+#
+from typing import Callable, Optional
+from concurrent.futures import Future
+
+#
+from algosdk import error
+from algosdk.v2client.algod import AlgodClient
+
+#
+from scheduler import current_priority, request_priority
+
+
+#
+logger = logging.getLogger("PreHTLC")
+
+
+#
+class ConfirmationTracker:
+    """
+    ConfirmationTracker object for following rounds once and resolving
+    every tracked transaction confirmed in a block, instead of polling
+    pending info per transaction
+    """
+
+    #
+    def __init__(
+                self,
+                client: Optional[AlgodClient],
+                catch_up_rounds: int = 10,
+                retain: int = 10000
+            ) -> None:
+        """
+        Constructor
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param catch_up_rounds: most rounds scanned block by block when the
+                                tracker wakes up after being idle, larger
+                                gaps are resolved with pending info requests
+        :param retain: number of finished transactions kept for late waiters
+
+        :returns: None
+        """
+        self.__client = client
+        self.__catch_up_rounds = catch_up_rounds
+        self.__retain = retain
+        self.__condition = threading.Condition()
+        self.__pending = {}
+        self.__finished = collections.OrderedDict()
+        self.__listeners = []
+        self.__app_listeners = []
+        self.__address_listeners = []
+        self.__last_round = None
+        # txids of recently scanned blocks by round, tracked transactions
+        # confirmed in them while their submit was returning resolve from it
+        self.__recent = collections.OrderedDict()
+        self.__scanned_round = None
+        self.__resumes = 0
+        self.__stopped = False
+        self.__thread = None
+
+    #
+    @property
+    def last_round(self) -> Optional[int]:
+        """
+        Getter for last_round private field
+
+        :returns: last round whose block was processed
+        """
+        return self.__last_round
+
+    #
+    @property
+    def pending(self) -> int:
+        """
+        Getter for number of tracked unconfirmed transactions
+
+        :returns: number of pending transactions
+        """
+        return len(self.__pending)
+
+    #
+    def add_listener(self, callback: Callable[[str, int], None]) -> None:
+        """
+        Register callback called with tx id and round for every
+        confirmed tracked transaction
+
+        :param callback: listener function
+
+        :returns: None
+        """
+        self.__listeners.append(callback)
+
+    #
+    def add_app_listener(self, callback: Callable[[int, int], None]) -> None:
+        """
+        Register callback called with application id and round for every
+        application called by a confirmed tracked transaction
+
+        :param callback: listener function
+
+        :returns: None
+        """
+        self.__app_listeners.append(callback)
+
+    #
+    def add_address_listener(self, callback: Callable[[Optional[str], int], None]) -> None:
+        """
+        Register callback called with address and round for every
+        account touched by a confirmed tracked transaction, the address
+        is None when the touched accounts are not known
+
+        :param callback: listener function
+
+        :returns: None
+        """
+        self.__address_listeners.append(callback)
+
+    #
+    def mark(self) -> tuple:
+        """
+        Get position of the tracker, taken before submitting a transaction
+        and passed to track
+
+        :returns: opaque tracker position
+        """
+        with self.__condition:
+            return self.__resumes, self.__scanned_round
+
+    #
+    def track(
+                self,
+                tx_id: str,
+                last_valid: int,
+                app_ids: tuple = (),
+                mark: Optional[tuple] = None,
+                addresses: Optional[tuple] = None
+            ) -> Future:
+        """
+        Start tracking transaction
+
+        :param tx_id: transaction id
+        :param last_valid: last round transaction can be confirmed in
+        :param app_ids: applications called by transaction or its group
+        :param mark: tracker position taken before the transaction was
+                     submitted, the transaction is looked up once when
+                     rounds were processed since without their block
+        :param addresses: accounts touched by transaction or its group,
+                          None when they are not known
+
+        A priority raised with request_priority by the caller applies
+        to the tracker requests while the transaction is pending
+
+        :returns: future resolved with {"confirmed-round": round} or
+                  failed with ConfirmationTimeoutError once last_valid passed
+        """
+        with self.__condition:
+            if tx_id in self.__finished:
+                return self.__finished[tx_id]
+            if tx_id in self.__pending:
+                return self.__pending[tx_id][0]
+
+            future = Future()
+            self.__pending[tx_id] = (
+                future, last_valid, tuple(app_ids), current_priority(),
+                None if addresses is None else tuple(addresses)
+            )
+            confirmed_round = next(
+                (round_num for round_num, tx_ids in self.__recent.items() if tx_id in tx_ids), None)
+            lookup = confirmed_round is None and mark is not None and self.__missed(mark)
+            self.__condition.notify()
+            if self.__thread is None:
+                self.__stopped = False
+                self.__thread = threading.Thread(
+                                    target=self.__run,
+                                    name="confirmation-tracker",
+                                    daemon=True
+                                )
+                self.__thread.start()
+
+        # tracker may have scanned the confirming block before tracking
+        if lookup:
+            confirmed_round = self.__lookup(tx_id)
+        if confirmed_round:
+            self.__resolve(tx_id, confirmed_round)
+        return future
+
+    #
+    def wait(self, tx_id: str, last_valid: int) -> dict:
+        """
+        Block until transaction is confirmed, a transaction the tracker
+        does not know is looked up first as it may be confirmed already
+
+        :param tx_id: transaction id
+        :param last_valid: last round transaction can be confirmed in
+
+        :returns: {"confirmed-round": round}
+        """
+        with self.__condition:
+            known = tx_id in self.__finished or tx_id in self.__pending
+        if known:
+            return self.track(tx_id, last_valid).result()
+
+        mark = self.mark()
+        confirmed_round = self.__lookup(tx_id)
+        if confirmed_round:
+            return {"confirmed-round": confirmed_round}
+        return self.track(tx_id, last_valid, mark=mark).result()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop following rounds, tracking resumes on next track call
+
+        :returns: None
+        """
+        with self.__condition:
+            self.__stopped = True
+            thread = self.__thread
+            self.__condition.notify()
+        if thread is not None:
+            thread.join()
+
+    #
+    def __run(self) -> None:
+        """
+        Follow rounds while there are pending transactions
+
+        :returns: None
+        """
+        while True:
+            with self.__condition:
+                while not self.__pending and not self.__stopped:
+                    self.__condition.wait()
+                if self.__stopped:
+                    self.__thread = None
+                    return
+
+            try:
+                with self.__priority():
+                    if self.__last_round is None:
+                        self.__resume(self.__client.status()["last-round"])
+                    else:
+                        status = self.__client.status_after_block(self.__last_round)
+                        self.__process_rounds(status["last-round"])
+            except Exception:
+                # transient algod failure, retry after a short pause
+                time.sleep(1)
+
+    #
+    def __priority(self):
+        """
+        Raise priority of tracker requests to the highest priority a
+        pending transaction was tracked with, e.g. a redeem
+
+        :returns: context manager
+        """
+        with self.__condition:
+            priorities = [entry[3] for entry in self.__pending.values() if entry[3] is not None]
+        if not priorities:
+            return contextlib.nullcontext()
+        return request_priority(min(priorities))
+
+    #
+    def __resume(self, current_round: int) -> None:
+        """
+        Pick up rounds after being idle or on first start, transactions
+        tracked while pending info is read are read as well
+
+        :param current_round: latest round reported by algod
+
+        :returns: None
+        """
+        checked = set()
+        while True:
+            with self.__condition:
+                tx_ids = [tx_id for tx_id in self.__pending if tx_id not in checked]
+                if not tx_ids:
+                    self.__last_round = current_round
+                    self.__scanned_round = current_round
+                    self.__resumes += 1
+                    self.__recent.clear()
+                    break
+            for tx_id in tx_ids:
+                checked.add(tx_id)
+                confirmed_round = self.__lookup(tx_id)
+                if confirmed_round:
+                    self.__resolve(tx_id, confirmed_round)
+        self.__expire(current_round)
+
+    #
+    def __process_rounds(self, current_round: int) -> None:
+        """
+        Resolve transactions confirmed in rounds after last processed one
+
+        :param current_round: latest round reported by algod
+
+        :returns: None
+        """
+        if current_round - self.__last_round > self.__catch_up_rounds:
+            self.__resume(current_round)
+            return
+
+        for round_num in range(self.__last_round + 1, current_round + 1):
+            confirmed = []
+            block_tx_ids = None
+            if self.__pending:
+                block_tx_ids = set(self.__client.get_block_txids(round_num).get("blockTxids") or [])
+            with self.__condition:
+                if block_tx_ids is not None:
+                    confirmed = [tx_id for tx_id in block_tx_ids if tx_id in self.__pending]
+                    self.__recent[round_num] = block_tx_ids
+                    while len(self.__recent) > self.__catch_up_rounds:
+                        self.__recent.popitem(last=False)
+                self.__last_round = round_num
+                self.__scanned_round = round_num
+            for tx_id in confirmed:
+                self.__resolve(tx_id, round_num)
+            self.__expire(round_num)
+
+        with self.__condition:
+            if not self.__pending:
+                # idle tracker forgets the round and resumes from status
+                self.__last_round = None
+
+    #
+    def __missed(self, mark: tuple) -> bool:
+        """
+        Whether rounds were processed without their block since mark,
+        caller holds the lock
+
+        :param mark: tracker position, see mark
+
+        :returns: True when a transaction submitted at mark has to be
+                  looked up
+        """
+        resumes, scanned_round = mark
+        if resumes != self.__resumes:
+            return True
+        if scanned_round is None:
+            # the tracker has not started, its first resume reads pending info
+            return False
+        return any(
+            round_num not in self.__recent
+            for round_num in range(scanned_round + 1, self.__scanned_round + 1)
+        )
+
+    #
+    def __lookup(self, tx_id: str) -> Optional[int]:
+        """
+        Read confirmation round from pending info, transactions algod
+        does not know, dropped or sent through another node, read as
+        unconfirmed
+
+        :param tx_id: transaction id
+
+        :returns: confirmed round or None
+        """
+        try:
+            info = self.__client.pending_transaction_info(tx_id)
+        except error.AlgodHTTPError as e:
+            if e.code != 404:
+                raise
+            return None
+        return info.get("confirmed-round") or None
+
+    #
+    def __resolve(self, tx_id: str, round_num: int) -> None:
+        """
+        Mark transaction confirmed
+
+        :param tx_id: transaction id
+        :param round_num: round transaction was confirmed in
+
+        :returns: None
+        """
+        with self.__condition:
+            entry = self.__pending.pop(tx_id, None)
+            if entry is None:
+                # resolved by the tracker thread and a submitter at once
+                return
+            future, _, app_ids, _, addresses = entry
+            self.__finish(tx_id, future)
+        # state readers drop cached state before waiters read it again,
+        # a failing listener must not leave the waiters hanging
+        calls = [(callback, app_id) for app_id in app_ids for callback in self.__app_listeners]
+        calls += [
+            (callback, address)
+            for address in ((None,) if addresses is None else addresses)
+            for callback in self.__address_listeners
+        ]
+        calls += [(callback, tx_id) for callback in self.__listeners]
+        for callback, key in calls:
+            try:
+                callback(key, round_num)
+            except Exception:
+                logger.exception("confirmation listener %r failed on %s in round %s",
+                                 callback, key, round_num)
+        future.set_result({"confirmed-round": round_num})
+
+    #
+    def __expire(self, round_num: int) -> None:
+        """
+        Fail transactions whose last valid round has passed
+
+        :param round_num: last processed round
+
+        :returns: None
+        """
+        with self.__condition:
+            expired = [
+                tx_id for tx_id, (_, last_valid, _, _, _) in self.__pending.items()
+                if last_valid < round_num
+            ]
+        for tx_id in expired:
+            # confirmation could have been missed while catching up
+            confirmed_round = self.__lookup(tx_id)
+            if confirmed_round:
+                self.__resolve(tx_id, confirmed_round)
+                continue
+            with self.__condition:
+                entry = self.__pending.pop(tx_id, None)
+                if entry is None:
+                    continue
+                future, last_valid, _, _, _ = entry
+                self.__finish(tx_id, future)
+            future.set_exception(error.ConfirmationTimeoutError(
+                "Transaction {} not confirmed by last valid round {}".format(
+                    tx_id, last_valid)))
+
+    #
+    def __finish(self, tx_id: str, future: Future) -> None:
+        """
+        Keep finished future for late waiters, caller holds the lock
+
+        :param tx_id: transaction id
+        :param future: finished future
+
+        :returns: None
+        """
+        self.__finished[tx_id] = future
+        while len(self.__finished) > self.__retain:
+            self.__finished.popitem(last=False)
@@ -0,0 +1,692 @@
+#
+import json
+import time
+import base64
+import threading
+import collections
+
+#
+from typing import Optional
+from urllib import parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#
+import msgpack
+
+#
+from algosdk import encoding, error, logic, transaction
+
+#
+from assembler import TealAssembler, TealAssemblyError
+from fake_ledger import FakeLedger, FakeLedgerError
+
+
+#
+class FakeAlgod:
+    """
+    FakeAlgod object standing in for an algod node in tests and
+    benchmarks, it implements the AlgodClient methods this project uses.
+    Groups are evaluated against an in-memory ledger when submitted, the
+    way algod checks them against its transaction pool, and become
+    visible to account and application reads once their round is
+    produced. Signatures are not verified
+    """
+
+    #
+    GENESIS_ID = "fake-v1"
+    GENESIS_HASH = base64.b64encode(b"\x00" * 32).decode('ascii')
+    CONSENSUS_VERSION = "fake"
+    MIN_FEE = 1000
+
+    #
+    def __init__(self, block_time: Optional[float] = None) -> None:
+        """
+        Constructor
+
+        :param block_time: seconds between rounds produced in background,
+                           None produces rounds only on produce_block calls
+
+        :returns: None
+        """
+        self.__block_time = block_time
+        self.__condition = threading.Condition()
+        self.__round = 1
+        self.__pending = []
+        self.__transactions = {}
+        # confirmed transactions pending_transaction_info no longer knows
+        self.__forgotten = set()
+        self.__signed = {}
+        self.__blocks = {1: []}
+        self.__results = {}
+        self.__ledger = FakeLedger()
+        self.__pending_ledger = self.__ledger.child()
+        self.__requests = collections.Counter()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    #
+    @property
+    def round(self) -> int:
+        """
+        Getter for round private field
+
+        :returns: last produced round
+        """
+        return self.__round
+
+    #
+    @property
+    def requests(self) -> collections.Counter:
+        """
+        Getter for requests private field
+
+        :returns: number of calls per client method
+        """
+        return self.__requests
+
+    #
+    def start(self) -> None:
+        """
+        Start producing rounds every block_time seconds
+
+        :returns: None
+        """
+        if self.__block_time is None or self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="fake-algod", daemon=True)
+        self.__thread.start()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop producing rounds
+
+        :returns: None
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    #
+    def fund(self, address: str, amount: int) -> None:
+        """
+        Credit account out of thin air, stands in for a dispenser
+
+        :param address: account address
+        :param amount: microalgos
+
+        :returns: None
+        """
+        with self.__condition:
+            self.__pending_ledger.fund(address, amount)
+
+    #
+    def forget_confirmed(self) -> None:
+        """
+        Drop confirmed transactions from the pending cache as algod does
+        a while after confirming them, their blocks keep them
+
+        :returns: None
+        """
+        with self.__condition:
+            self.__forgotten.update(
+                tx_id for tx_id, info in self.__transactions.items() if info["confirmed-round"])
+
+    #
+    def produce_block(self) -> int:
+        """
+        Confirm pending transactions in a new round
+
+        :returns: new round
+        """
+        with self.__condition:
+            pending, self.__pending = self.__pending, []
+            self.__pending_ledger.commit()
+            self.__round += 1
+            self.__blocks[self.__round] = []
+            for group in pending:
+                self.__apply_group(group)
+            self.__condition.notify_all()
+            return self.__round
+
+    #
+    def suggested_params(self) -> transaction.SuggestedParams:
+        """
+        Return suggested transaction parameters
+
+        :returns: params valid from the current round
+        """
+        self.__requests["suggested_params"] += 1
+        return transaction.SuggestedParams(
+                    0,
+                    self.__round,
+                    self.__round + 1000,
+                    self.GENESIS_HASH,
+                    self.GENESIS_ID,
+                    False,
+                    self.CONSENSUS_VERSION,
+                    self.MIN_FEE
+                )
+
+    #
+    def send_transaction(self, txn) -> str:
+        """
+        Queue signed transaction for next round
+
+        :param txn: signed transaction
+
+        :returns: transaction id
+        """
+        return self.send_transactions([txn])
+
+    #
+    def send_transactions(self, txns) -> str:
+        """
+        Queue signed transaction group for next round
+
+        :param txns: signed transactions
+
+        :returns: first transaction id
+        """
+        raw = b"".join(base64.b64decode(encoding.msgpack_encode(txn)) for txn in txns)
+        return self.send_raw_transaction(base64.b64encode(raw))
+
+    #
+    def send_raw_transaction(self, txn) -> str:
+        """
+        Queue msgpack encoded signed transactions for next round
+
+        :param txn: base64 encoded concatenated signed transactions
+
+        :returns: first transaction id
+        """
+        self.__requests["send_raw_transaction"] += 1
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(base64.b64decode(txn))
+        group = [transaction.SignedTransaction.undictify(d) for d in unpacker]
+        if not group:
+            raise error.AlgodHTTPError("empty transaction group", 400)
+
+        with self.__condition:
+            for stxn in group:
+                txn = stxn.transaction
+                if not txn.first_valid_round <= self.__round + 1 <= txn.last_valid_round:
+                    raise error.AlgodHTTPError(
+                        "txn dead: round {} outside of {}--{}".format(
+                            self.__round + 1,
+                            txn.first_valid_round,
+                            txn.last_valid_round),
+                        400)
+                tx_id = stxn.get_txid()
+                if tx_id in self.__transactions:
+                    raise error.AlgodHTTPError(
+                        "transaction already in ledger: {}".format(tx_id), 400)
+
+            view = self.__pending_ledger.child()
+            try:
+                results = view.apply_group(group, self.__round + 1, int(time.time()))
+            except FakeLedgerError as e:
+                raise error.AlgodHTTPError(str(e), 400)
+            view.commit()
+
+            for stxn, result in zip(group, results):
+                tx_id = stxn.get_txid()
+                self.__transactions[tx_id] = {
+                    "confirmed-round": 0,
+                    "pool-error": ""
+                }
+                self.__results[tx_id] = result
+                self.__signed[tx_id] = stxn
+            self.__pending.append(group)
+        return group[0].get_txid()
+
+    #
+    def pending_transaction_info(self, tx_id: str) -> dict:
+        """
+        Get transaction information
+
+        :param tx_id: transaction id
+
+        :returns: pending or confirmed transaction info
+        """
+        self.__requests["pending_transaction_info"] += 1
+        with self.__condition:
+            info = self.__transactions.get(tx_id)
+            if info is None or tx_id in self.__forgotten:
+                raise error.AlgodHTTPError("txn does not exist", 404)
+            return dict(info)
+
+    #
+    def status(self) -> dict:
+        """
+        Get node status
+
+        :returns: status with last round
+        """
+        self.__requests["status"] += 1
+        return {"last-round": self.__round}
+
+    #
+    def status_after_block(self, round_num: int) -> dict:
+        """
+        Wait until a round after given one is produced
+
+        :param round_num: round to wait after
+
+        :returns: status with last round
+        """
+        self.__requests["status_after_block"] += 1
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__round > round_num, timeout=60)
+            return {"last-round": self.__round}
+
+    #
+    def get_block_txids(self, round_num: int) -> dict:
+        """
+        Get top level transaction ids of a block
+
+        :param round_num: block round
+
+        :returns: {"blockTxids": [...]}
+        """
+        self.__requests["get_block_txids"] += 1
+        with self.__condition:
+            if round_num not in self.__blocks:
+                raise error.AlgodHTTPError("block not found", 404)
+            return {"blockTxids": list(self.__blocks[round_num])}
+
+    #
+    def block_info(
+                self,
+                block: Optional[int] = None,
+                response_format: str = "json",
+                round_num: Optional[int] = None
+            ) -> bytes:
+        """
+        Get block with its transactions, encoded the way algod stores
+        them: apply data (created application and asset ids, inner
+        transactions) next to each signed transaction. Only msgpack is
+        served, the format block followers read
+
+        :param block: block round
+        :param response_format: msgpack
+        :param round_num: alias for block
+
+        :returns: msgpack encoded {"block": {"rnd", "txns"}}
+        """
+        self.__requests["block_info"] += 1
+        round_num = block or round_num
+        if response_format != "msgpack":
+            raise error.AlgodHTTPError("blocks are served as msgpack only", 400)
+        with self.__condition:
+            if round_num not in self.__blocks:
+                raise error.AlgodHTTPError("block not found", 404)
+            txns = []
+            for tx_id in self.__blocks[round_num]:
+                info = self.__transactions[tx_id]
+                entry = self.__signed[tx_id].dictify()
+                entry["hgi"] = True
+                if info.get("application-index"):
+                    entry["apid"] = info["application-index"]
+                if info.get("asset-index"):
+                    entry["caid"] = info["asset-index"]
+                if info.get("inner-txns"):
+                    entry["dt"] = {"itx": [inner["txn"] for inner in info["inner-txns"]]}
+                txns.append(entry)
+        return msgpack.packb({"block": {"rnd": round_num, "txns": txns}}, use_bin_type=True)
+
+    #
+    def account_info(self, address: str) -> dict:
+        """
+        Get account information
+
+        :param address: account address
+
+        :returns: balance, assets, created apps and assets
+        """
+        self.__requests["account_info"] += 1
+        with self.__condition:
+            ledger = self.__ledger
+            account = ledger.get_account(address)
+            created_apps = [
+                self.__app_info(app_id, app)
+                for app_id, app in sorted(ledger.items("apps").items())
+                if app["creator"] == address
+            ]
+            created_assets = [
+                {"index": asset_id, "params": self.__asset_params(asset)}
+                for asset_id, asset in sorted(ledger.items("assets").items())
+                if asset["AssetCreator"] == address
+            ]
+            return {
+                "address": address,
+                "amount": account["amount"],
+                "amount-without-pending-rewards": account["amount"],
+                "min-balance": ledger.min_balance(address),
+                "pending-rewards": 0,
+                "rewards": 0,
+                "round": self.__round,
+                "status": "Offline",
+                "assets": [
+                    {"asset-id": asset_id, "amount": amount, "is-frozen": False}
+                    for asset_id, amount in sorted(account["assets"].items())
+                ],
+                "created-apps": created_apps,
+                "created-assets": created_assets,
+                "total-apps-opted-in": 0,
+                "total-assets-opted-in": len(account["assets"]),
+                "total-created-apps": len(created_apps),
+                "total-created-assets": len(created_assets),
+                "total-boxes": account["boxes"],
+                "total-box-bytes": account["box_bytes"]
+            }
+
+    #
+    def application_info(self, app_id: int) -> dict:
+        """
+        Get application information
+
+        :param app_id: application id
+
+        :returns: application id and params with global state
+        """
+        self.__requests["application_info"] += 1
+        with self.__condition:
+            app = self.__ledger.get_app(app_id)
+            if app is None:
+                raise error.AlgodHTTPError("application does not exist", 404)
+            return self.__app_info(app_id, app)
+
+    #
+    def application_box_by_name(self, app_id: int, name: bytes) -> dict:
+        """
+        Get application box
+
+        :param app_id: application id
+        :param name: box name
+
+        :returns: base64 encoded box name and value
+        """
+        self.__requests["application_box_by_name"] += 1
+        with self.__condition:
+            value = self.__ledger.get_box(app_id, name)
+            if value is None:
+                raise error.AlgodHTTPError("box not found", 404)
+            return {
+                "name": base64.b64encode(name).decode('ascii'),
+                "round": self.__round,
+                "value": base64.b64encode(value).decode('ascii')
+            }
+
+    #
+    def compile(self, source: str) -> dict:
+        """
+        Assemble TEAL source
+
+        :param source: TEAL assembly program
+
+        :returns: program hash and base64 encoded bytecode
+        """
+        self.__requests["compile"] += 1
+        try:
+            program = TealAssembler().assemble(source)
+        except TealAssemblyError as e:
+            raise error.AlgodHTTPError(str(e), 400)
+        return {
+            "hash": logic.address(program),
+            "result": base64.b64encode(program).decode('ascii')
+        }
+
+    #
+    def __apply_group(self, group: list) -> None:
+        """
+        Confirm transaction group in current round, caller holds the lock
+
+        :param group: signed transactions
+
+        :returns: None
+        """
+        for stxn in group:
+            tx_id = stxn.get_txid()
+            info = self.__transactions[tx_id]
+            info["confirmed-round"] = self.__round
+            info.update(self.__results.pop(tx_id))
+            self.__blocks[self.__round].append(tx_id)
+
+    #
+    @staticmethod
+    def __app_info(app_id: int, app: dict) -> dict:
+        """
+        Build application info the way algod returns it
+
+        :param app_id: application id
+        :param app: application record of ledger
+
+        :returns: application info
+        """
+        global_state = []
+        for key, value in sorted(app["global_state"].items()):
+            if isinstance(value, int):
+                value = {"type": 2, "bytes": "", "uint": value}
+            else:
+                value = {"type": 1, "bytes": base64.b64encode(value).decode('ascii'), "uint": 0}
+            global_state.append({"key": base64.b64encode(key).decode('ascii'), "value": value})
+        return {
+            "id": app_id,
+            "params": {
+                "creator": app["creator"],
+                "approval-program": base64.b64encode(app["approval"]).decode('ascii'),
+                "clear-state-program": base64.b64encode(app["clear"]).decode('ascii'),
+                "extra-program-pages": app["extra_pages"],
+                "global-state": global_state,
+                "global-state-schema": {
+                    "num-uint": app["global_schema"][0],
+                    "num-byte-slice": app["global_schema"][1]
+                },
+                "local-state-schema": {
+                    "num-uint": app["local_schema"][0],
+                    "num-byte-slice": app["local_schema"][1]
+                }
+            }
+        }
+
+    #
+    @staticmethod
+    def __asset_params(asset: dict) -> dict:
+        """
+        Build asset params the way algod returns them
+
+        :param asset: asset record of ledger
+
+        :returns: asset params
+        """
+        return {
+            "creator": asset["AssetCreator"],
+            "total": asset["AssetTotal"],
+            "decimals": asset["AssetDecimals"],
+            "default-frozen": bool(asset["AssetDefaultFrozen"]),
+            "unit-name": asset["AssetUnitName"].decode('utf-8', 'replace'),
+            "name": asset["AssetName"].decode('utf-8', 'replace'),
+            "url": asset["AssetURL"].decode('utf-8', 'replace'),
+            "manager": asset["AssetManager"],
+            "reserve": asset["AssetReserve"],
+            "freeze": asset["AssetFreeze"],
+            "clawback": asset["AssetClawback"]
+        }
+
+    #
+    def __run(self) -> None:
+        """
+        Round production loop
+
+        :returns: None
+        """
+        while not self.__stop.wait(self.__block_time):
+            self.produce_block()
+
+
+#
+class FakeAlgodHTTPServer(ThreadingHTTPServer):
+    """
+    Threading HTTP server with a backlog large enough for load tests
+    """
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+#
+class FakeAlgodServer:
+    """
+    FakeAlgodServer object serving FakeAlgod over the algod REST API
+    """
+
+    #
+    def __init__(self, node: FakeAlgod, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        Constructor
+
+        :param node: node whose state is served
+        :param host: interface to listen on
+        :param port: port to listen on, 0 picks a free port
+
+        :returns: None
+        """
+        self.__node = node
+        self.__server = FakeAlgodHTTPServer((host, port), self.__handler())
+        self.__thread = None
+
+    #
+    @property
+    def address(self) -> str:
+        """
+        Getter for algod address of the server
+
+        :returns: http address
+        """
+        host, port = self.__server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    #
+    def start(self) -> None:
+        """
+        Serve requests in background
+
+        :returns: None
+        """
+        self.__thread = threading.Thread(
+                            target=self.__server.serve_forever,
+                            name="fake-algod-server",
+                            daemon=True
+                        )
+        self.__thread.start()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop serving requests
+
+        :returns: None
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    #
+    def route(self, method: str, path: str, body: bytes, query: Optional[dict] = None):
+        """
+        Dispatch REST request to node
+
+        :param method: http method
+        :param path: request path without query
+        :param body: request body
+        :param query: parsed query string
+
+        :returns: json serializable response, bytes for msgpack
+        """
+        node = self.__node
+        parts = path.strip("/").split("/")
+        if parts[:1] == ["v2"]:
+            parts = parts[1:]
+
+        if method == "GET" and parts == ["transactions", "params"]:
+            params = node.suggested_params()
+            return {
+                "consensus-version": params.consensus_version,
+                "fee": params.fee,
+                "genesis-hash": params.gh,
+                "genesis-id": params.gen,
+                "last-round": params.first,
+                "min-fee": params.min_fee
+            }
+        if method == "POST" and parts == ["transactions"]:
+            return {"txId": node.send_raw_transaction(base64.b64encode(body))}
+        if method == "GET" and parts[:2] == ["transactions", "pending"] and len(parts) == 3:
+            return node.pending_transaction_info(parts[2])
+        if method == "GET" and parts == ["status"]:
+            return node.status()
+        if method == "GET" and parts[:2] == ["status", "wait-for-block-after"]:
+            return node.status_after_block(int(parts[2]))
+        if method == "GET" and parts[:1] == ["blocks"] and parts[2:] == ["txids"]:
+            return node.get_block_txids(int(parts[1]))
+        if method == "GET" and parts[:1] == ["blocks"] and len(parts) == 2:
+            return node.block_info(int(parts[1]), (query or {}).get("format", ["json"])[0])
+        if method == "GET" and parts[:1] == ["accounts"] and len(parts) == 2:
+            return node.account_info(parts[1])
+        if method == "GET" and parts[:1] == ["applications"] and len(parts) == 2:
+            return node.application_info(int(parts[1]))
+        if method == "GET" and parts[:1] == ["applications"] and parts[2:] == ["box"]:
+            encoding_name, _, value = (query or {}).get("name", [""])[0].partition(":")
+            if encoding_name != "b64":
+                raise error.AlgodHTTPError("box name must be b64 encoded", 400)
+            return node.application_box_by_name(int(parts[1]), base64.b64decode(value))
+        if method == "POST" and parts == ["teal", "compile"]:
+            return node.compile(body.decode('utf-8'))
+        if method == "GET" and parts == ["health"]:
+            return {}
+        raise error.AlgodHTTPError("not found", 404)
+
+    #
+    def __handler(self):
+        """
+        Build request handler class bound to this server
+
+        :returns: BaseHTTPRequestHandler subclass
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.__dispatch("GET")
+
+            def do_POST(self):
+                self.__dispatch("POST")
+
+            def log_message(self, *args):
+                pass
+
+            def __dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                url = parse.urlsplit(self.path)
+                try:
+                    status, response = 200, server.route(
+                        method, url.path, body, parse.parse_qs(url.query))
+                except error.AlgodHTTPError as e:
+                    status, response = e.code or 400, {"message": str(e)}
+                if isinstance(response, bytes):
+                    payload, content_type = response, "application/msgpack"
+                else:
+                    payload, content_type = json.dumps(response).encode('utf-8'), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
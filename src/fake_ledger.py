@@ -0,0 +1,688 @@
+#
+import copy
+
+#
+from typing import Optional
+
+#
+from algosdk import encoding, logic, transaction
+
+#
+from teal_interpreter import TealInterpreter, TealEvalError
+
+
+#
+class FakeLedgerError(Exception):
+    """
+    Raised when a transaction can not be applied to the ledger
+    """
+
+
+#
+class FakeLedger:
+    """
+    FakeLedger object holding accounts, applications, assets and boxes
+    in memory. A child ledger reads through to its parent and keeps its
+    own writes until commit, which is how groups are applied atomically
+    """
+
+    # protocol fee and minimum balance constants
+    MIN_FEE = 1000
+    MIN_BALANCE = 100000
+    ASSET_MIN_BALANCE = 100000
+    APP_MIN_BALANCE = 100000
+    UINT_MIN_BALANCE = 28500
+    BYTES_MIN_BALANCE = 50000
+    PAGE_MIN_BALANCE = 100000
+    BOX_FLAT_MIN_BALANCE = 2500
+    BOX_BYTE_MIN_BALANCE = 400
+
+    # opcode budget of one application call
+    APP_BUDGET = 700
+
+    # most inner transactions one group may issue
+    MAX_INNER_TXNS = 256
+
+    #
+    def __init__(self, parent: Optional["FakeLedger"] = None) -> None:
+        """
+        Constructor
+
+        :param parent: ledger reads fall through to, None for the root
+
+        :returns: None
+        """
+        self.__parent = parent
+        self.__tables = {"accounts": {}, "apps": {}, "assets": {}, "boxes": {}}
+        self.__next_index = parent.next_index if parent else 1000
+
+    #
+    @property
+    def next_index(self) -> int:
+        """
+        Getter for next_index private field
+
+        :returns: last allocated application or asset index
+        """
+        return self.__next_index
+
+    #
+    def child(self) -> "FakeLedger":
+        """
+        Create ledger layered on top of this one
+
+        :returns: child ledger
+        """
+        return FakeLedger(self)
+
+    #
+    def commit(self) -> None:
+        """
+        Write changes of child ledger to its parent
+
+        :returns: None
+        """
+        parent = self.__parent
+        for name, table in self.__tables.items():
+            for key, value in table.items():
+                if parent.__parent is None and value is None:
+                    parent.__tables[name].pop(key, None)
+                else:
+                    parent.__tables[name][key] = value
+            table.clear()
+        parent.__next_index = self.__next_index
+
+    #
+    def allocate_index(self) -> int:
+        """
+        Get next application or asset index
+
+        :returns: index
+        """
+        self.__next_index += 1
+        return self.__next_index
+
+    #
+    def get_account(self, address: str) -> dict:
+        """
+        Read account, missing accounts read as empty ones
+
+        :param address: account address
+
+        :returns: account record, must not be modified
+        """
+        account = self.__lookup("accounts", address)
+        return account if account is not None else self.__empty_account()
+
+    #
+    def account(self, address: str) -> dict:
+        """
+        Get account record for modification
+
+        :param address: account address
+
+        :returns: account record owned by this ledger
+        """
+        return self.__mutable("accounts", address, self.__empty_account)
+
+    #
+    def get_app(self, app_id: int) -> Optional[dict]:
+        """
+        Read application
+
+        :param app_id: application id
+
+        :returns: application record, must not be modified
+        """
+        return self.__lookup("apps", app_id)
+
+    #
+    def get_asset(self, asset_id: int) -> Optional[dict]:
+        """
+        Read asset params
+
+        :param asset_id: asset id
+
+        :returns: asset record, must not be modified
+        """
+        return self.__lookup("assets", asset_id)
+
+    #
+    def get_box(self, app_id: int, name: bytes) -> Optional[bytes]:
+        """
+        Read box of application
+
+        :param app_id: application id
+        :param name: box name
+
+        :returns: box value, None when box does not exist
+        """
+        return self.__lookup("boxes", (app_id, name))
+
+    #
+    def items(self, table: str) -> dict:
+        """
+        Get every record of a table, merged over parent ledgers
+
+        :param table: accounts, apps, assets or boxes
+
+        :returns: records by key
+        """
+        records = dict(self.__parent.items(table)) if self.__parent else {}
+        for key, value in self.__tables[table].items():
+            if value is None:
+                records.pop(key, None)
+            else:
+                records[key] = value
+        return records
+
+    #
+    def fund(self, address: str, amount: int) -> None:
+        """
+        Credit account out of thin air, stands in for a dispenser. The
+        root ledger and every parent holding a copy of the account are
+        credited, so the funds survive commits of this ledger
+
+        :param address: account address
+        :param amount: microalgos
+
+        :returns: None
+        """
+        ledger = self
+        while ledger is not None:
+            records = ledger.__tables["accounts"]
+            if ledger.__parent is None:
+                ledger.account(address)["amount"] += amount
+            elif records.get(address) is not None:
+                records[address]["amount"] += amount
+            ledger = ledger.__parent
+
+    #
+    def min_balance(self, address: str) -> int:
+        """
+        Get minimum balance of account
+
+        :param address: account address
+
+        :returns: microalgos
+        """
+        account = self.get_account(address)
+        return (
+            self.MIN_BALANCE
+            + self.ASSET_MIN_BALANCE * len(account["assets"])
+            + self.APP_MIN_BALANCE * account["apps_created"]
+            + self.UINT_MIN_BALANCE * account["schema_uints"]
+            + self.BYTES_MIN_BALANCE * account["schema_bytes"]
+            + self.PAGE_MIN_BALANCE * account["extra_pages"]
+            + self.BOX_FLAT_MIN_BALANCE * account["boxes"]
+            + self.BOX_BYTE_MIN_BALANCE * account["box_bytes"]
+        )
+
+    #
+    def apply_group(self, group: list, round_num: int, timestamp: int) -> list:
+        """
+        Apply signed transaction group, call on a child ledger and commit
+        it only when every transaction succeeded
+
+        :param group: signed transactions
+        :param round_num: round group is confirmed in
+        :param timestamp: block timestamp
+
+        :returns: result per transaction, with application-index or
+                  asset-index of created objects
+        """
+        txns = [stxn.transaction for stxn in group]
+        app_calls = sum(1 for txn in txns if txn.type == "appl")
+        group_state = {
+            "txns": txns,
+            "round": round_num,
+            "timestamp": timestamp,
+            "budget": self.APP_BUDGET * app_calls,
+            "fee_credit": sum(txn.fee for txn in txns) - self.MIN_FEE * len(txns),
+            "inner_txns": 0,
+        }
+        if group_state["fee_credit"] < 0:
+            raise FakeLedgerError("txgroup had {} in fees, which is less than the minimum {}".format(
+                sum(txn.fee for txn in txns), self.MIN_FEE * len(txns)))
+
+        results = []
+        for index, txn in enumerate(txns):
+            self.__pay(txn.sender, txn.fee)
+            results.append(self.__apply(txn, index, group_state))
+        self.__check_min_balances()
+        return results
+
+    #
+    def apply_inner(self, app_id: int, inner: list, group_state: dict) -> None:
+        """
+        Apply inner transactions submitted by application
+
+        :param app_id: calling application id
+        :param inner: inner transaction fields by TEAL field name
+        :param group_state: evaluation state of outer group
+
+        :returns: None
+        """
+        app_address = logic.get_application_address(app_id)
+        group_state["inner_txns"] += len(inner)
+        if group_state["inner_txns"] > self.MAX_INNER_TXNS:
+            raise FakeLedgerError("too many inner transactions")
+
+        for fields in inner:
+            sender = encoding.encode_address(fields["Sender"])
+            if sender != app_address:
+                raise FakeLedgerError("inner transaction sender {} is not the application".format(sender))
+            fee = fields["Fee"]
+            group_state["fee_credit"] += fee - self.MIN_FEE
+            if group_state["fee_credit"] < 0:
+                raise FakeLedgerError("fee too small for inner transaction")
+            self.__pay(sender, fee)
+
+            kind = fields["TypeEnum"]
+            if kind == 1:
+                txn = {
+                    "type": "pay",
+                    "rcv": self.__field_address(fields, "Receiver"),
+                    "amt": fields.get("Amount", 0),
+                    "close": self.__field_address(fields, "CloseRemainderTo")
+                }
+                self.__transfer(sender, txn["rcv"], txn["amt"], txn["close"])
+            elif kind == 4:
+                txn = {
+                    "type": "axfer",
+                    "arcv": self.__field_address(fields, "AssetReceiver"),
+                    "xaid": fields.get("XferAsset", 0),
+                    "aamt": fields.get("AssetAmount", 0),
+                    "aclose": self.__field_address(fields, "AssetCloseTo")
+                }
+                self.__transfer_asset(sender, txn["arcv"], txn["xaid"], txn["aamt"], txn["aclose"])
+            else:
+                raise FakeLedgerError("inner transaction type {} is not supported".format(kind))
+
+            # recorded the way algod reports inner transactions, empty fields omitted
+            txn.update(snd=sender, fee=fee)
+            group_state.setdefault("inner", []).append({k: v for k, v in txn.items() if v})
+
+    #
+    def put_global(self, app_id: int, key: bytes, value) -> None:
+        """
+        Write application global state
+
+        :param app_id: application id
+        :param key: state key
+        :param value: uint64 or bytes value
+
+        :returns: None
+        """
+        app = self.__mutable("apps", app_id)
+        if len(key) > 64 or isinstance(value, bytes) and len(key) + len(value) > 128:
+            raise TealEvalError("key or value too long")
+        state = app["global_state"]
+        state[key] = value
+        uints = sum(1 for v in state.values() if isinstance(v, int))
+        if uints > app["global_schema"][0] or len(state) - uints > app["global_schema"][1]:
+            raise TealEvalError("store exceeds global schema")
+
+    #
+    def delete_global(self, app_id: int, key: bytes) -> None:
+        """
+        Delete application global state key
+
+        :param app_id: application id
+        :param key: state key
+
+        :returns: None
+        """
+        self.__mutable("apps", app_id)["global_state"].pop(key, None)
+
+    #
+    def put_box(self, app_id: int, name: bytes, value: bytes) -> None:
+        """
+        Create or overwrite box, application account pays its min balance
+
+        :param app_id: application id
+        :param name: box name
+        :param value: box value
+
+        :returns: None
+        """
+        if self.get_box(app_id, name) is None:
+            account = self.account(logic.get_application_address(app_id))
+            account["boxes"] += 1
+            account["box_bytes"] += len(name) + len(value)
+        self.__tables["boxes"][(app_id, name)] = bytes(value)
+
+    #
+    def delete_box(self, app_id: int, name: bytes) -> None:
+        """
+        Delete box and release its min balance
+
+        :param app_id: application id
+        :param name: box name
+
+        :returns: None
+        """
+        value = self.get_box(app_id, name)
+        account = self.account(logic.get_application_address(app_id))
+        account["boxes"] -= 1
+        account["box_bytes"] -= len(name) + len(value)
+        self.__tables["boxes"][(app_id, name)] = None
+
+    #
+    def __apply(self, txn, index: int, group_state: dict) -> dict:
+        """
+        Apply one top level transaction
+
+        :param txn: transaction
+        :param index: position in group
+        :param group_state: evaluation state of the group
+
+        :returns: result with created object index
+        """
+        if isinstance(txn, transaction.PaymentTxn):
+            self.__transfer(txn.sender, txn.receiver, txn.amt, txn.close_remainder_to)
+            return {}
+        if isinstance(txn, transaction.AssetTransferTxn):
+            self.__transfer_asset(
+                txn.sender, txn.receiver, txn.index, txn.amount, txn.close_assets_to)
+            return {}
+        if isinstance(txn, transaction.AssetConfigTxn):
+            return self.__configure_asset(txn)
+        if isinstance(txn, transaction.ApplicationCallTxn):
+            return self.__call_application(txn, index, group_state)
+        raise FakeLedgerError("transaction type {} is not supported".format(txn.type))
+
+    #
+    def __call_application(self, txn, index: int, group_state: dict) -> dict:
+        """
+        Create, call or delete application running its approval program
+
+        :param txn: application call transaction
+        :param index: position in group
+        :param group_state: evaluation state of the group
+
+        :returns: result with application-index of created application
+        """
+        result = {}
+        app_id = txn.index
+        if not app_id:
+            app_id = self.allocate_index()
+            global_schema = (
+                getattr(txn.global_schema, "num_uints", 0) or 0,
+                getattr(txn.global_schema, "num_byte_slices", 0) or 0
+            )
+            self.__tables["apps"][app_id] = {
+                "creator": txn.sender,
+                "approval": txn.approval_program,
+                "clear": txn.clear_program,
+                "global_schema": global_schema,
+                "local_schema": (
+                    getattr(txn.local_schema, "num_uints", 0) or 0,
+                    getattr(txn.local_schema, "num_byte_slices", 0) or 0
+                ),
+                "extra_pages": txn.extra_pages or 0,
+                "global_state": {},
+            }
+            creator = self.account(txn.sender)
+            creator["apps_created"] += 1
+            creator["schema_uints"] += global_schema[0]
+            creator["schema_bytes"] += global_schema[1]
+            creator["extra_pages"] += txn.extra_pages or 0
+            result["application-index"] = app_id
+
+        app = self.get_app(app_id)
+        if app is None:
+            raise FakeLedgerError("application {} does not exist".format(app_id))
+
+        if txn.on_complete == transaction.OnComplete.ClearStateOC:
+            program = app["clear"]
+        elif txn.on_complete in (transaction.OnComplete.NoOpOC,
+                                 transaction.OnComplete.DeleteApplicationOC,
+                                 transaction.OnComplete.UpdateApplicationOC):
+            program = app["approval"]
+        else:
+            raise FakeLedgerError("on completion {} is not supported".format(txn.on_complete))
+
+        try:
+            approved = TealInterpreter(self, group_state, index, app_id).run(program)
+        except TealEvalError as e:
+            raise FakeLedgerError(
+                "transaction {}: logic eval error: {}".format(txn.get_txid(), e))
+        if not approved and txn.on_complete != transaction.OnComplete.ClearStateOC:
+            raise FakeLedgerError(
+                "transaction {}: rejected by ApprovalProgram".format(txn.get_txid()))
+        inner = group_state.pop("inner", None)
+        if inner:
+            result["inner-txns"] = [{"txn": {"txn": fields}} for fields in inner]
+
+        if txn.on_complete == transaction.OnComplete.DeleteApplicationOC:
+            creator = self.account(app["creator"])
+            creator["apps_created"] -= 1
+            creator["schema_uints"] -= app["global_schema"][0]
+            creator["schema_bytes"] -= app["global_schema"][1]
+            creator["extra_pages"] -= app["extra_pages"]
+            self.__tables["apps"][app_id] = None
+        elif txn.on_complete == transaction.OnComplete.UpdateApplicationOC:
+            app = self.__mutable("apps", app_id)
+            app["approval"] = txn.approval_program
+            app["clear"] = txn.clear_program
+        return result
+
+    #
+    def __configure_asset(self, txn) -> dict:
+        """
+        Create or destroy asset
+
+        :param txn: asset config transaction
+
+        :returns: result with asset-index of created asset
+        """
+        if not txn.index:
+            asset_id = self.allocate_index()
+            self.__tables["assets"][asset_id] = {
+                "AssetCreator": txn.sender,
+                "AssetTotal": txn.total,
+                "AssetDecimals": txn.decimals,
+                "AssetDefaultFrozen": int(bool(txn.default_frozen)),
+                "AssetUnitName": (txn.unit_name or "").encode('utf-8'),
+                "AssetName": (txn.asset_name or "").encode('utf-8'),
+                "AssetURL": (txn.url or "").encode('utf-8'),
+                "AssetMetadataHash": txn.metadata_hash or b"",
+                "AssetManager": txn.manager,
+                "AssetReserve": txn.reserve,
+                "AssetFreeze": txn.freeze,
+                "AssetClawback": txn.clawback,
+            }
+            self.account(txn.sender)["assets"][asset_id] = txn.total
+            return {"asset-index": asset_id}
+
+        asset = self.get_asset(txn.index)
+        if asset is None:
+            raise FakeLedgerError("asset {} does not exist".format(txn.index))
+        if txn.sender != asset["AssetManager"]:
+            raise FakeLedgerError("only manager can configure asset {}".format(txn.index))
+        creator = self.account(asset["AssetCreator"])
+        if creator["assets"].get(txn.index) != asset["AssetTotal"]:
+            raise FakeLedgerError("asset {} is not fully held by its creator".format(txn.index))
+        del creator["assets"][txn.index]
+        self.__tables["assets"][txn.index] = None
+        return {}
+
+    #
+    def __pay(self, address: str, amount: int) -> None:
+        """
+        Debit account
+
+        :param address: account address
+        :param amount: microalgos
+
+        :returns: None
+        """
+        account = self.account(address)
+        if account["amount"] < amount:
+            raise FakeLedgerError("overspend (account {}, data {} tried to spend {})".format(
+                address, account["amount"], amount))
+        account["amount"] -= amount
+
+    #
+    def __transfer(
+                self,
+                sender: str,
+                receiver: Optional[str],
+                amount: int,
+                close_to: Optional[str] = None
+            ) -> None:
+        """
+        Move algos between accounts
+
+        :param sender: sender address
+        :param receiver: receiver address
+        :param amount: microalgos
+        :param close_to: address receiving remaining balance of sender
+
+        :returns: None
+        """
+        self.__pay(sender, amount)
+        if receiver:
+            self.account(receiver)["amount"] += amount
+        if close_to:
+            account = self.account(sender)
+            if account["assets"] or account["apps_created"] or account["boxes"]:
+                raise FakeLedgerError("account {} can not be closed".format(sender))
+            self.account(close_to)["amount"] += account["amount"]
+            self.__tables["accounts"][sender] = None
+
+    #
+    def __transfer_asset(
+                self,
+                sender: str,
+                receiver: Optional[str],
+                asset_id: int,
+                amount: int,
+                close_to: Optional[str] = None
+            ) -> None:
+        """
+        Move asset units between accounts, zero transfer to self opts in
+
+        :param sender: sender address
+        :param receiver: receiver address
+        :param asset_id: asset id
+        :param amount: asset units
+        :param close_to: address receiving remaining units of sender
+
+        :returns: None
+        """
+        if self.get_asset(asset_id) is None:
+            raise FakeLedgerError("asset {} does not exist".format(asset_id))
+        holdings = self.account(sender)["assets"]
+        if sender == receiver and amount == 0 and asset_id not in holdings:
+            holdings[asset_id] = 0
+            return
+        if asset_id not in holdings:
+            raise FakeLedgerError("asset {} missing from {}".format(asset_id, sender))
+        if holdings[asset_id] < amount:
+            raise FakeLedgerError("underflow on subtracting {} from sender amount {}".format(
+                amount, holdings[asset_id]))
+        holdings[asset_id] -= amount
+        receiver_holdings = self.account(receiver)["assets"]
+        if asset_id not in receiver_holdings:
+            raise FakeLedgerError("asset {} missing from {}".format(asset_id, receiver))
+        receiver_holdings[asset_id] += amount
+        if close_to:
+            close_holdings = self.account(close_to)["assets"]
+            if asset_id not in close_holdings:
+                raise FakeLedgerError("asset {} missing from {}".format(asset_id, close_to))
+            close_holdings[asset_id] += holdings.pop(asset_id)
+
+    #
+    def __check_min_balances(self) -> None:
+        """
+        Check every account changed by this ledger holds its min balance
+
+        :returns: None
+        """
+        for address, account in self.__tables["accounts"].items():
+            if account is None:
+                continue
+            min_balance = self.min_balance(address)
+            empty = min_balance == self.MIN_BALANCE and account["amount"] == 0
+            if account["amount"] < min_balance and not empty:
+                raise FakeLedgerError("account {} balance {} below min {}".format(
+                    address, account["amount"], min_balance))
+
+    #
+    @staticmethod
+    def __field_address(fields: dict, name: str) -> Optional[str]:
+        """
+        Read address field of inner transaction
+
+        :param fields: inner transaction fields
+        :param name: field name
+
+        :returns: address, None when unset or zero
+        """
+        value = fields.get(name)
+        if not value or value == b"\x00" * 32:
+            return None
+        return encoding.encode_address(value)
+
+    #
+    @staticmethod
+    def __empty_account() -> dict:
+        """
+        Build record of account which never received funds
+
+        :returns: account record
+        """
+        return {
+            "amount": 0,
+            "assets": {},
+            "apps_created": 0,
+            "schema_uints": 0,
+            "schema_bytes": 0,
+            "extra_pages": 0,
+            "boxes": 0,
+            "box_bytes": 0,
+        }
+
+    #
+    def __lookup(self, table: str, key):
+        """
+        Read record from this ledger or its parents
+
+        :param table: table name
+        :param key: record key
+
+        :returns: record, None when missing or deleted
+        """
+        ledger = self
+        while ledger is not None:
+            records = ledger.__tables[table]
+            if key in records:
+                return records[key]
+            ledger = ledger.__parent
+        return None
+
+    #
+    def __mutable(self, table: str, key, default=None):
+        """
+        Get record owned by this ledger, copying it from parent first
+
+        :param table: table name
+        :param key: record key
+        :param default: builds record when it does not exist
+
+        :returns: record
+        """
+        records = self.__tables[table]
+        record = records.get(key)
+        if record is None:
+            record = self.__lookup(table, key)
+            if record is None:
+                if default is None:
+                    raise FakeLedgerError("{} {} does not exist".format(table[:-1], key))
+                record = default()
+            else:
+                record = copy.deepcopy(record)
+            records[key] = record
+        return record
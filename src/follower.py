@@ -0,0 +1,404 @@
+#
+import os
+import json
+import logging
+import threading
+
+#
+from typing import Callable, List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+#
+import msgpack
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+
+#
+logger = logging.getLogger("PreHTLC")
+
+
+#
+@dataclass
+class AppCallEvent:
+    round: int
+    app_id: int
+    sender: str
+    args: List[bytes]
+    inner: List[dict] = field(default_factory=list)
+    on_complete: int = 0
+
+
+#
+@dataclass
+class CommitEvent(AppCallEvent):
+    amount: int = 0
+    swap_id: Optional[bytes] = None
+
+
+#
+@dataclass
+class LockEvent(AppCallEvent):
+    hashlock: bytes = b""
+    amount: Optional[int] = None
+    swap_id: Optional[bytes] = None
+
+
+#
+@dataclass
+class ClaimEvent(AppCallEvent):
+    secret: bytes = b""
+    swap_id: Optional[bytes] = None
+
+
+#
+@dataclass
+class RedeemEvent(AppCallEvent):
+    secret: bytes = b""
+
+
+#
+def parse_event(
+            round_num: int,
+            app_id: int,
+            sender: str,
+            args: List[bytes],
+            inner: List[dict],
+            on_complete: int = 0
+        ) -> AppCallEvent:
+    """
+    Type application call by its method argument, the classic,
+    destination chain and registry contracts share method names and
+    differ in argument layout
+
+    :param round_num: round the call was confirmed in
+    :param app_id: called application id
+    :param sender: caller address
+    :param args: application arguments
+    :param inner: inner transactions issued by the call
+    :param on_complete: on completion action
+
+    :returns: CommitEvent, LockEvent, ClaimEvent, RedeemEvent or
+              AppCallEvent for other calls
+    """
+    common = (round_num, app_id, sender, args, inner, on_complete)
+    method = args[0] if args else b""
+    # registry calls carry a 32 bytes swap id after the method
+    swap_id = args[1] if len(args) == 3 and len(args[1]) == 32 else None
+    if method == b"commit" and len(args) >= 2:
+        return CommitEvent(*common, amount=int.from_bytes(args[-1], 'big'), swap_id=swap_id)
+    if method == b"lock" and len(args) >= 2:
+        amount = int.from_bytes(args[1], 'big') if len(args) == 3 and len(args[1]) == 8 else None
+        return LockEvent(*common, hashlock=args[-1], amount=amount, swap_id=swap_id)
+    if method == b"claim" and len(args) >= 2:
+        return ClaimEvent(*common, secret=args[-1], swap_id=swap_id)
+    if method == b"redeem" and len(args) >= 2:
+        return RedeemEvent(*common, secret=args[-1])
+    return AppCallEvent(*common)
+
+
+#
+class BlockFollower:
+    """
+    BlockFollower object reading every new block once and dispatching
+    calls to watched applications as typed events, instead of polling
+    the state of each application. The last processed round is
+    checkpointed so a restarted follower catches up from it, fetching
+    missed blocks in parallel batches
+    """
+
+    #
+    def __init__(
+                self,
+                client: Optional[AlgodClient],
+                checkpoint: Optional[str] = None,
+                start_round: Optional[int] = None,
+                batch_size: int = 16,
+                fetch_workers: int = 4
+            ) -> None:
+        """
+        Constructor
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param checkpoint: json file keeping the last processed round
+        :param start_round: first round to process when there is no
+                            checkpoint, the next round by default
+        :param batch_size: blocks fetched and checkpointed together when
+                           catching up
+        :param fetch_workers: blocks of a batch fetched concurrently
+
+        :returns: None
+        """
+        self.__client = client
+        self.__checkpoint = checkpoint
+        self.__batch_size = batch_size
+        self.__lock = threading.Lock()
+        self.__app_ids = set()
+        self.__subscribers = []
+        self.__blocks = 0
+        self.__events = 0
+        self.__errors = 0
+        self.__executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="block-follower")
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.__last_round = self.__load_checkpoint()
+        if self.__last_round is None and start_round is not None:
+            self.__last_round = start_round - 1
+
+    #
+    @property
+    def last_round(self) -> Optional[int]:
+        """
+        Getter for last_round private field
+
+        :returns: last round whose block was processed
+        """
+        return self.__last_round
+
+    #
+    def watch(self, app_id: int) -> None:
+        """
+        Dispatch calls to application
+
+        :param app_id: application id
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__app_ids.add(app_id)
+
+    #
+    def unwatch(self, app_id: int) -> None:
+        """
+        Stop dispatching calls to application, e.g. once its swap is
+        finished
+
+        :param app_id: application id
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__app_ids.discard(app_id)
+
+    #
+    def subscribe(self, callback: Callable[[AppCallEvent], None], kinds: tuple = (AppCallEvent,)) -> None:
+        """
+        Register callback called on the follower thread for every event,
+        exceptions it raises are logged and the block still counts as
+        processed
+
+        :param callback: listener function
+        :param kinds: event classes delivered, e.g. (LockEvent,)
+
+        :returns: None
+        """
+        self.__subscribers.append((callback, kinds))
+
+    #
+    def poll(self) -> int:
+        """
+        Process blocks produced since last processed round, in batches
+
+        :returns: last processed round
+        """
+        current = self.__client.status()["last-round"]
+        if self.__last_round is None:
+            self.__last_round = current
+            self.__save_checkpoint()
+            return current
+        while self.__last_round < current:
+            first = self.__last_round + 1
+            rounds = range(first, min(current, first + self.__batch_size - 1) + 1)
+            # blocks are fetched concurrently and processed in order
+            for round_num, block in zip(rounds, self.__executor.map(self.__fetch, rounds)):
+                self.process_block(round_num, block)
+            self.__last_round = rounds[-1]
+            self.__save_checkpoint()
+        return self.__last_round
+
+    #
+    def process_block(self, round_num: int, block: dict) -> list:
+        """
+        Dispatch events of calls to watched applications in a block,
+        inner calls included
+
+        :param round_num: block round
+        :param block: decoded block, {"txns": [...]}
+
+        :returns: dispatched events
+        """
+        with self.__lock:
+            app_ids = set(self.__app_ids)
+        events = []
+        for stxn in block.get("txns") or []:
+            self.__collect(round_num, stxn, app_ids, events)
+        errors = 0
+        for event in events:
+            for callback, kinds in self.__subscribers:
+                if not isinstance(event, kinds):
+                    continue
+                # a failing subscriber must not stall the follower or make
+                # it deliver the block again to the others
+                try:
+                    callback(event)
+                except Exception:
+                    errors += 1
+                    logger.exception("subscriber %r failed on %s of app %s in round %s",
+                                     callback, type(event).__name__, event.app_id, round_num)
+        with self.__lock:
+            self.__blocks += 1
+            self.__events += len(events)
+            self.__errors += errors
+        return events
+
+    #
+    def start(self) -> None:
+        """
+        Follow new blocks in background
+
+        :returns: None
+        """
+        if self.__thread is not None:
+            return
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__run, name="block-follower", daemon=True)
+        self.__thread.start()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop following blocks, the block in progress is finished first
+
+        :returns: None
+        """
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    #
+    def close(self) -> None:
+        """
+        Stop following and release fetch threads
+
+        :returns: None
+        """
+        self.stop()
+        self.__executor.shutdown()
+
+    #
+    def stats(self) -> dict:
+        """
+        :returns: last processed round, blocks processed, events
+                  dispatched, subscriber errors and watched applications
+        """
+        with self.__lock:
+            return {
+                "last_round": self.__last_round,
+                "blocks": self.__blocks,
+                "events": self.__events,
+                "errors": self.__errors,
+                "watched": len(self.__app_ids)
+            }
+
+    #
+    def __run(self) -> None:
+        """
+        Follow loop, waits for the round after the last processed one
+
+        :returns: None
+        """
+        while not self.__stopped.is_set():
+            try:
+                if self.__last_round is not None:
+                    self.__client.status_after_block(self.__last_round)
+                if not self.__stopped.is_set():
+                    self.poll()
+            except Exception:
+                # transient algod failure, retry after a short pause
+                self.__stopped.wait(1)
+
+    #
+    def __fetch(self, round_num: int) -> dict:
+        """
+        :param round_num: block round
+        :returns: decoded block
+        """
+        raw = self.__client.block_info(round_num=round_num, response_format="msgpack")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)["block"]
+
+    #
+    def __collect(self, round_num: int, stxn: dict, app_ids: set, events: list) -> None:
+        """
+        Add event of a watched application call and of its inner calls
+
+        :param round_num: block round
+        :param stxn: signed transaction with apply data
+        :param app_ids: watched application ids
+        :param events: list events are appended to
+
+        :returns: None
+        """
+        txn = stxn.get("txn", {})
+        inner = (stxn.get("dt") or {}).get("itx") or []
+        app_id = txn.get("apid") or stxn.get("apid", 0)
+        if txn.get("type") == "appl" and app_id in app_ids:
+            events.append(parse_event(
+                round_num,
+                app_id,
+                self.__address(txn.get("snd")),
+                list(txn.get("apaa") or []),
+                [self.__inner(itxn.get("txn", {})) for itxn in inner],
+                txn.get("apan", 0)
+            ))
+        for itxn in inner:
+            self.__collect(round_num, itxn, app_ids, events)
+
+    #
+    @classmethod
+    def __inner(cls, txn: dict) -> dict:
+        """
+        :param txn: inner transaction fields
+        :returns: inner transaction with addresses encoded
+        """
+        return {
+            key: cls.__address(value) if key in ("snd", "rcv", "close", "arcv", "aclose") else value
+            for key, value in txn.items()
+        }
+
+    #
+    @staticmethod
+    def __address(value) -> Optional[str]:
+        """
+        :param value: raw 32 bytes address or encoded address
+        :returns: encoded address
+        """
+        if isinstance(value, bytes):
+            return encoding.encode_address(value)
+        return value
+
+    #
+    def __load_checkpoint(self) -> Optional[int]:
+        """
+        :returns: last round processed before a restart, None without
+                  checkpoint
+        """
+        if self.__checkpoint is None or not os.path.exists(self.__checkpoint):
+            return None
+        with open(self.__checkpoint, "r") as f:
+            return json.load(f)["round"]
+
+    #
+    def __save_checkpoint(self) -> None:
+        """
+        Write last processed round, replaced atomically
+
+        :returns: None
+        """
+        if self.__checkpoint is None:
+            return
+        tmp_path = self.__checkpoint + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"round": self.__last_round}, f)
+        os.replace(tmp_path, self.__checkpoint)
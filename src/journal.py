@@ -0,0 +1,410 @@
+#
+import time
+import queue
+import sqlite3
+import threading
+
+#
+from typing import List, Optional
+
+
+# tables and indexes of a journal database
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS swaps (
+    swap_id TEXT PRIMARY KEY,
+    hashlock BLOB,
+    app_id INTEGER,
+    app_address TEXT,
+    dest_app_id INTEGER,
+    asset_id INTEGER,
+    sender TEXT,
+    receiver TEXT,
+    amount INTEGER,
+    step TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    swap_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    tx_id TEXT,
+    round INTEGER,
+    status TEXT NOT NULL,
+    recorded REAL NOT NULL,
+    first_valid INTEGER,
+    last_valid INTEGER,
+    PRIMARY KEY (swap_id, step)
+);
+CREATE INDEX IF NOT EXISTS swaps_hashlock ON swaps (hashlock);
+CREATE INDEX IF NOT EXISTS swaps_app_id ON swaps (app_id);
+CREATE INDEX IF NOT EXISTS swaps_dest_app_id ON swaps (dest_app_id);
+CREATE INDEX IF NOT EXISTS swaps_sender ON swaps (sender);
+CREATE INDEX IF NOT EXISTS swaps_receiver ON swaps (receiver);
+CREATE INDEX IF NOT EXISTS swaps_completed ON swaps (completed);
+"""
+
+# step columns added after the first release, added to older journals
+STEP_COLUMNS = ("first_valid", "last_valid")
+
+# swap columns a step may set
+FIELDS = ("hashlock", "app_id", "app_address", "dest_app_id", "asset_id", "sender", "receiver", "amount")
+
+
+#
+class SwapJournal:
+    """
+    SwapJournal object recording swap steps in SQLite so a restarted
+    worker can resume unfinished swaps. Records are queued and written
+    by a background thread, one transaction per batch, callers which
+    must not continue before their record is on disk wait for its batch
+    """
+
+    # status of a step sent to the network but not confirmed yet
+    SUBMITTED = "submitted"
+
+    # status of a step confirmed in a round
+    CONFIRMED = "confirmed"
+
+    #
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.005) -> None:
+        """
+        Constructor
+
+        :param path: database file, created when missing
+        :param batch_size: records written per transaction at most
+        :param flush_interval: seconds the writer waits for more records
+                               before writing a batch
+
+        :returns: None
+        """
+        self.__path = path
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SCHEMA)
+        existing = {row[1] for row in self.__connection.execute("PRAGMA table_info(steps)")}
+        for column in STEP_COLUMNS:
+            if column not in existing:
+                self.__connection.execute("ALTER TABLE steps ADD COLUMN {} INTEGER".format(column))
+        # swaps a previous worker left unfinished, only they are looked up
+        self.__resumable = {
+            row[0] for row in self.__connection.execute("SELECT swap_id FROM swaps WHERE completed = 0")
+        }
+        self.__lock = threading.Lock()
+        self.__queue = queue.Queue()
+        self.__written = threading.Condition()
+        self.__queued = 0
+        self.__committed = 0
+        self.__batches = 0
+        # first failed batch error not raised by flush yet
+        self.__error = None
+        self.__writer = threading.Thread(target=self.__run, name="swap-journal", daemon=True)
+        self.__writer.start()
+
+    #
+    @property
+    def path(self) -> str:
+        """
+        Getter for path private field
+
+        :returns: path field value
+        """
+        return self.__path
+
+    #
+    @property
+    def batches(self) -> int:
+        """
+        Getter for batches private field
+
+        :returns: number of transactions written
+        """
+        return self.__batches
+
+    #
+    def resumable(self, swap_id) -> bool:
+        """
+        Whether swap was left unfinished when the journal was opened,
+        steps of other swaps are not looked up
+
+        :param swap_id: swap identifier
+
+        :returns: True for a swap to resume
+        """
+        return self.__key(swap_id) in self.__resumable
+
+    #
+    def record(
+                self,
+                swap_id,
+                step: str,
+                tx_id: Optional[str] = None,
+                round_num: Optional[int] = None,
+                durable: bool = False,
+                completed: bool = False,
+                first_valid: Optional[int] = None,
+                last_valid: Optional[int] = None,
+                **fields
+            ) -> None:
+        """
+        Record step of a swap, a step with a transaction but no round
+        is submitted, other steps are confirmed
+
+        :param swap_id: swap identifier, bytes are stored as hex
+        :param step: protocol step name, e.g. commit or lock
+        :param tx_id: id of the transaction making the step
+        :param round_num: round the transaction was confirmed in
+        :param durable: wait until the record is written, e.g. before
+                        submitting the transaction it names
+        :param completed: whether the step finishes the swap
+        :param first_valid: first round a submitted transaction can be
+                            confirmed in
+        :param last_valid: last round a submitted transaction can be
+                           confirmed in, a restart looks for it in the
+                           blocks up to this round before sending again
+        :param fields: swap columns set by the step, see FIELDS
+
+        :returns: None
+        """
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError("unknown swap fields: {}".format(", ".join(sorted(unknown))))
+        status = self.SUBMITTED if tx_id is not None and round_num is None else self.CONFIRMED
+        # outcome of the batch the record is written in, set by the writer
+        outcome = [None] if durable else None
+        with self.__written:
+            self.__queued += 1
+            sequence = self.__queued
+            self.__queue.put((
+                self.__key(swap_id), step, tx_id, round_num, status, completed,
+                (first_valid, last_valid), fields, outcome
+            ))
+        if durable:
+            self.__wait(sequence)
+            if outcome[0] is not None:
+                raise outcome[0]
+
+    #
+    def flush(self) -> None:
+        """
+        Wait until queued records are written, raises the error of the
+        first batch failed since the last flush
+
+        :returns: None
+        """
+        with self.__written:
+            sequence = self.__queued
+        self.__wait(sequence)
+        with self.__written:
+            failure, self.__error = self.__error, None
+        if failure is not None:
+            raise failure
+
+    #
+    def get(self, swap_id) -> Optional[dict]:
+        """
+        Get swap with its steps, queued records included
+
+        :param swap_id: swap identifier
+
+        :returns: swap columns and steps by name, None for an unknown swap
+        """
+        swaps = self.__select("WHERE swap_id = ?", (self.__key(swap_id),))
+        return swaps[0] if swaps else None
+
+    #
+    def find(
+                self,
+                hashlock: Optional[bytes] = None,
+                app_id: Optional[int] = None,
+                participant: Optional[str] = None
+            ) -> List[dict]:
+        """
+        Find swaps by hashlock, application id or participant address
+
+        :param hashlock: sha256 of the secret
+        :param app_id: source or destination application id
+        :param participant: sender or receiver address
+
+        :returns: matching swaps, see get
+        """
+        clauses, params = [], []
+        if hashlock is not None:
+            clauses.append("hashlock = ?")
+            params.append(hashlock)
+        if app_id is not None:
+            clauses.append("(app_id = ? OR dest_app_id = ?)")
+            params += [app_id, app_id]
+        if participant is not None:
+            clauses.append("(sender = ? OR receiver = ?)")
+            params += [participant, participant]
+        if not clauses:
+            raise ValueError("hashlock, app_id or participant is required")
+        return self.__select("WHERE " + " AND ".join(clauses), tuple(params))
+
+    #
+    def unfinished(self) -> List[dict]:
+        """
+        Swaps a restarted worker has to resume
+
+        :returns: swaps without a completing step, oldest first
+        """
+        return self.__select("WHERE completed = 0", ())
+
+    #
+    def close(self) -> None:
+        """
+        Write queued records and stop the writer
+
+        :returns: None
+        """
+        self.flush()
+        self.__queue.put(None)
+        self.__writer.join()
+        self.__connection.close()
+
+    #
+    def __enter__(self):
+        return self
+
+    #
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    #
+    def __select(self, where: str, params: tuple) -> List[dict]:
+        """
+        Read swaps and their steps
+
+        :param where: where clause over the swaps table
+        :param params: clause parameters
+
+        :returns: swaps, see get
+        """
+        self.flush()
+        with self.__lock:
+            cursor = self.__connection.execute(
+                        "SELECT * FROM swaps {} ORDER BY updated".format(where), params)
+            columns = [column[0] for column in cursor.description]
+            swaps = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            for swap in swaps:
+                swap["completed"] = bool(swap["completed"])
+                swap["steps"] = {
+                    step: {"tx_id": tx_id, "round": round_num, "status": status,
+                           "first_valid": first_valid, "last_valid": last_valid}
+                    for step, tx_id, round_num, status, first_valid, last_valid in self.__connection.execute(
+                        "SELECT step, tx_id, round, status, first_valid, last_valid "
+                        "FROM steps WHERE swap_id = ? ORDER BY rowid",
+                        (swap["swap_id"],)
+                    )
+                }
+        return swaps
+
+    #
+    def __wait(self, sequence: int) -> None:
+        """
+        :param sequence: number of a queued record
+        :returns: None, once the batch of the record is done
+        """
+        with self.__written:
+            self.__written.wait_for(lambda: self.__committed >= sequence)
+
+    #
+    def __run(self) -> None:
+        """
+        Writer loop, records queued while a batch is written go into the
+        next one
+
+        :returns: None
+        """
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.__flush_interval
+            while len(batch) < self.__batch_size:
+                try:
+                    item = self.__queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.__queue.put(None)
+                    break
+                batch.append(item)
+            try:
+                self.__write(batch)
+                failure = None
+            except sqlite3.Error as e:
+                failure = e
+            with self.__written:
+                # failures are kept per record, a later batch succeeding
+                # must not hide them and must not report them
+                for item in batch:
+                    if item[-1] is not None:
+                        item[-1][0] = failure
+                if failure is not None and self.__error is None:
+                    self.__error = failure
+                self.__committed += len(batch)
+                self.__batches += 1
+                self.__written.notify_all()
+
+    #
+    def __write(self, batch: list) -> None:
+        """
+        Write records in one transaction
+
+        :param batch: queued records
+
+        :returns: None
+        """
+        now = time.time()
+        with self.__lock:
+            connection = self.__connection
+            connection.execute("BEGIN")
+            try:
+                self.__insert(batch, now)
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    #
+    def __insert(self, batch: list, now: float) -> None:
+        """
+        Upsert swaps and steps of a batch, caller holds the lock inside
+        a transaction
+
+        :param batch: queued records
+        :param now: time the batch is written
+
+        :returns: None
+        """
+        connection = self.__connection
+        for swap_id, step, tx_id, round_num, status, completed, validity, fields, _ in batch:
+            columns = ["swap_id", "step", "completed", "updated"] + list(fields)
+            updates = ["step = excluded.step", "completed = MAX(completed, excluded.completed)",
+                       "updated = excluded.updated"]
+            updates += ["{0} = excluded.{0}".format(name) for name in fields]
+            connection.execute(
+                "INSERT INTO swaps ({}) VALUES ({}) ON CONFLICT (swap_id) DO UPDATE SET {}".format(
+                    ", ".join(columns), ", ".join("?" * len(columns)), ", ".join(updates)),
+                (swap_id, step, int(completed), now, *fields.values())
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO steps "
+                "(swap_id, step, tx_id, round, status, recorded, first_valid, last_valid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (swap_id, step, tx_id, round_num, status, now, *validity)
+            )
+
+    #
+    @staticmethod
+    def __key(swap_id) -> str:
+        """
+        :param swap_id: swap identifier
+        :returns: stored identifier, hex for bytes
+        """
+        return swap_id.hex() if isinstance(swap_id, bytes) else str(swap_id)
@@ -0,0 +1,326 @@
+#
+import os
+import time
+import bisect
+import inspect
+import threading
+import functools
+
+#
+from typing import Optional
+
+
+# latency histogram bucket bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# help text of the metrics this package records
+DESCRIPTIONS = {
+    "prehtlc_operation_seconds": "Latency of client operations by kind and method",
+    "prehtlc_operation_errors_total": "Client operations that raised, by kind and method",
+    "prehtlc_algod_requests_total": "Algod requests by endpoint",
+    "prehtlc_algod_request_errors_total": "Algod requests failed or answered with an error status",
+    "prehtlc_algod_request_bytes_sent_total": "Algod request body bytes by endpoint",
+    "prehtlc_algod_request_seconds": "Algod request latency by endpoint",
+    "prehtlc_reveal_to_claim_seconds": "Time from a secret being seen to its source claim being confirmed"
+}
+
+# environment variable enabling the default registry
+METRICS_ENV = "PREHTLC_METRICS"
+
+
+#
+class _Histogram:
+    """
+    Bucket counts, sum and count of observed values
+    """
+
+    #
+    def __init__(self, buckets: tuple) -> None:
+        """
+        :param buckets: upper bounds, ascending
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    #
+    def observe(self, value: float) -> None:
+        """
+        :param value: observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+#
+class _Timer:
+    """
+    Context manager observing the time spent in the block
+    """
+
+    #
+    def __init__(self, registry, name: str, labels: dict, errors: Optional[str]) -> None:
+        self.__registry = registry
+        self.__name = name
+        self.__labels = labels
+        self.__errors = errors
+        self.__start = 0.0
+
+    #
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    #
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.__registry.observe(self.__name, time.perf_counter() - self.__start, **self.__labels)
+        if exc_type is not None and self.__errors is not None:
+            self.__registry.inc(self.__errors, **self.__labels)
+
+
+#
+class _NullTimer:
+    """
+    Context manager doing nothing, returned while metrics are disabled
+    """
+
+    #
+    def __enter__(self):
+        return self
+
+    #
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+#
+_NULL_TIMER = _NullTimer()
+
+
+#
+class MetricsRegistry:
+    """
+    MetricsRegistry object holding counters and latency histograms in
+    process, exported as Prometheus text or JSON snapshots, recording
+    is skipped while the registry is disabled
+    """
+
+    #
+    def __init__(self, enabled: bool = True, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        """
+        Constructor
+
+        :param enabled: whether values are recorded
+        :param buckets: histogram bucket upper bounds in seconds
+
+        :returns: None
+        """
+        self.__enabled = enabled
+        self.__buckets = tuple(buckets)
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__histograms = {}
+
+    #
+    @property
+    def enabled(self) -> bool:
+        """
+        Getter for enabled private field
+
+        :returns: whether values are recorded
+        """
+        return self.__enabled
+
+    #
+    def enable(self, enabled: bool = True) -> None:
+        """
+        Start or stop recording, recorded values are kept
+
+        :param enabled: whether values are recorded
+
+        :returns: None
+        """
+        self.__enabled = enabled
+
+    #
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Increase counter
+
+        :param name: counter name, ending with _total
+        :param value: amount added
+        :param labels: label values of the series
+
+        :returns: None
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    #
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Add value to histogram
+
+        :param name: histogram name
+        :param value: observed value, seconds for latencies
+        :param labels: label values of the series
+
+        :returns: None
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = _Histogram(self.__buckets)
+            histogram.observe(value)
+
+    #
+    def timer(self, name: str, errors: Optional[str] = None, **labels):
+        """
+        Time a block into a histogram
+
+        :param name: histogram name
+        :param errors: counter increased when the block raises
+        :param labels: label values of the series
+
+        :returns: context manager
+        """
+        if not self.__enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels, errors)
+
+    #
+    def reset(self) -> None:
+        """
+        Drop recorded values
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    #
+    def snapshot(self) -> dict:
+        """
+        Recorded values for JSON output
+
+        :returns: counters and histograms by name, one entry per label
+                  set, histogram buckets are cumulative
+        """
+        with self.__lock:
+            counters, histograms = {}, {}
+            for (name, labels), value in sorted(self.__counters.items()):
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), histogram in sorted(self.__histograms.items(), key=lambda item: item[0]):
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": dict(zip(
+                        [str(bound) for bound in histogram.buckets] + ["+Inf"],
+                        self.__cumulative(histogram.counts)
+                    ))
+                })
+        return {"enabled": self.enabled, "counters": counters, "histograms": histograms}
+
+    #
+    def to_prometheus(self) -> str:
+        """
+        Recorded values in Prometheus text exposition format
+
+        :returns: exposition text
+        """
+        lines = []
+        snapshot = self.snapshot()
+        for kind, metrics in [("counter", snapshot["counters"]), ("histogram", snapshot["histograms"])]:
+            for name, series in metrics.items():
+                if name in DESCRIPTIONS:
+                    lines.append("# HELP {} {}".format(name, DESCRIPTIONS[name]))
+                lines.append("# TYPE {} {}".format(name, kind))
+                for entry in series:
+                    if kind == "counter":
+                        lines.append("{}{} {}".format(name, self.__labels(entry["labels"]), entry["value"]))
+                        continue
+                    for bound, count in entry["buckets"].items():
+                        labels = dict(entry["labels"], le=bound)
+                        lines.append("{}_bucket{} {}".format(name, self.__labels(labels), count))
+                    lines.append("{}_sum{} {}".format(name, self.__labels(entry["labels"]), entry["sum"]))
+                    lines.append("{}_count{} {}".format(name, self.__labels(entry["labels"]), entry["count"]))
+        return "\n".join(lines) + "\n"
+
+    #
+    @staticmethod
+    def __cumulative(counts: list) -> list:
+        """
+        :param counts: count per bucket
+        :returns: count of values up to each bucket bound
+        """
+        total, cumulative = 0, []
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    #
+    @staticmethod
+    def __labels(labels: dict) -> str:
+        """
+        :param labels: label values
+        :returns: Prometheus label set, empty without labels
+        """
+        if not labels:
+            return ""
+        escaped = (
+            '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in labels.items()
+        )
+        return "{" + ",".join(escaped) + "}"
+
+
+# registry of the package, disabled unless PREHTLC_METRICS=1
+REGISTRY = MetricsRegistry(enabled=os.environ.get(METRICS_ENV) == "1")
+
+
+#
+def instrumented(operation: str):
+    """
+    Decorate client method to record its latency and errors in the
+    metrics registry of the client, see prehtlc_operation_seconds
+
+    :param operation: kind of operation, e.g. build, sign, send,
+                      confirm, compile or htlc
+
+    :returns: method decorator, coroutine functions stay coroutines
+    """
+    def decorator(method):
+        labels = {"operation": operation, "method": method.__name__}
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                metrics = self.metrics
+                if not metrics.enabled:
+                    return await method(self, *args, **kwargs)
+                with _Timer(metrics, "prehtlc_operation_seconds", labels, "prehtlc_operation_errors_total"):
+                    return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            # disabled metrics cost a property read and a flag check
+            if not metrics.enabled:
+                return method(self, *args, **kwargs)
+            with _Timer(metrics, "prehtlc_operation_seconds", labels, "prehtlc_operation_errors_total"):
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,237 @@
+#
+import os
+import time
+import random
+import inspect
+import cProfile
+import itertools
+import threading
+import functools
+import contextlib
+import contextvars
+import tracemalloc
+
+#
+from typing import Optional
+
+
+# environment variable naming the profile directory, profiling is
+# enabled when it is set
+PROFILE_ENV = "PREHTLC_PROFILE"
+
+# environment variable with the fraction of swaps profiled
+PROFILE_SAMPLE_ENV = "PREHTLC_PROFILE_SAMPLE"
+
+# swap id and sampling decision of the swap in progress
+_SWAP = contextvars.ContextVar("profile_swap", default=None)
+
+
+#
+class SwapProfiler:
+    """
+    SwapProfiler object capturing cProfile and tracemalloc data of swap
+    phases for a sampled fraction of swaps, each phase is written to
+    <directory>/<swap id>/<sequence>-<step>.prof and .mem.txt
+    """
+
+    # swap id of phases run outside a swap block
+    UNSCOPED = "unscoped"
+
+    #
+    def __init__(
+                self,
+                directory: Optional[str] = None,
+                sample_rate: float = 1.0,
+                memory: bool = True,
+                top: int = 25
+            ) -> None:
+        """
+        Constructor
+
+        :param directory: directory profiles are written to, profiling
+                          is disabled without it
+        :param sample_rate: fraction of swaps profiled
+        :param memory: whether allocations are traced as well
+        :param top: allocation sites written per phase
+
+        :returns: None
+        """
+        self.__directory = directory
+        self.__sample_rate = sample_rate
+        self.__memory = memory
+        self.__top = top
+        self.__random = random.Random()
+        self.__sequence = itertools.count(1)
+        self.__active = threading.Lock()
+        self.__enabled = directory is not None
+
+    #
+    @property
+    def enabled(self) -> bool:
+        """
+        Getter for enabled private field
+
+        :returns: whether swaps are profiled
+        """
+        return self.__enabled
+
+    #
+    @property
+    def directory(self) -> Optional[str]:
+        """
+        Getter for directory private field
+
+        :returns: directory field value
+        """
+        return self.__directory
+
+    #
+    def enable(self, directory: str, sample_rate: float = 1.0) -> None:
+        """
+        Start profiling swaps
+
+        :param directory: directory profiles are written to
+        :param sample_rate: fraction of swaps profiled
+
+        :returns: None
+        """
+        self.__directory = directory
+        self.__sample_rate = sample_rate
+        self.__enabled = True
+
+    #
+    def disable(self) -> None:
+        """
+        Stop profiling, phases in progress are still written
+
+        :returns: None
+        """
+        self.__enabled = False
+
+    #
+    @contextlib.contextmanager
+    def swap(self, swap_id):
+        """
+        Run the phases of one swap, a swap id is sampled the same way
+        on every entry so all or none of its phases are profiled, also
+        when its steps run in separate blocks
+
+        :param swap_id: swap identifier used as directory name, e.g.
+                        the application id or the hashlock, bytes are
+                        written as hex
+
+        :returns: context manager
+        """
+        name = swap_id.hex() if isinstance(swap_id, bytes) else str(swap_id)
+        sampled = self.__enabled and random.Random(name).random() < self.__sample_rate
+        token = _SWAP.set((name, sampled))
+        try:
+            yield
+        finally:
+            _SWAP.reset(token)
+
+    #
+    @contextlib.contextmanager
+    def phase(self, step: str):
+        """
+        Profile a phase of the current swap, phases outside a swap block
+        are sampled one by one. Profilers and tracemalloc are process
+        wide, so one phase is profiled at a time: nested phases are part
+        of the enclosing profile and concurrent phases are skipped
+
+        :param step: phase name used in the file names
+
+        :returns: context manager yielding the profile path or None
+        """
+        swap = _SWAP.get()
+        if swap is None:
+            swap = (self.UNSCOPED, self.__random.random() < self.__sample_rate)
+        if not self.__enabled or not swap[1] or not self.__active.acquire(blocking=False):
+            yield None
+            return
+
+        try:
+            directory = os.path.join(self.__directory, swap[0])
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "{:04d}-{}".format(next(self.__sequence), step))
+
+            started = self.__memory and not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            if self.__memory:
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                yield path + ".prof"
+            finally:
+                profile.disable()
+                seconds = time.perf_counter() - start
+                profile.dump_stats(path + ".prof")
+                if self.__memory:
+                    self.__write_memory(path + ".mem.txt", step, seconds, before)
+                if started:
+                    tracemalloc.stop()
+        finally:
+            self.__active.release()
+
+    #
+    def __write_memory(self, path: str, step: str, seconds: float, before) -> None:
+        """
+        Write allocation growth of a phase by source line
+
+        :param path: output file
+        :param step: phase name
+        :param seconds: phase duration
+        :param before: tracemalloc snapshot taken when the phase started
+
+        :returns: None
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        with open(path, "w") as f:
+            f.write("step: {}\nseconds: {:.6f}\npeak_bytes: {}\n\n".format(step, seconds, peak))
+            for stat in stats[:self.__top]:
+                f.write("{}\n".format(stat))
+
+
+# profiler of the package, enabled when PREHTLC_PROFILE names a directory
+PROFILER = SwapProfiler(
+                os.environ.get(PROFILE_ENV),
+                float(os.environ.get(PROFILE_SAMPLE_ENV, "1"))
+            )
+
+
+#
+def profiled(method):
+    """
+    Decorate method to run as a swap phase of PROFILER named after the
+    class and method, e.g. AlgorandHTLC.commit. A method taking a
+    swap_id argument called outside a swap block runs in the block of
+    that swap
+
+    :param method: method profiled
+
+    :returns: wrapper calling the method directly while profiling is
+              disabled
+    """
+    step = method.__qualname__
+    signature = inspect.signature(method)
+    scoped = "swap_id" in signature.parameters
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return method(*args, **kwargs)
+        swap_id = None
+        if scoped and _SWAP.get() is None:
+            swap_id = signature.bind_partial(*args, **kwargs).arguments.get("swap_id")
+        with contextlib.ExitStack() as stack:
+            if swap_id is not None:
+                stack.enter_context(PROFILER.swap(swap_id))
+            stack.enter_context(PROFILER.phase(step))
+            return method(*args, **kwargs)
+    return wrapper
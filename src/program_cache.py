@@ -0,0 +1,259 @@
+#
+import os
+import json
+import base64
+import hashlib
+import threading
+
+#
+from typing import Optional, Tuple
+
+
+#
+class ProgramCache:
+    """
+    ProgramCache object for keeping compiled approval and clear programs
+    in memory and on disk, addressed by the hash of their TEAL source
+    """
+
+    #
+    def __init__(self, path: Optional[str] = None) -> None:
+        """
+        Constructor
+
+        :param path: directory where compiled programs are persisted,
+                     None keeps the cache in memory only
+
+        :returns: None
+        """
+        self.__path = path
+        self.__programs = {}
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    #
+    @property
+    def path(self) -> Optional[str]:
+        """
+        Getter for path private field
+
+        :returns: path field value
+        """
+        return self.__path
+
+    #
+    @property
+    def hits(self) -> int:
+        """
+        Getter for hits private field
+
+        :returns: number of lookups served from the cache
+        """
+        return self.__hits
+
+    #
+    @property
+    def misses(self) -> int:
+        """
+        Getter for misses private field
+
+        :returns: number of lookups that had to be compiled
+        """
+        return self.__misses
+
+    #
+    @staticmethod
+    def make_key(
+                approval_source: str,
+                clear_source: str,
+                version: int,
+                mode: str
+            ) -> str:
+        """
+        Build cache key from TEAL sources, TEAL version and mode
+
+        :param approval_source: approval program TEAL source
+        :param clear_source: clear program TEAL source
+        :param version: TEAL version programs are compiled for
+        :param mode: pyteal compile mode name
+
+        :returns: hex encoded sha256 digest
+        """
+        return ProgramCache.__digest(approval_source, clear_source, str(version), mode)
+
+    #
+    @staticmethod
+    def make_source_key(
+                builder_source: str,
+                compiler_version: str,
+                version: int,
+                mode: str
+            ) -> str:
+        """
+        Build key of TEAL source generated by a pyteal builder
+
+        :param builder_source: python source of the pyteal builder
+        :param compiler_version: installed pyteal version
+        :param version: TEAL version programs are compiled for
+        :param mode: pyteal compile mode name
+
+        :returns: hex encoded sha256 digest
+        """
+        return ProgramCache.__digest(builder_source, compiler_version, str(version), mode)
+
+    #
+    @staticmethod
+    def __digest(*parts: str) -> str:
+        """
+        Hash length-prefixed parts
+
+        :param parts: strings to hash
+
+        :returns: hex encoded sha256 digest
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            encoded = part.encode('utf-8')
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    #
+    def get(self, key: str) -> Optional[Tuple[bytes, bytes]]:
+        """
+        Get compiled approval and clear programs for given key
+
+        :param key: cache key built with make_key
+
+        :returns: (approval, clear) bytecode or None if not cached
+        """
+        with self.__lock:
+            programs = self.__programs.get(key)
+            if programs is None:
+                programs = self.__load(key)
+                if programs is not None:
+                    self.__programs[key] = programs
+            if programs is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+            return programs
+
+    #
+    def put(self, key: str, approval: bytes, clear: bytes) -> None:
+        """
+        Store compiled approval and clear programs
+
+        :param key: cache key built with make_key
+        :param approval: approval program bytecode
+        :param clear: clear program bytecode
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__programs[key] = (approval, clear)
+            self.__store(key, approval, clear)
+
+    #
+    def get_source(self, key: str) -> Optional[str]:
+        """
+        Get TEAL source generated for given builder key
+
+        :param key: cache key built with make_source_key
+
+        :returns: TEAL source or None if not cached
+        """
+        if self.path is None:
+            return None
+        try:
+            with open(os.path.join(self.path, "{}.teal".format(key)), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    #
+    def put_source(self, key: str, teal_code: str) -> None:
+        """
+        Persist TEAL source generated for given builder key
+
+        :param key: cache key built with make_source_key
+        :param teal_code: TEAL source
+
+        :returns: None
+        """
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        filename = os.path.join(self.path, "{}.teal".format(key))
+        # threads of one process write the same key concurrently
+        tmp_filename = "{}.{}.{}.tmp".format(filename, os.getpid(), threading.get_ident())
+        with open(tmp_filename, 'w') as f:
+            f.write(teal_code)
+        os.replace(tmp_filename, filename)
+
+    #
+    def clear(self) -> None:
+        """
+        Drop in-memory entries, persisted programs are kept
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__programs.clear()
+
+    #
+    def __filename(self, key: str) -> str:
+        """
+        Get file where programs for given key are persisted
+
+        :param key: cache key
+
+        :returns: file path
+        """
+        return os.path.join(self.path, "{}.json".format(key))
+
+    #
+    def __load(self, key: str) -> Optional[Tuple[bytes, bytes]]:
+        """
+        Read persisted programs for given key
+
+        :param key: cache key
+
+        :returns: (approval, clear) bytecode or None
+        """
+        if self.path is None:
+            return None
+        try:
+            with open(self.__filename(key), 'r') as f:
+                entry = json.load(f)
+            return (
+                base64.b64decode(entry["approval"]),
+                base64.b64decode(entry["clear"])
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    #
+    def __store(self, key: str, approval: bytes, clear: bytes) -> None:
+        """
+        Persist programs for given key, written atomically
+
+        :param key: cache key
+        :param approval: approval program bytecode
+        :param clear: clear program bytecode
+
+        :returns: None
+        """
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        filename = self.__filename(key)
+        # threads of one process write the same key concurrently
+        tmp_filename = "{}.{}.{}.tmp".format(filename, os.getpid(), threading.get_ident())
+        with open(tmp_filename, 'w') as f:
+            json.dump({
+                "approval": base64.b64encode(approval).decode('ascii'),
+                "clear": base64.b64encode(clear).decode('ascii')
+            }, f)
+        os.replace(tmp_filename, filename)
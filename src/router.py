@@ -0,0 +1,346 @@
+#
+import time
+import threading
+import contextvars
+import http.client
+
+#
+from typing import List, Optional
+from dataclasses import dataclass, asdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+#
+import msgpack
+from algosdk import error, transaction
+from algosdk.v2client.algod import AlgodClient
+
+#
+from metrics import MetricsRegistry
+from scheduler import RequestScheduler
+from transport import HttpTransport, PooledAlgodClient, endpoint_path
+
+
+#
+@dataclass
+class EndpointHealth:
+    address: str
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    last_round: Optional[int] = None
+
+
+#
+class RoutedAlgodClient(AlgodClient):
+    """
+    RoutedAlgodClient object spreading algod requests over several
+    endpoints: reads go to the fastest healthy endpoint and are hedged
+    to the next one when slow, submissions are broadcast
+    """
+
+    # idempotent reads hedged to a second endpoint
+    HEDGED = {
+        "/status",
+        "/transactions/params",
+        "/transactions/pending/{txid}",
+        "/accounts/{address}",
+        "/applications/{id}",
+        "/applications/{id}/box"
+    }
+
+    # errors of a submission some endpoint has already accepted
+    DUPLICATE_ERRORS = ("already in ledger", "already in pool")
+
+    # weight of the newest sample in latency and error rate averages
+    SMOOTHING = 0.2
+
+    #
+    def __init__(
+                self,
+                clients: List[AlgodClient],
+                hedge_after: float = 0.2,
+                broadcast: int = 2,
+                max_error_rate: float = 0.5,
+                max_lag: int = 2
+            ) -> None:
+        """
+        Constructor
+
+        :param clients: one client per algod endpoint, e.g.
+                        PooledAlgodClient
+        :param hedge_after: seconds a read may take before it is sent
+                            to the next endpoint as well
+        :param broadcast: endpoints each transaction is submitted to
+        :param max_error_rate: smoothed error rate above which an
+                               endpoint is unhealthy
+        :param max_lag: rounds an endpoint may be behind the most
+                        recent one before it is unhealthy
+
+        :returns: None
+        """
+        if not clients:
+            raise ValueError("at least one algod endpoint is required")
+        super().__init__(clients[0].algod_token, clients[0].algod_address, clients[0].headers)
+        self.__clients = clients
+        self.__hedge_after = hedge_after
+        self.__broadcast = broadcast
+        self.__max_error_rate = max_error_rate
+        self.__max_lag = max_lag
+        self.__lock = threading.Lock()
+        self.__health = [EndpointHealth(client.algod_address) for client in clients]
+        self.__hedges = 0
+        self.__duplicates = 0
+        self.__executor = ThreadPoolExecutor(
+                                max_workers=4 * len(clients),
+                                thread_name_prefix="algod-router"
+                            )
+
+    #
+    @classmethod
+    def from_addresses(
+                cls,
+                algod_token: str,
+                addresses: List[str],
+                headers: Optional[dict] = None,
+                scheduler: Optional[RequestScheduler] = None,
+                metrics: Optional[MetricsRegistry] = None,
+                **kwargs
+            ):
+        """
+        Create router with a pooled client per endpoint
+
+        :param algod_token: algod api token of every endpoint
+        :param addresses: algod base urls
+        :param headers: headers sent with every request
+        :param scheduler: rate limiter shared by the endpoints
+        :param metrics: registry requests to the endpoints are recorded
+                        in, the package REGISTRY by default
+
+        :returns: RoutedAlgodClient object, kwargs are passed to the
+                  constructor
+        """
+        return cls([
+            PooledAlgodClient(algod_token, address, headers, HttpTransport(address, scheduler=scheduler, metrics=metrics))
+            for address in addresses
+        ], **kwargs)
+
+    #
+    def stats(self) -> dict:
+        """
+        Health of every endpoint and routing counters
+
+        :returns: endpoint health in ranking order, number of hedged
+                  reads and of submissions answered as duplicates
+        """
+        with self.__lock:
+            health = [asdict(self.__health[index]) for index in self.__ranked()]
+            return {"endpoints": health, "hedges": self.__hedges, "duplicates": self.__duplicates}
+
+    #
+    def close(self) -> None:
+        """
+        Stop router threads, requests in flight finish first
+
+        :returns: None
+        """
+        self.__executor.shutdown()
+
+    #
+    def algod_request(
+                self,
+                method: str,
+                requrl: str,
+                params: Optional[dict] = None,
+                data: Optional[bytes] = None,
+                headers: Optional[dict] = None,
+                response_format: Optional[str] = "json",
+                timeout: Optional[float] = None
+            ):
+        """
+        Route request, see AlgodClient.algod_request
+
+        :param method: http method
+        :param requrl: path below the api version prefix
+        :param params: query parameters
+        :param data: request body
+        :param headers: additional request headers
+        :param response_format: json to decode the response body
+        :param timeout: seconds a single endpoint may take
+
+        :returns: response of the first endpoint answering
+        """
+        kwargs = {"params": params, "data": data, "headers": headers,
+                  "response_format": response_format}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+
+        def call(index):
+            return self.__call(index, method, requrl, kwargs)
+
+        with self.__lock:
+            order = self.__ranked()
+        if method == "POST" and requrl == "/transactions":
+            return self.__submit(order[:self.__broadcast], call, data)
+        if method == "GET" and endpoint_path(requrl) in self.HEDGED:
+            return self.__first_answer(order, call, self.__hedge_after)
+        return self.__first_answer(order, call, None)
+
+    #
+    def __first_answer(self, order: list, call, hedge_after: Optional[float]):
+        """
+        Send request to endpoints in order until one answers, the next
+        endpoint is tried when one fails and, with hedge_after, when
+        one is slow
+
+        :param order: endpoint indexes
+        :param call: function sending the request to an endpoint
+        :param hedge_after: seconds before a slow request is hedged
+
+        :returns: first answer
+        """
+        candidates = iter(order)
+        pending = {self.__executor.submit(contextvars.copy_context().run, call, next(candidates))}
+        failure = None
+        while pending:
+            done, pending = wait(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    if not self.__retryable(e):
+                        raise
+                    failure = e
+            index = next(candidates, None)
+            if index is not None:
+                if not done:
+                    with self.__lock:
+                        self.__hedges += 1
+                pending.add(self.__executor.submit(contextvars.copy_context().run, call, index))
+        raise failure
+
+    #
+    def __submit(self, order: list, call, data: bytes) -> dict:
+        """
+        Broadcast transactions, an endpoint reporting them as already
+        submitted counts as success
+
+        :param order: endpoint indexes
+        :param call: function sending the request to an endpoint
+        :param data: msgpack encoded signed transactions
+
+        :returns: response with id of the first transaction
+        """
+        pending = {self.__executor.submit(contextvars.copy_context().run, call, index) for index in order}
+        failure = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    if any(message in str(e) for message in self.DUPLICATE_ERRORS):
+                        with self.__lock:
+                            self.__duplicates += 1
+                        return {"txId": self.__first_txid(data)}
+                    # a rejection is reported over an unreachable endpoint
+                    if failure is None or (self.__retryable(failure) and not self.__retryable(e)):
+                        failure = e
+        raise failure
+
+    #
+    def __call(self, index: int, method: str, requrl: str, kwargs: dict):
+        """
+        Send request to one endpoint and update its health, runs on a
+        router thread in a copy of the caller's context so request
+        priorities carry over
+
+        :param index: endpoint index
+        :param method: http method
+        :param requrl: path below the api version prefix
+        :param kwargs: algod_request arguments
+
+        :returns: endpoint response
+        """
+        start = time.perf_counter()
+        try:
+            response = self.__clients[index].algod_request(method, requrl, **kwargs)
+        except Exception as e:
+            self.__record(index, time.perf_counter() - start, self.__retryable(e), None)
+            raise
+        round_num = None
+        if isinstance(response, dict):
+            round_num = response.get("last-round", response.get("round"))
+        self.__record(index, time.perf_counter() - start, False, round_num)
+        return response
+
+    #
+    def __record(self, index: int, seconds: float, failed: bool, round_num: Optional[int]) -> None:
+        """
+        Update smoothed latency and error rate of an endpoint
+
+        :param index: endpoint index
+        :param seconds: request time
+        :param failed: whether the endpoint failed to answer
+        :param round_num: round reported by the response
+
+        :returns: None
+        """
+        alpha = self.SMOOTHING
+        with self.__lock:
+            health = self.__health[index]
+            health.requests += 1
+            health.errors += failed
+            health.error_rate = (1 - alpha) * health.error_rate + alpha * failed
+            if not failed:
+                health.latency = seconds if health.latency is None else (
+                    (1 - alpha) * health.latency + alpha * seconds)
+            if isinstance(round_num, int):
+                health.last_round = max(health.last_round or 0, round_num)
+
+    #
+    def __ranked(self) -> list:
+        """
+        Order endpoints healthy first and then by latency, endpoints
+        not tried yet come first and ones which never answered last,
+        caller holds the lock
+
+        :returns: endpoint indexes
+        """
+        rounds = [health.last_round for health in self.__health if health.last_round is not None]
+        newest = max(rounds, default=None)
+
+        def key(index):
+            health = self.__health[index]
+            lagging = (newest is not None and health.last_round is not None
+                       and newest - health.last_round > self.__max_lag)
+            unhealthy = health.error_rate > self.__max_error_rate or lagging
+            if health.latency is None:
+                return unhealthy, 0.0 if health.requests == 0 else float("inf")
+            return unhealthy, health.latency
+
+        return sorted(range(len(self.__health)), key=key)
+
+    #
+    @staticmethod
+    def __retryable(e: Exception) -> bool:
+        """
+        :param e: error of a request
+        :returns: whether another endpoint may answer differently,
+                  true for connection errors, rate limits and server
+                  errors
+        """
+        if isinstance(e, error.AlgodHTTPError):
+            return e.code is None or e.code == 429 or e.code >= 500
+        return isinstance(e, (OSError, http.client.HTTPException))
+
+    #
+    @staticmethod
+    def __first_txid(data: bytes) -> str:
+        """
+        :param data: msgpack encoded signed transactions
+        :returns: id of the first transaction
+        """
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(data)
+        return transaction.SignedTransaction.undictify(next(iter(unpacker))).get_txid()
@@ -0,0 +1,230 @@
+#
+import time
+import threading
+import contextlib
+import contextvars
+import collections
+
+#
+from enum import IntEnum
+from typing import Optional
+
+
+#
+class Priority(IntEnum):
+    REDEEM = 0
+    SUBMIT = 1
+    CONFIRMATION = 2
+    READ = 3
+
+
+# priority raised for every request sent inside request_priority
+_PRIORITY = contextvars.ContextVar("request_priority", default=None)
+
+
+#
+@contextlib.contextmanager
+def request_priority(priority: Priority):
+    """
+    Send requests made inside the block with at least given priority,
+    e.g. the submission and confirmation polling of a redeem
+
+    :param priority: lowest priority of the requests
+
+    :returns: context manager
+    """
+    current = _PRIORITY.get()
+    token = _PRIORITY.set(priority if current is None else min(current, priority))
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+#
+def current_priority() -> Optional[Priority]:
+    """
+    Get priority raised by the enclosing request_priority block, e.g. to
+    carry it to requests another thread makes on behalf of the caller
+
+    :returns: raised priority or None
+    """
+    return _PRIORITY.get()
+
+
+#
+class RequestScheduler:
+    """
+    RequestScheduler object limiting algod requests with a token bucket,
+    waiting requests are granted tokens in priority order and 429
+    responses lower the rate until requests succeed again
+    """
+
+    #
+    def __init__(
+                self,
+                rate: float = 10.0,
+                burst: int = 10,
+                min_rate: float = 1.0,
+                backoff: float = 0.5,
+                recovery: float = 0.1
+            ) -> None:
+        """
+        Constructor
+
+        :param rate: requests per second allowed by the provider
+        :param burst: requests sent at once after an idle period
+        :param min_rate: lowest rate 429 responses lower the rate to
+        :param backoff: factor applied to the rate on a 429 response
+        :param recovery: requests per second the rate regains on every
+                         successful response, up to rate
+
+        :returns: None
+        """
+        self.__max_rate = rate
+        self.__rate = rate
+        self.__burst = burst
+        self.__min_rate = min_rate
+        self.__backoff = backoff
+        self.__recovery = recovery
+        self.__tokens = float(burst)
+        self.__updated = time.monotonic()
+        self.__condition = threading.Condition()
+        self.__queues = {priority: collections.deque() for priority in Priority}
+        self.__waits = {priority: [0, 0.0, 0.0] for priority in Priority}
+        self.__throttled = 0
+
+    #
+    @property
+    def rate(self) -> float:
+        """
+        Getter for rate private field
+
+        :returns: current requests per second
+        """
+        return self.__rate
+
+    #
+    @staticmethod
+    def classify(method: str, path: str) -> Priority:
+        """
+        Priority of a request by endpoint, raised by request_priority
+
+        :param method: http method
+        :param path: request path
+
+        :returns: request priority
+        """
+        path = path.split("?", 1)[0]
+        if path.startswith("/v2"):
+            path = path[3:]
+        if method == "POST" and path == "/transactions":
+            priority = Priority.SUBMIT
+        elif path.startswith(("/transactions/pending/", "/status/wait-for-block-after/", "/blocks/")):
+            # blocks are read by the confirmation tracker and block follower
+            priority = Priority.CONFIRMATION
+        else:
+            priority = Priority.READ
+        raised = _PRIORITY.get()
+        return priority if raised is None else min(priority, raised)
+
+    #
+    def acquire(self, method: str, path: str) -> float:
+        """
+        Wait for a token, higher priority requests are served first and
+        requests of one priority in arrival order
+
+        :param method: http method
+        :param path: request path
+
+        :returns: seconds waited
+        """
+        priority = self.classify(method, path)
+        start = time.monotonic()
+        ticket = object()
+        with self.__condition:
+            queue = self.__queues[priority]
+            queue.append(ticket)
+            try:
+                while True:
+                    self.__refill()
+                    head = self.__head() is ticket
+                    if head and self.__tokens >= 1:
+                        self.__tokens -= 1
+                        break
+                    # the head sleeps until its token is due, others until
+                    # the head is served
+                    self.__condition.wait((1 - self.__tokens) / self.__rate if head else None)
+            finally:
+                queue.remove(ticket)
+                self.__condition.notify_all()
+
+            waited = time.monotonic() - start
+            stats = self.__waits[priority]
+            stats[0] += 1
+            stats[1] += waited
+            stats[2] = max(stats[2], waited)
+        return waited
+
+    #
+    def feedback(self, status: int) -> None:
+        """
+        Adjust rate to a response, a 429 lowers the rate and empties
+        the bucket, other responses let the rate recover
+
+        :param status: http status code
+
+        :returns: None
+        """
+        with self.__condition:
+            self.__refill()
+            if status == 429:
+                self.__throttled += 1
+                self.__rate = max(self.__min_rate, self.__rate * self.__backoff)
+                self.__tokens = 0.0
+            elif status < 500:
+                self.__rate = min(self.__max_rate, self.__rate + self.__recovery)
+
+    #
+    def stats(self) -> dict:
+        """
+        Queue depths and wait times per priority
+
+        :returns: current rate, number of 429 responses, and waiting
+                  requests and waits granted per priority name
+        """
+        with self.__condition:
+            return {
+                "rate": round(self.__rate, 3),
+                "throttled": self.__throttled,
+                "queues": {priority.name.lower(): len(queue) for priority, queue in self.__queues.items()},
+                "waits": {
+                    priority.name.lower(): {
+                        "count": count,
+                        "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                        "max_ms": round(longest * 1000, 3)
+                    }
+                    for priority, (count, total, longest) in self.__waits.items()
+                }
+            }
+
+    #
+    def __refill(self) -> None:
+        """
+        Add tokens earned since last refill, caller holds the condition
+
+        :returns: None
+        """
+        now = time.monotonic()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+    #
+    def __head(self) -> Optional[object]:
+        """
+        :returns: ticket served next, caller holds the condition
+        """
+        for priority in Priority:
+            if self.__queues[priority]:
+                return self.__queues[priority][0]
+        return None
@@ -0,0 +1,232 @@
+#
+import os
+import base64
+import threading
+import multiprocessing
+
+#
+from typing import List, Optional
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+
+#
+from nacl.signing import SigningKey
+from algosdk import constants, encoding
+from algosdk.transaction import SignedTransaction, Transaction
+
+
+# signing keys of worker processes, by seed
+_WORKER_KEYS = {}
+
+
+#
+def _signature(signing_key: SigningKey, txn: Transaction) -> bytes:
+    """
+    Sign transaction bytes the way Transaction.raw_sign does
+
+    :param signing_key: decoded key
+    :param txn: transaction which should be signed
+
+    :returns: signature
+    """
+    message = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(txn))
+    return signing_key.sign(message).signature
+
+
+#
+def _sign_chunk(chunk: list) -> List[bytes]:
+    """
+    Sign part of a batch in a worker process
+
+    :param chunk: list of (key seed, transaction)
+
+    :returns: signatures in chunk order
+    """
+    signatures = []
+    for seed, txn in chunk:
+        signing_key = _WORKER_KEYS.get(seed)
+        if signing_key is None:
+            signing_key = _WORKER_KEYS[seed] = SigningKey(seed)
+        signatures.append(_signature(signing_key, txn))
+    return signatures
+
+
+#
+@dataclass
+class DecodedKey:
+    seed: bytes
+    address: str
+    signing_key: SigningKey
+
+
+#
+class TransactionSigner:
+    """
+    TransactionSigner object signing transactions with private keys
+    decoded once, batches are split across a process pool
+    """
+
+    # batches below this size are signed on the calling thread
+    MIN_PARALLEL_BATCH = 256
+
+    # transactions sent to a worker process at once
+    CHUNK_SIZE = 128
+
+    #
+    def __init__(
+                self,
+                max_workers: Optional[int] = None,
+                min_parallel_batch: int = MIN_PARALLEL_BATCH,
+                chunk_size: int = CHUNK_SIZE
+            ) -> None:
+        """
+        Constructor
+
+        :param max_workers: worker processes, number of CPUs by default
+                            and none on a single CPU, 0 signs every
+                            batch on the calling thread
+        :param min_parallel_batch: smallest batch signed by the pool
+        :param chunk_size: transactions sent to a worker at once
+
+        :returns: None
+        """
+        if max_workers is None:
+            cpus = os.cpu_count() or 1
+            max_workers = cpus if cpus > 1 else 0
+        self.__max_workers = max_workers
+        self.__min_parallel_batch = min_parallel_batch
+        self.__chunk_size = chunk_size
+        self.__lock = threading.Lock()
+        self.__keys = {}
+        self.__pool = None
+
+    #
+    @property
+    def max_workers(self) -> int:
+        """
+        Getter for max_workers private field
+
+        :returns: worker processes of the pool
+        """
+        return self.__max_workers
+
+    #
+    def decode(self, private_key: str) -> DecodedKey:
+        """
+        Decode private key, later calls reuse the decoded key
+
+        :param private_key: base64 private key, e.g. AlgoUser.pk
+
+        :returns: decoded key
+        """
+        key = self.__keys.get(private_key)
+        if key is None:
+            seed = base64.b64decode(private_key)[:constants.key_len_bytes]
+            signing_key = SigningKey(seed)
+            address = encoding.encode_address(bytes(signing_key.verify_key))
+            key = self.__keys[private_key] = DecodedKey(seed, address, signing_key)
+        return key
+
+    #
+    def sign(self, private_key: str, txn: Transaction) -> SignedTransaction:
+        """
+        Sign transaction on the calling thread
+
+        :param private_key: base64 private key, e.g. AlgoUser.pk
+        :param txn: transaction which should be signed
+
+        :returns: signed transaction, same as txn.sign(private_key)
+        """
+        key = self.decode(private_key)
+        return self.__signed(key, txn, _signature(key.signing_key, txn))
+
+    #
+    def sign_batch(self, private_keys, txns: list) -> List[SignedTransaction]:
+        """
+        Sign transactions, large batches across the process pool
+
+        :param private_keys: base64 private key signing every
+                             transaction or list of keys, one per
+                             transaction
+        :param txns: transactions which should be signed
+
+        :returns: signed transactions in order of txns
+        """
+        if not isinstance(private_keys, list):
+            private_keys = [private_keys] * len(txns)
+        if len(private_keys) != len(txns):
+            raise ValueError("{} keys for {} transactions".format(len(private_keys), len(txns)))
+
+        keys = [self.decode(private_key) for private_key in private_keys]
+        if self.__max_workers < 1 or len(txns) < self.__min_parallel_batch:
+            return [
+                self.__signed(key, txn, _signature(key.signing_key, txn))
+                for key, txn in zip(keys, txns)
+            ]
+
+        items = [(key.seed, txn) for key, txn in zip(keys, txns)]
+        chunks = [
+            items[start:start + self.__chunk_size]
+            for start in range(0, len(items), self.__chunk_size)
+        ]
+        signatures = [
+            signature
+            for chunk_signatures in self.__get_pool().map(_sign_chunk, chunks)
+            for signature in chunk_signatures
+        ]
+        return [
+            self.__signed(key, txn, signature)
+            for key, txn, signature in zip(keys, txns, signatures)
+        ]
+
+    #
+    def close(self) -> None:
+        """
+        Shut down worker processes, the pool restarts on the next
+        parallel batch
+
+        :returns: None
+        """
+        with self.__lock:
+            pool, self.__pool = self.__pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    #
+    def __enter__(self):
+        return self
+
+    #
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    #
+    def __get_pool(self) -> ProcessPoolExecutor:
+        """
+        Start worker processes on first use, spawned rather than forked
+        as clients sign from threads and event loops
+
+        :returns: process pool
+        """
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = ProcessPoolExecutor(
+                                    max_workers=self.__max_workers,
+                                    mp_context=multiprocessing.get_context("spawn")
+                                )
+            return self.__pool
+
+    #
+    @staticmethod
+    def __signed(key: DecodedKey, txn: Transaction, signature: bytes) -> SignedTransaction:
+        """
+        Wrap signature, rekeyed senders get the signing address
+
+        :param key: decoded key
+        :param txn: signed transaction
+        :param signature: signature of txn
+
+        :returns: signed transaction
+        """
+        authorizing_address = key.address if key.address != txn.sender else None
+        return SignedTransaction(txn, base64.b64encode(signature).decode(), authorizing_address)
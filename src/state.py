@@ -0,0 +1,266 @@
+#
+import base64
+import threading
+
+#
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+#
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+#
+from confirmation import ConfirmationTracker
+from teal import TealManager
+
+
+#
+class StateReader:
+    """
+    StateReader object for reading typed application global state,
+    cached per application with the round it was read at until the
+    application is called
+    """
+
+    # value types used by state schemas
+    UINT = "uint"
+    BYTES = "bytes"
+    ADDRESS = "address"
+
+    #
+    def __init__(
+                self,
+                client: Optional[AlgodClient],
+                round_source: Callable[[], Optional[int]],
+                confirmation_tracker: Optional[ConfirmationTracker] = None,
+                schemas: Optional[dict] = None,
+                max_workers: int = 8
+            ) -> None:
+        """
+        Constructor
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param round_source: function returning the estimated current
+                             round, None disables caching
+        :param confirmation_tracker: tracker whose confirmed application
+                                     calls invalidate cached state and
+                                     whose processed round is preferred
+        :param schemas: value types of global keys per contract,
+                        TealManager.STATE_SCHEMAS by default
+        :param max_workers: most algod requests in flight
+
+        :returns: None
+        """
+        self.__client = client
+        self.__round_source = round_source
+        self.__schemas = schemas or TealManager.STATE_SCHEMAS
+        self.__max_workers = max_workers
+        self.__lock = threading.Lock()
+        self.__confirmation_tracker = confirmation_tracker
+        self.__executor = None
+        self.__cache = {}
+        self.__generations = {}
+        self.__hits = 0
+        self.__misses = 0
+        if confirmation_tracker is not None:
+            confirmation_tracker.add_app_listener(self.invalidate)
+
+    #
+    @property
+    def hits(self) -> int:
+        """
+        Getter for hits private field
+
+        :returns: number of states served from cache
+        """
+        return self.__hits
+
+    #
+    @property
+    def misses(self) -> int:
+        """
+        Getter for misses private field
+
+        :returns: number of application states read from algod
+        """
+        return self.__misses
+
+    #
+    def get(self, app_id: int, contract: Optional[str] = None) -> dict:
+        """
+        Get typed global state of application
+
+        :param app_id: application id
+        :param contract: name of TealManager contract the application
+                         runs, its schema types values and fills
+                         missing keys with defaults
+
+        :returns: global state keyed by key name
+        """
+        return self.get_many([app_id], contract)[app_id]
+
+    #
+    def get_many(self, app_ids: list, contract: Optional[str] = None) -> dict:
+        """
+        Get typed global state of many applications, cached states read
+        at the current round or later are reused, the rest is read
+        concurrently with one application_info per application
+
+        :param app_ids: application ids
+        :param contract: name of TealManager contract the applications run
+
+        :returns: global state per application id
+        """
+        # taken before the reads, state read after it is at least as new
+        round_num = self.current_round()
+        states = {}
+        generations = {}
+        with self.__lock:
+            for app_id in dict.fromkeys(app_ids):
+                cached = self.__cache.get(app_id)
+                if round_num is not None and cached is not None and cached[0] >= round_num:
+                    self.__hits += 1
+                    states[app_id] = cached[1]
+                    continue
+                generations[app_id] = self.__generations.get(app_id, 0)
+
+        missing = list(generations)
+        if len(missing) == 1:
+            fetched = [self.__fetch(missing[0])]
+        elif missing:
+            fetched = list(self.__get_executor().map(self.__fetch, missing))
+        else:
+            fetched = []
+
+        with self.__lock:
+            for app_id, global_state in zip(missing, fetched):
+                state = self.decode(global_state, contract)
+                states[app_id] = state
+                self.__misses += 1
+                # state read while the application was called is not kept
+                if round_num is not None and self.__generations.get(app_id, 0) == generations[app_id]:
+                    self.__cache[app_id] = (round_num, state)
+
+        return {app_id: dict(states[app_id]) for app_id in app_ids}
+
+    #
+    def current_round(self) -> Optional[int]:
+        """
+        Get round cached state is compared with, the last round processed
+        by confirmation tracker while it follows rounds, the round of
+        round source otherwise
+
+        :returns: round, None when unknown
+        """
+        if self.__confirmation_tracker is not None:
+            last_round = self.__confirmation_tracker.last_round
+            if last_round is not None:
+                return last_round
+        return self.__round_source()
+
+    #
+    def invalidate(self, app_id: int, round_num: Optional[int] = None) -> None:
+        """
+        Drop cached state of application
+
+        :param app_id: application id
+        :param round_num: round application was called in
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__cache.pop(app_id, None)
+            self.__generations[app_id] = self.__generations.get(app_id, 0) + 1
+
+    #
+    def cached_addresses(self, app_id: int) -> Optional[list]:
+        """
+        Get addresses held in cached state of application, without a
+        request, e.g. the accounts its inner transactions may pay
+
+        :param app_id: application id
+
+        :returns: addresses, None when no state of the application is cached
+        """
+        with self.__lock:
+            cached = self.__cache.get(app_id)
+        if cached is None:
+            return None
+        return [
+            value for value in cached[1].values()
+            if isinstance(value, str) and encoding.is_valid_address(value)
+        ]
+
+    #
+    def __fetch(self, app_id: int) -> list:
+        """
+        Read global state of application
+
+        :param app_id: application id
+
+        :returns: global-state list of application_info response
+        """
+        params = self.__client.application_info(app_id)["params"]
+        return params.get("global-state") or []
+
+    #
+    def __get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get executor reading applications concurrently, created on first use
+
+        :returns: executor
+        """
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(
+                                        max_workers=self.__max_workers,
+                                        thread_name_prefix="state-reader"
+                                    )
+            return self.__executor
+
+    #
+    def close(self) -> None:
+        """
+        Shut down executor reading applications concurrently
+
+        :returns: None
+        """
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    #
+    def decode(self, global_state: list, contract: Optional[str] = None) -> dict:
+        """
+        Decode global-state list of application_info response
+
+        :param global_state: list of {"key", "value"} items
+        :param contract: name of TealManager contract whose schema is used
+
+        :returns: global state keyed by key name, keys which are not
+                  valid utf-8 are kept as bytes
+        """
+        schema = self.__schemas.get(contract, {})
+        state = {
+            key: 0 if value_type == self.UINT else None
+            for key, value_type in schema.items()
+        }
+        for item in global_state:
+            key = base64.b64decode(item["key"])
+            try:
+                key = key.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+            value = item["value"]
+            if value["type"] == 2:
+                state[key] = value.get("uint", 0)
+                continue
+            raw = base64.b64decode(value.get("bytes", ""))
+            if schema.get(key) == self.ADDRESS and len(raw) == 32:
+                state[key] = encoding.encode_address(raw)
+            else:
+                state[key] = raw
+        return state
@@ -0,0 +1,226 @@
+#
+import copy
+import time
+import threading
+
+#
+from typing import Optional
+
+#
+from algosdk.transaction import SuggestedParams
+from algosdk.v2client.algod import AlgodClient
+
+
+#
+class SuggestedParamsProvider:
+    """
+    SuggestedParamsProvider object for sharing cached suggested params
+    between transaction builders and keeping their validity window
+    anchored to the current round
+    """
+
+    # protocol limit for last_valid - first_valid
+    MAX_TXN_LIFE = 1000
+
+    #
+    def __init__(
+                self,
+                client: Optional[AlgodClient],
+                refresh_rounds: int = 100,
+                validity_rounds: int = MAX_TXN_LIFE,
+                block_time: float = 3.3
+            ) -> None:
+        """
+        Constructor
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param refresh_rounds: rounds after which cached params are refetched
+        :param validity_rounds: rounds each transaction stays valid for
+        :param block_time: seconds per round used to estimate current round,
+                           should not be lower than the real block time
+
+        :returns: None
+        """
+        if not 0 < validity_rounds <= self.MAX_TXN_LIFE:
+            raise ValueError("validity_rounds must be in 1..{}".format(self.MAX_TXN_LIFE))
+
+        self.__client = client
+        self.__refresh_rounds = refresh_rounds
+        self.__validity_rounds = validity_rounds
+        self.__block_time = block_time
+        self.__lock = threading.Lock()
+        self.__params = None
+        self.__fetched_at = 0.0
+        self.__refreshes = 0
+        self.__hits = 0
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    #
+    @property
+    def refreshes(self) -> int:
+        """
+        Getter for refreshes private field
+
+        :returns: number of suggested_params requests made
+        """
+        return self.__refreshes
+
+    #
+    @property
+    def hits(self) -> int:
+        """
+        Getter for hits private field
+
+        :returns: number of params served from cache
+        """
+        return self.__hits
+
+    #
+    def refresh(self) -> SuggestedParams:
+        """
+        Fetch suggested params from algod
+
+        :returns: fetched params
+        """
+        params = self.__client.suggested_params()
+        self.update(params)
+        return params
+
+    #
+    def update(self, params: SuggestedParams) -> None:
+        """
+        Replace cached params with params fetched by the caller,
+        used by clients that fetch params asynchronously
+
+        :param params: fresh suggested params
+
+        :returns: None
+        """
+        with self.__lock:
+            self.__params = params
+            self.__fetched_at = time.monotonic()
+            self.__refreshes += 1
+
+    #
+    def is_stale(self) -> bool:
+        """
+        Check whether params have to be fetched before next get
+
+        :returns: True when params are missing or older than refresh_rounds
+        """
+        with self.__lock:
+            return self.__is_stale()
+
+    #
+    def current_round(self) -> Optional[int]:
+        """
+        Estimate current round from the last fetched params and elapsed time
+
+        :returns: estimated round, None before params were fetched
+        """
+        with self.__lock:
+            if self.__params is None:
+                return None
+            return self.__estimate_round()
+
+    #
+    def get(self) -> SuggestedParams:
+        """
+        Get params for a new transaction, valid from the current round
+        for validity_rounds rounds
+
+        :returns: copy of cached params with tightened validity window
+        """
+        with self.__lock:
+            stale = self.__is_stale()
+            if not stale:
+                self.__hits += 1
+        if stale:
+            self.refresh()
+
+        with self.__lock:
+            params = copy.copy(self.__params)
+            params.first = self.__estimate_round()
+            params.last = params.first + self.__validity_rounds
+        return params
+
+    #
+    def start(self) -> None:
+        """
+        Start refreshing params in background every refresh_rounds rounds
+
+        :returns: None
+        """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+                            target=self.__run,
+                            name="suggested-params",
+                            daemon=True
+                        )
+        self.__thread.start()
+
+    #
+    def stop(self) -> None:
+        """
+        Stop background refresh
+
+        :returns: None
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    #
+    def stats(self) -> dict:
+        """
+        Get refresh and cache hit counters
+
+        :returns: refreshes, hits and hit ratio
+        """
+        total = self.__refreshes + self.__hits
+        return {
+            "refreshes": self.__refreshes,
+            "hits": self.__hits,
+            "hit_ratio": self.__hits / total if total else 0.0
+        }
+
+    #
+    def __is_stale(self) -> bool:
+        """
+        Check params freshness, caller holds the lock
+
+        :returns: True when params are missing or older than refresh_rounds
+        """
+        return (
+            self.__params is None
+            or self.__estimate_round() - self.__params.first >= self.__refresh_rounds
+        )
+
+    #
+    def __estimate_round(self) -> int:
+        """
+        Estimate current round, caller holds the lock
+
+        :returns: estimated round
+        """
+        elapsed = time.monotonic() - self.__fetched_at
+        return self.__params.first + int(elapsed / self.__block_time)
+
+    #
+    def __run(self) -> None:
+        """
+        Background refresh loop
+
+        :returns: None
+        """
+        interval = self.__refresh_rounds * self.__block_time
+        while not self.__stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception:
+                # next builder call refreshes synchronously if params expire
+                continue
@@ -1,17 +1,28 @@
 #
+from __future__ import annotations
+
+#
+import os
 import base64
+import inspect
+from importlib import metadata
 #
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-#
-from pyteal import And, Cond, Expr, Assert, App, Txn, Mode
-from pyteal import Bytes, Int, Approve, Return, Btoi, Log
-from pyteal import Sha256, Addr, Seq, Or, Global, OnComplete
-from pyteal import compileTeal, InnerTxnBuilder, TxnField, TxnType, InnerTxn
+# pyteal is imported lazily by the builders, only when a contract
+# has to be generated
+if TYPE_CHECKING:
+    from pyteal import Cond, Expr
 
 #
 from algosdk.v2client.algod import AlgodClient
 
+#
+from assembler import TealAssembler
+from metrics import REGISTRY, MetricsRegistry, instrumented
+from profiling import profiled
+from program_cache import ProgramCache
+
 
 #
 class TealManager:
@@ -19,16 +30,86 @@ class TealManager:
     TealManager object for creating teal contracts from pyteal code
     """
 
+    # teal version and mode contracts are compiled for
+    TEAL_VERSION = 5
+    MODE = "Application"
+
+    # contracts compiled for a newer teal version than TEAL_VERSION
+    CONTRACT_VERSIONS = {
+        "swap_registry": 8
+    }
+
+    # from this version approval and clear programs must share a version
+    SYNC_PROGRAMS_VERSION = 6
+
+    # from this version contracts are built from their optimized variant
+    # and dispatch on application argument 0 with a single match opcode,
+    # lock_redeem_dest reads no global twice and only gets the match
+    OPTIMIZED_VERSION = 8
+    OPTIMIZED_CONTRACTS = {
+        "commit": "commit_optimized",
+        "lock": "lock_optimized"
+    }
+
+    # swap registry box: alice(32) | bob(32) | amount(8) | timelock(8) | hashlock(32)
+    SWAP_ID_SIZE = 32
+    SWAP_BOX_SIZE = 112
+    SWAP_BOX_COST = 2500 + 400 * (SWAP_ID_SIZE + SWAP_BOX_SIZE)
+
+    # value types of global keys written by each contract
+    STATE_SCHEMAS = {
+        "commit": {
+            "committed_amount": "uint",
+            "lock_timestamp": "uint",
+            "alice": "address",
+            "bob": "address",
+            "hashlock": "bytes"
+        },
+        "lock": {
+            "committed_amount": "uint",
+            "hashlock": "bytes",
+            "alice": "address",
+            "receiver": "address"
+        },
+        "lock_redeem_dest": {
+            "asset_id": "uint",
+            "committed_amount": "uint",
+            "hashlock": "bytes",
+            "receiver": "address"
+        }
+    }
+
+    # backends turning TEAL source into bytecode
+    ALGOD_BACKEND = "algod"
+    LOCAL_BACKEND = "local"
+
     #
-    def __init__(self, path: str) -> None:
+    def __init__(
+                self,
+                path: str,
+                cache: Optional[ProgramCache] = None,
+                versions: Optional[dict] = None,
+                metrics: Optional[MetricsRegistry] = None
+            ) -> None:
         """
         Constructor
 
         :param path: path where smart contracts should be saved
+        :param cache: compiled programs cache, by default persisted
+                      in cache directory under path
+        :param versions: teal version per contract deployed by this
+                         manager, e.g. {"commit": OPTIMIZED_VERSION},
+                         overriding CONTRACT_VERSIONS
+        :param metrics: registry compile latency is recorded in, the
+                        package REGISTRY by default
 
         :returns: None
         """
         self.__path = path
+        self.__cache = cache or ProgramCache(os.path.join(path, "cache"))
+        self.__versions = dict(versions or {})
+        self.__teal_sources = {}
+        self.__metrics = metrics or REGISTRY
 
     #
     @property
@@ -41,15 +122,97 @@ class TealManager:
         return self.__path
 
     #
-    def compile_teal_file(self, teal_code) -> str:
+    @property
+    def cache(self) -> Optional[ProgramCache]:
+        """
+        getter for cache private field
+
+        :returns: cache field value
+        """
+        return self.__cache
+
+    #
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """
+        getter for metrics private field
+
+        :returns: metrics field value
+        """
+        return self.__metrics
+
+    #
+    def get_version(self, contract: str) -> int:
+        """
+        Get teal version contract is compiled for
+
+        :param contract: name of TealManager contract method
+
+        :returns: teal version
+        """
+        if contract in self.__versions:
+            return self.__versions[contract]
+        return self.CONTRACT_VERSIONS.get(contract, self.TEAL_VERSION)
+
+    #
+    @staticmethod
+    def match_dispatch(teal_code: str) -> str:
+        """
+        Replace runs of Cond branches comparing application argument 0
+        with byte constants by one match opcode, first equal constant
+        wins and no match falls through as the Cond chain does
+
+        :param teal_code: TEAL assembly program, version 8 or newer
+
+        :returns: TEAL assembly program
+        """
+        lines = teal_code.split("\n")
+        out = []
+        i = 0
+        while i < len(lines):
+            selectors, labels = [], []
+            j = i
+            while (
+                j + 3 < len(lines)
+                and lines[j] == "txna ApplicationArgs 0"
+                and len(lines[j + 1].split(" ")) == 2
+                and lines[j + 1].split(" ")[0] in ("byte", "pushbytes")
+                and lines[j + 2] == "=="
+                and lines[j + 3].startswith("bnz ")
+            ):
+                selectors.append(lines[j + 1].split(" ")[1])
+                labels.append(lines[j + 3][len("bnz "):])
+                j += 4
+            if len(selectors) < 2:
+                out.append(lines[i])
+                i += 1
+                continue
+            # match compares the top of stack with the constants below it
+            out += [
+                "pushbytess {}".format(" ".join(selectors)),
+                "txna ApplicationArgs 0",
+                "match {}".format(" ".join(labels))
+            ]
+            i = j
+        return "\n".join(out)
+
+    #
+    def compile_teal_file(self, teal_code, version: Optional[int] = None) -> str:
         """
         Compile TEAL code to base64-encoded TEAL.
 
         :param teal_code: pyteal expression
+        :param version: teal version, TEAL_VERSION by default
 
         :returns: A TEAL assembly program compiled from the input expression.
         """
-        return compileTeal(teal_code, mode=Mode.Application, version=5)
+        from pyteal import compileTeal, Mode
+
+        return compileTeal(
+                    teal_code,
+                    mode=Mode.Application,
+                    version=version or self.TEAL_VERSION
+                )
 
     #
     def save_teal_to_file(self, teal_code, filename: str) -> None:
@@ -69,13 +232,16 @@ class TealManager:
     def compile_teal_code(
                 self,
                 client: Optional[AlgodClient],
-                filename: str
+                filename: str,
+                backend: str = ALGOD_BACKEND
             ) -> bytes:
         """
         Convert TEAL assembly program to base64
 
         param client: Client class for algod. Handles all algod requests.
         param filename: filename from  where compiled program should be read
+        param backend: ALGOD_BACKEND to compile with algod compile endpoint,
+                       LOCAL_BACKEND to assemble offline
 
         :returns: compiled bytes
         """
@@ -83,6 +249,31 @@ class TealManager:
         with open("{}/{}".format(self.path, filename), "r") as f:
             teal_program = f.read()
 
+        return self.compile_teal_source(client, teal_program, backend)
+
+    #
+    @profiled
+    @instrumented("compile")
+    def compile_teal_source(
+                self,
+                client: Optional[AlgodClient],
+                teal_program: str,
+                backend: str = ALGOD_BACKEND
+            ) -> bytes:
+        """
+        Convert TEAL assembly program to bytecode
+
+        param client: Client class for algod. Handles all algod requests.
+        param teal_program: TEAL assembly program
+        param backend: compile backend, see compile_teal_code
+
+        :returns: compiled bytes
+        """
+        if backend == self.LOCAL_BACKEND:
+            return TealAssembler().assemble(teal_program)
+        if backend != self.ALGOD_BACKEND:
+            raise ValueError("unknown compile backend {}".format(backend))
+
         teal_result = client.compile(teal_program)
         teal = base64.b64decode(teal_result["result"])
         return teal
@@ -95,6 +286,10 @@ class TealManager:
         :returns: pyteal.Expr value
         """
 
+        from pyteal import And, App, Assert, Balance, Btoi, Bytes, Cond, Global, If, Int
+        from pyteal import InnerTxnBuilder, OnComplete, Return, Seq, Sha256, Txn
+        from pyteal import Approve, TxnField, TxnType
+
         committed_amount_key = Bytes("committed_amount")
         lock_timestamp_key = Bytes("lock_timestamp")
         alice_key = Bytes("alice")
@@ -108,6 +303,9 @@ class TealManager:
             App.globalPut(lock_timestamp_key, Txn.last_valid()),
             App.globalPut(alice_key, Txn.sender()),
             App.globalPut(bob_key, Txn.accounts[1]),
+            # a pooled application still holds the hashlock of its last
+            # swap, whose secret is public, until the new lock
+            App.globalPut(hashlock, Bytes("")),
             Return(Int(1))
         ])
 
@@ -140,8 +338,35 @@ class TealManager:
             Return(Int(1))
         ])
 
+        # Creator deletes a pooled application once no funds are committed
+        on_delete = Seq([
+            Assert(Txn.sender() == Global.creator_address()),
+            Assert(App.globalGet(committed_amount_key) == Int(0)),
+            # sweep fill leftover and min balance back to the creator
+            If(Balance(Global.current_application_address()) > Int(0)).Then(Seq([
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.Payment,
+                    TxnField.receiver: Global.creator_address(),
+                    TxnField.close_remainder_to: Global.creator_address(),
+                }),
+                InnerTxnBuilder.Submit()
+            ])),
+            Return(Int(1))
+        ])
+
+        # creation carrying commit args falls through to on_commit and
+        # records the commitment right away, so committing needs a
+        # single transaction
         program = Cond(
-            [Txn.application_id() == Int(0), Approve()],
+            [
+                And(
+                    Txn.application_id() == Int(0),
+                    Txn.application_args.length() == Int(0)
+                ),
+                Approve()
+            ],
+            [Txn.on_completion() == OnComplete.DeleteApplication, on_delete],
             [Txn.application_args[0] == Bytes("commit"), on_commit],
             [Txn.application_args[0] == Bytes("lock"), on_lock],
             [Txn.application_args[0] == Bytes("claim"), on_claim]
@@ -158,6 +383,9 @@ class TealManager:
         :returns: pyteal.Expr value
         """
 
+        from pyteal import App, Assert, Btoi, Bytes, Cond, Int, InnerTxnBuilder
+        from pyteal import Return, Seq, Sha256, Txn, Approve, TxnField, TxnType
+
         committed_amount_key = Bytes("committed_amount")
         hashlock_key = Bytes("hashlock")
         alice_key = Bytes("alice")
@@ -207,6 +435,10 @@ class TealManager:
     # redeem on simulated destination chain. This is not part of protocol
     @staticmethod
     def lock_redeem_dest():
+        from pyteal import App, Assert, Balance, Btoi, Bytes, Cond, Global, If, Int
+        from pyteal import InnerTxnBuilder, OnComplete, Return, Seq, Sha256, Txn
+        from pyteal import Approve, TxnField, TxnType
+
         asset_id_key = Bytes("asset_id")
         committed_amount_key = Bytes("committed_amount")
         hashlock_key = Bytes("hashlock")
@@ -229,8 +461,26 @@ class TealManager:
             Return(Int(1))
         ])
 
+        # Delete pooled application logic
+        on_delete = Seq([
+            Assert(Txn.sender() == Global.creator_address()),
+            Assert(App.globalGet(committed_amount_key) == Int(0)),
+            # sweep fill leftover and min balance back to the creator
+            If(Balance(Global.current_application_address()) > Int(0)).Then(Seq([
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.Payment,
+                    TxnField.receiver: Global.creator_address(),
+                    TxnField.close_remainder_to: Global.creator_address(),
+                }),
+                InnerTxnBuilder.Submit()
+            ])),
+            Return(Int(1))
+        ])
+
         program = Cond(
             [Txn.application_id() == Int(0), Approve()],
+            [Txn.on_completion() == OnComplete.DeleteApplication, on_delete],
             [Txn.application_args[0] == Bytes("lock"), on_lock],
             [Txn.application_args[0] == Bytes("redeem"), on_redeem]
         )
@@ -238,14 +488,350 @@ class TealManager:
         return program
 
     #
-    def deploy_contract(self, client, contract):
-        teal_code = self.compile_teal_file(TealManager.__dict__[contract]())
-        self.save_teal_to_file(teal_code, '{}.teal'.format(contract))
-        compiled_teal = self.compile_teal_code(client, "{}.teal".format(contract))
-        clear_teal = self.compile_teal_code(client, "clear.teal")
+    @staticmethod
+    def commit_optimized() -> Optional[Expr]:
+        """
+        PyTeal code of commit for OPTIMIZED_VERSION. Calls carrying
+        arguments are dispatched right after the delete check instead
+        of after the creation check as well, and a global read more
+        than once by a branch is loaded into scratch space once.
+
+        :returns: pyteal.Expr value
+        """
+        from pyteal import App, Assert, Balance, Btoi, Bytes, Cond, Global, If, Int
+        from pyteal import InnerTxnBuilder, OnComplete, Return, ScratchVar, Seq, Sha256, Txn
+        from pyteal import Approve, TealType, TxnField, TxnType
+
+        committed_amount_key = Bytes("committed_amount")
+        lock_timestamp_key = Bytes("lock_timestamp")
+        alice_key = Bytes("alice")
+        bob_key = Bytes("bob")
+        hashlock = Bytes("hashlock")
+
+        on_commit = Seq([
+            Assert(App.globalGet(committed_amount_key) == Int(0)),
+            App.globalPut(committed_amount_key, Btoi(Txn.application_args[1])),
+            App.globalPut(lock_timestamp_key, Txn.last_valid()),
+            App.globalPut(alice_key, Txn.sender()),
+            App.globalPut(bob_key, Txn.accounts[1]),
+            # a pooled application still holds the hashlock of its last
+            # swap, whose secret is public, until the new lock
+            App.globalPut(hashlock, Bytes("")),
+            Return(Int(1))
+        ])
+
+        committed_amount = ScratchVar(TealType.uint64)
+
+        on_lock = Seq([
+            Assert(App.globalGet(alice_key) == Txn.sender()),
+            committed_amount.store(App.globalGet(committed_amount_key)),
+            Assert(committed_amount.load() > Int(0)),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: committed_amount.load(),
+                TxnField.receiver: Global.current_application_address(),
+            }),
+            InnerTxnBuilder.Submit(),
+            App.globalPut(hashlock, Txn.application_args[1]),
+            Return(Int(1))
+        ])
+
+        on_claim = Seq([
+            Assert(App.globalGet(bob_key) == Txn.sender()),
+            Assert(Sha256(Txn.application_args[1]) == App.globalGet(hashlock)),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: App.globalGet(committed_amount_key),
+                TxnField.receiver: Txn.sender(),
+            }),
+            InnerTxnBuilder.Submit(),
+            App.globalPut(committed_amount_key, Int(0)),
+            Return(Int(1))
+        ])
+
+        on_delete = Seq([
+            Assert(Txn.sender() == Global.creator_address()),
+            Assert(App.globalGet(committed_amount_key) == Int(0)),
+            # sweep fill leftover and min balance back to the creator
+            If(Balance(Global.current_application_address()) > Int(0)).Then(Seq([
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.Payment,
+                    TxnField.receiver: Global.creator_address(),
+                    TxnField.close_remainder_to: Global.creator_address(),
+                }),
+                InnerTxnBuilder.Submit()
+            ])),
+            Return(Int(1))
+        ])
+
+        # only creation may come without arguments, any other call
+        # without arguments is rejected as reading argument 0 does
+        on_no_args = Seq([
+            Assert(Txn.application_id() == Int(0)),
+            Approve()
+        ])
+
+        program = Cond(
+            [Txn.on_completion() == OnComplete.DeleteApplication, on_delete],
+            [Txn.application_args.length() == Int(0), on_no_args],
+            [Txn.application_args[0] == Bytes("commit"), on_commit],
+            [Txn.application_args[0] == Bytes("lock"), on_lock],
+            [Txn.application_args[0] == Bytes("claim"), on_claim]
+        )
+
+        return program
+
+    #
+    @staticmethod
+    def lock_optimized() -> Optional[Cond]:
+        """
+        PyTeal code of lock for OPTIMIZED_VERSION. Lock pays from the
+        call arguments it stores instead of reading them back from global
+        state, redeem loads the locked amount into scratch space once.
+
+        :returns: pyteal.Expr value
+        """
+        from pyteal import App, Assert, Btoi, Bytes, Cond, Int, InnerTxnBuilder, Return
+        from pyteal import ScratchVar, Seq, Sha256, Txn, Approve, TealType, TxnField, TxnType
+
+        committed_amount_key = Bytes("committed_amount")
+        hashlock_key = Bytes("hashlock")
+        receiver_key = Bytes("receiver")
+
+        committed_amount = ScratchVar(TealType.uint64)
+
+        # the receiver equals accounts 0 once asserted
+        on_lock = Seq([
+            Assert(App.globalGet(committed_amount_key) == Int(0)),
+            Assert(App.globalGet(receiver_key) == Txn.accounts[0]),
+            App.globalPut(committed_amount_key, Btoi(Txn.application_args[1])),
+            App.globalPut(hashlock_key, Txn.application_args[2]),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: Btoi(Txn.application_args[1]),
+                TxnField.receiver: Txn.accounts[0],
+            }),
+            InnerTxnBuilder.Submit(),
+            Return(Int(1))
+        ])
+
+        on_redeem = Seq([
+            committed_amount.store(App.globalGet(committed_amount_key)),
+            Assert(committed_amount.load() > Int(0)),
+            Assert(Sha256(Txn.application_args[1]) == App.globalGet(hashlock_key)),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: committed_amount.load(),
+                TxnField.receiver: Txn.sender(),
+            }),
+            InnerTxnBuilder.Submit(),
+            App.globalPut(committed_amount_key, Int(0)),
+            Return(Int(1))
+        ])
+
+        program = Cond(
+            [Txn.application_id() == Int(0), Approve()],
+            [Txn.application_args[0] == Bytes("lock"), on_lock],
+            [Txn.application_args[0] == Bytes("redeem"), on_redeem]
+        )
+
+        return program
+
+    #
+    @profiled
+    def get_teal_source(self, contract: str, version: Optional[int] = None) -> str:
+        """
+        Build TEAL source of contract. Pyteal compilation runs only when
+        the builder source, pyteal version, TEAL version or mode changed
+        since the TEAL source was last generated
+
+        :param contract: name of TealManager contract method
+        :param version: teal version, contract version by default
+
+        :returns: TEAL assembly program
+        """
+        version = version or self.get_version(contract)
+        teal_code = self.__teal_sources.get((contract, version))
+        if teal_code is not None:
+            return teal_code
+
+        optimized = version >= self.OPTIMIZED_VERSION
+        if optimized:
+            builder = TealManager.__dict__[self.OPTIMIZED_CONTRACTS.get(contract, contract)]
+        else:
+            builder = TealManager.__dict__[contract]
+        builder_source = inspect.getsource(builder.__func__)
+        if optimized:
+            builder_source += inspect.getsource(TealManager.match_dispatch)
+        key = self.cache.make_source_key(
+                    builder_source,
+                    metadata.version("pyteal"),
+                    version,
+                    self.MODE
+                )
+        teal_code = self.cache.get_source(key)
+        if teal_code is None:
+            teal_code = self.compile_teal_file(builder(), version)
+            if optimized:
+                teal_code = self.match_dispatch(teal_code)
+                if contract in self.OPTIMIZED_CONTRACTS and "\nmatch " not in teal_code:
+                    # pyteal has no match expression, the dispatch relies
+                    # on the Cond chain pyteal emits for the builder
+                    raise ValueError(
+                        "{} built for version {} has no match dispatch".format(contract, version))
+            # generated source is kept in the cache directory only, the
+            # contract sources under path are never rewritten
+            self.cache.put_source(key, teal_code)
+
+        self.__teal_sources[(contract, version)] = teal_code
+        return teal_code
+
+    #
+    def get_clear_source(self, version: int) -> str:
+        """
+        Get TEAL source of clear program matching approval program version
+
+        :param version: teal version of approval program
+
+        :returns: TEAL assembly program
+        """
+        if version >= self.SYNC_PROGRAMS_VERSION:
+            return self.get_teal_source("clear_state_program", version)
+
+        with open("{}/{}".format(self.path, "clear.teal"), "r") as f:
+            return f.read()
+
+    #
+    @profiled
+    def deploy_contract(self, client, contract, backend=ALGOD_BACKEND, version=None):
+        """
+        Get approval and clear bytecode of contract, compiled programs
+        are served from cache while their TEAL source is unchanged
+
+        :param client: Client class for algod. Handles all algod requests.
+        :param contract: name of TealManager contract method
+        :param backend: compile backend, see compile_teal_code
+        :param version: teal version, get_version of contract by default,
+                        OPTIMIZED_VERSION deploys the optimized variant
+
+        :returns: approval and clear programs bytecode
+        """
+        version = version or self.get_version(contract)
+        teal_code = self.get_teal_source(contract, version)
+        clear_code = self.get_clear_source(version)
+
+        key = self.cache.make_key(
+                    teal_code,
+                    clear_code,
+                    version,
+                    self.MODE
+                )
+        programs = self.cache.get(key)
+        if programs is not None:
+            return programs
+
+        compiled_teal = self.compile_teal_source(client, teal_code, backend)
+        clear_teal = self.compile_teal_source(client, clear_code, backend)
+        self.cache.put(key, compiled_teal, clear_teal)
 
         return compiled_teal, clear_teal
 
+    #
+    @staticmethod
+    def swap_registry() -> Optional[Expr]:
+        """
+        PyTeal code for a long-lived application holding any number of
+        swaps, each one stored in a box named by its swap id.
+
+        :returns: pyteal.Expr value
+        """
+
+        from pyteal import And, App, Assert, BoxCreate, BoxDelete, BoxExtract
+        from pyteal import BoxReplace, Btoi, Bytes, BytesZero, Concat, Cond
+        from pyteal import Global, Gtxn, InnerTxnBuilder, Int
+        from pyteal import Itob, Len, Pop, Return, Seq, Sha256, Txn, Approve
+        from pyteal import TxnField, TxnType
+
+        swap_id = Txn.application_args[1]
+        box_cost = Int(TealManager.SWAP_BOX_COST)
+
+        alice = BoxExtract(swap_id, Int(0), Int(32))
+        bob = BoxExtract(swap_id, Int(32), Int(32))
+        amount = Btoi(BoxExtract(swap_id, Int(64), Int(8)))
+        hashlock = BoxExtract(swap_id, Int(80), Int(32))
+
+        # Step 1: Alice commits funds for Bob, the payment preceding the call
+        # carries the amount and the box minimum balance
+        payment = Gtxn[0]
+        on_commit = Seq([
+            Assert(Global.group_size() == Int(2)),
+            Assert(Txn.group_index() == Int(1)),
+            Assert(Len(swap_id) == Int(TealManager.SWAP_ID_SIZE)),
+            Assert(And(
+                payment.type_enum() == TxnType.Payment,
+                payment.sender() == Txn.sender(),
+                payment.receiver() == Global.current_application_address(),
+                payment.amount() == Btoi(Txn.application_args[2]) + box_cost
+            )),
+            # fails when the swap id is already taken
+            Assert(BoxCreate(swap_id, Int(TealManager.SWAP_BOX_SIZE))),
+            App.box_put(swap_id, Concat(
+                Txn.sender(),
+                Txn.accounts[1],
+                Itob(Btoi(Txn.application_args[2])),
+                Itob(Txn.last_valid()),
+                BytesZero(Int(32))
+            )),
+            Return(Int(1))
+        ])
+
+        # Step 2: Alice locks the commitment by providing the hashlock
+        on_lock = Seq([
+            Assert(alice == Txn.sender()),
+            Assert(hashlock == BytesZero(Int(32))),
+            Assert(Len(Txn.application_args[2]) == Int(32)),
+            BoxReplace(swap_id, Int(80), Txn.application_args[2]),
+            Return(Int(1))
+        ])
+
+        # Step 3: Bob claims committed funds by providing the correct preimage,
+        # the box is deleted and its minimum balance returned to Alice
+        on_claim = Seq([
+            Assert(bob == Txn.sender()),
+            Assert(Sha256(Txn.application_args[2]) == hashlock),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: amount,
+                TxnField.receiver: Txn.sender(),
+                TxnField.fee: Int(0),
+            }),
+            InnerTxnBuilder.Next(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.amount: box_cost,
+                TxnField.receiver: alice,
+                TxnField.fee: Int(0),
+            }),
+            InnerTxnBuilder.Submit(),
+            Pop(BoxDelete(swap_id)),
+            Return(Int(1))
+        ])
+
+        program = Cond(
+            [Txn.application_id() == Int(0), Approve()],
+            [Txn.application_args[0] == Bytes("commit"), on_commit],
+            [Txn.application_args[0] == Bytes("lock"), on_lock],
+            [Txn.application_args[0] == Bytes("claim"), on_claim]
+        )
+
+        return program
+
     #
     @staticmethod
     def clear_state_program() -> int:
@@ -255,9 +841,7 @@ class TealManager:
 
         :retruns: int
         """
-        return Approve()
+        from pyteal import Approve
 
+        return Approve()
 
-tm = TealManager("smart_contracts")
-cc = tm.compile_teal_file(tm.commit())
-tm.save_teal_to_file(cc, "commit.teal")
@@ -0,0 +1,392 @@
+#
+import math
+
+#
+from typing import Optional
+from dataclasses import dataclass, field
+
+#
+from assembler import TealAssembler
+from teal import TealManager
+from teal_interpreter import cost, decode_program
+
+
+#
+class TealAnalysisError(Exception):
+    """
+    Raised when worst-case cost of a program can not be bounded
+    """
+
+
+#
+@dataclass
+class BranchReport:
+    name: str
+    pc: int
+    cost: int
+
+
+#
+@dataclass
+class ProgramReport:
+    contract: Optional[str]
+    version: int
+    size: int
+    clear_size: int
+    extra_pages: int
+    budget: int
+    max_cost: int
+    branches: dict = field(default_factory=dict)
+
+    #
+    def to_dict(self) -> dict:
+        """
+        Convert report to plain dict for JSON output
+
+        :returns: report with branch costs keyed by branch name
+        """
+        return {
+            "contract": self.contract,
+            "version": self.version,
+            "size": self.size,
+            "clear_size": self.clear_size,
+            "extra_pages": self.extra_pages,
+            "budget": self.budget,
+            "max_cost": self.max_cost,
+            "branches": {name: branch.cost for name, branch in self.branches.items()}
+        }
+
+
+#
+class TealAnalyzer:
+    """
+    TealAnalyzer object for computing worst-case opcode cost of every
+    dispatch branch and bytecode size of TEAL programs, offline
+    """
+
+    # contracts of TealManager checked by default
+    CONTRACTS = ["commit", "lock", "lock_redeem_dest", "swap_registry"]
+
+    # opcode budget of a single application call
+    APP_BUDGET = 700
+
+    # approval and clear program bytes per program page
+    PAGE_SIZE = 2048
+
+    # instructions ending evaluation
+    TERMINALS = ("err", "return", "retsub")
+
+    # branch names of OnCompletion checks
+    ON_COMPLETION = {
+        0: "noop", 1: "opt_in", 2: "close_out",
+        3: "clear_state", 4: "update", 5: "delete"
+    }
+
+    #
+    def __init__(self, budget: int = APP_BUDGET) -> None:
+        """
+        Constructor
+
+        :param budget: opcode budget the reports compare against
+
+        :returns: None
+        """
+        self.__budget = budget
+        self.__assembler = TealAssembler()
+
+    #
+    @property
+    def budget(self) -> int:
+        """
+        Getter for budget private field
+
+        :returns: opcode budget
+        """
+        return self.__budget
+
+    #
+    def analyze_contract(
+                self,
+                teal_manager: Optional[TealManager],
+                contract: str,
+                version: Optional[int] = None
+            ) -> ProgramReport:
+        """
+        Analyze TealManager contract
+
+        :param teal_manager: object for interacting with teal contracts
+        :param contract: name of TealManager contract method
+        :param version: teal version, the version contract is deployed
+                        with by default
+
+        :returns: program report
+        """
+        version = version or teal_manager.get_version(contract)
+        return self.analyze(
+                    teal_manager.get_teal_source(contract, version),
+                    teal_manager.get_clear_source(version),
+                    contract
+                )
+
+    #
+    def analyze(
+                self,
+                teal_source: str,
+                clear_source: Optional[str] = None,
+                contract: Optional[str] = None
+            ) -> ProgramReport:
+        """
+        Analyze TEAL program, e.g. output of TealManager.compile_teal_file
+
+        :param teal_source: approval program TEAL source
+        :param clear_source: clear program TEAL source, counted in the
+                             extra pages the programs need
+        :param contract: name reported for the program
+
+        :returns: program report
+        """
+        program = self.__assembler.assemble(teal_source)
+        clear_size = len(self.__assembler.assemble(clear_source)) if clear_source else 0
+        version, instructions = decode_program(program)
+
+        walker = _PathCost(instructions, version)
+        branches = {}
+        for name, pc, dispatch_cost in self.__dispatch(instructions, version):
+            if name in branches:
+                name = "{}@{}".format(name, pc)
+            branches[name] = BranchReport(name, pc, dispatch_cost + walker.longest(pc))
+
+        first_pc = min(instructions) if instructions else 0
+        max_cost = walker.longest(first_pc) if instructions else 0
+        if not branches:
+            branches["main"] = BranchReport("main", first_pc, max_cost)
+
+        size = len(program)
+        return ProgramReport(
+                    contract=contract,
+                    version=version,
+                    size=size,
+                    clear_size=clear_size,
+                    extra_pages=max(0, math.ceil((size + clear_size) / self.PAGE_SIZE) - 1),
+                    budget=self.__budget,
+                    max_cost=max_cost,
+                    branches=branches
+                )
+
+    #
+    def __dispatch(self, instructions: dict, version: int) -> list:
+        """
+        Find dispatch branches on the fall-through path from program
+        start, each named after the constant its condition tests
+
+        :param instructions: decoded program
+        :param version: program TEAL version
+
+        :returns: list of (name, target pc, cost of reaching target)
+        """
+        constants = _Constants(instructions)
+        branches = []
+        segment = []
+        spent = 0
+        pc = min(instructions) if instructions else 0
+        while pc in instructions:
+            name, immediates, next_pc = instructions[pc]
+            spent += cost(name, version)
+            if name in self.TERMINALS or name == "b":
+                break
+            if name in ("bz", "bnz"):
+                branches.append((self.__branch_name(segment, constants), immediates[0], spent))
+                segment = []
+            elif name in ("switch", "match"):
+                targets = immediates[0]
+                values = [value for value in constants.values(segment) if isinstance(value, bytes)]
+                names = self.__names(values[-len(targets):] if name == "match" else [])
+                for i, target in enumerate(targets):
+                    label = names[i] if i < len(names) else "{}_{}".format(name, i)
+                    branches.append((label, target, spent))
+                segment = []
+            elif name not in ("intcblock", "bytecblock"):
+                segment.append(pc)
+            pc = next_pc
+        return branches
+
+    #
+    def __branch_name(self, segment: list, constants) -> str:
+        """
+        Name condition of a dispatch branch
+
+        :param segment: pcs of instructions computing the condition
+        :param constants: resolver of constant loads
+
+        :returns: tested argument string, create for the creation
+                  check, no_args for the argument count check,
+                  OnCompletion name or pc of the condition
+        """
+        fields = constants.fields(segment)
+        values = constants.values(segment)
+        if "OnCompletion" in fields:
+            for value in values:
+                if isinstance(value, int) and value in self.ON_COMPLETION:
+                    return self.ON_COMPLETION[value]
+        if "ApplicationID" in fields:
+            return "create"
+        if "NumAppArgs" in fields:
+            return "no_args"
+        names = self.__names([value for value in values if isinstance(value, bytes)])
+        if names:
+            return names[0]
+        return "pc{}".format(segment[0] if segment else 0)
+
+    #
+    @staticmethod
+    def __names(values: list) -> list:
+        """
+        Decode byte constants naming branches
+
+        :param values: byte constants
+
+        :returns: utf-8 names, bytes which do not decode are skipped
+        """
+        names = []
+        for value in values:
+            try:
+                names.append(value.decode('utf-8'))
+            except UnicodeDecodeError:
+                pass
+        return names
+
+
+#
+class _Constants:
+    """
+    Resolves constant loads and field reads of decoded instructions
+    """
+
+    #
+    def __init__(self, instructions: dict) -> None:
+        """
+        :param instructions: decoded program
+        """
+        self.__instructions = instructions
+        self.__ints = ()
+        self.__bytes = ()
+        for name, immediates, _ in instructions.values():
+            if name == "intcblock":
+                self.__ints = immediates[0]
+            elif name == "bytecblock":
+                self.__bytes = immediates[0]
+
+    #
+    def values(self, segment: list) -> list:
+        """
+        :param segment: instruction pcs
+        :returns: constants loaded by the instructions, in order
+        """
+        values = []
+        for pc in segment:
+            name, immediates, _ = self.__instructions[pc]
+            if name.startswith("intc_"):
+                values.append(self.__ints[int(name[5:])])
+            elif name == "intc":
+                values.append(self.__ints[immediates[0]])
+            elif name.startswith("bytec_"):
+                values.append(self.__bytes[int(name[6:])])
+            elif name == "bytec":
+                values.append(self.__bytes[immediates[0]])
+            elif name in ("pushint", "pushbytes"):
+                values.append(immediates[0])
+            elif name in ("pushints", "pushbytess"):
+                values.extend(immediates[0])
+        return values
+
+    #
+    def fields(self, segment: list) -> set:
+        """
+        :param segment: instruction pcs
+        :returns: transaction and global fields read by the instructions
+        """
+        return {
+            immediates[0]
+            for name, immediates, _ in (self.__instructions[pc] for pc in segment)
+            if name in ("txn", "txna", "global")
+        }
+
+
+#
+class _PathCost:
+    """
+    Longest-path opcode cost over the control flow graph of a program,
+    subroutine calls are charged the worst case of the subroutine
+    """
+
+    #
+    def __init__(self, instructions: dict, version: int) -> None:
+        """
+        :param instructions: decoded program
+        :param version: program TEAL version
+        """
+        self.__instructions = instructions
+        self.__version = version
+        self.__memo = {}
+        self.__visiting = set()
+
+    #
+    def longest(self, pc: int) -> int:
+        """
+        :param pc: instruction to start from
+        :returns: worst-case cost from pc until evaluation or the
+                  subroutine pc belongs to ends
+        """
+        # iterative depth-first walk, programs are longer than the
+        # recursion limit allows
+        stack = [pc]
+        while stack:
+            top = stack[-1]
+            if top in self.__memo or top not in self.__instructions:
+                stack.pop()
+                continue
+            successors, subroutine = self.__successors(top)
+            pending = [
+                target for target in successors + subroutine
+                if target in self.__instructions and target not in self.__memo
+            ]
+            if pending:
+                if top in self.__visiting:
+                    raise TealAnalysisError("loop through pc {}, cost is unbounded".format(top))
+                self.__visiting.add(top)
+                for target in pending:
+                    if target in self.__visiting:
+                        raise TealAnalysisError(
+                            "loop through pc {}, cost is unbounded".format(target))
+                    stack.append(target)
+                continue
+
+            name = self.__instructions[top][0]
+            self.__memo[top] = (
+                cost(name, self.__version)
+                + sum(self.__memo.get(target, 0) for target in subroutine)
+                + max((self.__memo.get(target, 0) for target in successors), default=0)
+            )
+            self.__visiting.discard(top)
+            stack.pop()
+        return self.__memo.get(pc, 0)
+
+    #
+    def __successors(self, pc: int) -> tuple:
+        """
+        :param pc: instruction
+        :returns: instructions evaluation may continue at and entry of
+                  the subroutine the instruction calls
+        """
+        name, immediates, next_pc = self.__instructions[pc]
+        if name in TealAnalyzer.TERMINALS:
+            return [], []
+        if name == "b":
+            return [immediates[0]], []
+        if name in ("bz", "bnz"):
+            return [next_pc, immediates[0]], []
+        if name in ("switch", "match"):
+            return [next_pc, *immediates[0]], []
+        if name == "callsub":
+            return [next_pc], [immediates[0]]
+        return [next_pc], []
@@ -0,0 +1,1027 @@
+#
+import base64
+import hashlib
+import math
+
+#
+from typing import Optional
+
+#
+from algosdk import encoding, logic
+
+#
+from assembler import (
+    OPCODES, OPCODE_NAMES, FIELD_TABLES, INTCBLOCK, BYTECBLOCK, decode_varuint
+)
+
+
+# largest uint64 value
+MAX_UINT = 2 ** 64 - 1
+
+# longest byte string on the stack
+MAX_BYTES = 4096
+
+# algod opcode costs differing from 1, by first version they apply to
+OPCODE_COSTS = {
+    "sha256": ((1, 7), (2, 35)),
+    "keccak256": ((1, 26), (2, 130)),
+    "sha512_256": ((1, 9), (2, 45)),
+    "ed25519verify": ((1, 1900),),
+    "sqrt": ((4, 4),),
+    "exp": ((4, 1),),
+    "bsqrt": ((6, 40),),
+    "divw": ((6, 1),),
+    "b+": ((4, 10),),
+    "b-": ((4, 10),),
+    "b/": ((4, 20),),
+    "b*": ((4, 20),),
+    "b%": ((4, 20),),
+    "b|": ((4, 6),),
+    "b&": ((4, 6),),
+    "b^": ((4, 6),),
+    "b~": ((4, 4),),
+}
+
+#
+TXN_TYPES = {
+    "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6,
+}
+
+#
+ZERO_ADDRESS = b"\x00" * 32
+
+# uint64 operations popping two arguments and pushing one
+BINARY_UINT_OPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a // b if b else None,
+    "%": lambda a, b: a % b if b else None,
+    "<": lambda a, b: int(a < b),
+    ">": lambda a, b: int(a > b),
+    "<=": lambda a, b: int(a <= b),
+    ">=": lambda a, b: int(a >= b),
+    "&&": lambda a, b: int(bool(a and b)),
+    "||": lambda a, b: int(bool(a or b)),
+    "|": lambda a, b: a | b,
+    "&": lambda a, b: a & b,
+    "^": lambda a, b: a ^ b,
+    "shl": lambda a, b: (a << b) & MAX_UINT if b < 64 else None,
+    "shr": lambda a, b: a >> b if b < 64 else None,
+    "exp": lambda a, b: a ** b if a or b else None,
+}
+
+
+#
+class TealEvalError(Exception):
+    """
+    Raised when an application program fails or rejects
+    """
+
+
+#
+def cost(name: str, version: int) -> int:
+    """
+    Get opcode cost the way algod charges it
+
+    :param name: opcode name
+    :param version: program TEAL version
+
+    :returns: opcode cost
+    """
+    value = 1
+    for first_version, op_cost in OPCODE_COSTS.get(name, ()):
+        if version >= first_version:
+            value = op_cost
+    return value
+
+
+#
+def decode_program(program: bytes) -> tuple:
+    """
+    Decode program bytecode into instructions
+
+    :param program: program bytecode
+
+    :returns: version and {pc: (name, immediates, next pc)}
+    """
+    version, pc = decode_varuint(program, 0)
+    instructions = {}
+    while pc < len(program):
+        start = pc
+        opcode = program[pc]
+        pc += 1
+        if opcode == INTCBLOCK:
+            count, pc = decode_varuint(program, pc)
+            values = []
+            for _ in range(count):
+                value, pc = decode_varuint(program, pc)
+                values.append(value)
+            instructions[start] = ("intcblock", (tuple(values),), pc)
+            continue
+        if opcode == BYTECBLOCK:
+            count, pc = decode_varuint(program, pc)
+            values = []
+            for _ in range(count):
+                length, pc = decode_varuint(program, pc)
+                values.append(program[pc:pc + length])
+                pc += length
+            instructions[start] = ("bytecblock", (tuple(values),), pc)
+            continue
+        if opcode not in OPCODE_NAMES:
+            raise TealEvalError("invalid opcode {:#x} at {}".format(opcode, start))
+
+        name = OPCODE_NAMES[opcode]
+        immediates = []
+        for kind in OPCODES[name][2]:
+            if kind == "label":
+                offset = int.from_bytes(program[pc:pc + 2], 'big', signed=True)
+                pc += 2
+                immediates.append(offset)
+            elif kind == "labels":
+                count = program[pc]
+                pc += 1
+                offsets = []
+                for _ in range(count):
+                    offsets.append(int.from_bytes(program[pc:pc + 2], 'big', signed=True))
+                    pc += 2
+                immediates.append(tuple(offsets))
+            elif kind == "bytes":
+                length, pc = decode_varuint(program, pc)
+                immediates.append(program[pc:pc + length])
+                pc += length
+            elif kind == "varuint":
+                value, pc = decode_varuint(program, pc)
+                immediates.append(value)
+            elif kind == "bytes_list":
+                count, pc = decode_varuint(program, pc)
+                values = []
+                for _ in range(count):
+                    length, pc = decode_varuint(program, pc)
+                    values.append(program[pc:pc + length])
+                    pc += length
+                immediates.append(tuple(values))
+            elif kind == "varuint_list":
+                count, pc = decode_varuint(program, pc)
+                values = []
+                for _ in range(count):
+                    value, pc = decode_varuint(program, pc)
+                    values.append(value)
+                immediates.append(tuple(values))
+            elif kind == "int8":
+                immediates.append(int.from_bytes(program[pc:pc + 1], 'big', signed=True))
+                pc += 1
+            elif kind in FIELD_TABLES:
+                immediates.append(FIELD_TABLES[kind][program[pc]])
+                pc += 1
+            else:
+                immediates.append(program[pc])
+                pc += 1
+        # branch offsets are relative to the end of the instruction
+        if name in ("bnz", "bz", "b", "callsub"):
+            immediates = [pc + immediates[0]]
+        elif name in ("switch", "match"):
+            immediates = [tuple(pc + offset for offset in immediates[0])]
+        instructions[start] = (name, tuple(immediates), pc)
+    return version, instructions
+
+
+#
+class TealInterpreter:
+    """
+    TealInterpreter object evaluating application programs against
+    an in-memory ledger, it covers the opcodes application contracts
+    of this project compile to
+    """
+
+    # decoded programs shared between evaluations
+    __programs = {}
+
+    #
+    def __init__(self, ledger, group_state: dict, group_index: int, app_id: int) -> None:
+        """
+        Constructor
+
+        :param ledger: FakeLedger evaluation reads and writes
+        :param group_state: evaluation state shared by the transaction
+                            group, {"txns", "round", "timestamp",
+                            "budget", "fee_credit"}
+        :param group_index: index of the application call in the group
+        :param app_id: id of the called application, allocated already
+                       when the call creates it
+
+        :returns: None
+        """
+        self.__ledger = ledger
+        self.__group_state = group_state
+        self.__txns = group_state["txns"]
+        self.__group_index = group_index
+        self.__txn = self.__txns[group_index]
+        self.__app_id = app_id
+        self.__app_address = encoding.decode_address(logic.get_application_address(app_id))
+        self.__version = None
+        self.__stack = []
+        self.__scratch = [0] * 256
+        self.__frames = []
+        self.__intc = ()
+        self.__bytec = ()
+        self.__inner = None
+        self.__last_inner = None
+        self.__logs = []
+
+    #
+    @property
+    def logs(self) -> list:
+        """
+        Getter for logs private field
+
+        :returns: values logged by the program
+        """
+        return self.__logs
+
+    #
+    @classmethod
+    def decode(cls, program: bytes) -> tuple:
+        """
+        Decode program once and reuse it on later evaluations
+
+        :param program: program bytecode
+
+        :returns: version and instructions, see decode_program
+        """
+        decoded = cls.__programs.get(program)
+        if decoded is None:
+            decoded = decode_program(program)
+            cls.__programs[program] = decoded
+        return decoded
+
+    #
+    def run(self, program: bytes) -> bool:
+        """
+        Evaluate program
+
+        :param program: program bytecode
+
+        :returns: True when program approves
+        """
+        version, instructions = self.decode(program)
+        self.__version = version
+        pc = next(iter(instructions), None)
+        while pc is not None and pc in instructions:
+            name, immediates, next_pc = instructions[pc]
+            if OPCODES.get(name, (0, 1))[1] > version:
+                raise TealEvalError("{} needs version {}".format(name, OPCODES[name][1]))
+            self.__group_state["budget"] -= cost(name, version)
+            if self.__group_state["budget"] < 0:
+                raise TealEvalError("dynamic cost budget exceeded")
+
+            if name == "return":
+                value = self.__pop_uint()
+                return value != 0
+            pc = self.__step(name, immediates, next_pc)
+            if pc is not None and pc not in instructions and pc != len(program):
+                raise TealEvalError("branch to invalid position {}".format(pc))
+
+        # program ended without return
+        if len(self.__stack) != 1:
+            raise TealEvalError("stack must hold one value at the end")
+        value = self.__stack.pop()
+        if not isinstance(value, int):
+            raise TealEvalError("program ended with bytes on the stack")
+        return value != 0
+
+    #
+    def __step(self, name: str, immediates: tuple, next_pc: int) -> Optional[int]:
+        """
+        Execute one instruction
+
+        :param name: opcode name
+        :param immediates: decoded immediates
+        :param next_pc: position of next instruction
+
+        :returns: position of instruction executed next
+        """
+        stack = self.__stack
+
+        if name in BINARY_UINT_OPS:
+            b = self.__pop_uint()
+            a = self.__pop_uint()
+            value = BINARY_UINT_OPS[name](a, b)
+            if value is None or not 0 <= value <= MAX_UINT:
+                raise TealEvalError("{} {} {} is out of range".format(a, name, b))
+            stack.append(value)
+        elif name in ("==", "!="):
+            b = self.__pop()
+            a = self.__pop()
+            if type(a) is not type(b):
+                raise TealEvalError("{} of mismatched types".format(name))
+            stack.append(int((a == b) == (name == "==")))
+        elif name == "!":
+            stack.append(int(self.__pop_uint() == 0))
+        elif name == "~":
+            stack.append(MAX_UINT ^ self.__pop_uint())
+        elif name == "len":
+            stack.append(len(self.__pop_bytes()))
+        elif name == "itob":
+            stack.append(self.__pop_uint().to_bytes(8, 'big'))
+        elif name == "btoi":
+            value = self.__pop_bytes()
+            if len(value) > 8:
+                raise TealEvalError("btoi of {} bytes".format(len(value)))
+            stack.append(int.from_bytes(value, 'big'))
+        elif name == "mulw":
+            b = self.__pop_uint()
+            a = self.__pop_uint()
+            stack.extend([(a * b) >> 64, (a * b) & MAX_UINT])
+        elif name == "addw":
+            b = self.__pop_uint()
+            a = self.__pop_uint()
+            stack.extend([(a + b) >> 64, (a + b) & MAX_UINT])
+        elif name == "sqrt":
+            stack.append(math.isqrt(self.__pop_uint()))
+        elif name == "bitlen":
+            value = self.__pop()
+            if isinstance(value, bytes):
+                value = int.from_bytes(value, 'big')
+            stack.append(value.bit_length())
+        elif name == "sha256":
+            stack.append(hashlib.sha256(self.__pop_bytes()).digest())
+        elif name == "sha512_256":
+            stack.append(encoding.checksum(self.__pop_bytes()))
+        elif name == "err":
+            raise TealEvalError("err opcode executed")
+
+        elif name == "intcblock":
+            self.__intc = immediates[0]
+        elif name == "bytecblock":
+            self.__bytec = immediates[0]
+        elif name in ("intc", "intc_0", "intc_1", "intc_2", "intc_3"):
+            stack.append(self.__constant(self.__intc, name, immediates))
+        elif name in ("bytec", "bytec_0", "bytec_1", "bytec_2", "bytec_3"):
+            stack.append(self.__constant(self.__bytec, name, immediates))
+        elif name in ("pushint", "pushbytes"):
+            stack.append(immediates[0])
+        elif name in ("pushints", "pushbytess"):
+            stack.extend(immediates[0])
+
+        elif name == "txn":
+            stack.append(self.__txn_field(self.__group_index, immediates[0]))
+        elif name == "txna":
+            stack.append(self.__txn_field(self.__group_index, immediates[0], immediates[1]))
+        elif name == "txnas":
+            index = self.__pop_uint()
+            stack.append(self.__txn_field(self.__group_index, immediates[0], index))
+        elif name == "gtxn":
+            stack.append(self.__txn_field(immediates[0], immediates[1]))
+        elif name == "gtxna":
+            stack.append(self.__txn_field(immediates[0], immediates[1], immediates[2]))
+        elif name == "gtxnas":
+            index = self.__pop_uint()
+            stack.append(self.__txn_field(immediates[0], immediates[1], index))
+        elif name == "gtxns":
+            stack.append(self.__txn_field(self.__pop_uint(), immediates[0]))
+        elif name == "gtxnsa":
+            stack.append(self.__txn_field(self.__pop_uint(), immediates[0], immediates[1]))
+        elif name == "gtxnsas":
+            index = self.__pop_uint()
+            stack.append(self.__txn_field(self.__pop_uint(), immediates[0], index))
+        elif name == "global":
+            stack.append(self.__global_field(immediates[0]))
+
+        elif name == "load":
+            stack.append(self.__scratch[immediates[0]])
+        elif name == "store":
+            self.__scratch[immediates[0]] = self.__pop()
+        elif name == "loads":
+            stack.append(self.__scratch[self.__scratch_index()])
+        elif name == "stores":
+            value = self.__pop()
+            self.__scratch[self.__scratch_index()] = value
+
+        elif name == "bnz":
+            return immediates[0] if self.__pop_uint() else next_pc
+        elif name == "bz":
+            return next_pc if self.__pop_uint() else immediates[0]
+        elif name == "b":
+            return immediates[0]
+        elif name == "switch":
+            index = self.__pop_uint()
+            targets = immediates[0]
+            return targets[index] if index < len(targets) else next_pc
+        elif name == "match":
+            targets = immediates[0]
+            value = self.__pop()
+            candidates = [self.__pop() for _ in targets][::-1]
+            for target, candidate in zip(targets, candidates):
+                if type(candidate) is type(value) and candidate == value:
+                    return target
+            return next_pc
+        elif name == "assert":
+            if not self.__pop_uint():
+                raise TealEvalError("assert failed at {}".format(next_pc - 1))
+        elif name == "callsub":
+            self.__frames.append([next_pc, len(stack), 0, 0])
+            return immediates[0]
+        elif name == "retsub":
+            if not self.__frames:
+                raise TealEvalError("retsub without callsub")
+            return_pc, height, args, returns = self.__frames.pop()
+            if returns or args:
+                values = stack[len(stack) - returns:] if returns else []
+                del stack[height - args:]
+                stack.extend(values)
+            return return_pc
+        elif name == "proto":
+            frame = self.__frames[-1]
+            frame[2], frame[3] = immediates
+            if frame[1] < frame[2]:
+                raise TealEvalError("proto arguments missing")
+        elif name == "frame_dig":
+            stack.append(stack[self.__frame_index(immediates[0])])
+        elif name == "frame_bury":
+            value = self.__pop()
+            stack[self.__frame_index(immediates[0])] = value
+
+        elif name == "pop":
+            self.__pop()
+        elif name == "popn":
+            for _ in range(immediates[0]):
+                self.__pop()
+        elif name == "dup":
+            stack.append(self.__peek(0))
+        elif name == "dupn":
+            stack.extend([self.__peek(0)] * immediates[0])
+        elif name == "dup2":
+            stack.extend([self.__peek(1), self.__peek(0)])
+        elif name == "dig":
+            stack.append(self.__peek(immediates[0]))
+        elif name == "bury":
+            value = self.__pop()
+            self.__peek(immediates[0] - 1)
+            stack[-immediates[0]] = value
+        elif name == "swap":
+            self.__peek(1)
+            stack[-1], stack[-2] = stack[-2], stack[-1]
+        elif name == "select":
+            condition = self.__pop_uint()
+            b = self.__pop()
+            a = self.__pop()
+            stack.append(b if condition else a)
+        elif name == "cover":
+            value = self.__pop()
+            if immediates[0] > len(stack):
+                raise TealEvalError("stack underflow")
+            stack.insert(len(stack) - immediates[0], value)
+        elif name == "uncover":
+            self.__peek(immediates[0])
+            stack.append(stack.pop(len(stack) - 1 - immediates[0]))
+
+        elif name == "concat":
+            b = self.__pop_bytes()
+            a = self.__pop_bytes()
+            stack.append(self.__check_length(a + b))
+        elif name == "bzero":
+            stack.append(self.__check_length(b"\x00" * self.__pop_uint()))
+        elif name == "substring":
+            stack.append(self.__slice(self.__pop_bytes(), immediates[0], immediates[1]))
+        elif name == "substring3":
+            end = self.__pop_uint()
+            start = self.__pop_uint()
+            stack.append(self.__slice(self.__pop_bytes(), start, end))
+        elif name == "extract":
+            value = self.__pop_bytes()
+            start, length = immediates
+            end = len(value) if length == 0 else start + length
+            stack.append(self.__slice(value, start, end))
+        elif name == "extract3":
+            length = self.__pop_uint()
+            start = self.__pop_uint()
+            stack.append(self.__slice(self.__pop_bytes(), start, start + length))
+        elif name in ("extract_uint16", "extract_uint32", "extract_uint64"):
+            size = int(name[len("extract_uint"):]) // 8
+            start = self.__pop_uint()
+            value = self.__slice(self.__pop_bytes(), start, start + size)
+            stack.append(int.from_bytes(value, 'big'))
+        elif name in ("replace2", "replace3"):
+            replacement = self.__pop_bytes()
+            start = immediates[0] if name == "replace2" else self.__pop_uint()
+            value = self.__pop_bytes()
+            self.__slice(value, start, start + len(replacement))
+            stack.append(value[:start] + replacement + value[start + len(replacement):])
+        elif name == "getbyte":
+            index = self.__pop_uint()
+            value = self.__pop_bytes()
+            stack.append(self.__slice(value, index, index + 1)[0])
+        elif name == "setbyte":
+            byte = self.__pop_uint()
+            index = self.__pop_uint()
+            value = self.__pop_bytes()
+            self.__slice(value, index, index + 1)
+            if byte > 255:
+                raise TealEvalError("setbyte value {} > 255".format(byte))
+            stack.append(value[:index] + bytes([byte]) + value[index + 1:])
+        elif name == "log":
+            self.__logs.append(self.__pop_bytes())
+
+        elif name == "balance":
+            stack.append(self.__ledger.get_account(self.__account(self.__pop()))["amount"])
+        elif name == "min_balance":
+            stack.append(self.__ledger.min_balance(self.__account(self.__pop())))
+        elif name == "app_opted_in":
+            self.__pop()
+            self.__pop()
+            stack.append(0)
+        elif name == "app_global_get":
+            key = self.__pop_bytes()
+            value = self.__ledger.get_app(self.__app_id)["global_state"].get(key)
+            stack.append(0 if value is None else value)
+        elif name == "app_global_get_ex":
+            key = self.__pop_bytes()
+            app = self.__ledger.get_app(self.__application(self.__pop()))
+            value = app["global_state"].get(key) if app else None
+            stack.extend([0, 0] if value is None else [value, 1])
+        elif name == "app_global_put":
+            value = self.__pop()
+            key = self.__pop_bytes()
+            self.__ledger.put_global(self.__app_id, key, value)
+        elif name == "app_global_del":
+            self.__ledger.delete_global(self.__app_id, self.__pop_bytes())
+        elif name == "asset_holding_get":
+            asset_id = self.__asset(self.__pop())
+            holding = self.__ledger.get_account(self.__account(self.__pop()))["assets"].get(asset_id)
+            if holding is None:
+                stack.extend([0, 0])
+            else:
+                value = holding if immediates[0] == "AssetBalance" else 0
+                stack.extend([value, 1])
+        elif name == "asset_params_get":
+            asset = self.__ledger.get_asset(self.__asset(self.__pop()))
+            if asset is None:
+                stack.extend([0, 0])
+            else:
+                stack.extend([self.__asset_param(asset, immediates[0]), 1])
+        elif name == "acct_params_get":
+            address = self.__account(self.__pop())
+            account = self.__ledger.get_account(address)
+            values = {
+                "AcctBalance": account["amount"],
+                "AcctMinBalance": self.__ledger.min_balance(address),
+                "AcctAuthAddr": ZERO_ADDRESS,
+            }
+            stack.extend([values[immediates[0]], int(account["amount"] > 0)])
+
+        elif name in ("box_create", "box_extract", "box_replace", "box_del",
+                      "box_len", "box_get", "box_put"):
+            self.__box(name)
+
+        elif name == "itxn_begin":
+            if self.__inner is not None:
+                raise TealEvalError("itxn_begin without itxn_submit")
+            self.__inner = [self.__new_inner()]
+        elif name == "itxn_next":
+            if self.__inner is None:
+                raise TealEvalError("itxn_next without itxn_begin")
+            self.__inner.append(self.__new_inner())
+        elif name == "itxn_field":
+            if self.__inner is None:
+                raise TealEvalError("itxn_field without itxn_begin")
+            value = self.__pop()
+            field = immediates[0]
+            if field == "Type":
+                field, value = "TypeEnum", TXN_TYPES.get(value.decode('utf-8', 'replace'), 0)
+            self.__inner[-1][field] = value
+        elif name == "itxn_submit":
+            if self.__inner is None:
+                raise TealEvalError("itxn_submit without itxn_begin")
+            inner, self.__inner = self.__inner, None
+            self.__ledger.apply_inner(self.__app_id, inner, self.__group_state)
+            self.__last_inner = inner[-1]
+        elif name == "itxn":
+            if self.__last_inner is None or immediates[0] not in self.__last_inner:
+                raise TealEvalError("itxn field {} is not available".format(immediates[0]))
+            stack.append(self.__last_inner[immediates[0]])
+
+        else:
+            raise TealEvalError("opcode {} is not supported".format(name))
+
+        return next_pc
+
+    #
+    def __box(self, name: str) -> None:
+        """
+        Execute box opcode
+
+        :param name: opcode name
+
+        :returns: None
+        """
+        ledger = self.__ledger
+        stack = self.__stack
+        if name in ("box_replace", "box_put"):
+            value = self.__pop_bytes()
+        if name in ("box_create", "box_replace", "box_extract"):
+            argument = self.__pop_uint()
+        if name == "box_extract":
+            start = self.__pop_uint()
+        box_name = self.__pop_bytes()
+        if not 1 <= len(box_name) <= 64:
+            raise TealEvalError("box name of {} bytes".format(len(box_name)))
+        self.__check_box_ref(box_name)
+        box = ledger.get_box(self.__app_id, box_name)
+
+        if name == "box_create":
+            if box is not None:
+                if len(box) != argument:
+                    raise TealEvalError("box size mismatch {} {}".format(len(box), argument))
+                stack.append(0)
+            else:
+                if argument > 32768:
+                    raise TealEvalError("box size {} too large".format(argument))
+                ledger.put_box(self.__app_id, box_name, b"\x00" * argument)
+                stack.append(1)
+        elif name == "box_del":
+            stack.append(int(box is not None))
+            if box is not None:
+                ledger.delete_box(self.__app_id, box_name)
+        elif name == "box_len":
+            stack.extend([0, 0] if box is None else [len(box), 1])
+        elif name == "box_get":
+            stack.extend([b"", 0] if box is None else [self.__check_length(box), 1])
+        elif name == "box_put":
+            if box is not None and len(box) != len(value):
+                raise TealEvalError("box_put size mismatch {} {}".format(len(box), len(value)))
+            ledger.put_box(self.__app_id, box_name, value)
+        else:
+            if box is None:
+                raise TealEvalError("no such box")
+            if name == "box_extract":
+                stack.append(self.__check_length(self.__slice(box, start, start + argument)))
+            else:
+                self.__slice(box, argument, argument + len(value))
+                ledger.put_box(
+                    self.__app_id,
+                    box_name,
+                    box[:argument] + value + box[argument + len(value):]
+                )
+
+    #
+    def __check_box_ref(self, box_name: bytes) -> None:
+        """
+        Check that the transaction group references box of current app
+
+        :param box_name: box name
+
+        :returns: None
+        """
+        for txn in self.__txns:
+            if txn.type != "appl":
+                continue
+            for ref in txn.boxes or []:
+                if ref.name != box_name:
+                    continue
+                if ref.app_index == 0:
+                    app_id = txn.index or self.__app_id
+                else:
+                    app_id = (txn.foreign_apps or [])[ref.app_index - 1]
+                if app_id == self.__app_id:
+                    return
+        raise TealEvalError("invalid Box reference {!r}".format(box_name))
+
+    #
+    def __new_inner(self) -> dict:
+        """
+        Create inner transaction with algod defaults
+
+        :returns: inner transaction fields
+        """
+        credit = self.__group_state["fee_credit"]
+        return {
+            "Sender": self.__app_address,
+            "Fee": max(0, self.__ledger.MIN_FEE - credit),
+            "TypeEnum": 0,
+        }
+
+    #
+    def __txn_field(self, group_index: int, field: str, index: Optional[int] = None):
+        """
+        Read field of transaction in group
+
+        :param group_index: position of transaction in group
+        :param field: field name
+        :param index: array index of array fields
+
+        :returns: field value
+        """
+        if group_index >= len(self.__txns):
+            raise TealEvalError("group index {} out of range".format(group_index))
+        txn = self.__txns[group_index]
+        kind = txn.type
+
+        arrays = {
+            "ApplicationArgs": lambda: list(txn.app_args or []),
+            "Accounts": lambda: [txn.sender] + list(txn.accounts or []),
+            "Assets": lambda: list(txn.foreign_assets or []),
+            "Applications": lambda: [txn.index] + list(txn.foreign_apps or []),
+        }
+        if field in arrays:
+            if kind != "appl":
+                raise TealEvalError("{} of {} transaction".format(field, kind))
+            values = arrays[field]()
+            if index is None or index >= len(values):
+                raise TealEvalError("{} index {} out of range".format(field, index))
+            value = values[index]
+            return encoding.decode_address(value) if field == "Accounts" else value
+        if index is not None:
+            raise TealEvalError("{} is not an array field".format(field))
+
+        appl = kind == "appl"
+        fields = {
+            "Sender": lambda: self.__address(txn.sender),
+            "Fee": lambda: txn.fee,
+            "FirstValid": lambda: txn.first_valid_round,
+            "LastValid": lambda: txn.last_valid_round,
+            "Note": lambda: txn.note or b"",
+            "Lease": lambda: txn.lease or ZERO_ADDRESS,
+            "RekeyTo": lambda: self.__address(txn.rekey_to),
+            "Type": lambda: kind.encode('ascii'),
+            "TypeEnum": lambda: TXN_TYPES.get(kind, 0),
+            "GroupIndex": lambda: group_index,
+            "TxID": lambda: base64.b32decode(txn.get_txid() + "===="),
+            "Receiver": lambda: self.__address(txn.receiver if kind == "pay" else None),
+            "Amount": lambda: txn.amt if kind == "pay" else 0,
+            "CloseRemainderTo": lambda: self.__address(
+                                    txn.close_remainder_to if kind == "pay" else None),
+            "XferAsset": lambda: txn.index if kind == "axfer" else 0,
+            "AssetAmount": lambda: txn.amount if kind == "axfer" else 0,
+            "AssetSender": lambda: self.__address(
+                                txn.revocation_target if kind == "axfer" else None),
+            "AssetReceiver": lambda: self.__address(txn.receiver if kind == "axfer" else None),
+            "AssetCloseTo": lambda: self.__address(
+                                txn.close_assets_to if kind == "axfer" else None),
+            "ConfigAsset": lambda: txn.index if kind == "acfg" else 0,
+            "ApplicationID": lambda: txn.index if appl else 0,
+            "OnCompletion": lambda: int(txn.on_complete) if appl else 0,
+            "NumAppArgs": lambda: len(txn.app_args or []) if appl else 0,
+            "NumAccounts": lambda: len(txn.accounts or []) if appl else 0,
+            "NumAssets": lambda: len(txn.foreign_assets or []) if appl else 0,
+            "NumApplications": lambda: len(txn.foreign_apps or []) if appl else 0,
+            "ApprovalProgram": lambda: (txn.approval_program or b"") if appl else b"",
+            "ClearStateProgram": lambda: (txn.clear_program or b"") if appl else b"",
+            "GlobalNumUint": lambda: self.__schema(txn, "global_schema", "num_uints"),
+            "GlobalNumByteSlice": lambda: self.__schema(txn, "global_schema", "num_byte_slices"),
+            "LocalNumUint": lambda: self.__schema(txn, "local_schema", "num_uints"),
+            "LocalNumByteSlice": lambda: self.__schema(txn, "local_schema", "num_byte_slices"),
+            "ExtraProgramPages": lambda: txn.extra_pages if appl else 0,
+        }
+        if field not in fields:
+            raise TealEvalError("txn field {} is not supported".format(field))
+        return fields[field]()
+
+    #
+    def __global_field(self, field: str):
+        """
+        Read global field
+
+        :param field: field name
+
+        :returns: field value
+        """
+        if field == "MinTxnFee":
+            return self.__ledger.MIN_FEE
+        if field == "MinBalance":
+            return self.__ledger.MIN_BALANCE
+        if field == "MaxTxnLife":
+            return 1000
+        if field == "ZeroAddress":
+            return ZERO_ADDRESS
+        if field == "GroupSize":
+            return len(self.__txns)
+        if field == "LogicSigVersion":
+            return 8
+        if field == "Round":
+            return self.__group_state["round"]
+        if field == "LatestTimestamp":
+            return self.__group_state["timestamp"]
+        if field == "CurrentApplicationID":
+            return self.__app_id
+        if field == "CurrentApplicationAddress":
+            return self.__app_address
+        if field == "CreatorAddress":
+            return self.__address(self.__ledger.get_app(self.__app_id)["creator"])
+        if field == "GroupID":
+            return self.__txn.group or b"\x00" * 32
+        if field == "OpcodeBudget":
+            return self.__group_state["budget"]
+        if field == "CallerApplicationID":
+            return 0
+        if field == "CallerApplicationAddress":
+            return ZERO_ADDRESS
+        raise TealEvalError("global field {} is not supported".format(field))
+
+    #
+    def __asset_param(self, asset: dict, field: str):
+        """
+        Read asset parameter
+
+        :param asset: asset params stored in ledger
+        :param field: field name
+
+        :returns: field value
+        """
+        if field in ("AssetManager", "AssetReserve", "AssetFreeze",
+                     "AssetClawback", "AssetCreator"):
+            return self.__address(asset[field])
+        return asset[field]
+
+    #
+    def __account(self, value) -> str:
+        """
+        Resolve account reference from stack
+
+        :param value: address bytes or index into Accounts
+
+        :returns: address
+        """
+        if isinstance(value, int):
+            return encoding.encode_address(self.__txn_field(self.__group_index, "Accounts", value))
+        if len(value) != 32:
+            raise TealEvalError("invalid account reference")
+        return encoding.encode_address(value)
+
+    #
+    def __asset(self, value: int) -> int:
+        """
+        Resolve asset reference from stack
+
+        :param value: asset id or index into Assets
+
+        :returns: asset id
+        """
+        assets = list(self.__txn.foreign_assets or [])
+        if self.__version < 4 or value < len(assets):
+            return self.__txn_field(self.__group_index, "Assets", value)
+        return value
+
+    #
+    def __application(self, value: int) -> int:
+        """
+        Resolve application reference from stack
+
+        :param value: application id or index into Applications
+
+        :returns: application id
+        """
+        apps = [self.__txn.index] + list(self.__txn.foreign_apps or [])
+        if value < len(apps):
+            return apps[value] or self.__app_id
+        return value
+
+    #
+    @staticmethod
+    def __address(address: Optional[str]) -> bytes:
+        """
+        Convert address to bytes pushed on stack
+
+        :param address: base32 address or None
+
+        :returns: 32 bytes public key
+        """
+        return encoding.decode_address(address) if address else ZERO_ADDRESS
+
+    #
+    @staticmethod
+    def __schema(txn, schema: str, field: str) -> int:
+        """
+        Read state schema field of application call
+
+        :param txn: transaction
+        :param schema: global_schema or local_schema
+        :param field: num_uints or num_byte_slices
+
+        :returns: field value
+        """
+        value = getattr(txn, schema, None)
+        return getattr(value, field, 0) or 0 if value else 0
+
+    #
+    @staticmethod
+    def __constant(block: tuple, name: str, immediates: tuple):
+        """
+        Read constant block value
+
+        :param block: intcblock or bytecblock values
+        :param name: opcode name
+        :param immediates: index for intc and bytec
+
+        :returns: constant
+        """
+        index = immediates[0] if immediates else int(name[-1])
+        if index >= len(block):
+            raise TealEvalError("{} index {} out of range".format(name, index))
+        return block[index]
+
+    #
+    @staticmethod
+    def __slice(value: bytes, start: int, end: int) -> bytes:
+        """
+        Slice bytes failing on out of range bounds like algod
+
+        :param value: bytes value
+        :param start: first index
+        :param end: index after last
+
+        :returns: slice
+        """
+        if start > end or end > len(value):
+            raise TealEvalError("slice {}:{} of {} bytes".format(start, end, len(value)))
+        return value[start:end]
+
+    #
+    @staticmethod
+    def __check_length(value: bytes) -> bytes:
+        """
+        Check byte string length limit
+
+        :param value: bytes value
+
+        :returns: value
+        """
+        if len(value) > MAX_BYTES:
+            raise TealEvalError("byte string of {} bytes".format(len(value)))
+        return value
+
+    #
+    def __scratch_index(self) -> int:
+        """
+        Pop scratch slot index
+
+        :returns: slot index
+        """
+        index = self.__pop_uint()
+        if index > 255:
+            raise TealEvalError("scratch index {} out of range".format(index))
+        return index
+
+    #
+    def __frame_index(self, offset: int) -> int:
+        """
+        Get stack position of frame slot
+
+        :param offset: frame_dig or frame_bury immediate
+
+        :returns: stack position
+        """
+        if not self.__frames:
+            raise TealEvalError("frame access outside of subroutine")
+        position = self.__frames[-1][1] + offset
+        if not 0 <= position < len(self.__stack):
+            raise TealEvalError("frame offset {} out of range".format(offset))
+        return position
+
+    #
+    def __peek(self, depth: int):
+        """
+        Read stack value without popping it
+
+        :param depth: distance from top of stack
+
+        :returns: value
+        """
+        if depth >= len(self.__stack):
+            raise TealEvalError("stack underflow")
+        return self.__stack[-1 - depth]
+
+    #
+    def __pop(self):
+        """
+        Pop value of any type
+
+        :returns: value
+        """
+        if not self.__stack:
+            raise TealEvalError("stack underflow")
+        return self.__stack.pop()
+
+    #
+    def __pop_uint(self) -> int:
+        """
+        Pop uint64 value
+
+        :returns: value
+        """
+        value = self.__pop()
+        if not isinstance(value, int):
+            raise TealEvalError("expected uint64, got bytes")
+        return value
+
+    #
+    def __pop_bytes(self) -> bytes:
+        """
+        Pop bytes value
+
+        :returns: value
+        """
+        value = self.__pop()
+        if not isinstance(value, bytes):
+            raise TealEvalError("expected bytes, got uint64")
+        return value
@@ -0,0 +1,92 @@
+#
+import threading
+
+#
+from base_test import BaseTest
+from accounts import AccountReader
+
+
+#
+class AccountClient:
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.barrier = threading.Event()
+        self.threads = set()
+
+    def account_info(self, address):
+        with self.lock:
+            self.requests += 1
+            self.threads.add(threading.current_thread())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.barrier.wait(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return {
+            "address": address,
+            "round": 10,
+            "amount": len(address),
+            "min-balance": 100000,
+            "assets": [{"asset-id": 5, "amount": 3}],
+            "created-apps": [{"id": 7, "params": {"global-state": []}}]
+        }
+
+
+class TestAccountReader(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.client = AccountClient()
+        self.round = 10
+        self.reader = AccountReader(self.client, lambda: self.round, max_workers=4)
+        self.addCleanup(self.reader.close)
+
+    #
+    def test_snapshot_bounds_requests_in_flight(self):
+        addresses = ["a" * i for i in range(1, 13)]
+        snapshots = self.reader.snapshot(addresses)
+
+        self.assertEqual(len(snapshots), 12)
+        self.assertEqual(snapshots["aaa"].amount, 3)
+        self.assertEqual(snapshots["aaa"].assets, {5: 3})
+        self.assertEqual(snapshots["aaa"].created_apps, {7: {}})
+        self.assertEqual(snapshots["aaa"].round, 10)
+        self.assertLessEqual(self.client.max_in_flight, 4)
+
+    #
+    def test_snapshot_is_cached_within_round(self):
+        self.reader.snapshot(["a", "b"])
+        self.reader.snapshot(["a", "b"])
+        self.assertEqual(self.client.requests, 2)
+
+        self.reader.invalidate()
+        self.reader.get("a")
+        self.round += 1
+        self.reader.get("a")
+        self.assertEqual(self.client.requests, 4)
+
+    #
+    def test_invalidate_drops_touched_account_only(self):
+        self.reader.snapshot(["a", "b", "c"])
+        self.reader.invalidate("a", self.round)
+        self.reader.snapshot(["a", "b", "c"])
+
+        self.assertEqual(self.client.requests, 4)
+        self.assertEqual((self.reader.hits, self.reader.misses), (2, 4))
+
+
+    #
+    def test_snapshots_share_reader_executor(self):
+        self.reader.snapshot(["a", "b", "c", "d"])
+        self.round += 1
+        self.reader.snapshot(["a", "b", "c", "d"])
+        self.assertEqual(self.client.requests, 8)
+        self.assertLessEqual(len(self.client.threads), 4)
+
+        self.reader.close()
+        self.assertFalse(any(thread.is_alive() for thread in self.client.threads))
+        self.round += 1
+        self.assertEqual(len(self.reader.snapshot(["a", "b"])), 2)
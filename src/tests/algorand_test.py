@@ -1,12 +1,62 @@
+#
+from unittest import mock
+
+#
+from algosdk import account
+from algosdk.transaction import SuggestedParams
+
 #
 from base_test import BaseTest
+from algorand import Algorand, AlgoUser
+
+
+#
+class GroupClient:
+    def __init__(self):
+        self.sent = []
+
+    def suggested_params(self):
+        return SuggestedParams(1000, 10, 1010, "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", "testnet-v1.0", flat_fee=True)
+
+    def send_transactions(self, txns):
+        self.sent.append(list(txns))
+        return txns[0].get_txid()
+
+    def status(self):
+        return {"last-round": 10}
+
+    def status_after_block(self, round_num):
+        return {"last-round": round_num + 1}
+
+    def pending_transaction_info(self, tx_id):
+        return {"confirmed-round": 11}
 
 
 class TestAlgorand(BaseTest):
     #
     def setUp(self):
         super().setUp()
+        self.client = GroupClient()
+        with mock.patch("algorand.PooledAlgodClient", return_value=self.client):
+            self.algorand = Algorand("", "http://localhost")
 
     #
     def test_base(self):
         pass
+
+    #
+    def test_send_group_submits_once(self):
+        private_key, address = account.generate_account()
+        user = AlgoUser(private_key, address, "")
+        txns = [
+            self.algorand.build_payment_transaction(user.address, user.address, 1, "a"),
+            self.algorand.build_payment_transaction(user.address, user.address, 2, "b")
+        ]
+
+        tx_id = self.algorand.send_group(user.pk, txns)
+
+        self.assertEqual(len(self.client.sent), 1)
+        group = self.client.sent[0]
+        self.assertEqual(tx_id, group[0].get_txid())
+        self.assertIsNotNone(group[0].transaction.group)
+        self.assertEqual(group[0].transaction.group, group[1].transaction.group)
@@ -0,0 +1,120 @@
+#
+import os
+import shutil
+import time
+import hashlib
+import tempfile
+
+#
+from algosdk.error import AlgodHTTPError
+
+#
+from base_test import BaseTest
+from algorand import Algorand
+from algorand_htlc import AlgorandHTLC
+from app_pool import AppPool
+from fake_algod import FakeAlgod, FakeAlgodServer
+from teal import TealManager
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+class TestAppPool(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.02)
+        self.server = FakeAlgodServer(self.node)
+        self.node.start()
+        self.server.start()
+        self.addCleanup(self.node.stop)
+        self.addCleanup(self.server.stop)
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), tmp_dir)
+
+        self.algorand = Algorand("", self.server.address)
+        self.addCleanup(self.algorand.confirmation_tracker.stop)
+        self.pool_creator = self.algorand.generate_new_account()
+        self.node.fund(self.pool_creator.address, 10 ** 7)
+        self.teal_manager = TealManager(tmp_dir)
+        self.pool = AppPool(self.algorand, self.teal_manager, self.pool_creator, {"commit": 3})
+
+    #
+    def test_refill_creates_apps_in_one_group(self):
+        self.assertEqual(self.pool.refill(), 3)
+        self.assertEqual(self.pool.ready("commit"), 3)
+        self.assertEqual(self.node.requests["send_raw_transaction"], 1)
+        self.assertEqual(self.pool.stats()["commit"]["idle_min_balance"], 3 * 414000)
+
+    #
+    def test_acquire_counts_hits_and_misses(self):
+        self.pool.refill()
+        app_ids = {self.pool.acquire("commit")[0] for _ in range(4)}
+
+        stats = self.pool.stats()["commit"]
+        self.assertEqual(len(app_ids), 4)
+        self.assertEqual((stats["hits"], stats["misses"], stats["ready"]), (3, 1, 0))
+        self.assertEqual(stats["hit_rate"], 0.75)
+
+    #
+    def test_reused_app_rejects_previous_secret_and_is_swept_on_delete(self):
+        htlc = AlgorandHTLC("", self.server.address)
+        self.addCleanup(htlc.confirmation_tracker.stop)
+        alice, bob = htlc.generate_new_account(), htlc.generate_new_account()
+        self.node.fund(alice.address, 10 ** 7)
+        self.node.fund(bob.address, 10 ** 7)
+        pool = AppPool(self.algorand, self.teal_manager, self.pool_creator, {"commit": 1})
+        pool.refill()
+
+        def swap(secret, amount, claimed=True):
+            app_id, app_address = htlc.commit(None, alice, amount, bob, pool=pool)
+            htlc.send_group(alice.pk, [
+                htlc.build_payment_transaction(alice.address, app_address, 200000, "Fill {}".format(amount))])
+            if claimed:
+                htlc.lock_commitment(alice, app_id, amount, hashlib.sha256(secret).digest(), app_address)
+                htlc.wait_for_confirmation(htlc.redeem(bob, app_id, secret, pool=pool))
+            return app_id, app_address
+
+        old_secret = os.urandom(32)
+        app_id, app_address = swap(old_secret, 500000)
+        # the confirmed claim queues the application for release
+        deadline = time.monotonic() + 2
+        while pool.reclaim() == 0:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(pool.ready("commit"), 1)
+
+        # reused before alice locks it, the public secret of the last swap
+        # must not claim the new commitment
+        self.assertEqual(swap(None, 100000, claimed=False)[0], app_id)
+        txn = htlc.call_application_transaction(bob.address, app_id, [b"claim", old_secret])
+        txn.note = b"replayed secret"
+        with self.assertRaises(AlgodHTTPError):
+            htlc.send_transaction(htlc.sign_transaction(bob.pk, txn))
+
+        secret = os.urandom(32)
+        htlc.lock_commitment(alice, app_id, 100000, hashlib.sha256(secret).digest(), app_address)
+        htlc.wait_for_confirmation(htlc.redeem(bob, app_id, secret))
+        pool.refill()
+        before = self.node.account_info(self.pool_creator.address)["amount"]
+        leftover = self.node.account_info(app_address)["amount"]
+        self.assertTrue(pool.release("commit", app_id))
+        self.assertEqual(self.node.account_info(app_address)["amount"], 0)
+        # leftover less the delete and sweep fees
+        self.assertEqual(self.node.account_info(self.pool_creator.address)["amount"] - before, leftover - 2000)
+
+    #
+    def test_failed_commit_returns_app_to_pool(self):
+        htlc = AlgorandHTLC("", self.server.address)
+        self.addCleanup(htlc.confirmation_tracker.stop)
+        # unfunded sender cannot pay the commit fee
+        alice, bob = htlc.generate_new_account(), htlc.generate_new_account()
+        self.pool.refill()
+
+        with self.assertRaises(AlgodHTTPError):
+            htlc.commit(None, alice, 100000, bob, pool=self.pool)
+        self.assertEqual(self.pool.ready("commit"), 3)
@@ -0,0 +1,65 @@
+#
+import os
+import json
+import base64
+
+#
+from base_test import BaseTest
+from assembler import TealAssembler, TealAssemblyError
+from teal import TealManager
+from update_goldens import CONTRACTS
+
+
+#
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden")
+
+
+class TestTealAssembler(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.assembler = TealAssembler()
+
+    #
+    def golden(self, name):
+        with open(os.path.join(GOLDEN_PATH, "{}.b64".format(name)), "r") as f:
+            return base64.b64decode(f.read().strip())
+
+    #
+    def test_pinned_sources_match_algod_goldens(self):
+        with open(os.path.join(GOLDEN_PATH, "sources.json")) as f:
+            sources = json.load(f)
+        names = sorted(name[:-len(".teal")] for name in os.listdir(GOLDEN_PATH) if name.endswith(".teal"))
+        # bytecode goldens come from algod only, see update_goldens
+        self.assertEqual(
+            sorted(name[:-len(".b64")] for name in os.listdir(GOLDEN_PATH) if name.endswith(".b64")),
+            sorted(sources))
+        for name in names:
+            with self.subTest(program=name):
+                if name not in sources:
+                    self.skipTest("no algod golden, run python -m tests.update_goldens")
+                program = self.assembler.assemble_file(os.path.join(GOLDEN_PATH, "{}.teal".format(name)))
+                self.assertEqual(program, self.golden(name))
+
+    #
+    def test_pinned_sources_match_contract_builders(self):
+        # a stale pinned source would check the assembler on a program
+        # no longer deployed, run python -m tests.update_goldens --pin
+        teal_manager = TealManager(GOLDEN_PATH)
+        for contract in CONTRACTS:
+            with self.subTest(contract=contract):
+                with open(os.path.join(GOLDEN_PATH, "{}.teal".format(contract))) as f:
+                    pinned = f.read()
+                built = teal_manager.compile_teal_file(
+                    TealManager.__dict__[contract](), teal_manager.get_version(contract))
+                self.assertEqual(pinned, built + "\n")
+
+    #
+    def test_constants_used_once_are_pushed(self):
+        program = self.assembler.assemble("#pragma version 5\nint 7\nint 1\nint 1\n+\n==\nreturn")
+        self.assertEqual(program, bytes.fromhex("0520010181072222081243"))
+
+    #
+    def test_opcode_newer_than_version_is_rejected(self):
+        with self.assertRaises(TealAssemblyError):
+            self.assembler.assemble("#pragma version 5\nbox_get")
@@ -0,0 +1,179 @@
+#
+import os
+import asyncio
+import hashlib
+import shutil
+import tempfile
+
+#
+from algosdk import account, error, transaction
+
+#
+from base_test import BaseTest
+from async_algorand import AsyncAlgorand, AsyncAlgorandHTLC, AsyncHttpTransport
+from fake_algod import FakeAlgod, FakeAlgodServer
+from teal import TealManager
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+class FollowClient(AsyncAlgorand):
+    def __init__(self):
+        super().__init__("", "http://127.0.0.1:1")
+        self.params_provider.update(transaction.SuggestedParams(1000, 1, 1001, "", "", False))
+        self.lookups = 0
+
+    async def get_transaction_info(self, tx_id):
+        self.lookups += 1
+        if self.lookups <= 2:
+            return {}
+        if tx_id == "LOST":
+            raise error.AlgodHTTPError("txn does not exist", 404)
+        return {"confirmed-round": 5}
+
+    async def status(self):
+        return {"last-round": 10}
+
+    async def status_after_block(self, round_num):
+        await asyncio.sleep(0.01)
+        return {"last-round": round_num}
+
+    async def get_block_txids(self, round_num):
+        return {"blockTxids": []}
+
+
+
+class ResumeClient(FollowClient):
+    def __init__(self):
+        super().__init__()
+        self.confirmed = {}
+
+    async def get_transaction_info(self, tx_id):
+        await asyncio.sleep(0.02)
+        if tx_id in self.confirmed:
+            return {"confirmed-round": self.confirmed[tx_id]}
+        return {}
+
+    async def algod_request(self, method, path, body=None, headers=None):
+        await asyncio.sleep(0.005)
+        tx_id = "B"
+        self.confirmed[tx_id] = 10
+        return {"txId": tx_id}
+
+class TestAsyncHttpTransport(BaseTest):
+    #
+    def test_timed_out_request_is_not_retried(self):
+        requests = []
+
+        async def handle(reader, writer):
+            try:
+                while await reader.readuntil(b"\r\n\r\n"):
+                    requests.append(1)
+                    if len(requests) == 1:
+                        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+                        await writer.drain()
+            except asyncio.IncompleteReadError:
+                writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            transport = AsyncHttpTransport("http://127.0.0.1:{}".format(port), timeout=0.2)
+            try:
+                await transport.request("GET", "/v2/status", {})
+                with self.assertRaises(asyncio.TimeoutError):
+                    await transport.request("POST", "/v2/transactions", {}, b"txn")
+            finally:
+                await transport.close()
+                # handler sees the closed connection before the loop stops
+                await asyncio.sleep(0.05)
+                server.close()
+
+        asyncio.run(run())
+
+        self.assertEqual(len(requests), 2)
+
+
+class TestAsyncAlgorandHTLC(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.02)
+        self.server = FakeAlgodServer(self.node)
+        self.node.start()
+        self.server.start()
+        self.addCleanup(self.node.stop)
+        self.addCleanup(self.server.stop)
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), tmp_dir)
+        self.teal_manager = TealManager(tmp_dir)
+
+    #
+    async def swap(self, htlc):
+        alice = htlc.generate_new_account()
+        bob = htlc.generate_new_account()
+        self.node.fund(alice.address, 10 ** 6)
+        self.node.fund(bob.address, 10 ** 6)
+        secret = os.urandom(32)
+        app_id, app_address = await htlc.commit(self.teal_manager, alice, 1000, bob)
+        # stands in for filling the application balance
+        self.node.fund(app_address, 10 ** 6)
+        await htlc.lock_commitment(
+                    alice, app_id, 1000, hashlib.sha256(secret).digest(), app_address)
+        tx_id = await htlc.redeem(bob, app_id, secret)
+        return await htlc.wait_for_confirmation(tx_id)
+
+    #
+    def test_concurrent_swaps_share_confirmation_follower(self):
+        async def run():
+            htlc = AsyncAlgorandHTLC("", self.server.address)
+            try:
+                return await asyncio.gather(*[self.swap(htlc) for _ in range(20)])
+            finally:
+                await htlc.close()
+
+        results = asyncio.run(run())
+
+        self.assertTrue(all(result["confirmed-round"] > 0 for result in results))
+        self.assertEqual(self.node.requests["suggested_params"], 1)
+        # one-shot commit, grouped lock and claim
+        self.assertEqual(self.node.requests["send_raw_transaction"], 20 * 3)
+        self.assertLess(self.node.requests["get_block_txids"], 20 * 4)
+
+    #
+    def test_unknown_transaction_does_not_stop_resume(self):
+        async def run():
+            client = FollowClient()
+            lost = asyncio.ensure_future(client.wait_for_confirmation("LOST"))
+            await asyncio.sleep(0)
+            try:
+                return await asyncio.wait_for(client.wait_for_confirmation("A"), 1)
+            finally:
+                lost.cancel()
+                await client.close()
+
+        self.assertEqual(asyncio.run(run()), {"confirmed-round": 5})
+
+    #
+    def test_transaction_tracked_during_resume_is_looked_up(self):
+        private_key, address = account.generate_account()
+        signed = transaction.PaymentTxn(
+            address, transaction.SuggestedParams(1000, 1, 1001, "", "", True), address, 0).sign(private_key)
+
+        async def run():
+            client = ResumeClient()
+            pending = asyncio.ensure_future(client.wait_for_confirmation("A"))
+            # follower is looking up A when B is sent and confirmed
+            await asyncio.sleep(0.025)
+            try:
+                tx_id = await client.send_transaction(signed)
+                return await asyncio.wait_for(client.wait_for_confirmation(tx_id), 1)
+            finally:
+                pending.cancel()
+                await client.close()
+
+        self.assertEqual(asyncio.run(run()), {"confirmed-round": 10})
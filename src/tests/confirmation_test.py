@@ -0,0 +1,136 @@
+#
+import threading
+
+#
+from algosdk import error
+
+#
+from base_test import BaseTest
+from confirmation import ConfirmationTracker
+from scheduler import Priority, current_priority, request_priority
+
+
+#
+class BlockClient:
+    """
+    Client producing a new round on every status_after_block call
+    """
+    def __init__(self, blocks, unknown=()):
+        self.round = 100
+        self.blocks = blocks
+        self.unknown = set(unknown)
+        self.requests = []
+        self.priorities = []
+        self.lock = threading.Lock()
+
+    def status(self):
+        self.requests.append("status")
+        return {"last-round": self.round}
+
+    def status_after_block(self, round_num):
+        self.requests.append("status_after_block")
+        with self.lock:
+            self.round = round_num + 1
+        return {"last-round": self.round}
+
+    def get_block_txids(self, round_num):
+        self.requests.append("get_block_txids")
+        self.priorities.append(current_priority())
+        return {"blockTxids": self.blocks.get(round_num, [])}
+
+    def pending_transaction_info(self, tx_id):
+        self.requests.append("pending_transaction_info")
+        if tx_id in self.unknown:
+            raise error.AlgodHTTPError("txn does not exist", 404)
+        confirmed = [round_num for round_num, tx_ids in self.blocks.items()
+                     if tx_id in tx_ids and round_num <= self.round]
+        return {"confirmed-round": confirmed[0] if confirmed else 0}
+
+
+class TestConfirmationTracker(BaseTest):
+    #
+    def test_block_confirms_all_tracked_transactions(self):
+        client = BlockClient({102: ["A", "B", "X"], 103: ["C"]})
+        tracker = ConfirmationTracker(client)
+        futures = [tracker.track(tx_id, 1000) for tx_id in ("A", "B", "C")]
+
+        results = [future.result(timeout=5) for future in futures]
+        tracker.stop()
+
+        self.assertEqual([r["confirmed-round"] for r in results], [102, 102, 103])
+        # one block request per round, regardless of the number of transactions
+        self.assertEqual(client.requests.count("get_block_txids"), 3)
+
+    #
+    def test_transaction_expires_after_last_valid(self):
+        client = BlockClient({})
+        tracker = ConfirmationTracker(client)
+
+        with self.assertRaises(error.ConfirmationTimeoutError):
+            tracker.wait("A", 102)
+        tracker.stop()
+
+    #
+    def test_unknown_transaction_expires_without_blocking_others(self):
+        client = BlockClient({102: ["A"]}, unknown=["LOST"])
+        tracker = ConfirmationTracker(client)
+        lost = tracker.track("LOST", 101)
+        # the first resume reads pending info of both
+        self.assertEqual(tracker.wait("A", 1000), {"confirmed-round": 102})
+        with self.assertRaises(error.ConfirmationTimeoutError):
+            lost.result(timeout=5)
+        tracker.stop()
+
+    #
+    def test_transaction_confirmed_before_tracking(self):
+        client = BlockClient({101: ["X"], 102: ["A", "X2"], 103: ["Y"]})
+        tracker = ConfirmationTracker(client)
+        tracker.track("X", 1000).result(timeout=5)
+        mark = tracker.mark()
+        tracker.track("Y", 1000).result(timeout=5)
+
+        # A was confirmed while its submit was returning
+        self.assertEqual(tracker.track("A", 1000, mark=mark).result(timeout=0), {"confirmed-round": 102})
+        tracker.stop()
+        # a transaction sent elsewhere and confirmed already is looked up
+        self.assertEqual(tracker.wait("X2", 1000), {"confirmed-round": 102})
+
+    #
+    def test_redeem_priority_reaches_tracker_requests(self):
+        client = BlockClient({102: ["A"], 104: ["R"]})
+        tracker = ConfirmationTracker(client)
+        tracker.wait("A", 1000)
+        with request_priority(Priority.REDEEM):
+            tracker.track("R", 1000).result(timeout=5)
+        tracker.stop()
+
+        self.assertEqual(client.priorities, [None, None, Priority.REDEEM, Priority.REDEEM])
+
+    #
+    def test_address_listeners_get_touched_accounts(self):
+        client = BlockClient({102: ["A"], 103: ["B"]})
+        tracker = ConfirmationTracker(client)
+        touched = []
+        tracker.add_address_listener(lambda address, round_num: touched.append((address, round_num)))
+        tracker.track("A", 1000, addresses=("ALICE", "BOB")).result(timeout=5)
+        tracker.track("B", 1000).result(timeout=5)
+        tracker.stop()
+
+        self.assertEqual(touched, [("ALICE", 102), ("BOB", 102), (None, 103)])
+
+    #
+    def test_failing_listener_does_not_block_waiters(self):
+        client = BlockClient({102: ["A"]})
+        tracker = ConfirmationTracker(client)
+        touched = []
+
+        def fail(tx_id, round_num):
+            raise RuntimeError("listener failed")
+
+        tracker.add_app_listener(fail)
+        tracker.add_listener(lambda tx_id, round_num: touched.append(tx_id))
+        with self.assertLogs("PreHTLC", "ERROR"):
+            self.assertEqual(tracker.track("A", 1000, app_ids=(7,)).result(timeout=5), {"confirmed-round": 102})
+        tracker.stop()
+
+        self.assertEqual(touched, ["A"])
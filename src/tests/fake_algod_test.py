@@ -0,0 +1,96 @@
+#
+import os
+import hashlib
+import shutil
+import tempfile
+
+#
+from algosdk import error
+
+#
+from base_test import BaseTest
+from algorand_htlc import AlgorandHTLC
+from fake_algod import FakeAlgod
+from teal import TealManager
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+class TestFakeAlgod(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.01)
+        self.node.start()
+        self.addCleanup(self.node.stop)
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), tmp_dir)
+        self.teal_manager = TealManager(tmp_dir)
+
+        self.htlc = AlgorandHTLC("", "", client=self.node)
+        self.addCleanup(self.htlc.confirmation_tracker.stop)
+        self.alice = self.htlc.generate_new_account()
+        self.bob = self.htlc.generate_new_account()
+        self.node.fund(self.alice.address, 10 ** 7)
+        self.node.fund(self.bob.address, 10 ** 7)
+        self.secret = os.urandom(32)
+        self.hashlock = hashlib.sha256(self.secret).digest()
+
+    #
+    def test_commit_lock_claim(self):
+        htlc = self.htlc
+        app_id, app_address = htlc.commit(self.teal_manager, self.alice, 500000, self.bob)
+        htlc.send_group(self.alice.pk, [
+            htlc.build_payment_transaction(self.alice.address, app_address, 200000, "Fill")])
+        htlc.lock_commitment(self.alice, app_id, 500000, self.hashlock, app_address)
+
+        state = htlc.state_reader.get(app_id, "commit")
+        self.assertEqual(state["committed_amount"], 500000)
+        self.assertEqual(state["bob"], self.bob.address)
+        self.assertEqual(state["hashlock"], self.hashlock)
+
+        bob_balance = htlc.get_balance(self.bob.address)
+        with self.assertRaises(error.AlgodHTTPError):
+            htlc.redeem(self.bob, app_id, b"wrong secret")
+        htlc.wait_for_confirmation(htlc.redeem(self.bob, app_id, self.secret))
+
+        self.assertEqual(htlc.get_balance(self.bob.address), bob_balance + 500000 - 1000)
+        self.assertEqual(htlc.state_reader.get(app_id, "commit")["committed_amount"], 0)
+
+    #
+    def test_lock_redeem_dest(self):
+        htlc = self.htlc
+        app_id, asset_id = htlc.create_new_asset(self.teal_manager, self.bob)
+        htlc.lock_dest_chain(self.bob, app_id, asset_id, 100, self.hashlock, self.alice)
+        self.assertEqual(htlc.state_reader.get(app_id, "lock_redeem_dest")["receiver"], self.alice.address)
+
+        htlc.redeem_dest(self.bob, app_id, self.secret)
+
+        self.assertEqual(htlc.state_reader.get(app_id, "lock_redeem_dest")["committed_amount"], 0)
+        self.assertEqual(htlc.account_reader.get(self.bob.address).assets, {asset_id: 1000000})
+
+    #
+    def test_swap_registry(self):
+        htlc = self.htlc
+        app_id, app_address = htlc.create_swap_registry(self.teal_manager, self.alice)
+        swap_id = os.urandom(32)
+
+        htlc.commit_swap(self.alice, app_id, swap_id, 300000, self.bob)
+        htlc.lock_swap(self.alice, app_id, swap_id, self.hashlock)
+        swap = htlc.get_swap(app_id, swap_id)
+        self.assertEqual((swap["alice"], swap["amount"], swap["hashlock"]),
+                         (self.alice.address, 300000, self.hashlock))
+        with self.assertRaises(error.AlgodHTTPError):
+            htlc.commit_swap(self.alice, app_id, swap_id, 300000, self.bob)
+
+        bob_balance = htlc.get_balance(self.bob.address)
+        htlc.claim_swap(self.bob, app_id, swap_id, self.secret)
+
+        self.assertEqual(htlc.get_balance(self.bob.address), bob_balance + 300000 - 3000)
+        self.assertEqual(htlc.get_balance(app_address), AlgorandHTLC.REGISTRY_MIN_BALANCE)
+        with self.assertRaises(error.AlgodHTTPError):
+            htlc.get_swap(app_id, swap_id)
@@ -0,0 +1,110 @@
+#
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+#
+from base_test import BaseTest
+from algorand_htlc import AlgorandHTLC
+from fake_algod import FakeAlgod
+from follower import BlockFollower, ClaimEvent, CommitEvent, LockEvent, parse_event
+from teal import TealManager
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+class TestBlockFollower(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.01)
+        self.node.start()
+        self.addCleanup(self.node.stop)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.checkpoint = os.path.join(self.tmp_dir, "follower.json")
+
+    #
+    def test_watched_calls_are_dispatched_as_events(self):
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), self.tmp_dir)
+        teal_manager = TealManager(self.tmp_dir)
+        htlc = AlgorandHTLC("", "", client=self.node)
+        self.addCleanup(htlc.confirmation_tracker.stop)
+        alice, bob = htlc.generate_new_account(), htlc.generate_new_account()
+        self.node.fund(alice.address, 10 ** 7)
+        self.node.fund(bob.address, 10 ** 7)
+        secret = os.urandom(32)
+        hashlock = hashlib.sha256(secret).digest()
+
+        follower = BlockFollower(self.node, self.checkpoint, start_round=self.node.round + 1)
+        self.addCleanup(follower.close)
+        events = []
+        follower.subscribe(events.append, (LockEvent, ClaimEvent))
+
+        app_id, app_address = htlc.commit(teal_manager, alice, 500000, bob)
+        follower.watch(app_id)
+        htlc.send_group(alice.pk, [
+            htlc.build_payment_transaction(alice.address, app_address, 200000, "Fill")])
+        htlc.lock_commitment(alice, app_id, 500000, hashlock, app_address)
+        htlc.wait_for_confirmation(htlc.redeem(bob, app_id, secret))
+
+        last_round = follower.poll()
+        self.assertEqual([type(event) for event in events], [LockEvent, ClaimEvent])
+        self.assertEqual(events[0].hashlock, hashlock)
+        self.assertEqual(events[0].sender, alice.address)
+        self.assertEqual(events[1].secret, secret)
+        self.assertEqual([(txn["type"], txn["rcv"], txn["snd"]) for txn in events[1].inner],
+                         [("pay", bob.address, app_address)])
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)["round"], last_round)
+
+    #
+    def test_restart_catches_up_in_batches(self):
+        follower = BlockFollower(self.node, self.checkpoint)
+        self.addCleanup(follower.close)
+        start = follower.poll()
+        self.node.stop()
+        for _ in range(5):
+            self.node.produce_block()
+
+        restarted = BlockFollower(self.node, self.checkpoint, batch_size=2)
+        self.addCleanup(restarted.close)
+        self.assertEqual(restarted.last_round, start)
+        self.assertEqual(restarted.poll(), self.node.round)
+        self.assertEqual(self.node.requests["block_info"], self.node.round - start)
+        self.assertEqual(restarted.stats()["blocks"], self.node.round - start)
+
+    #
+    def test_parse_event_layouts(self):
+        swap_id = bytes(range(32))
+        amount = (7).to_bytes(8, 'big')
+        commit = parse_event(5, 1, "A", [b"commit", swap_id, amount], [])
+        self.assertIsInstance(commit, CommitEvent)
+        self.assertEqual((commit.amount, commit.swap_id), (7, swap_id))
+        lock = parse_event(5, 1, "A", [b"lock", amount, b"h" * 32], [])
+        self.assertEqual((lock.amount, lock.swap_id, lock.hashlock), (7, None, b"h" * 32))
+        claim = parse_event(5, 1, "A", [b"claim", b"secret"], [])
+        self.assertEqual((claim.secret, claim.swap_id), (b"secret", None))
+        self.assertEqual(type(parse_event(5, 1, "A", [], [])).__name__, "AppCallEvent")
+
+    #
+    def test_failing_subscriber_does_not_stall_follower(self):
+        follower = BlockFollower(None)
+        self.addCleanup(follower.close)
+        follower.watch(7)
+        events = []
+
+        def fail(event):
+            raise RuntimeError("subscriber bug")
+        follower.subscribe(fail, (ClaimEvent,))
+        follower.subscribe(events.append, (ClaimEvent,))
+        block = {"txns": [{"txn": {"type": "appl", "apid": 7, "apaa": [b"claim", b"secret"]}}]}
+
+        with self.assertLogs("PreHTLC", "ERROR"):
+            follower.process_block(5, block)
+        self.assertEqual([event.secret for event in events], [b"secret"])
+        self.assertEqual(follower.stats()["errors"], 1)
@@ -0,0 +1,134 @@
+#
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import sqlite3
+import threading
+
+#
+from algosdk import transaction
+
+#
+from base_test import BaseTest
+from algorand_htlc import AlgorandHTLC
+from fake_algod import FakeAlgod
+from journal import SwapJournal
+from teal import TealManager
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+class TestSwapJournal(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "swaps.db")
+
+    #
+    def test_records_are_batched_and_indexed(self):
+        journal = SwapJournal(self.path, flush_interval=0.05)
+
+        def swap(i):
+            journal.record(i, "commit", "TX{}".format(i), 10 + i, app_id=100 + i,
+                           sender="ALICE", receiver="BOB{}".format(i))
+            journal.record(i, "lock", "LOCK{}".format(i), durable=True, first_valid=10, last_valid=1010,
+                           hashlock=bytes([i]) * 32)
+
+        threads = [threading.Thread(target=swap, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        journal.record(3, "redeem_dest", "CLAIM3", 40, completed=True)
+
+        self.assertLess(journal.batches, 20)
+        swap = journal.find(hashlock=bytes([5]) * 32)[0]
+        self.assertEqual(swap["app_id"], 105)
+        self.assertEqual(swap["steps"]["commit"], {"tx_id": "TX5", "round": 15, "status": "confirmed",
+                                                   "first_valid": None, "last_valid": None})
+        self.assertEqual(swap["steps"]["lock"], {"tx_id": "LOCK5", "round": None, "status": "submitted",
+                                                 "first_valid": 10, "last_valid": 1010})
+        self.assertEqual([swap["swap_id"] for swap in journal.find(app_id=107)], ["7"])
+        self.assertEqual(len(journal.find(participant="ALICE")), 20)
+        journal.close()
+
+        reopened = SwapJournal(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(len(reopened.unfinished()), 19)
+        self.assertTrue(reopened.resumable(5))
+        self.assertFalse(reopened.resumable(3))
+
+    #
+    def test_failed_batch_is_reported_to_its_records_only(self):
+        journal = SwapJournal(self.path)
+        self.addCleanup(journal.close)
+
+        with self.assertRaises(sqlite3.Error):
+            journal.record(1, "commit", "TX1", durable=True, sender={"not": "bindable"})
+        journal.record(2, "commit", "TX2", durable=True, sender="ALICE")
+        with self.assertRaises(sqlite3.Error):
+            journal.flush()
+        journal.flush()
+
+        self.assertIsNone(journal.get(1))
+        self.assertEqual(journal.get(2)["steps"]["commit"]["status"], "submitted")
+
+    #
+    def test_restarted_worker_resumes_swap(self):
+        node = FakeAlgod(block_time=0.01)
+        node.start()
+        self.addCleanup(node.stop)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), self.tmp_dir)
+        teal_manager = TealManager(self.tmp_dir)
+        secret = os.urandom(32)
+        hashlock = hashlib.sha256(secret).digest()
+
+        journal = SwapJournal(self.path)
+        htlc = AlgorandHTLC("", "", client=node, journal=journal)
+        self.addCleanup(htlc.confirmation_tracker.stop)
+        alice, bob = htlc.generate_new_account(), htlc.generate_new_account()
+        node.fund(alice.address, 10 ** 7)
+        node.fund(bob.address, 10 ** 7)
+        app_id, app_address = htlc.commit(teal_manager, alice, 500000, bob, swap_id="swap-1")
+        htlc.send_group(alice.pk, [
+            htlc.build_payment_transaction(alice.address, app_address, 200000, "Fill")])
+        # worker stops after submitting the lock, before recording it confirmed
+        txns = transaction.assign_group_id([
+            htlc.build_payment_transaction(alice.address, app_address, 500000, "Lock Commitment"),
+            htlc.call_application_transaction(alice.address, app_id, [b"lock", hashlock], app_address)])
+        signed = htlc.sign_transactions(alice.pk, txns)
+        journal.record("swap-1", "lock", signed[0].get_txid(), durable=True,
+                       first_valid=txns[0].first_valid_round, last_valid=txns[0].last_valid_round,
+                       hashlock=hashlock)
+        lock_round = htlc.wait_for_confirmation(htlc.send_transactions(signed))["confirmed-round"]
+        journal.close()
+        # algod no longer holds the lock in its pending cache
+        node.forget_confirmed()
+
+        # restarted worker runs the swap again from the start
+        journal = SwapJournal(self.path)
+        self.addCleanup(journal.close)
+        restarted = AlgorandHTLC("", "", client=node, journal=journal)
+        self.addCleanup(restarted.confirmation_tracker.stop)
+        balance = restarted.get_balance(alice.address)
+        self.assertEqual(
+            restarted.commit(teal_manager, alice, 500000, bob, swap_id="swap-1"), (app_id, app_address))
+        restarted.lock_commitment(alice, app_id, 500000, hashlock, app_address, swap_id="swap-1")
+        self.assertEqual(restarted.get_balance(alice.address), balance)
+        self.assertEqual(journal.get("swap-1")["steps"]["lock"]["round"], lock_round)
+
+        restarted.wait_for_confirmation(restarted.redeem(bob, app_id, secret, swap_id="swap-1"))
+        # redeem does not wait, the tracker records the confirmation
+        deadline = time.monotonic() + 2
+        while journal.get("swap-1")["steps"]["redeem"]["status"] != "confirmed":
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        swap = journal.find(hashlock=hashlock)[0]
+        self.assertEqual(swap["app_id"], app_id)
+        self.assertEqual(list(swap["steps"]), ["commit", "lock", "redeem"])
@@ -0,0 +1,69 @@
+#
+from base_test import BaseTest
+from algorand import Algorand
+from fake_algod import FakeAlgod, FakeAlgodServer
+from metrics import MetricsRegistry
+from transport import HttpTransport
+
+
+class TestMetricsRegistry(BaseTest):
+    #
+    def test_disabled_registry_records_nothing(self):
+        metrics = MetricsRegistry(enabled=False)
+        metrics.inc("prehtlc_algod_requests_total", endpoint="GET /v2/status")
+        with metrics.timer("prehtlc_operation_seconds", operation="send"):
+            pass
+        self.assertEqual(metrics.snapshot(), {"enabled": False, "counters": {}, "histograms": {}})
+
+    #
+    def test_prometheus_text(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        metrics.inc("prehtlc_algod_requests_total", endpoint="GET /v2/status")
+        metrics.inc("prehtlc_algod_requests_total", endpoint="GET /v2/status")
+        metrics.observe("prehtlc_operation_seconds", 0.5, operation="send", method="send_group")
+        with self.assertRaises(ValueError):
+            with metrics.timer("prehtlc_operation_seconds", "prehtlc_operation_errors_total",
+                               operation="confirm", method="wait_for_confirmation"):
+                raise ValueError()
+
+        lines = metrics.to_prometheus().splitlines()
+        self.assertIn("# TYPE prehtlc_algod_requests_total counter", lines)
+        self.assertIn('prehtlc_algod_requests_total{endpoint="GET /v2/status"} 2', lines)
+        self.assertIn('prehtlc_operation_errors_total{method="wait_for_confirmation",operation="confirm"} 1',
+                      lines)
+        self.assertIn('prehtlc_operation_seconds_bucket{method="send_group",operation="send",le="0.1"} 0', lines)
+        self.assertIn('prehtlc_operation_seconds_bucket{method="send_group",operation="send",le="1.0"} 1', lines)
+        self.assertIn('prehtlc_operation_seconds_count{method="send_group",operation="send"} 1', lines)
+
+    #
+    def test_client_operations_are_recorded(self):
+        node = FakeAlgod(block_time=0.01)
+        server = FakeAlgodServer(node)
+        node.start()
+        server.start()
+        self.addCleanup(node.stop)
+        self.addCleanup(server.stop)
+
+        metrics = MetricsRegistry()
+        transport = HttpTransport(server.address, metrics=metrics)
+        algorand = Algorand("", server.address, transport=transport, metrics=metrics)
+        self.addCleanup(algorand.confirmation_tracker.stop)
+        self.addCleanup(transport.close)
+        alice, bob = algorand.generate_new_account(), algorand.generate_new_account()
+        node.fund(alice.address, 10 ** 6)
+
+        txn = algorand.build_payment_transaction(alice.address, bob.address, 200000, "Pay")
+        algorand.send_group(alice.pk, [txn])
+
+        snapshot = metrics.snapshot()
+        operations = {entry["labels"]["method"]: entry["count"]
+                      for entry in snapshot["histograms"]["prehtlc_operation_seconds"]}
+        self.assertEqual(operations["build_payment_transaction"], 1)
+        self.assertEqual(operations["send_group"], 1)
+        self.assertEqual(operations["wait_for_confirmation"], 1)
+        requests = {entry["labels"]["endpoint"]: entry["value"]
+                    for entry in snapshot["counters"]["prehtlc_algod_requests_total"]}
+        self.assertEqual(requests["POST /v2/transactions"], 1)
+        sent = {entry["labels"]["endpoint"]: entry["value"]
+                for entry in snapshot["counters"]["prehtlc_algod_request_bytes_sent_total"]}
+        self.assertGreater(sent["POST /v2/transactions"], 0)
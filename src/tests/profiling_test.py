@@ -0,0 +1,62 @@
+#
+import os
+import pstats
+import shutil
+import tempfile
+
+#
+from base_test import BaseTest
+from profiling import PROFILER, SwapProfiler, profiled
+
+
+class Steps:
+    @profiled
+    def lock(self, amount, swap_id=None):
+        return sorted(range(amount))
+
+
+class TestSwapProfiler(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    #
+    def test_phases_of_sampled_swap_are_written(self):
+        profiler = SwapProfiler(self.directory)
+        with profiler.swap(42):
+            with profiler.phase("AlgorandHTLC.commit") as path:
+                with profiler.phase("TealManager.deploy_contract") as nested:
+                    self.assertIsNone(nested)
+                sorted(range(1000), key=lambda i: -i)
+
+        files = sorted(os.listdir(os.path.join(self.directory, "42")))
+        self.assertEqual(files, ["0001-AlgorandHTLC.commit.mem.txt", "0001-AlgorandHTLC.commit.prof"])
+        self.assertTrue(any("<lambda>" in function for _, _, function in pstats.Stats(path).stats))
+        with open(path.replace(".prof", ".mem.txt")) as f:
+            self.assertTrue(f.readline().startswith("step: AlgorandHTLC.commit"))
+
+    #
+    def test_unsampled_and_disabled_write_nothing(self):
+        profiler = SwapProfiler(self.directory, sample_rate=0)
+        with profiler.swap(1):
+            with profiler.phase("AlgorandHTLC.redeem") as path:
+                self.assertIsNone(path)
+
+        profiler.enable(self.directory, sample_rate=1)
+        profiler.disable()
+        with profiler.swap(2):
+            with profiler.phase("AlgorandHTLC.redeem") as path:
+                self.assertIsNone(path)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    #
+    def test_swap_id_argument_opens_swap_block(self):
+        PROFILER.enable(self.directory)
+        self.addCleanup(PROFILER.disable)
+        Steps().lock(100, swap_id=b"\x01\x02")
+        Steps().lock(100, "swap-7")
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ["0102", "swap-7"])
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, "swap-7"))), 2)
@@ -0,0 +1,32 @@
+#
+import tempfile
+
+#
+from base_test import BaseTest
+from program_cache import ProgramCache
+
+
+class TestProgramCache(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    #
+    def test_key_depends_on_source_version_and_mode(self):
+        key = ProgramCache.make_key("int 1", "int 1", 5, "Application")
+        self.assertNotEqual(key, ProgramCache.make_key("int 0", "int 1", 5, "Application"))
+        self.assertNotEqual(key, ProgramCache.make_key("int 1", "int 1", 6, "Application"))
+        self.assertNotEqual(key, ProgramCache.make_key("int 1", "int 1", 5, "Signature"))
+
+    #
+    def test_programs_are_persisted(self):
+        key = ProgramCache.make_key("int 1", "int 1", 5, "Application")
+        cache = ProgramCache(self.tmp_dir.name)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b"\x05\x81\x01\x43", b"\x02")
+
+        restarted = ProgramCache(self.tmp_dir.name)
+        self.assertEqual(restarted.get(key), (b"\x05\x81\x01\x43", b"\x02"))
+        self.assertEqual((restarted.hits, restarted.misses), (1, 0))
@@ -0,0 +1,86 @@
+#
+import time
+import socket
+
+#
+from base_test import BaseTest
+from algorand import Algorand
+from fake_algod import FakeAlgod, FakeAlgodServer
+from router import RoutedAlgodClient
+from transport import PooledAlgodClient
+
+
+#
+class SlowClient(PooledAlgodClient):
+    def algod_request(self, *args, **kwargs):
+        time.sleep(0.3)
+        return super().algod_request(*args, **kwargs)
+
+
+class TestRoutedAlgodClient(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.01)
+        self.node.start()
+        self.addCleanup(self.node.stop)
+        self.addresses = []
+        for _ in range(2):
+            server = FakeAlgodServer(self.node)
+            server.start()
+            self.addCleanup(server.stop)
+            self.addresses.append(server.address)
+
+    #
+    def router(self, clients, **kwargs):
+        router = RoutedAlgodClient(clients, **kwargs)
+        self.addCleanup(router.close)
+        return router
+
+    #
+    def test_submission_is_broadcast(self):
+        algorand = Algorand("", self.addresses)
+        self.addCleanup(algorand.confirmation_tracker.stop)
+        self.assertIsInstance(algorand.client, RoutedAlgodClient)
+        user = algorand.generate_new_account()
+        self.node.fund(user.address, 10 ** 6)
+
+        txn = algorand.build_payment_transaction(user.address, user.address, 1, "a")
+        tx_id = algorand.send_transaction(algorand.sign_transaction(user.pk, txn))
+        algorand.wait_for_confirmation(tx_id)
+        # the second endpoint answers the resubmission as a duplicate
+        algorand.wait_for_confirmation(algorand.send_transaction(algorand.sign_transaction(user.pk, txn)))
+
+        # submit returns on the first answer, the other one may be in flight
+        deadline = time.monotonic() + 2
+        while self.node.requests["send_raw_transaction"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.node.requests["send_raw_transaction"], 4)
+        self.assertGreaterEqual(algorand.client.stats()["duplicates"], 1)
+
+    #
+    def test_slow_read_is_hedged(self):
+        slow, fast = SlowClient("", self.addresses[0]), PooledAlgodClient("", self.addresses[1])
+        router = self.router([slow, fast], hedge_after=0.05)
+
+        start = time.perf_counter()
+        router.status()
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(router.stats()["hedges"], 1)
+
+        time.sleep(0.3)
+        router.status()
+        self.assertEqual(router.stats()["endpoints"][0]["address"], self.addresses[1])
+
+    #
+    def test_unreachable_endpoint_fails_over(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            dead = "http://127.0.0.1:{}".format(sock.getsockname()[1])
+        router = self.router([PooledAlgodClient("", dead), PooledAlgodClient("", self.addresses[0])])
+
+        for _ in range(3):
+            self.assertIn("last-round", router.status())
+        endpoints = router.stats()["endpoints"]
+        self.assertEqual(endpoints[0]["address"], self.addresses[0])
+        self.assertEqual(endpoints[1]["errors"], 1)
@@ -0,0 +1,59 @@
+#
+import time
+import threading
+
+#
+from base_test import BaseTest
+from scheduler import Priority, RequestScheduler, request_priority
+
+
+class TestRequestScheduler(BaseTest):
+    #
+    def test_classify(self):
+        classify = RequestScheduler.classify
+        self.assertEqual(classify("POST", "/v2/transactions"), Priority.SUBMIT)
+        self.assertEqual(classify("GET", "/v2/transactions/pending/ABC"), Priority.CONFIRMATION)
+        self.assertEqual(classify("GET", "/v2/accounts/ABC"), Priority.READ)
+        self.assertEqual(classify("GET", "/v2/blocks/5/txids"), Priority.CONFIRMATION)
+        self.assertEqual(classify("GET", "/v2/blocks/5?format=msgpack"), Priority.CONFIRMATION)
+        with request_priority(Priority.REDEEM):
+            self.assertEqual(classify("GET", "/v2/status/wait-for-block-after/5"), Priority.REDEEM)
+        self.assertEqual(classify("GET", "/v2/status"), Priority.READ)
+
+    #
+    def test_higher_priority_is_served_first(self):
+        scheduler = RequestScheduler(rate=10, burst=1)
+        scheduler.acquire("GET", "/v2/status")
+        served = []
+
+        def request(path, priority):
+            with request_priority(priority):
+                scheduler.acquire("GET", path)
+            served.append(path)
+
+        threads = [threading.Thread(target=request, args=("/v2/accounts/A", Priority.READ)),
+                   threading.Thread(target=request, args=("/v2/transactions/pending/T", Priority.REDEEM))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        self.assertEqual(scheduler.stats()["queues"]["read"], 1)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(served, ["/v2/transactions/pending/T", "/v2/accounts/A"])
+        waits = scheduler.stats()["waits"]
+        self.assertEqual(waits["redeem"]["count"], 1)
+        self.assertGreater(waits["read"]["max_ms"], waits["redeem"]["max_ms"])
+
+    #
+    def test_throttling_lowers_rate(self):
+        scheduler = RequestScheduler(rate=8, min_rate=1, backoff=0.5, recovery=1)
+        scheduler.feedback(429)
+        scheduler.feedback(429)
+        self.assertEqual(scheduler.rate, 2)
+        scheduler.feedback(200)
+        self.assertEqual(scheduler.rate, 3)
+        for _ in range(10):
+            scheduler.feedback(200)
+        self.assertEqual(scheduler.rate, 8)
+        self.assertEqual(scheduler.stats()["throttled"], 2)
@@ -0,0 +1,47 @@
+#
+from algosdk import account, encoding
+from algosdk.transaction import PaymentTxn, SuggestedParams
+
+#
+from base_test import BaseTest
+from signer import TransactionSigner
+
+
+#
+class TestTransactionSigner(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.params = SuggestedParams(1000, 1, 1000, "", "", flat_fee=True)
+        self.accounts = [account.generate_account() for _ in range(3)]
+
+    #
+    def payments(self, count):
+        return [
+            PaymentTxn(self.accounts[i % 3][1], self.params, self.accounts[0][1], i)
+            for i in range(count)
+        ]
+
+    #
+    def test_sign_matches_sdk(self):
+        signer = TransactionSigner(max_workers=0)
+        private_key, _ = self.accounts[0]
+        txn = self.payments(1)[0]
+        rekeyed = self.payments(2)[1]
+
+        for key, unsigned in [(private_key, txn), (private_key, rekeyed)]:
+            self.assertEqual(encoding.msgpack_encode(signer.sign(key, unsigned)),
+                             encoding.msgpack_encode(unsigned.sign(key)))
+        self.assertIs(signer.decode(private_key), signer.decode(private_key))
+
+    #
+    def test_parallel_batch_keeps_order(self):
+        txns = self.payments(50)
+        keys = [self.accounts[i % 3][0] for i in range(50)]
+        with TransactionSigner(max_workers=2, min_parallel_batch=10, chunk_size=7) as signer:
+            signed = signer.sign_batch(keys, txns)
+
+        self.assertEqual([encoding.msgpack_encode(stxn) for stxn in signed],
+                         [encoding.msgpack_encode(txn.sign(key)) for key, txn in zip(keys, txns)])
+        with self.assertRaises(ValueError):
+            signer.sign_batch(keys[:2], txns)
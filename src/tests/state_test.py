@@ -0,0 +1,72 @@
+#
+import base64
+
+#
+from algosdk import account, encoding
+
+#
+from base_test import BaseTest
+from confirmation import ConfirmationTracker
+from state import StateReader
+
+
+#
+class StateClient:
+    def __init__(self, address):
+        self.requests = {"application_info": 0}
+        self.address = address
+
+    def params(self, app_id):
+        def key(name):
+            return base64.b64encode(name).decode('ascii')
+
+        return {"creator": "CREATOR", "global-state": [
+            {"key": key(b"committed_amount"), "value": {"type": 2, "uint": app_id}},
+            {"key": key(b"alice"), "value": {"type": 1, "bytes": key(self.address)}},
+            {"key": key(b"\xff"), "value": {"type": 1, "bytes": key(b"raw")}}
+        ]}
+
+    def application_info(self, app_id):
+        self.requests["application_info"] += 1
+        return {"id": app_id, "params": self.params(app_id)}
+
+
+class TestStateReader(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.address = account.generate_account()[1]
+        self.client = StateClient(encoding.decode_address(self.address))
+        self.round = 10
+        self.tracker = ConfirmationTracker(None)
+        self.reader = StateReader(self.client, lambda: self.round, self.tracker)
+
+    #
+    def test_values_are_typed_by_contract_schema(self):
+        state = self.reader.get(7, "commit")
+
+        self.assertEqual(state["committed_amount"], 7)
+        self.assertEqual(state["alice"], self.address)
+        self.assertEqual(state["bob"], None)
+        self.assertEqual(state[b"\xff"], b"raw")
+
+    #
+    def test_state_is_cached_with_round_read_at(self):
+        self.reader.get_many([1, 2, 3], "commit")
+        self.reader.get_many([1, 2, 3], "commit")
+        self.assertEqual(self.client.requests, {"application_info": 3})
+        self.assertEqual((self.reader.hits, self.reader.misses), (3, 3))
+
+        # state read at round 10 is stale once the estimate passes it
+        self.round = 11
+        self.reader.get_many([1, 2], "commit")
+        self.reader.get(1, "commit")
+        self.assertEqual(self.client.requests, {"application_info": 5})
+
+    #
+    def test_app_call_invalidates_cached_state(self):
+        self.reader.get(1, "commit")
+        self.reader.get(1, "commit")
+        self.reader.invalidate(1, self.round)
+        self.reader.get(1, "commit")
+        self.assertEqual((self.reader.hits, self.reader.misses), (1, 2))
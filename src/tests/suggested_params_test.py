@@ -0,0 +1,57 @@
+#
+import time
+
+#
+from algosdk.transaction import SuggestedParams
+
+#
+from base_test import BaseTest
+from suggested_params import SuggestedParamsProvider
+
+
+#
+class ParamsClient:
+    def __init__(self):
+        self.calls = 0
+
+    def suggested_params(self):
+        self.calls += 1
+        return SuggestedParams(1000, 500, 1500, "gh", "testnet-v1.0", flat_fee=True)
+
+
+class TestSuggestedParamsProvider(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.client = ParamsClient()
+
+    #
+    def test_params_are_served_from_cache(self):
+        provider = SuggestedParamsProvider(self.client, validity_rounds=100)
+        first = provider.get()
+        second = provider.get()
+
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual((first.first, first.last), (500, 600))
+        self.assertIsNot(first, second)
+        self.assertEqual(provider.stats()["hits"], 1)
+
+    #
+    def test_params_are_refreshed_after_refresh_rounds(self):
+        provider = SuggestedParamsProvider(self.client, refresh_rounds=3, block_time=0.01)
+        provider.get()
+        time.sleep(0.05)
+        provider.get()
+
+        self.assertEqual(self.client.calls, 2)
+        self.assertEqual(provider.refreshes, 2)
+
+    #
+    def test_validity_window_follows_current_round(self):
+        provider = SuggestedParamsProvider(self.client, refresh_rounds=1000, block_time=0.01)
+        provider.get()
+        time.sleep(0.05)
+        params = provider.get()
+
+        self.assertGreaterEqual(params.first, 504)
+        self.assertEqual(params.last - params.first, SuggestedParamsProvider.MAX_TXN_LIFE)
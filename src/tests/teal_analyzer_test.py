@@ -0,0 +1,70 @@
+#
+import json
+
+#
+from base_test import BaseTest
+from benchmarks import teal_costs
+from teal_analyzer import TealAnalyzer, TealAnalysisError
+
+
+#
+PROGRAM = """#pragma version 5
+txna ApplicationArgs 0
+byte "a"
+==
+bnz branch_a
+txna ApplicationArgs 0
+byte "b"
+==
+bnz branch_b
+err
+branch_a:
+int 1
+return
+branch_b:
+callsub hash
+int 1
+return
+hash:
+txna ApplicationArgs 1
+sha256
+pop
+retsub
+"""
+
+
+class TestTealAnalyzer(BaseTest):
+    #
+    def test_branch_costs_include_dispatch_and_subroutines(self):
+        report = TealAnalyzer().analyze(PROGRAM, "#pragma version 5\nint 1\n")
+
+        self.assertEqual(report.to_dict()["branches"], {"a": 7, "b": 50})
+        self.assertEqual(report.max_cost, 50)
+        self.assertEqual(report.extra_pages, 0)
+
+    #
+    def test_loop_is_rejected(self):
+        with self.assertRaises(TealAnalysisError):
+            TealAnalyzer().analyze("#pragma version 5\nloop:\nint 1\nbnz loop\nint 1\n")
+
+    #
+    def test_contracts_within_baseline(self):
+        with open(teal_costs.BASELINE) as f:
+            baseline = json.load(f)
+
+        reports = teal_costs.analyze(TealAnalyzer.CONTRACTS)
+
+        self.assertEqual(teal_costs.compare(reports, baseline), [])
+        self.assertEqual(set(reports["commit"]["branches"]),
+                         {"create", "delete", "commit", "lock", "claim"})
+
+    #
+    def test_branch_changes_fail_against_baseline(self):
+        report = {"size": 10, "extra_pages": 0, "budget": 700, "branches": {"a": 5, "c": 5}}
+        baseline = {"x": {"size": 10, "extra_pages": 0, "budget": 700, "branches": {"a": 5, "b": 5}}}
+
+        self.assertEqual(teal_costs.compare({"x": report}, baseline), [
+            "x b branch removed since the baseline",
+            "x c branch is not in the baseline"
+        ])
+        self.assertEqual(teal_costs.compare({"y": report}, baseline), ["y is not in the baseline"])
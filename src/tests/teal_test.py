@@ -0,0 +1,238 @@
+#
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+#
+from algosdk import account, logic, transaction
+
+#
+from base_test import BaseTest
+from fake_ledger import FakeLedger, FakeLedgerError
+from teal import TealManager
+
+
+#
+SRC_PATH = os.path.join(os.path.dirname(__file__), "..")
+CONTRACTS_PATH = os.path.join(SRC_PATH, "smart_contracts")
+
+
+class TestTealManager(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), self.tmp_dir.name)
+
+    #
+    def run_python(self, code):
+        return subprocess.run(
+                    [sys.executable, "-c", code],
+                    cwd=SRC_PATH,
+                    check=True,
+                    capture_output=True,
+                    text=True
+                ).stdout.strip()
+
+    #
+    def test_import_does_not_load_pyteal(self):
+        loaded = self.run_python("import sys, algorand_htlc; print('pyteal' in sys.modules)")
+        self.assertEqual(loaded, "False")
+
+    #
+    def test_cached_deploy_does_not_load_pyteal(self):
+        teal_manager = TealManager(self.tmp_dir.name)
+        programs = teal_manager.deploy_contract(None, "commit", TealManager.LOCAL_BACKEND)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["cache", "clear.teal"])
+
+        loaded = self.run_python(
+            "import sys; from teal import TealManager; "
+            "tm = TealManager({!r}); "
+            "programs = tm.deploy_contract(None, 'commit', TealManager.LOCAL_BACKEND); "
+            "print(programs[0].hex(), 'pyteal' in sys.modules)".format(self.tmp_dir.name)
+        )
+        self.assertEqual(loaded, "{} False".format(programs[0].hex()))
+
+    #
+    def test_clear_program_matches_contract_version(self):
+        teal_manager = TealManager(self.tmp_dir.name)
+        approval, clear = teal_manager.deploy_contract(None, "swap_registry", TealManager.LOCAL_BACKEND)
+        self.assertEqual(approval[0], 8)
+        self.assertEqual(clear[0], 8)
+        self.assertEqual(teal_manager.deploy_contract(None, "commit", TealManager.LOCAL_BACKEND)[1][0], 2)
+
+    #
+    def test_deploy_version_selects_optimized_variant(self):
+        teal_manager = TealManager(self.tmp_dir.name, versions={"commit": TealManager.OPTIMIZED_VERSION})
+        approval, clear = teal_manager.deploy_contract(None, "commit", TealManager.LOCAL_BACKEND)
+        self.assertEqual((approval[0], clear[0]), (8, 8))
+        self.assertIn("match ", teal_manager.get_teal_source("commit"))
+
+        approval = teal_manager.deploy_contract(None, "commit", TealManager.LOCAL_BACKEND, version=5)[0]
+        self.assertEqual(approval[0], 5)
+
+    #
+    def test_optimized_variant_without_match_dispatch_is_rejected(self):
+        class NoMatchTealManager(TealManager):
+            @staticmethod
+            def match_dispatch(teal_code):
+                return teal_code
+
+        teal_manager = NoMatchTealManager(self.tmp_dir.name)
+        with self.assertRaises(ValueError):
+            teal_manager.get_teal_source("commit", TealManager.OPTIMIZED_VERSION)
+
+
+class TestOptimizedContracts(BaseTest):
+    """
+    Differential test running each call sequence against the contract
+    built for TEAL_VERSION and for OPTIMIZED_VERSION
+    """
+
+    #
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), tmp_dir)
+        self.teal_manager = TealManager(tmp_dir)
+        self.params = transaction.SuggestedParams(1000, 1, 1000, "", "", True)
+        self.keys = {}
+        for name in ("alice", "bob", "mallory"):
+            private_key, address = account.generate_account()
+            self.keys[name] = (private_key, address)
+        self.secret = os.urandom(32)
+        self.hashlock = hashlib.sha256(self.secret).digest()
+
+    #
+    def address(self, name):
+        return self.keys[name][1]
+
+    #
+    def call(self, ledger, app_id, sender, args=None, accounts=None,
+             on_complete=transaction.OnComplete.NoOpOC, pay=0, programs=None):
+        txns = []
+        if pay:
+            txns.append(transaction.PaymentTxn(
+                self.address(sender), self.params, logic.get_application_address(app_id), pay))
+        if programs:
+            txns.append(transaction.ApplicationCreateTxn(
+                self.address(sender), self.params, on_complete, programs[0], programs[1],
+                transaction.StateSchema(4, 4), transaction.StateSchema(0, 0),
+                app_args=args, accounts=accounts, note=os.urandom(8)))
+        else:
+            txns.append(transaction.ApplicationCallTxn(
+                self.address(sender), self.params, app_id, on_complete,
+                app_args=args, accounts=accounts, note=os.urandom(8)))
+        if len(txns) > 1:
+            transaction.assign_group_id(txns)
+        group = [txn.sign(self.keys[sender][0]) for txn in txns]
+
+        view = ledger.child()
+        try:
+            results = view.apply_group(group, 2, 0)
+        except FakeLedgerError:
+            return False, None
+        view.commit()
+        return True, results[-1].get("application-index")
+
+    #
+    def trace(self, contract, version, calls):
+        ledger = FakeLedger()
+        for _, address in self.keys.values():
+            ledger.fund(address, 10 ** 7)
+        programs = self.teal_manager.deploy_contract(
+                        None, contract, TealManager.LOCAL_BACKEND, version)
+
+        app_id = None
+        trace = []
+        for call in calls:
+            call = dict(call)
+            if call.pop("create", False):
+                call["programs"] = programs
+            accepted, created = self.call(ledger, app_id, **call)
+            app_id = created or app_id
+            app = ledger.get_app(app_id) if app_id else None
+            trace.append((
+                accepted,
+                dict(app["global_state"]) if app else None,
+                {name: ledger.get_account(address)["amount"]
+                 for name, (_, address) in self.keys.items()}
+            ))
+        return trace
+
+    #
+    def assertSameBehavior(self, contract, calls):
+        before = self.trace(contract, TealManager.TEAL_VERSION, calls)
+        after = self.trace(contract, TealManager.OPTIMIZED_VERSION, calls)
+        for i, (old, new) in enumerate(zip(before, after)):
+            with self.subTest(call=i):
+                self.assertEqual(old, new)
+        return before
+
+    #
+    def test_commit(self):
+        amount = (100000).to_bytes(8, 'big')
+        delete = transaction.OnComplete.DeleteApplicationOC
+        trace = self.assertSameBehavior("commit", [
+            {"sender": "alice", "create": True, "args": [b"commit", amount],
+             "accounts": [self.address("bob")]},
+            {"sender": "alice", "pay": 300000},
+            {"sender": "alice"},
+            {"sender": "alice", "args": [b"refund"]},
+            {"sender": "alice", "args": [b"commit", amount], "accounts": [self.address("bob")]},
+            {"sender": "mallory", "args": [b"lock", self.hashlock]},
+            {"sender": "alice", "args": [b"lock", self.hashlock], "pay": 300000},
+            {"sender": "alice", "args": [b"claim", self.secret]},
+            {"sender": "bob", "args": [b"claim", b"wrong secret"]},
+            {"sender": "alice", "args": [b"claim"], "on_complete": delete},
+            {"sender": "bob", "args": [b"claim", self.secret]},
+            {"sender": "mallory", "on_complete": delete},
+            {"sender": "alice", "on_complete": delete},
+        ])
+        self.assertEqual([step[0] for step in trace],
+                         [True, False, False, False, False, False, True, False,
+                          False, False, True, False, True])
+
+        self.assertSameBehavior("commit", [
+            {"sender": "alice", "create": True},
+            {"sender": "bob", "args": [b"commit", amount], "accounts": [self.address("alice")]},
+            {"sender": "alice", "args": [b"commit", amount], "accounts": [self.address("bob")]},
+            {"sender": "alice", "on_complete": delete},
+        ])
+
+    #
+    def test_lock_redeem_dest(self):
+        amount = (1000).to_bytes(8, 'big')
+        delete = transaction.OnComplete.DeleteApplicationOC
+        trace = self.assertSameBehavior("lock_redeem_dest", [
+            {"sender": "bob", "create": True, "args": [b"lock", amount, self.hashlock],
+             "accounts": [self.address("alice")]},
+            {"sender": "bob", "args": [b"redeem", self.secret]},
+            {"sender": "bob", "args": [b"lock", amount, self.hashlock],
+             "accounts": [self.address("alice")]},
+            {"sender": "bob", "args": [b"lock", amount, self.hashlock],
+             "accounts": [self.address("alice")]},
+            {"sender": "bob", "on_complete": delete},
+            {"sender": "alice", "args": [b"redeem", b"wrong secret"]},
+            {"sender": "alice", "args": [b"redeem", self.secret]},
+            {"sender": "mallory", "on_complete": delete},
+            {"sender": "bob", "on_complete": delete},
+        ])
+        self.assertEqual([step[0] for step in trace],
+                         [True, False, True, False, False, False, True, False, True])
+
+    #
+    def test_lock(self):
+        amount = (1000).to_bytes(8, 'big')
+        trace = self.assertSameBehavior("lock", [
+            {"sender": "alice", "create": True},
+            {"sender": "alice", "args": [b"lock", amount, self.hashlock], "pay": 300000},
+            {"sender": "bob", "args": [b"redeem", self.secret]},
+            {"sender": "alice", "args": [b"refund"]},
+        ])
+        self.assertEqual([step[0] for step in trace], [True, False, False, False])
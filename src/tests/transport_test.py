@@ -0,0 +1,45 @@
+#
+from algosdk import error
+
+#
+from base_test import BaseTest
+from algorand import Algorand
+from fake_algod import FakeAlgod, FakeAlgodServer
+from transport import HttpTransport, endpoint_path
+
+
+class TestHttpTransport(BaseTest):
+    #
+    def setUp(self):
+        super().setUp()
+        self.node = FakeAlgod(block_time=0.01)
+        self.server = FakeAlgodServer(self.node)
+        self.node.start()
+        self.server.start()
+        self.addCleanup(self.node.stop)
+        self.addCleanup(self.server.stop)
+
+    #
+    def test_requests_reuse_connection(self):
+        transport = HttpTransport(self.server.address, pool_size=2)
+        algorand = Algorand("", self.server.address, transport=transport)
+        self.addCleanup(algorand.confirmation_tracker.stop)
+        self.addCleanup(transport.close)
+
+        user = algorand.generate_new_account()
+        self.node.fund(user.address, 10 ** 6)
+        for _ in range(3):
+            self.assertEqual(algorand.client.account_info(user.address)["amount"], 10 ** 6)
+        with self.assertRaises(error.AlgodHTTPError):
+            algorand.get_transaction_info("A" * 52)
+
+        self.assertIs(algorand.transport, transport)
+        stats = transport.stats()
+        self.assertEqual(stats["GET /v2/accounts/{address}"]["requests"], 3)
+        self.assertEqual(sum(endpoint["connections_opened"] for endpoint in stats.values()), 1)
+        self.assertEqual(stats["GET /v2/transactions/pending/{txid}"]["requests"], 1)
+
+    #
+    def test_endpoint_path(self):
+        self.assertEqual(endpoint_path("/v2/applications/12/box?name=b64:YQ=="),
+                         "/v2/applications/{id}/box")
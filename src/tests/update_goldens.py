@@ -0,0 +1,94 @@
+#
+import os
+import sys
+import json
+import argparse
+
+#
+from typing import List
+
+#
+from algosdk.v2client.algod import AlgodClient
+
+#
+from teal import TealManager
+
+
+#
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden")
+SOURCES = os.path.join(GOLDEN_PATH, "sources.json")
+
+# contracts whose TEAL is pinned by --pin
+CONTRACTS = ("commit", "lock", "lock_redeem_dest", "swap_registry", "clear_state_program")
+
+
+#
+def pin(contracts: List[str]) -> None:
+    """
+    Pin TEAL generated by the contract builders as golden sources
+
+    :param contracts: names of TealManager contract methods
+
+    :returns: None
+    """
+    teal_manager = TealManager(GOLDEN_PATH)
+    for contract in contracts:
+        teal_code = teal_manager.compile_teal_file(
+            TealManager.__dict__[contract](), teal_manager.get_version(contract))
+        with open(os.path.join(GOLDEN_PATH, "{}.teal".format(contract)), "w") as f:
+            f.write(teal_code + "\n")
+
+
+#
+def update(client: AlgodClient, names: List[str]) -> dict:
+    """
+    Compile golden sources with algod and write the bytecode, goldens
+    are never produced by the local assembler they check
+
+    :param client: Client class for algod. Handles all algod requests.
+    :param names: golden names, every pinned source by default
+
+    :returns: source description per updated golden
+    """
+    build = client.versions()["build"]
+    origin = "algod {major}.{minor}.{build_number} /v2/teal/compile".format(**build)
+    with open(SOURCES) as f:
+        sources = json.load(f)
+    for name in names:
+        with open(os.path.join(GOLDEN_PATH, "{}.teal".format(name))) as f:
+            result = client.compile(f.read())["result"]
+        with open(os.path.join(GOLDEN_PATH, "{}.b64".format(name)), "w") as f:
+            f.write(result + "\n")
+        sources[name] = origin
+    with open(SOURCES, "w") as f:
+        f.write(json.dumps(sources, indent=2, sort_keys=True) + "\n")
+    return sources
+
+
+#
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Regenerate assembler goldens with algod")
+    parser.add_argument("names", nargs="*")
+    parser.add_argument("--algod-address",
+                        help="node compiling the goldens, without it --pin only pins sources")
+    parser.add_argument("--algod-token", default="")
+    parser.add_argument("--pin", action="store_true",
+                        help="pin TEAL of the contract builders before compiling")
+    args = parser.parse_args(argv)
+
+    if args.pin:
+        pin(CONTRACTS)
+    if args.algod_address is None:
+        if not args.pin:
+            parser.error("--algod-address is required to compile goldens")
+        return 0
+    names = args.names or sorted(
+        name[:-len(".teal")] for name in os.listdir(GOLDEN_PATH) if name.endswith(".teal"))
+    sources = update(AlgodClient(args.algod_token, args.algod_address), names)
+    for name in names:
+        print(name, sources[name])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#
+import os
+import shutil
+import hashlib
+import tempfile
+
+#
+from algosdk import error
+
+#
+from base_test import BaseTest
+from algorand_htlc import AlgorandHTLC
+from fake_algod import FakeAlgod
+from follower import BlockFollower, RedeemEvent
+from metrics import MetricsRegistry
+from teal import TealManager
+from watcher import PreimageWatcher
+
+
+#
+CONTRACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "smart_contracts")
+
+
+#
+class RecordingHTLC:
+    def __init__(self, failures=0, last_round=100):
+        self.metrics = MetricsRegistry(enabled=False)
+        self.redeemed = []
+        self.failures = failures
+        self.client = self
+        self.last_round = last_round
+
+    def redeem(self, sender, app_id, secret, swap_id=None):
+        self.redeemed.append((app_id, secret))
+        return "TX{}".format(app_id)
+
+    def wait_for_confirmation(self, tx_id):
+        if self.failures:
+            self.failures -= 1
+            raise error.ConfirmationTimeoutError("claim rejected")
+        return {"confirmed-round": self.last_round}
+
+    def status(self):
+        return {"last-round": self.last_round}
+
+
+class TestPreimageWatcher(BaseTest):
+    #
+    def test_revealed_secret_claims_matching_swap(self):
+        htlc = RecordingHTLC()
+        follower = BlockFollower(None)
+        self.addCleanup(follower.close)
+        watcher = PreimageWatcher(htlc, follower)
+        secrets = [i.to_bytes(32, 'big') for i in range(5000)]
+        for i, secret in enumerate(secrets):
+            watcher.add(hashlib.sha256(secret).digest(), 1000 + i, None, dest_app_id=9000 + i)
+
+        futures = watcher.on_reveal(RedeemEvent(10, 9042, "ALICE", [b"redeem", secrets[42]], secret=secrets[42]))
+        self.assertEqual([future.result() for future in futures], ["TX1042"])
+        self.assertEqual(watcher.on_reveal(RedeemEvent(11, 9042, "ALICE", [], secret=b"unknown")), [])
+        watcher.close()
+
+        self.assertEqual(htlc.redeemed, [(1042, secrets[42])])
+        stats = watcher.stats()
+        self.assertEqual((stats["pending"], stats["claimed"]), (4999, 1))
+        self.assertEqual(follower.stats()["watched"], 4999)
+
+    #
+    def test_failed_claim_is_retried_until_timelock(self):
+        htlc = RecordingHTLC(failures=2)
+        follower = BlockFollower(None)
+        self.addCleanup(follower.close)
+        watcher = PreimageWatcher(htlc, follower, retry_delay=0.01)
+        secret, expired_secret = b"s" * 32, b"e" * 32
+        watcher.add(hashlib.sha256(secret).digest(), 1, None, timelock=200)
+        watcher.add(hashlib.sha256(expired_secret).digest(), 2, None, timelock=99)
+
+        with self.assertLogs("PreHTLC", "WARNING"):
+            claimed = watcher.on_reveal(RedeemEvent(10, 9, "ALICE", [], secret=secret))[0]
+            self.assertEqual(claimed.result(timeout=5), "TX1")
+        htlc.failures = 1
+        expired = watcher.on_reveal(RedeemEvent(10, 9, "ALICE", [], secret=expired_secret))[0]
+        with self.assertRaises(error.ConfirmationTimeoutError):
+            expired.result(timeout=5)
+        watcher.close()
+
+        stats = watcher.stats()
+        self.assertEqual((stats["claimed"], stats["failed"], stats["retries"]), (1, 1, 2))
+        self.assertEqual(htlc.redeemed, [(1, secret)] * 3 + [(2, expired_secret)])
+
+    #
+    def test_destination_redeem_claims_source_swap(self):
+        node = FakeAlgod(block_time=0.01)
+        node.start()
+        self.addCleanup(node.stop)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        shutil.copy(os.path.join(CONTRACTS_PATH, "clear.teal"), tmp_dir)
+        teal_manager = TealManager(tmp_dir)
+
+        metrics = MetricsRegistry()
+        htlc = AlgorandHTLC("", "", client=node, metrics=metrics)
+        self.addCleanup(htlc.confirmation_tracker.stop)
+        alice, bob = htlc.generate_new_account(), htlc.generate_new_account()
+        node.fund(alice.address, 10 ** 7)
+        node.fund(bob.address, 10 ** 7)
+        secret = os.urandom(32)
+        hashlock = hashlib.sha256(secret).digest()
+
+        follower = BlockFollower(node, start_round=node.round + 1)
+        self.addCleanup(follower.close)
+        watcher = PreimageWatcher(htlc, follower)
+
+        app_id, app_address = htlc.commit(teal_manager, alice, 500000, bob)
+        htlc.send_group(alice.pk, [
+            htlc.build_payment_transaction(alice.address, app_address, 200000, "Fill")])
+        htlc.lock_commitment(alice, app_id, 500000, hashlock, app_address)
+        dest_app_id, asset_id = htlc.create_new_asset(teal_manager, bob)
+        htlc.lock_dest_chain(bob, dest_app_id, asset_id, 100, hashlock, alice)
+        watcher.add(hashlock, app_id, bob, dest_app_id)
+
+        htlc.redeem_dest(alice, dest_app_id, secret)
+        follower.poll()
+        watcher.close()
+
+        stats = watcher.stats()
+        self.assertEqual((stats["pending"], stats["claimed"], stats["failed"]), (0, 1, 0))
+        self.assertIn("p99_ms", stats["latency"])
+        self.assertEqual(follower.stats()["watched"], 0)
+        histogram = metrics.snapshot()["histograms"]["prehtlc_reveal_to_claim_seconds"]
+        self.assertEqual(histogram[0]["count"], 1)
@@ -0,0 +1,399 @@
+#
+import re
+import json
+import time
+import threading
+import http.client
+
+#
+from typing import Dict, Optional, Tuple
+from urllib import parse
+from dataclasses import dataclass, asdict
+
+#
+from algosdk import constants, error
+from algosdk.v2client.algod import AlgodClient, api_version_path_prefix
+
+#
+from metrics import REGISTRY, MetricsRegistry
+from scheduler import RequestScheduler
+
+
+# path segments replaced so requests group by endpoint
+PATH_PARAMS = [
+    (re.compile(r"^\d+$"), "{id}"),
+    (re.compile(r"^[A-Z2-7]{58}$"), "{address}"),
+    (re.compile(r"^[A-Z2-7]{52}$"), "{txid}")
+]
+
+
+#
+def endpoint_path(requrl: str) -> str:
+    """
+    Replace ids, addresses and transaction ids in request path
+
+    :param requrl: request path, e.g. /accounts/ABC.../
+    :returns: path template, e.g. /accounts/{address}
+    """
+    path = requrl.split("?", 1)[0]
+    segments = []
+    for segment in path.strip("/").split("/"):
+        for pattern, name in PATH_PARAMS:
+            if pattern.match(segment):
+                segment = name
+                break
+        segments.append(segment)
+    return "/" + "/".join(segments)
+
+
+#
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+    retries: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+#
+class HttpTransport:
+    """
+    HttpTransport object sending HTTP/1.1 requests over a pool of
+    keep-alive connections to a single host, safe to share between
+    threads
+    """
+
+    # errors of an idle connection the server has closed meanwhile
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                    ConnectionResetError, BrokenPipeError)
+
+    #
+    def __init__(
+                self,
+                address: str,
+                pool_size: int = 10,
+                connect_timeout: float = 5,
+                timeout: float = 30,
+                scheduler: Optional[RequestScheduler] = None,
+                metrics: Optional[MetricsRegistry] = None
+            ) -> None:
+        """
+        Constructor
+
+        :param address: base url, for example https://testnet-api.algonode.cloud
+        :param pool_size: maximum number of open connections, requests
+                          beyond it wait for a free connection
+        :param connect_timeout: seconds opening a connection may take
+        :param timeout: seconds a request may take once connected
+        :param scheduler: rate limiter every request waits for, it may
+                          be shared by transports to one provider
+        :param metrics: registry request counts, bytes sent, errors and
+                        latencies are recorded in, the package REGISTRY
+                        by default
+
+        :returns: None
+        """
+        url = parse.urlsplit(address)
+        self.__https = url.scheme == "https"
+        self.__host = url.hostname
+        self.__port = url.port or (443 if self.__https else 80)
+        self.__prefix = url.path.rstrip("/")
+        self.__connect_timeout = connect_timeout
+        self.__timeout = timeout
+        self.__scheduler = scheduler
+        self.__metrics = metrics or REGISTRY
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(pool_size)
+        self.__idle = []
+        self.__stats = {}
+
+    #
+    @property
+    def timeout(self) -> float:
+        """
+        Getter for timeout private field
+
+        :returns: seconds a request may take once connected
+        """
+        return self.__timeout
+
+    #
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """
+        Getter for metrics private field
+
+        :returns: metrics field value
+        """
+        return self.__metrics
+
+    #
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        """
+        Getter for scheduler private field
+
+        :returns: scheduler field value
+        """
+        return self.__scheduler
+
+    #
+    def request(
+                self,
+                method: str,
+                path: str,
+                headers: dict,
+                body: Optional[bytes] = None,
+                timeout: Optional[float] = None
+            ) -> Tuple[int, bytes]:
+        """
+        Send request reusing an idle connection when possible
+
+        :param method: http method
+        :param path: request path with query
+        :param headers: request headers
+        :param body: request body
+        :param timeout: seconds the request may take once connected,
+                        timeout of the transport by default
+
+        :returns: status code and response body
+        """
+        endpoint = "{} {}".format(method, endpoint_path(path))
+        if self.__scheduler is not None:
+            self.__scheduler.acquire(method, path)
+        start = time.perf_counter()
+        with self.__slots:
+            connection, reused = self.__acquire(endpoint)
+            try:
+                try:
+                    status, response, keep_alive = self.__exchange(
+                        connection, method, path, headers, body, timeout)
+                except self.STALE_ERRORS:
+                    connection.close()
+                    if not reused:
+                        raise
+                    # idle connection was closed by the server, retry on a new one
+                    self.__count(endpoint, "retries")
+                    connection = self.__connect(endpoint)
+                    status, response, keep_alive = self.__exchange(
+                        connection, method, path, headers, body, timeout)
+            except Exception:
+                connection.close()
+                self.__count(endpoint, "errors", time.perf_counter() - start)
+                self.__record(endpoint, body, time.perf_counter() - start, None)
+                raise
+
+            if keep_alive:
+                with self.__lock:
+                    self.__idle.append(connection)
+            else:
+                connection.close()
+        self.__count(endpoint, "requests", time.perf_counter() - start)
+        self.__record(endpoint, body, time.perf_counter() - start, status)
+        if self.__scheduler is not None:
+            self.__scheduler.feedback(status)
+        return status, response
+
+    #
+    def stats(self) -> Dict[str, dict]:
+        """
+        Connection metrics per "METHOD /path" endpoint
+
+        :returns: requests, connections opened and reused, retries of
+                  stale connections, errors and seconds spent
+        """
+        with self.__lock:
+            return {endpoint: asdict(stats) for endpoint, stats in self.__stats.items()}
+
+    #
+    def close(self) -> None:
+        """
+        Close idle connections
+
+        :returns: None
+        """
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for connection in idle:
+            connection.close()
+
+    #
+    def __acquire(self, endpoint: str) -> tuple:
+        """
+        Take idle connection or open a new one
+
+        :param endpoint: endpoint the connection is counted for
+
+        :returns: connection and whether it was idle
+        """
+        with self.__lock:
+            connection = self.__idle.pop() if self.__idle else None
+        if connection is not None:
+            self.__count(endpoint, "connections_reused")
+            return connection, True
+        return self.__connect(endpoint), False
+
+    #
+    def __connect(self, endpoint: str) -> http.client.HTTPConnection:
+        """
+        Open new connection
+
+        :param endpoint: endpoint the connection is counted for
+
+        :returns: connected http.client connection
+        """
+        connection_class = http.client.HTTPSConnection if self.__https else http.client.HTTPConnection
+        connection = connection_class(self.__host, self.__port, timeout=self.__connect_timeout)
+        connection.connect()
+        self.__count(endpoint, "connections_opened")
+        return connection
+
+    #
+    def __exchange(self, connection, method, path, headers, body, timeout) -> tuple:
+        """
+        Write request and read response on an open connection
+
+        :returns: status code, response body and keep-alive flag
+        """
+        connection.sock.settimeout(timeout or self.__timeout)
+        connection.request(method, self.__prefix + path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        return response.status, payload, not response.will_close
+
+    #
+    def __record(self, endpoint: str, body: Optional[bytes], seconds: float, status: Optional[int]) -> None:
+        """
+        Record request in the metrics registry
+
+        :param endpoint: "METHOD /path" endpoint
+        :param body: request body
+        :param seconds: request time
+        :param status: http status code, None when no response arrived
+
+        :returns: None
+        """
+        metrics = self.__metrics
+        if not metrics.enabled:
+            return
+        metrics.inc("prehtlc_algod_requests_total", endpoint=endpoint)
+        metrics.inc("prehtlc_algod_request_bytes_sent_total", len(body or b""), endpoint=endpoint)
+        metrics.observe("prehtlc_algod_request_seconds", seconds, endpoint=endpoint)
+        if status is None or status >= 400:
+            metrics.inc("prehtlc_algod_request_errors_total", endpoint=endpoint)
+
+    #
+    def __count(self, endpoint: str, counter: str, seconds: float = 0.0) -> None:
+        """
+        Update metrics of an endpoint
+
+        :param endpoint: "METHOD /path" endpoint
+        :param counter: EndpointStats field incremented
+        :param seconds: time added to the endpoint
+
+        :returns: None
+        """
+        with self.__lock:
+            stats = self.__stats.get(endpoint)
+            if stats is None:
+                stats = self.__stats[endpoint] = EndpointStats()
+            setattr(stats, counter, getattr(stats, counter) + 1)
+            stats.seconds += seconds
+
+
+#
+class PooledAlgodClient(AlgodClient):
+    """
+    AlgodClient sending requests over a shared HttpTransport instead of
+    a new urllib connection per request
+    """
+
+    #
+    def __init__(
+                self,
+                algod_token: str,
+                algod_address: str,
+                headers: Optional[dict] = None,
+                transport: Optional[HttpTransport] = None
+            ) -> None:
+        """
+        Constructor
+
+        :param algod_token: algod api token
+        :param algod_address: algod base url
+        :param headers: headers sent with every request
+        :param transport: pooled transport, created for the address
+                          when not given
+
+        :returns: None
+        """
+        super().__init__(algod_token, algod_address, headers)
+        self.__transport = transport or HttpTransport(algod_address)
+
+    #
+    @property
+    def transport(self) -> Optional[HttpTransport]:
+        """
+        Getter for transport private field
+
+        :returns: transport field value
+        """
+        return self.__transport
+
+    #
+    def algod_request(
+                self,
+                method: str,
+                requrl: str,
+                params: Optional[dict] = None,
+                data: Optional[bytes] = None,
+                headers: Optional[dict] = None,
+                response_format: Optional[str] = "json",
+                timeout: Optional[float] = None
+            ):
+        """
+        Execute request over the transport, see AlgodClient.algod_request
+
+        :param method: http method
+        :param requrl: path below the api version prefix
+        :param params: query parameters
+        :param data: request body
+        :param headers: additional request headers
+        :param response_format: json to decode the response body
+        :param timeout: seconds the request may take once connected,
+                        timeout of the transport by default
+
+        :returns: decoded json response or response body
+        """
+        header = {"User-Agent": "py-algorand-sdk"}
+        header.update(self.headers or {})
+        header.update(headers or {})
+        if requrl not in constants.no_auth:
+            header[constants.algod_auth_header] = self.algod_token
+
+        if requrl not in constants.unversioned_paths:
+            requrl = api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        status, body = self.__transport.request(method, requrl, header, data, timeout)
+        if status >= 400:
+            message, data = body.decode('utf-8', 'replace'), None
+            try:
+                decoded = json.loads(message)
+                message, data = decoded.get("message", message), decoded.get("data")
+            except ValueError:
+                pass
+            raise error.AlgodHTTPError(message, status, data)
+
+        if response_format != "json":
+            return body
+        if not body:
+            # some algod responses are 200 OK with an empty body
+            return {}
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
@@ -0,0 +1,268 @@
+#
+import time
+import hashlib
+import logging
+import threading
+import collections
+
+#
+from typing import List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+
+#
+from algorand import AlgoUser
+from algorand_htlc import AlgorandHTLC
+from follower import BlockFollower, ClaimEvent, RedeemEvent
+
+
+#
+logger = logging.getLogger("PreHTLC")
+
+#
+@dataclass
+class PendingClaim:
+    hashlock: bytes
+    app_id: int
+    claimer: AlgoUser
+    dest_app_id: Optional[int] = None
+    swap_id: Optional[str] = None
+    timelock: Optional[int] = None
+    added: float = field(default_factory=time.monotonic)
+
+
+#
+class PreimageWatcher:
+    """
+    PreimageWatcher object claiming source chain swaps as soon as their
+    secret is revealed. Pending swaps are indexed by hashlock, every
+    redeem or claim call seen by the block follower is hashed once and
+    looked up in the index, and the matching claims are submitted from
+    a thread pool so the follower is never blocked. The secret is
+    revealed once, so a failed claim is retried with backoff until its
+    timelock passes
+    """
+
+    #
+    def __init__(
+                self,
+                htlc: Optional[AlgorandHTLC],
+                follower: Optional[BlockFollower],
+                max_workers: int = 8,
+                retain: int = 10000,
+                retry_delay: float = 0.5,
+                max_retry_delay: float = 30.0
+            ) -> None:
+        """
+        Constructor
+
+        :param htlc: client submitting the claims
+        :param follower: block follower reporting destination chain
+                         calls, the watcher subscribes to it
+        :param max_workers: claims submitted concurrently
+        :param retain: latencies kept for stats
+        :param retry_delay: seconds before the first retry of a failed
+                            claim, doubled on every retry
+        :param max_retry_delay: longest pause between retries
+
+        :returns: None
+        """
+        self.__htlc = htlc
+        self.__follower = follower
+        self.__lock = threading.Lock()
+        self.__index = {}
+        self.__watched = collections.Counter()
+        self.__latencies = collections.deque(maxlen=retain)
+        self.__retry_delay = retry_delay
+        self.__max_retry_delay = max_retry_delay
+        self.__closed = threading.Event()
+        self.__claimed = 0
+        self.__failed = 0
+        self.__retries = 0
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preimage-watcher")
+        follower.subscribe(self.on_reveal, (RedeemEvent, ClaimEvent))
+
+    #
+    @property
+    def pending(self) -> int:
+        """
+        Getter for number of swaps waiting for their secret
+
+        :returns: number of pending claims
+        """
+        with self.__lock:
+            return sum(len(claims) for claims in self.__index.values())
+
+    #
+    def add(
+                self,
+                hashlock: bytes,
+                app_id: int,
+                claimer: Optional[AlgoUser],
+                dest_app_id: Optional[int] = None,
+                swap_id=None,
+                timelock: Optional[int] = None
+            ) -> PendingClaim:
+        """
+        Claim source swap once the preimage of its hashlock is revealed
+
+        :param hashlock: sha256 of the secret
+        :param app_id: source chain application to claim
+        :param claimer: account receiving the locked funds
+        :param dest_app_id: destination chain application where the
+                            secret is revealed, watched by the follower
+        :param swap_id: journal key of the swap, see AlgorandHTLC
+        :param timelock: last round the claim is retried in, by default
+                         lock_timestamp of the source application
+
+        :returns: pending claim
+        """
+        claim = PendingClaim(hashlock, app_id, claimer, dest_app_id, swap_id, timelock)
+        with self.__lock:
+            self.__index.setdefault(hashlock, []).append(claim)
+            if dest_app_id is not None:
+                self.__watched[dest_app_id] += 1
+                if self.__watched[dest_app_id] == 1:
+                    self.__follower.watch(dest_app_id)
+        return claim
+
+    #
+    def remove(self, hashlock: bytes) -> List[PendingClaim]:
+        """
+        Stop watching swaps, e.g. after their timelock has passed
+
+        :param hashlock: sha256 of the secret
+
+        :returns: removed claims
+        """
+        with self.__lock:
+            claims = self.__index.pop(hashlock, [])
+        self.__unwatch(claims)
+        return claims
+
+    #
+    def on_reveal(self, event) -> List[Future]:
+        """
+        Submit claims of the swaps locked with the revealed secret,
+        called by the follower for every redeem and claim call
+
+        :param event: RedeemEvent or ClaimEvent carrying a secret
+
+        :returns: futures resolved with the claim transaction ids
+        """
+        revealed = time.perf_counter()
+        hashlock = hashlib.sha256(event.secret).digest()
+        with self.__lock:
+            claims = self.__index.pop(hashlock, None)
+        if not claims:
+            return []
+        self.__unwatch(claims)
+        return [
+            self.__executor.submit(self.__claim, claim, event.secret, revealed)
+            for claim in claims
+        ]
+
+    #
+    def stats(self) -> dict:
+        """
+        Reveal-to-claim latency, from the follower seeing the secret to
+        the claim being confirmed
+
+        :returns: pending, claimed and failed claims, retries and
+                  latency mean, p50, p99 and max in milliseconds
+        """
+        with self.__lock:
+            values = sorted(seconds * 1000 for seconds in self.__latencies)
+            stats = {"pending": sum(len(claims) for claims in self.__index.values()),
+                     "claimed": self.__claimed, "failed": self.__failed, "retries": self.__retries}
+        if values:
+            stats["latency"] = {
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(values[int(0.50 * (len(values) - 1))], 3),
+                "p99_ms": round(values[int(0.99 * (len(values) - 1))], 3),
+                "max_ms": round(values[-1], 3)
+            }
+        return stats
+
+    #
+    def close(self) -> None:
+        """
+        Wait for claims in flight, claims waiting for a retry give up
+
+        :returns: None
+        """
+        self.__closed.set()
+        self.__executor.shutdown()
+
+    #
+    def __claim(self, claim: PendingClaim, secret: bytes, revealed: float) -> str:
+        """
+        Submit claim of a source swap and wait for its confirmation,
+        runs on a watcher thread
+
+        :param claim: pending claim
+        :param secret: revealed preimage
+        :param revealed: perf_counter time the secret was seen
+
+        :returns: claim transaction id
+        """
+        delay = self.__retry_delay
+        while True:
+            try:
+                tx_id = self.__htlc.redeem(claim.claimer, claim.app_id, secret, swap_id=claim.swap_id)
+                # a claim rejected after submission is retried as well
+                self.__htlc.wait_for_confirmation(tx_id)
+                break
+            except Exception:
+                if self.__closed.is_set() or self.__expired(claim):
+                    with self.__lock:
+                        self.__failed += 1
+                    raise
+                logger.warning("claim of app %s failed, retrying in %.1fs", claim.app_id, delay, exc_info=True)
+                with self.__lock:
+                    self.__retries += 1
+                self.__closed.wait(delay)
+                delay = min(delay * 2, self.__max_retry_delay)
+
+        seconds = time.perf_counter() - revealed
+        with self.__lock:
+            self.__claimed += 1
+            self.__latencies.append(seconds)
+        self.__htlc.metrics.observe("prehtlc_reveal_to_claim_seconds", seconds)
+        return tx_id
+
+    #
+    def __expired(self, claim: PendingClaim) -> bool:
+        """
+        Whether the timelock of a claim has passed, an unknown state
+        reads as not expired so the claim is retried
+
+        :param claim: pending claim
+
+        :returns: True once the claim can no longer succeed
+        """
+        try:
+            if claim.timelock is None:
+                claim.timelock = self.__htlc.state_reader.get(claim.app_id, "commit")["lock_timestamp"]
+            return self.__htlc.client.status()["last-round"] > claim.timelock
+        except Exception:
+            return False
+
+    #
+    def __unwatch(self, claims: List[PendingClaim]) -> None:
+        """
+        Stop following destination applications no pending claim is
+        revealed on
+
+        :param claims: claims no longer pending
+
+        :returns: None
+        """
+        with self.__lock:
+            for claim in claims:
+                if claim.dest_app_id is None:
+                    continue
+                self.__watched[claim.dest_app_id] -= 1
+                if self.__watched[claim.dest_app_id] <= 0:
+                    del self.__watched[claim.dest_app_id]
+                    self.__follower.unwatch(claim.dest_app_id)